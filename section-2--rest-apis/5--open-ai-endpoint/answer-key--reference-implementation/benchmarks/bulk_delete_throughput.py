@@ -0,0 +1,85 @@
+"""
+Benchmark deleting a directory file by file against deleting it with batched `DeleteObjects` requests.
+
+Keys are deleted from a local moto server through `Boto3S3Backend`. The per-key loop makes the same
+S3 calls as `DELETE /v1/files/{file_path}`: an existence check and a `DeleteObject` per key. The
+bulk delete lists the directory and deletes it in batches of 1000 keys, as `POST /v1/files/batch-delete`
+does. A fixed delay is added to every S3 round trip to emulate network latency to S3.
+
+Usage:
+    python benchmarks/bulk_delete_throughput.py --keys 200 2000 --s3-latency-ms 20
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import (
+    BUCKET_NAME,
+    add_simulated_latency,
+    moto_server,
+)
+
+from files_api.s3.backends import Boto3S3Backend
+from files_api.s3.clients import create_s3_client
+from files_api.s3.executor import S3Executor
+
+PREFIX = "benchmark/"
+
+
+def create_objects(num_keys: int) -> None:
+    s3_client = create_s3_client(max_pool_connections=32)
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        for index in range(num_keys):
+            executor.submit(s3_client.put_object, Bucket=BUCKET_NAME, Key=f"{PREFIX}{index}.txt", Body=b"x")
+
+
+async def delete_one_by_one(backend: Boto3S3Backend, num_keys: int) -> None:
+    for index in range(num_keys):
+        object_key = f"{PREFIX}{index}.txt"
+        if await backend.object_exists_in_s3(BUCKET_NAME, object_key):
+            await backend.delete_s3_object(BUCKET_NAME, object_key)
+
+
+async def delete_in_bulk(backend: Boto3S3Backend, num_keys: int, max_concurrency: int) -> None:
+    deleted_count, failures = await backend.delete_s3_objects_with_prefix(
+        BUCKET_NAME, PREFIX, max_concurrency=max_concurrency
+    )
+    assert deleted_count == num_keys and not failures
+
+
+def keys_per_second(backend: Boto3S3Backend, num_keys: int, mode: str, max_concurrency: int) -> float:
+    create_objects(num_keys)
+    start = time.perf_counter()
+    if mode == "per-key":
+        asyncio.run(delete_one_by_one(backend, num_keys))
+    else:
+        asyncio.run(delete_in_bulk(backend, num_keys, max_concurrency))
+    return num_keys / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, nargs="+", default=[200, 2000])
+    parser.add_argument("--s3-latency-ms", type=float, default=20, help="Delay added to every S3 round trip.")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="DeleteObjects requests in flight at once.")
+    parser.add_argument("--port", type=int, default=5060, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    with moto_server(args.port):
+        executor = S3Executor(max_workers=4)
+        backend = Boto3S3Backend(s3_client=create_s3_client(), executor=executor)
+        add_simulated_latency(backend, args.s3_latency_ms / 1000)
+
+        print(f"{'keys':>8}{'mode':>10}{'keys/s':>12}")
+        for num_keys in args.keys:
+            for mode in ["per-key", "bulk"]:
+                print(
+                    f"{num_keys:>8}{mode:>10}{keys_per_second(backend, num_keys, mode, args.max_concurrency):>12.1f}"
+                )
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
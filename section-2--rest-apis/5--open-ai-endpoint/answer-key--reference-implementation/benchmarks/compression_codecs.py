@@ -0,0 +1,100 @@
+"""
+Benchmark the bytes on the wire and the CPU cost of each response compression codec and level.
+
+Each payload is compressed the way `CompressionMiddleware` compresses a file streamed from S3: in
+chunks of the backend's chunk size, with the compressor flushed whenever its flush size went in.
+Codecs whose library is not installed (see the `compression` extra) are skipped.
+
+Usage:
+    python benchmarks/compression_codecs.py --size-mb 8
+"""
+
+import argparse
+import json
+import os
+import time
+from datetime import (
+    datetime,
+    timezone,
+)
+from typing import Dict
+
+from files_api.compression import (
+    DEFAULT_COMPRESSION_FLUSH_SIZE_BYTES,
+    ContentCoding,
+    create_compressor,
+    get_available_content_codings,
+)
+from files_api.s3.read_objects import DEFAULT_CHUNK_SIZE_BYTES
+
+LEVELS = {
+    ContentCoding.GZIP: [1, 4, 6, 9],
+    ContentCoding.ZSTD: [1, 3, 9, 19],
+    ContentCoding.BROTLI: [1, 4, 9, 11],
+}
+
+
+def make_payloads(size_bytes: int) -> Dict[str, bytes]:
+    csv_rows = (f"{i},user{i % 977},{i * 7919 % 100_000 / 100:.2f},2024-01-{i % 28 + 1:02}\n" for i in range(10**9))
+    csv = b"id,name,amount,date\n"
+    while len(csv) < size_bytes:
+        csv += "".join(next(csv_rows) for _ in range(10_000)).encode()
+    listing = {
+        "files": [
+            {
+                "file_path": f"reports/2024/{i % 12 + 1:02}/report-{i:06}.csv",
+                "last_modified": datetime(2024, 1, 1, tzinfo=timezone.utc).isoformat(),
+                "size_bytes": i * 37 % 10**6,
+            }
+            for i in range(1000)
+        ],
+        "next_page_token": "eyJjb250aW51YXRpb25fdG9rZW4iOiIxZmY0In0=",
+    }
+    return {
+        "text/csv": csv[:size_bytes],
+        "listing json (1000 files)": json.dumps(listing).encode(),
+        "random bytes": os.urandom(size_bytes),
+    }
+
+
+def compress_in_chunks(coding: ContentCoding, level: int, payload: bytes) -> tuple[int, float]:
+    """Return the compressed size and the CPU seconds compressing `payload` took."""
+    compressor = create_compressor(coding, level)
+    started_at = time.process_time()
+    compressed_bytes = unflushed_bytes = 0
+    for start in range(0, len(payload), DEFAULT_CHUNK_SIZE_BYTES):
+        end = start + DEFAULT_CHUNK_SIZE_BYTES
+        compressed_bytes += len(compressor.compress(payload[start:end]))
+        unflushed_bytes += end - start
+        if unflushed_bytes >= DEFAULT_COMPRESSION_FLUSH_SIZE_BYTES:
+            compressed_bytes += len(compressor.flush())
+            unflushed_bytes = 0
+    compressed_bytes += len(compressor.finish())
+    return compressed_bytes, time.process_time() - started_at
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=8, help="Size of the CSV and random payloads.")
+    args = parser.parse_args()
+
+    codings = get_available_content_codings()
+    skipped = [coding.value for coding in ContentCoding if coding not in codings]
+    if skipped:
+        print(f"skipped, not installed: {', '.join(skipped)}")
+
+    for name, payload in make_payloads(int(args.size_mb * 1024 * 1024)).items():
+        print(f"\n{name}: {len(payload) / 1024:,.0f} KiB")
+        print(f"{'codec':>8}{'level':>7}{'ratio':>8}{'on wire KiB':>13}{'CPU MB/s':>10}")
+        for coding in codings:
+            for level in LEVELS[coding]:
+                compressed_bytes, cpu_seconds = compress_in_chunks(coding, level, payload)
+                mb_per_second = len(payload) / 1e6 / max(cpu_seconds, 1e-9)
+                print(
+                    f"{coding.value:>8}{level:>7}{len(payload) / compressed_bytes:>8.2f}"
+                    f"{compressed_bytes / 1024:>13,.0f}{mb_per_second:>10.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
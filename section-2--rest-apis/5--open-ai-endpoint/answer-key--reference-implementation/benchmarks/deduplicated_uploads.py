@@ -0,0 +1,89 @@
+"""
+Benchmark the bytes sent to S3 and stored in it when uploads are deduplicated, against plain uploads.
+
+`--files` files are uploaded through `Boto3S3Backend` to a local moto server, their contents drawn in
+turn from `--distinct-contents` random payloads of `--size-mb` each, the way many users upload the
+same datasets or images. With deduplication, every upload after the first of each content sends
+only a reference and an empty pointer to S3. A fixed delay is added to every S3 round trip to
+emulate network latency to S3.
+
+Usage:
+    python benchmarks/deduplicated_uploads.py --files 40 --distinct-contents 4 --size-mb 8
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import time
+
+from utils import (
+    BUCKET_NAME,
+    add_simulated_latency,
+    moto_server,
+)
+
+from files_api.s3.backends import Boto3S3Backend
+from files_api.s3.clients import create_s3_client
+from files_api.s3.executor import S3Executor
+from files_api.s3.read_objects import iter_s3_objects
+
+
+async def upload_files(backend: Boto3S3Backend, contents: list[bytes], num_files: int) -> None:
+    for index in range(num_files):
+        await backend.upload_s3_object_from_file(
+            BUCKET_NAME, f"uploads/{index}.bin", io.BytesIO(contents[index % len(contents)])
+        )
+
+
+def run(backend: Boto3S3Backend, contents: list[bytes], num_files: int) -> tuple[int, int, int, float]:
+    """Return the body bytes sent to S3, the PUT requests, the bytes stored, and the seconds the uploads took."""
+    sent = {"bytes": 0, "requests": 0}
+
+    def count_body(params, **kwargs):  # pylint: disable=unused-argument
+        sent["requests"] += 1
+        body = params.get("Body", b"")
+        sent["bytes"] += len(body) if isinstance(body, bytes) else 0
+
+    backend.s3_client.meta.events.register("before-parameter-build.s3.PutObject", count_body)
+    backend.s3_client.meta.events.register("before-parameter-build.s3.UploadPart", count_body)
+    started_at = time.perf_counter()
+    asyncio.run(upload_files(backend, contents, num_files))
+    duration_seconds = time.perf_counter() - started_at
+    backend.s3_client.meta.events.unregister("before-parameter-build.s3.PutObject", count_body)
+    backend.s3_client.meta.events.unregister("before-parameter-build.s3.UploadPart", count_body)
+
+    stored_bytes = sum(s3_object["Size"] for s3_object in iter_s3_objects(BUCKET_NAME, s3_client=backend.s3_client))
+    asyncio.run(backend.delete_s3_objects_with_prefix(BUCKET_NAME, ""))
+    return sent["bytes"], sent["requests"], stored_bytes, duration_seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=40, help="Number of files to upload.")
+    parser.add_argument("--distinct-contents", type=int, default=4, help="Number of distinct file contents.")
+    parser.add_argument("--size-mb", type=float, default=8, help="Size of each file.")
+    parser.add_argument("--s3-latency-ms", type=float, default=20, help="Delay added to every S3 round trip.")
+    parser.add_argument("--port", type=int, default=5070, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    contents = [os.urandom(int(args.size_mb * 1024 * 1024)) for _ in range(args.distinct_contents)]
+    with moto_server(args.port):
+        executor = S3Executor(max_workers=8)
+        print(f"{'mode':>14}{'sent MB':>10}{'PUTs':>8}{'stored MB':>12}{'seconds':>10}")
+        for deduplicate_uploads in [False, True]:
+            backend = Boto3S3Backend(
+                s3_client=create_s3_client(), executor=executor, deduplicate_uploads=deduplicate_uploads
+            )
+            add_simulated_latency(backend, args.s3_latency_ms / 1000)
+            sent_bytes, put_requests, stored_bytes, duration_seconds = run(backend, contents, args.files)
+            mode = "deduplicated" if deduplicate_uploads else "plain"
+            print(
+                f"{mode:>14}{sent_bytes / 2**20:>10.1f}{put_requests:>8}"
+                f"{stored_bytes / 2**20:>12.1f}{duration_seconds:>10.2f}"
+            )
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
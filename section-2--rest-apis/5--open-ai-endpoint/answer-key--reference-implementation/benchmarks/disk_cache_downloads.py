@@ -0,0 +1,76 @@
+"""
+Benchmark the latency of downloads, and the S3 GETs they make, with and without the disk cache.
+
+`--files` files of `--size-kb` are uploaded to a local moto server, then downloaded `--downloads`
+times through the API, picking files from a Zipf distribution so a few hot files get most of the
+downloads. With `DISK_CACHE_DIR` set, repeated downloads of a file are sent from local disk. A fixed
+delay is added to every S3 round trip to emulate network latency to S3.
+
+Usage:
+    python benchmarks/disk_cache_downloads.py --files 200 --size-kb 512 --downloads 1000
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+from utils import (
+    BUCKET_NAME,
+    add_simulated_latency,
+    choose_zipf,
+    moto_server,
+    record_get_object_calls,
+)
+
+from files_api.main import create_app
+from files_api.settings import Settings
+
+
+def run(settings: Settings, file_paths: list[str], args: argparse.Namespace) -> tuple[list[float], int]:
+    """Return the seconds each download took, and the number of S3 GETs made."""
+    with TestClient(create_app(settings=settings)) as client:
+        add_simulated_latency(client.app.state.s3_backend, args.s3_latency_ms / 1000)
+        get_object_calls = record_get_object_calls(client)
+        durations = []
+        for file_path in choose_zipf(file_paths, args.zipf_exponent, args.downloads):
+            started_at = time.perf_counter()
+            response = client.get(f"/v1/files/{file_path}")
+            durations.append(time.perf_counter() - started_at)
+            assert response.status_code == 200
+        return durations, len(get_object_calls)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200, help="Number of distinct files.")
+    parser.add_argument("--size-kb", type=int, default=512, help="Size of each file.")
+    parser.add_argument("--downloads", type=int, default=1000, help="Number of downloads.")
+    parser.add_argument("--zipf-exponent", type=float, default=1.1, help="Skew of the downloads towards hot files.")
+    parser.add_argument("--disk-cache-mb", type=int, default=32, help="Byte budget of the disk cache.")
+    parser.add_argument("--s3-latency-ms", type=float, default=20, help="Delay added to every S3 round trip.")
+    parser.add_argument("--port", type=int, default=5072, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    with moto_server(args.port), tempfile.TemporaryDirectory() as disk_cache_dir:
+        file_paths = [f"files/{index}.bin" for index in range(args.files)]
+        with TestClient(create_app(settings=Settings(s3_bucket_name=BUCKET_NAME))) as client:
+            for file_path in file_paths:
+                client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, b"x" * args.size_kb * 1024)})
+
+        print(f"{'mode':>10}{'p50 ms':>9}{'p99 ms':>9}{'S3 GETs':>9}")
+        for mode in ["s3", "disk"]:
+            settings = Settings(
+                s3_bucket_name=BUCKET_NAME,
+                disk_cache_dir=disk_cache_dir if mode == "disk" else None,
+                disk_cache_max_bytes=args.disk_cache_mb * 1024 * 1024,
+                disk_cache_eviction="lfu",
+            )
+            durations, get_object_calls = run(settings, file_paths, args)
+            p99 = statistics.quantiles(durations, n=100)[98]
+            print(f"{mode:>10}{statistics.median(durations) * 1000:>9.1f}{p99 * 1000:>9.1f}{get_object_calls:>9}")
+
+
+if __name__ == "__main__":
+    main()
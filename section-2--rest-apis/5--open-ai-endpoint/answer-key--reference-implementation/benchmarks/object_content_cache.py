@@ -0,0 +1,91 @@
+"""
+Benchmark the latency of small-file downloads, and the S3 GETs they make, with and without the content cache.
+
+`--files` files of `--size-kb` are uploaded to a local moto server, then downloaded `--downloads`
+times through the API, picking files from a Zipf distribution so a few hot files get most of the
+downloads. Every `--scan-every` downloads, the next file of a one-off scan of `--scan-files` other
+files is downloaded too, as a backup or crawler would. With `OBJECT_CONTENT_CACHE_MAX_BYTES` set,
+repeated downloads of a hot file are answered from memory, and the scan should not push the hot files
+out. A fixed delay is added to every S3 round trip to emulate network latency to S3.
+
+Usage:
+    python benchmarks/object_content_cache.py --files 500 --size-kb 16 --downloads 2000 --cache-mb 2
+"""
+
+import argparse
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+from utils import (
+    BUCKET_NAME,
+    add_simulated_latency,
+    choose_zipf,
+    moto_server,
+    record_get_object_calls,
+)
+
+from files_api.main import create_app
+from files_api.settings import Settings
+
+
+def run(settings: Settings, file_paths: list[str], scan_paths: list[str], args: argparse.Namespace) -> tuple:
+    """Return the seconds each download of a hot file took, the number of S3 GETs made, and the cache's stats."""
+    with TestClient(create_app(settings=settings)) as client:
+        add_simulated_latency(client.app.state.s3_backend, args.s3_latency_ms / 1000)
+        get_object_calls = record_get_object_calls(client)
+        scan = iter(scan_paths)
+        durations = []
+        for index, file_path in enumerate(choose_zipf(file_paths, args.zipf_exponent, args.downloads)):
+            started_at = time.perf_counter()
+            response = client.get(f"/v1/files/{file_path}")
+            durations.append(time.perf_counter() - started_at)
+            assert response.status_code == 200
+            if index % args.scan_every == 0 and (scan_path := next(scan, None)):
+                assert client.get(f"/v1/files/{scan_path}").status_code == 200
+        # without any cache, the metrics report no metadata cache at all
+        contents = (client.get("/v1/metrics").json()["s3_metadata_cache"] or {}).get("contents")
+        return durations, len(get_object_calls), contents
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=500, help="Number of distinct hot and cold files.")
+    parser.add_argument("--scan-files", type=int, default=500, help="Number of files downloaded once by the scan.")
+    parser.add_argument("--scan-every", type=int, default=4, help="Downloads between two files of the scan.")
+    parser.add_argument("--size-kb", type=int, default=16, help="Size of each file.")
+    parser.add_argument("--downloads", type=int, default=2000, help="Number of downloads.")
+    parser.add_argument("--zipf-exponent", type=float, default=1.1, help="Skew of the downloads towards hot files.")
+    parser.add_argument("--cache-mb", type=float, default=2, help="Byte budget of the content cache.")
+    parser.add_argument("--s3-latency-ms", type=float, default=20, help="Delay added to every S3 round trip.")
+    parser.add_argument("--port", type=int, default=5073, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    with moto_server(args.port):
+        file_paths = [f"files/{index}.bin" for index in range(args.files)]
+        scan_paths = [f"scan/{index}.bin" for index in range(args.scan_files)]
+        with TestClient(create_app(settings=Settings(s3_bucket_name=BUCKET_NAME))) as client:
+            for file_path in file_paths + scan_paths:
+                client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, b"x" * args.size_kb * 1024)})
+
+        print(f"{'mode':>10}{'p50 ms':>9}{'p99 ms':>9}{'S3 GETs':>9}{'hit rate':>10}{'rejected':>10}")
+        for mode in ["s3", "memory"]:
+            settings = Settings(
+                s3_bucket_name=BUCKET_NAME,
+                object_content_cache_max_bytes=int(args.cache_mb * 1024 * 1024) if mode == "memory" else 0,
+                # long enough for the whole run, so only evictions make files leave the cache
+                metadata_cache_ttl_seconds=3600,
+            )
+            durations, get_object_calls, contents = run(settings, file_paths, scan_paths, args)
+            p99 = statistics.quantiles(durations, n=100)[98]
+            lookups = contents["hits"] + contents["misses"] if contents else 0
+            hit_rate = contents["hits"] / lookups if lookups else 0.0
+            rejected = contents["rejections"] if contents else 0
+            print(
+                f"{mode:>10}{statistics.median(durations) * 1000:>9.1f}{p99 * 1000:>9.1f}"
+                f"{get_object_calls:>9}{hit_rate:>10.2f}{rejected:>10}"
+            )
+
+
+if __name__ == "__main__":
+    main()
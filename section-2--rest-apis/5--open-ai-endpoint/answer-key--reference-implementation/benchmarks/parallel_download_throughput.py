@@ -0,0 +1,85 @@
+"""
+Benchmark download throughput against object size and the number of concurrent ranged GETs.
+
+Objects are downloaded from a local moto server through `Boto3S3Backend.fetch_s3_object_in_parallel`.
+A fixed delay is added to every S3 round trip to emulate the time to first byte of S3, and every
+response is slowed down to a fixed bandwidth to emulate S3's per-connection throughput limit, which
+is what concurrent ranged GETs work around. Parallelism 1 downloads the object with a single GET.
+
+Usage:
+    python benchmarks/parallel_download_throughput.py --sizes-mb 8 32 128 --parallelism 1 2 4 8
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+from utils import (
+    BUCKET_NAME,
+    add_simulated_latency,
+    moto_server,
+)
+
+from files_api.s3.backends import Boto3S3Backend
+from files_api.s3.clients import create_s3_client
+from files_api.s3.executor import S3Executor
+
+MIB = 1024 * 1024
+PART_SIZE_BYTES = 8 * MIB
+
+
+def limit_bandwidth_per_connection(s3_client, mb_per_second: float) -> None:
+    """Delay every GetObject response for as long as its body would take to arrive at `mb_per_second`."""
+
+    def delay(parsed, **kwargs):  # pylint: disable=unused-argument
+        time.sleep(parsed.get("ContentLength", 0) / MIB / mb_per_second)
+
+    s3_client.meta.events.register("after-call.s3.GetObject", delay)
+
+
+async def download_mb_per_second(backend: Boto3S3Backend, object_key: str, size_mb: int, parallelism: int) -> float:
+    # a threshold of the whole object makes the download a single GET
+    threshold_bytes = size_mb * MIB if parallelism == 1 else PART_SIZE_BYTES
+    start = time.perf_counter()
+    response = await backend.fetch_s3_object_in_parallel(
+        BUCKET_NAME,
+        object_key,
+        threshold_bytes=threshold_bytes,
+        part_size_bytes=PART_SIZE_BYTES,
+        max_concurrency=parallelism,
+    )
+    num_bytes = 0
+    async for chunk in response["Body"]:
+        num_bytes += len(chunk)
+    return num_bytes / MIB / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--parallelism", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--s3-latency-ms", type=float, default=20, help="Delay added to every S3 round trip.")
+    parser.add_argument("--s3-mbps-per-connection", type=float, default=50, help="Bandwidth of one S3 connection.")
+    parser.add_argument("--port", type=int, default=5058, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    with moto_server(args.port):
+        s3_client = create_s3_client()
+        executor = S3Executor(max_workers=max(args.parallelism) + 1)
+        backend = Boto3S3Backend(s3_client=s3_client, executor=executor)
+        add_simulated_latency(backend, args.s3_latency_ms / 1000)
+        limit_bandwidth_per_connection(s3_client, args.s3_mbps_per_connection)
+
+        print(f"{'size (MiB)':>10}{'parallelism':>13}{'MiB/s':>10}")
+        for size_mb in args.sizes_mb:
+            object_key = f"benchmark/{size_mb}.bin"
+            create_s3_client().put_object(Bucket=BUCKET_NAME, Key=object_key, Body=os.urandom(size_mb * MIB))
+            for parallelism in args.parallelism:
+                mb_per_second = asyncio.run(download_mb_per_second(backend, object_key, size_mb, parallelism))
+                print(f"{size_mb:>10}{parallelism:>13}{mb_per_second:>10.1f}")
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark reconciling the metadata index with one sequential listing against prefix-sharded listings.
+
+Keys are spread over `--directories` directories of a local moto server, and the index is rebuilt
+from scratch with `reconcile_metadata_index`. With `--target-shards 1`, the bucket is listed as one
+shard, one page after another. A fixed delay is added to every S3 round trip to emulate network
+latency to S3; the listing is bound by it, since every page waits for the previous page's token.
+
+moto lists slowly, so a small `--page-size` stands in for a bucket with many more keys: a directory
+is only split off as a shard when its listing takes more than one page.
+
+Usage:
+    python benchmarks/reconcile_throughput.py --keys 2000 --directories 20 --page-size 20
+"""
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from utils import (
+    BUCKET_NAME,
+    add_simulated_latency,
+    moto_server,
+)
+
+from files_api.s3.clients import create_s3_client
+from files_api.s3.metadata_index import S3MetadataIndex
+from files_api.s3.reconciler import reconcile_metadata_index
+
+
+class _Backend:  # pylint: disable=too-few-public-methods
+    """Just enough of a backend for `add_simulated_latency`."""
+
+    def __init__(self, s3_client):
+        self.s3_client = s3_client
+
+
+def create_objects(num_keys: int, num_directories: int) -> None:
+    s3_client = create_s3_client(max_pool_connections=32)
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        for index in range(num_keys):
+            key = f"dir{index % num_directories:03}/file{index}.txt"
+            executor.submit(s3_client.put_object, Bucket=BUCKET_NAME, Key=key, Body=b"x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--directories", type=int, default=20)
+    parser.add_argument("--target-shards", type=int, nargs="+", default=[1, 64])
+    parser.add_argument("--max-concurrency", type=int, default=8, help="Shards listed at once.")
+    parser.add_argument("--page-size", type=int, default=20, help="Keys per listing request.")
+    parser.add_argument("--s3-latency-ms", type=float, default=20, help="Delay added to every S3 round trip.")
+    parser.add_argument("--port", type=int, default=5061, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    with moto_server(args.port):
+        create_objects(args.keys, args.directories)
+        s3_client = create_s3_client(max_pool_connections=args.max_concurrency)
+        add_simulated_latency(_Backend(s3_client), args.s3_latency_ms / 1000)
+
+        print(f"{'target shards':>14}{'shards':>8}{'keys/s':>10}{'skew':>8}")
+        for target_shards in args.target_shards:
+            index = S3MetadataIndex(":memory:")
+            report = reconcile_metadata_index(
+                BUCKET_NAME,
+                index,
+                max_concurrency=args.max_concurrency,
+                target_shards=target_shards,
+                page_size=args.page_size,
+                s3_client=s3_client,
+            )
+            index.close()
+            assert report.listed_keys == args.keys
+            print(
+                f"{target_shards:>14}{len(report.shards):>8}{report.keys_per_second:>10.0f}{report.shard_skew:>8.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
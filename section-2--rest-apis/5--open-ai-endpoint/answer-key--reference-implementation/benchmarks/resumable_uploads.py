@@ -0,0 +1,134 @@
+"""
+Benchmark the bytes resent, and the time taken, by uploads over a connection that drops.
+
+`--uploads` files of `--size-mb` are uploaded through `Boto3S3Backend` to a local moto server, over a
+simulated connection that drops on average every `--mean-mb-between-drops` of data sent. A plain
+upload (`upload_s3_object_from_file`, as `PUT /v1/files/:file_path` does) starts over from the first
+byte after every drop. An upload session only resends the chunk the drop interrupted, and sends
+`--concurrency` chunks at a time. A fixed delay is added to every S3 round trip to emulate network
+latency to S3.
+
+Usage:
+    python benchmarks/resumable_uploads.py --uploads 20 --size-mb 64 --mean-mb-between-drops 48
+"""
+
+import argparse
+import asyncio
+import io
+import os
+import random
+import statistics
+import time
+
+from utils import (
+    BUCKET_NAME,
+    add_simulated_latency,
+    moto_server,
+)
+
+from files_api.s3.backends import Boto3S3Backend
+from files_api.s3.clients import create_s3_client
+from files_api.s3.executor import S3Executor
+from files_api.s3.write_objects import MIN_MULTIPART_PART_SIZE_BYTES
+
+
+class DroppingConnection:
+    """Counts the bytes sent, and raises `ConnectionError` where the next drop falls."""
+
+    def __init__(self, mean_bytes_between_drops: float, seed: int):
+        self.random = random.Random(seed)
+        self.mean_bytes_between_drops = mean_bytes_between_drops
+        self.bytes_until_drop = self.random.expovariate(1 / mean_bytes_between_drops)
+        self.bytes_sent = 0
+
+    def send(self, num_bytes: int) -> None:
+        if num_bytes < self.bytes_until_drop:
+            self.bytes_until_drop -= num_bytes
+            self.bytes_sent += num_bytes
+            return
+        self.bytes_sent += int(self.bytes_until_drop)
+        self.bytes_until_drop = self.random.expovariate(1 / self.mean_bytes_between_drops)
+        raise ConnectionError("connection dropped")
+
+
+class DroppingFile(io.BytesIO):
+    """A file whose reads are sent over a `DroppingConnection`."""
+
+    def __init__(self, content: bytes, connection: DroppingConnection):
+        super().__init__(content)
+        self.connection = connection
+
+    def read(self, size: int = -1) -> bytes:  # type: ignore[override]
+        data = super().read(size)
+        self.connection.send(len(data))
+        return data
+
+
+async def upload_plain(backend: Boto3S3Backend, content: bytes, connection: DroppingConnection) -> None:
+    while True:
+        try:
+            await backend.upload_s3_object_from_file(BUCKET_NAME, "plain.bin", DroppingFile(content, connection))
+            return
+        except ConnectionError:
+            continue
+
+
+async def upload_in_session(
+    backend: Boto3S3Backend, content: bytes, connection: DroppingConnection, concurrency: int
+) -> None:
+    upload_id = await backend.create_upload_session(BUCKET_NAME, "session.bin")
+    chunk_size = MIN_MULTIPART_PART_SIZE_BYTES
+    pending = list(range(1, -(-len(content) // chunk_size) + 1))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def upload_chunk(chunk_number: int) -> None:
+        start = (chunk_number - 1) * chunk_size
+        end = start + chunk_size
+        chunk = content[start:end]
+        async with semaphore:
+            while True:
+                try:
+                    connection.send(len(chunk))
+                    await backend.upload_session_chunk(BUCKET_NAME, "session.bin", upload_id, chunk_number, chunk)
+                    return
+                except ConnectionError:
+                    continue
+
+    await asyncio.gather(*(upload_chunk(chunk_number) for chunk_number in pending))
+    await backend.complete_upload_session(BUCKET_NAME, "session.bin", upload_id, len(pending))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=20, help="Number of files to upload.")
+    parser.add_argument("--size-mb", type=float, default=64, help="Size of each file.")
+    parser.add_argument("--mean-mb-between-drops", type=float, default=48, help="Mean data sent between drops.")
+    parser.add_argument("--concurrency", type=int, default=4, help="Chunks of a session sent at the same time.")
+    parser.add_argument("--s3-latency-ms", type=float, default=20, help="Delay added to every S3 round trip.")
+    parser.add_argument("--port", type=int, default=5071, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    content = os.urandom(int(args.size_mb * 1024 * 1024))
+    with moto_server(args.port):
+        executor = S3Executor(max_workers=8)
+        backend = Boto3S3Backend(s3_client=create_s3_client(), executor=executor)
+        add_simulated_latency(backend, args.s3_latency_ms / 1000)
+        print(f"{'mode':>10}{'sent / size':>13}{'p50 s':>8}{'p99 s':>8}")
+        for mode in ["plain", "session"]:
+            connection = DroppingConnection(args.mean_mb_between_drops * 1024 * 1024, seed=0)
+            durations = []
+            for _ in range(args.uploads):
+                started_at = time.perf_counter()
+                if mode == "plain":
+                    asyncio.run(upload_plain(backend, content, connection))
+                else:
+                    asyncio.run(upload_in_session(backend, content, connection, args.concurrency))
+                durations.append(time.perf_counter() - started_at)
+            overhead = connection.bytes_sent / (len(content) * args.uploads)
+            p99 = statistics.quantiles(durations, n=100)[98] if len(durations) > 1 else durations[0]
+            print(f"{mode:>10}{overhead:>13.2f}{statistics.median(durations):>8.2f}{p99:>8.2f}")
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
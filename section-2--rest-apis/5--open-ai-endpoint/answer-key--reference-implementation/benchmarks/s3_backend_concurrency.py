@@ -0,0 +1,69 @@
+"""
+Benchmark API throughput against the number of in-flight requests for each S3 backend.
+
+Requests are sent in-process to the FastAPI app, which calls a local moto server. A fixed delay is
+added to every S3 round trip to emulate network latency to S3; if S3 calls block the event loop
+that delay serializes the requests, otherwise it overlaps.
+
+Usage:
+    python benchmarks/s3_backend_concurrency.py --requests 64 --s3-latency-ms 20
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from utils import (
+    BUCKET_NAME,
+    add_simulated_latency,
+    moto_server,
+)
+
+from files_api.main import create_app
+from files_api.settings import (
+    S3BackendType,
+    Settings,
+)
+
+FILE_PATH = "benchmark/file.txt"
+
+
+async def requests_per_second(backend: S3BackendType, concurrency: int, num_requests: int, latency: float) -> float:
+    # without the metadata cache, so every HEAD reaches S3
+    app = create_app(Settings(s3_bucket_name=BUCKET_NAME, s3_backend=backend, metadata_cache_max_entries=0))
+    async with app.router.lifespan_context(app):
+        add_simulated_latency(app.state.s3_backend, latency)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://files-api") as client:
+            await client.put(f"/v1/files/{FILE_PATH}", files={"file_content": (FILE_PATH, b"hello", "text/plain")})
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def head_file() -> None:
+                async with semaphore:
+                    response = await client.head(f"/v1/files/{FILE_PATH}")
+                    response.raise_for_status()
+
+            start = time.perf_counter()
+            await asyncio.gather(*(head_file() for _ in range(num_requests)))
+            return num_requests / (time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=64, help="Number of HEAD requests per measurement.")
+    parser.add_argument("--s3-latency-ms", type=float, default=20, help="Delay added to every S3 round trip.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 32])
+    parser.add_argument("--port", type=int, default=5056, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    with moto_server(args.port):
+        print(f"{'backend':<14}{'in-flight':>10}{'req/s':>10}")
+        for backend in S3BackendType:
+            for concurrency in args.concurrency:
+                rps = asyncio.run(requests_per_second(backend, concurrency, args.requests, args.s3_latency_ms / 1000))
+                print(f"{backend.value:<14}{concurrency:>10}{rps:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
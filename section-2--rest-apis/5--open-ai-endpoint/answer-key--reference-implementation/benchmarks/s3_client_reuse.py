@@ -0,0 +1,51 @@
+"""
+Benchmark the per-request overhead of creating a new S3 client vs. reusing the pooled client.
+
+Runs against a local moto server so that every S3 call goes over a real HTTP connection.
+
+Usage:
+    python benchmarks/s3_client_reuse.py --requests 200
+"""
+
+import argparse
+
+import boto3
+from utils import (
+    BUCKET_NAME,
+    moto_server,
+    time_per_call_ms,
+)
+
+from files_api.s3.clients import create_s3_client
+from files_api.s3.read_objects import object_exists_in_s3
+
+OBJECT_KEY = "benchmark/file.txt"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="Number of HEAD requests per scenario.")
+    parser.add_argument("--port", type=int, default=5055, help="Port to run the moto server on.")
+    args = parser.parse_args()
+
+    with moto_server(args.port):
+        boto3.client("s3").put_object(Bucket=BUCKET_NAME, Key=OBJECT_KEY, Body=b"hello")
+        shared_client = create_s3_client()
+
+        new_client_ms = time_per_call_ms(
+            lambda: object_exists_in_s3(BUCKET_NAME, OBJECT_KEY, s3_client=boto3.client("s3")),
+            args.requests,
+        )
+        pooled_client_ms = time_per_call_ms(
+            lambda: object_exists_in_s3(BUCKET_NAME, OBJECT_KEY, s3_client=shared_client),
+            args.requests,
+        )
+
+    print(f"{'scenario':<28}{'ms/request':>12}")
+    print(f"{'new client per call':<28}{new_client_ms:>12.2f}")
+    print(f"{'pooled shared client':<28}{pooled_client_ms:>12.2f}")
+    print(f"overhead removed per request: {new_client_ms - pooled_client_ms:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark peak memory of uploading a file to S3: buffered in full vs streamed in multipart parts.
+
+Each upload runs in a fresh subprocess, so the moto server running in this process is not measured.
+Peak memory is the peak of Python allocations traced by `tracemalloc` during the upload, which
+includes the request bodies built by boto3 in the uploading threads. (`ru_maxrss` would not work
+here: Linux carries the parent's peak RSS over into the subprocess.)
+
+Usage:
+    python benchmarks/upload_peak_memory.py --sizes-mb 16 64 256
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from utils import (
+    BUCKET_NAME,
+    moto_server,
+)
+
+from files_api.s3.clients import get_s3_client
+from files_api.s3.write_objects import (
+    upload_s3_object,
+    upload_s3_object_from_file,
+)
+
+MODES = ("buffered", "streaming")
+MIB = 1024 * 1024
+
+
+def peak_upload_memory_mb(mode: str, file_path: str) -> float:
+    """Upload `file_path` and return the peak memory allocated while doing so, in MiB."""
+    tracemalloc.start()
+    try:
+        with open(file_path, "rb") as file_obj:
+            if mode == "buffered":
+                upload_s3_object(BUCKET_NAME, "benchmark/file.bin", file_obj.read())
+            else:
+                upload_s3_object_from_file(BUCKET_NAME, "benchmark/file.bin", file_obj)
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak_bytes / MIB
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--port", type=int, default=5057, help="Port to run the moto server on.")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "FILE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        get_s3_client()  # create the shared client up front so that it is not counted
+        print(f"{peak_upload_memory_mb(*args.child):.1f}")
+        return
+
+    with moto_server(args.port), tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'size (MiB)':>10}{'mode':>12}{'peak memory (MiB)':>20}")
+        for size_mb in args.sizes_mb:
+            file_path = os.path.join(tmp_dir, f"{size_mb}.bin")
+            with open(file_path, "wb") as file_obj:
+                for _ in range(size_mb):
+                    file_obj.write(os.urandom(MIB))
+            for mode in MODES:
+                result = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, file_path],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                print(f"{size_mb:>10}{mode:>12}{result.stdout.strip():>20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Shared helpers for the benchmark scripts."""
+
+import asyncio
+import logging
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import (
+    Callable,
+    Iterator,
+    List,
+)
+
+import boto3
+from moto.server import ThreadedMotoServer
+
+BUCKET_NAME = "benchmark-bucket"
+
+
+@contextmanager
+def moto_server(port: int, bucket_name: str = BUCKET_NAME) -> Iterator[None]:
+    """Run a local moto server with an empty bucket and point boto3 at it."""
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=port, verbose=False)
+    server.start()
+    os.environ["AWS_ENDPOINT_URL"] = f"http://localhost:{port}"
+    os.environ["AWS_ACCESS_KEY_ID"] = "mock"
+    os.environ["AWS_SECRET_ACCESS_KEY"] = "mock"
+    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    try:
+        boto3.client("s3").create_bucket(Bucket=bucket_name)
+        yield
+    finally:
+        server.stop()
+
+
+def time_per_call_ms(func: Callable[[], None], num_calls: int) -> float:
+    """Return the mean wall-clock milliseconds per call of `func`, after one warm-up call."""
+    func()
+    start = time.perf_counter()
+    for _ in range(num_calls):
+        func()
+    return (time.perf_counter() - start) / num_calls * 1000
+
+
+def add_simulated_latency(s3_backend, latency_seconds: float) -> None:
+    """Delay every S3 request made by the backend's clients, the way a slow network would."""
+
+    def blocking_delay(**kwargs):  # pylint: disable=unused-argument
+        time.sleep(latency_seconds)
+
+    async def async_delay(**kwargs):  # pylint: disable=unused-argument
+        await asyncio.sleep(latency_seconds)
+
+    s3_backend.s3_client.meta.events.register("before-send.s3", blocking_delay)
+    async_s3_client = getattr(s3_backend, "async_s3_client", None)
+    if async_s3_client is not None:
+        async_s3_client.meta.events.register("before-send.s3", async_delay)
+
+
+def record_get_object_calls(client) -> list:
+    """Return a list that grows by one with every S3 GET the app behind the `TestClient` makes from now on."""
+    calls: list = []
+    client.app.state.s3_client.meta.events.register("before-call.s3.GetObject", lambda **_: calls.append(1))
+    return calls
+
+
+def choose_zipf(file_paths: List[str], exponent: float, num_choices: int, seed: int = 0) -> List[str]:
+    """Pick `num_choices` of `file_paths` with Zipf-distributed popularity: the first paths are the hot ones."""
+    weights = [1 / rank**exponent for rank in range(1, len(file_paths) + 1)]
+    return random.Random(seed).choices(file_paths, weights=weights, k=num_choices)
@@ -0,0 +1,158 @@
+"""
+Build ZIP and TAR archives on the fly, in constant memory.
+
+Each archive is written as an async iterator of byte chunks while the content of its entries is
+still arriving, so an archive can be streamed to the client without ever being held in memory or on
+disk. Entries must therefore know their size up front, which S3 objects do.
+
+ZIP archives are written with Python's `zipfile` to a sink that is drained after every write; since
+the sink cannot seek, `zipfile` writes each entry's CRC and sizes in a data descriptor after its
+content instead of going back to its header. TAR archives are simple enough to write by hand.
+"""
+
+import asyncio
+import io
+import tarfile
+import zipfile
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import (
+    IO,
+    AsyncIterator,
+    Callable,
+    NamedTuple,
+    Optional,
+    cast,
+)
+
+TAR_BLOCK_SIZE_BYTES = 512
+
+
+class ArchiveFormat(str, Enum):
+    """The format of an archive."""
+
+    ZIP = "zip"
+    TAR = "tar"
+
+
+class ArchiveCompression(str, Enum):
+    """How the content of an archive is compressed."""
+
+    # trades bandwidth for CPU: the archive is as large as its files, but costs nothing to build
+    STORE = "store"
+    # DEFLATE-compresses each entry of a ZIP archive, or gzips a whole TAR archive
+    DEFLATE = "deflate"
+
+
+class ArchiveEntry(NamedTuple):
+    """A file to add to an archive."""
+
+    name: str
+    size_bytes: int
+    last_modified: datetime
+    content: AsyncIterator[bytes]
+
+
+def get_archive_media_type(archive_format: ArchiveFormat, compression: ArchiveCompression) -> str:
+    if archive_format == ArchiveFormat.ZIP:
+        return "application/zip"
+    return "application/gzip" if compression == ArchiveCompression.DEFLATE else "application/x-tar"
+
+
+def get_archive_file_extension(archive_format: ArchiveFormat, compression: ArchiveCompression) -> str:
+    if archive_format == ArchiveFormat.ZIP:
+        return ".zip"
+    return ".tar.gz" if compression == ArchiveCompression.DEFLATE else ".tar"
+
+
+def stream_archive(
+    entries: AsyncIterator[ArchiveEntry], archive_format: ArchiveFormat, compression: ArchiveCompression
+) -> AsyncIterator[bytes]:
+    """
+    Write an archive of `entries`, yielding its bytes as they are produced.
+
+    :param entries: Files to add, in order. Each entry's content is read to the end before the next entry is read.
+    :param archive_format: Whether to write a ZIP or a TAR archive.
+    :param compression: Whether to compress the archive.
+
+    :return: The archive as an async iterator of byte chunks.
+    """
+    if archive_format == ArchiveFormat.ZIP:
+        return stream_zip(entries, compression)
+    return stream_tar(entries, compression)
+
+
+async def stream_zip(entries: AsyncIterator[ArchiveEntry], compression: ArchiveCompression) -> AsyncIterator[bytes]:
+    """Write a ZIP archive of `entries`; see `stream_archive`."""
+    compress = compression == ArchiveCompression.DEFLATE
+    sink = _DrainableSink()
+    # typeshed declares the file of a ZipFile as IO[bytes], which an io.RawIOBase is not
+    with zipfile.ZipFile(
+        cast(IO[bytes], sink), mode="w", compression=zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+    ) as zip_:
+        async for entry in entries:
+            zip_info = zipfile.ZipInfo(entry.name, date_time=entry.last_modified.timetuple()[:6])
+            zip_info.compress_type = zip_.compression
+            # lets `zipfile` decide up front whether the entry needs ZIP64 sizes
+            zip_info.file_size = entry.size_bytes
+            with zip_.open(zip_info, mode="w") as zip_entry:
+                async for chunk in entry.content:
+                    await _run_compression(zip_entry.write, chunk, compress)
+                    if data := sink.drain():
+                        yield data
+            if data := sink.drain():
+                yield data
+    yield sink.drain()
+
+
+async def stream_tar(entries: AsyncIterator[ArchiveEntry], compression: ArchiveCompression) -> AsyncIterator[bytes]:
+    """Write a TAR archive of `entries`, gzipped with `DEFLATE` compression; see `stream_archive`."""
+    # wbits=31 makes zlib write the gzip container
+    compressor = zlib.compressobj(wbits=31) if compression == ArchiveCompression.DEFLATE else None
+
+    async def encode(data: bytes) -> bytes:
+        return await _run_compression(compressor.compress, data, True) if compressor else data
+
+    async for entry in entries:
+        tar_info = tarfile.TarInfo(entry.name)
+        tar_info.size = entry.size_bytes
+        tar_info.mtime = int(entry.last_modified.timestamp())
+        tar_info.mode = 0o644
+        if data := await encode(tar_info.tobuf(format=tarfile.PAX_FORMAT)):
+            yield data
+        async for chunk in entry.content:
+            if data := await encode(chunk):
+                yield data
+        # content is padded to a whole number of blocks
+        if data := await encode(b"\0" * (-entry.size_bytes % TAR_BLOCK_SIZE_BYTES)):
+            yield data
+
+    # the end of a TAR archive is marked by two empty blocks
+    end_of_archive = await encode(b"\0" * 2 * TAR_BLOCK_SIZE_BYTES)
+    yield (end_of_archive + compressor.flush()) if compressor else end_of_archive
+
+
+async def _run_compression(func: Callable[[bytes], Optional[int | bytes]], data: bytes, compress: bool):
+    # compressing a chunk takes long enough to hold up other requests, so it runs off the event loop
+    return await asyncio.to_thread(func, data) if compress else func(data)
+
+
+class _DrainableSink(io.RawIOBase):
+    """Write-only, unseekable stream that buffers what is written until it is drained."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._chunks: list[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:  # type: ignore[override]
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
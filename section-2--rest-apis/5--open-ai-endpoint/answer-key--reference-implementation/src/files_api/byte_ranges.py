@@ -0,0 +1,85 @@
+"""
+Parse and resolve HTTP `Range` headers (RFC 9110, section 14) for partial file downloads.
+
+A `Range` header such as `bytes=0-99, 200-, -50` is parsed into byte range specs, which are
+resolved against the size of the file into inclusive `(first_byte, last_byte)` offsets.
+"""
+
+import re
+from typing import Optional
+
+MAX_BYTE_RANGES = 16
+
+ByteRangeSpec = tuple[Optional[int], Optional[int]]
+
+_BYTE_RANGE_SPEC_PATTERN = re.compile(r"^(\d*)-(\d*)$")
+
+
+def parse_range_header(range_header: str) -> Optional[list[ByteRangeSpec]]:
+    """
+    Parse a `Range` header into `(first_byte, last_byte)` specs.
+
+    `first_byte` is None for a suffix range (`-50`: the last 50 bytes) and `last_byte`
+    is None for an open-ended range (`200-`: everything from byte 200).
+
+    :param range_header: Value of the `Range` header.
+
+    :return: The specs, or None if the header is malformed, is not in bytes, or asks for
+        more than `MAX_BYTE_RANGES` ranges. Per the RFC, such headers are ignored.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+
+    specs: list[ByteRangeSpec] = []
+    for byte_range in ranges.split(","):
+        match = _BYTE_RANGE_SPEC_PATTERN.match(byte_range.strip())
+        if not match or match.groups() == ("", ""):
+            return None
+        first_byte = int(match[1]) if match[1] else None
+        last_byte = int(match[2]) if match[2] else None
+        if first_byte is not None and last_byte is not None and last_byte < first_byte:
+            return None
+        specs.append((first_byte, last_byte))
+
+    if len(specs) > MAX_BYTE_RANGES:
+        return None
+    return specs
+
+
+def resolve_byte_ranges(specs: list[ByteRangeSpec], size_bytes: int) -> list[tuple[int, int]]:
+    """
+    Resolve byte range specs against the size of a file.
+
+    :param specs: Specs as returned by `parse_range_header`.
+    :param size_bytes: Size of the file.
+
+    :return: Inclusive `(first_byte, last_byte)` offsets of the satisfiable ranges, in request order.
+        Empty if no range is satisfiable, which calls for a 416 response.
+    """
+    byte_ranges: list[tuple[int, int]] = []
+    for first_byte, last_byte in specs:
+        if first_byte is None:
+            # suffix range; a zero-length suffix is unsatisfiable
+            if not last_byte or not size_bytes:
+                continue
+            byte_ranges.append((max(size_bytes - last_byte, 0), size_bytes - 1))
+        elif first_byte < size_bytes:
+            byte_ranges.append((first_byte, size_bytes - 1 if last_byte is None else min(last_byte, size_bytes - 1)))
+    return byte_ranges
+
+
+def format_byte_range_spec(spec: ByteRangeSpec) -> str:
+    """Format a spec as the value of a `Range` header, e.g. for the S3 `Range` parameter."""
+    first_byte, last_byte = spec
+    return f"bytes={'' if first_byte is None else first_byte}-{'' if last_byte is None else last_byte}"
+
+
+def format_content_range(first_byte: int, last_byte: int, size_bytes: int) -> str:
+    """Format the value of the `Content-Range` header of a 206 response."""
+    return f"bytes {first_byte}-{last_byte}/{size_bytes}"
+
+
+def format_unsatisfied_content_range(size_bytes: int) -> str:
+    """Format the value of the `Content-Range` header of a 416 response."""
+    return f"bytes */{size_bytes}"
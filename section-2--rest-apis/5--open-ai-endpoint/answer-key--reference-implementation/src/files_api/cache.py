@@ -0,0 +1,300 @@
+"""Thread-safe, size-bounded in-process caches."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import (
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    List,
+    NamedTuple,
+    Optional,
+    TypeVar,
+)
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class CacheCounters:  # pylint: disable=too-few-public-methods
+    """How often a cache was looked up, found what it was looked up for, and evicted an entry."""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def as_dict(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class TTLCache(Generic[K, V]):
+    """
+    Cache whose entries expire `ttl_seconds` after they were set.
+
+    Once it holds `max_entries`, setting an entry evicts the least recently used one. A cache with
+    `max_entries=0` stores nothing.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.counters = CacheCounters()
+
+    def get(self, key: K) -> Optional[V]:
+        """Return the value cached for `key`, or None if there is none or it expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= self._clock():
+                if entry is not None:
+                    del self._entries[key]
+                self.counters.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters.hits += 1
+            return entry[1]
+
+    def peek(self, key: K) -> Optional[V]:
+        """Like `get`, but without counting a hit or miss or refreshing the entry's recency."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None and entry[0] > self._clock() else None
+
+    def set(self, key: K, value: V, ttl_seconds: Optional[float] = None) -> None:
+        """Cache `value` for `key`, for `ttl_seconds` if given instead of the cache's TTL."""
+        if self.max_entries <= 0:
+            return
+        expires_at = self._clock() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.counters.evictions += 1
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[K], bool]) -> None:
+        """Delete every entry whose key matches `predicate`."""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Return a snapshot of the cache's size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                **self.counters.as_dict(),
+            }
+
+
+class CountMinSketch:
+    """
+    Approximate count of how often each key was seen, in fixed memory.
+
+    Every key increments one 4-bit counter in each of `depth` rows, and its count is the smallest
+    of them, so collisions can only overestimate it. Once `sample_size` keys were counted, every
+    counter is halved, so the counts reflect recent popularity rather than all-time popularity.
+    """
+
+    MAX_COUNT = 15
+
+    def __init__(self, width: int, depth: int = 4, sample_size: Optional[int] = None):
+        # a power of two, so a hash is reduced to a column with a mask
+        self.width = 1 << max(width - 1, 1).bit_length()
+        self._mask = self.width - 1
+        self._rows = [bytearray(self.width) for _ in range(depth)]
+        self.sample_size = sample_size or 10 * self.width
+        self._additions = 0
+
+    def _columns(self, key: Hashable) -> List[int]:
+        return [hash((row, key)) & self._mask for row in range(len(self._rows))]
+
+    def increment(self, key: Hashable) -> None:
+        columns = self._columns(key)
+        count = min(row[column] for row, column in zip(self._rows, columns))
+        if count < self.MAX_COUNT:
+            # only the counters at the minimum, which keeps keys that collide from inflating each other
+            for row, column in zip(self._rows, columns):
+                if row[column] == count:
+                    row[column] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[column] for row, column in zip(self._rows, self._columns(key)))
+
+    def _age(self) -> None:
+        for row in self._rows:
+            row[:] = bytes(count >> 1 for count in row)
+        self._additions //= 2
+
+
+class _SizedEntry(NamedTuple, Generic[V]):
+    expires_at: float
+    value: V
+    size_bytes: int
+
+
+class WTinyLFUCache(Generic[K, V]):  # pylint: disable=too-many-instance-attributes
+    """
+    Cache of at most `max_bytes` of values, which only keeps a new value if it is used more than what it would evict.
+
+    This is W-TinyLFU: a new entry enters a small LRU window, of `window_ratio` of the bytes. An entry
+    pushed out of the window is admitted to the main area, a segmented LRU, only if a `CountMinSketch`
+    of recent lookups estimates it is looked up more often than every entry it would evict. One-off
+    lookups, such as a scan of many files, thus pass through the window without flushing the
+    frequently used entries out of the main area. Entries of the main area that are looked up again
+    move from its probation segment to its protected segment, which holds `protected_ratio` of it.
+
+    Entries expire `ttl_seconds` after they were set.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        max_bytes: int,
+        ttl_seconds: float,
+        expected_entries: int = 10_000,
+        window_ratio: float = 0.01,
+        protected_ratio: float = 0.8,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.window_max_bytes = int(max_bytes * window_ratio)
+        self.main_max_bytes = max_bytes - self.window_max_bytes
+        self.protected_max_bytes = int(self.main_max_bytes * protected_ratio)
+        self._clock = clock
+        self._sketch = CountMinSketch(expected_entries)
+        self._window: OrderedDict[K, _SizedEntry[V]] = OrderedDict()
+        self._probation: OrderedDict[K, _SizedEntry[V]] = OrderedDict()
+        self._protected: OrderedDict[K, _SizedEntry[V]] = OrderedDict()
+        self._segment_bytes = {id(self._window): 0, id(self._probation): 0, id(self._protected): 0}
+        self._lock = threading.Lock()
+        self.counters = CacheCounters()
+        self.rejections = 0
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(self._segment_bytes.values())
+
+    def get(self, key: K) -> Optional[V]:
+        """Return the value cached for `key`, or None if there is none or it expired; either way, count the lookup."""
+        with self._lock:
+            self._sketch.increment(key)
+            segment = self._find_segment(key)
+            entry = segment[key] if segment is not None else None
+            if entry is None or entry.expires_at <= self._clock():
+                if segment is not None:
+                    self._pop(segment, key)
+                self.counters.misses += 1
+                return None
+            self.counters.hits += 1
+            if segment is self._probation:
+                self._push(self._protected, key, self._pop(self._probation, key))
+                while self._bytes(self._protected) > self.protected_max_bytes:
+                    demoted_key, demoted_entry = self._protected.popitem(last=False)
+                    self._segment_bytes[id(self._protected)] -= demoted_entry.size_bytes
+                    self._push(self._probation, demoted_key, demoted_entry)
+            else:
+                segment.move_to_end(key)
+            return entry.value
+
+    def set(self, key: K, value: V, size_bytes: int) -> None:
+        """Cache `value`, which takes `size_bytes`, for `key`; values larger than the main area are not cached."""
+        if size_bytes > self.main_max_bytes:
+            return
+        with self._lock:
+            segment = self._find_segment(key)
+            if segment is not None:
+                self._pop(segment, key)
+            self._push(self._window, key, _SizedEntry(self._clock() + self.ttl_seconds, value, size_bytes))
+            while self._bytes(self._window) > self.window_max_bytes:
+                candidate_key, candidate = self._window.popitem(last=False)
+                self._segment_bytes[id(self._window)] -= candidate.size_bytes
+                self._admit(candidate_key, candidate)
+
+    def _admit(self, key: K, entry: _SizedEntry[V]) -> None:
+        """Move an entry pushed out of the window to the main area, if it is used more than every entry it evicts."""
+        victims = []
+        freed_bytes = 0
+        frequency = self._sketch.estimate(key)
+        main_bytes = self._bytes(self._probation) + self._bytes(self._protected)
+        for victim_key in [*self._probation, *self._protected]:
+            if main_bytes - freed_bytes + entry.size_bytes <= self.main_max_bytes:
+                break
+            if self._sketch.estimate(victim_key) >= frequency:
+                self.rejections += 1
+                return
+            victims.append(victim_key)
+            freed_bytes += (self._probation.get(victim_key) or self._protected[victim_key]).size_bytes
+        for victim_key in victims:
+            segment = self._find_segment(victim_key)
+            self._pop(segment, victim_key)  # type: ignore[arg-type]
+            self.counters.evictions += 1
+        self._push(self._probation, key, entry)
+
+    def _find_segment(self, key: K) -> Optional[OrderedDict[K, _SizedEntry[V]]]:
+        for segment in (self._window, self._probation, self._protected):
+            if key in segment:
+                return segment
+        return None
+
+    def _bytes(self, segment: OrderedDict[K, _SizedEntry[V]]) -> int:
+        return self._segment_bytes[id(segment)]
+
+    def _push(self, segment: OrderedDict[K, _SizedEntry[V]], key: K, entry: _SizedEntry[V]) -> None:
+        segment[key] = entry
+        self._segment_bytes[id(segment)] += entry.size_bytes
+
+    def _pop(self, segment: OrderedDict[K, _SizedEntry[V]], key: K) -> _SizedEntry[V]:
+        entry = segment.pop(key)
+        self._segment_bytes[id(segment)] -= entry.size_bytes
+        return entry
+
+    def delete(self, key: K) -> None:
+        with self._lock:
+            segment = self._find_segment(key)
+            if segment is not None:
+                self._pop(segment, key)
+
+    def delete_where(self, predicate: Callable[[K], bool]) -> None:
+        """Delete every entry whose key matches `predicate`."""
+        with self._lock:
+            for segment in (self._window, self._probation, self._protected):
+                for key in [key for key in segment if predicate(key)]:
+                    self._pop(segment, key)
+
+    def clear(self) -> None:
+        self.delete_where(lambda key: True)
+
+    def __len__(self) -> int:
+        return len(self._window) + len(self._probation) + len(self._protected)
+
+    def stats(self) -> Dict:
+        """Return a snapshot of the cache's size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                **self.counters.as_dict(),
+                "rejections": self.rejections,
+            }
@@ -0,0 +1,310 @@
+"""
+Compress response bodies with the content coding the client prefers.
+
+`CompressionMiddleware` picks gzip, zstd or brotli from the request's `Accept-Encoding` header and
+compresses every chunk of the response body as it passes through, so no body is ever held in memory
+whole. The compressor is flushed whenever `flush_size_bytes` of the body went in since its last
+flush, rather than after every chunk, which would cost a block header and a worse ratio per chunk.
+A file streamed from S3, or a listing streamed as NDJSON, thus reaches the client in pieces of
+about that size as it is read.
+
+Responses whose media type is already compressed (images, audio, video, archives), partial
+responses to `Range` requests, and bodies shorter than `minimum_size_bytes` are sent as they are.
+So are files the server sends from disk itself (the `http.response.pathsend` extension, which
+`FileResponse` uses when the server offers it): their bytes never pass through the middleware.
+zstd and brotli need the `compression` extra (`zstandard` and `brotli`); without it only gzip is
+offered.
+"""
+
+import asyncio
+import zlib
+from enum import Enum
+from typing import (
+    Dict,
+    List,
+    Optional,
+    Protocol,
+    Sequence,
+)
+
+from starlette.datastructures import (
+    Headers,
+    MutableHeaders,
+)
+from starlette.types import (
+    ASGIApp,
+    Message,
+    Receive,
+    Scope,
+    Send,
+)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_COMPRESSION_MIN_SIZE_BYTES = 1024
+DEFAULT_COMPRESSION_FLUSH_SIZE_BYTES = 1024 * 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_ZSTD_LEVEL = 3
+DEFAULT_BROTLI_LEVEL = 4
+
+# compressing a chunk this large would hold up the event loop, so it is compressed on a thread;
+# zlib, zstandard and brotli all release the GIL while they work
+OFFLOAD_CHUNK_SIZE_BYTES = 256 * 1024
+
+INCOMPRESSIBLE_MEDIA_TYPE_PREFIXES = ("image/", "audio/", "video/")
+INCOMPRESSIBLE_MEDIA_TYPES = {
+    "application/gzip",
+    "application/pdf",
+    "application/vnd.rar",
+    "application/x-7z-compressed",
+    "application/x-bzip2",
+    "application/x-gzip",
+    "application/x-rar-compressed",
+    "application/x-xz",
+    "application/zip",
+    "application/zstd",
+    "font/woff",
+    "font/woff2",
+}
+# text formats under the prefixes above
+COMPRESSIBLE_MEDIA_TYPES = {"image/svg+xml"}
+
+
+class ContentCoding(str, Enum):
+    """Content codings the API can compress responses with, in the order it prefers them."""
+
+    ZSTD = "zstd"
+    BROTLI = "br"
+    GZIP = "gzip"
+
+
+class Compressor(Protocol):
+    """Incremental compressor of one response body."""
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress `data`, returning the compressed bytes that are ready so far."""
+
+    def flush(self) -> bytes:
+        """Return the rest of what was compressed so far, so that the client can decode all of it."""
+
+    def finish(self) -> bytes:
+        """Return the end of the compressed stream."""
+
+
+class _GzipCompressor:
+    def __init__(self, level: int):
+        # wbits of 16 + MAX_WBITS writes a gzip header and trailer rather than a bare zlib stream
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush()
+
+
+class _ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressobj.flush()
+
+
+class _BrotliCompressor:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+def get_available_content_codings() -> List[ContentCoding]:
+    """Return the content codings whose libraries are installed, in the order the API prefers them."""
+    installed = {ContentCoding.ZSTD: zstandard is not None, ContentCoding.BROTLI: brotli is not None}
+    return [coding for coding in ContentCoding if installed.get(coding, True)]
+
+
+def create_compressor(coding: ContentCoding, level: int) -> Compressor:
+    """Create an incremental compressor for `coding` at compression `level`."""
+    if coding == ContentCoding.ZSTD:
+        return _ZstdCompressor(level)
+    if coding == ContentCoding.BROTLI:
+        return _BrotliCompressor(level)
+    return _GzipCompressor(level)
+
+
+def negotiate_content_coding(accept_encoding: str, available: Sequence[ContentCoding]) -> Optional[ContentCoding]:
+    """
+    Pick the content coding to compress a response with, from the request's `Accept-Encoding` header.
+
+    :param accept_encoding: Value of the `Accept-Encoding` header, e.g. `gzip, br;q=0.9, *;q=0`.
+    :param available: Content codings the API can use, most preferred first.
+
+    :return: The available coding with the highest quality value, the API's preference breaking ties,
+        or None if the client accepts none of them.
+    """
+    quality_by_coding: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        coding, *params = (part.strip() for part in item.split(";"))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        quality_by_coding[coding.lower()] = quality
+
+    best_coding, best_quality = None, 0.0
+    for coding in available:
+        quality = quality_by_coding.get(coding.value, quality_by_coding.get("*", 0.0))
+        if quality > best_quality:
+            best_coding, best_quality = coding, quality
+    return best_coding
+
+
+def is_compressible_media_type(content_type: Optional[str]) -> bool:
+    """Whether compressing a body of this `Content-Type` is worth it; already-compressed formats are not."""
+    if not content_type:
+        return False
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type in COMPRESSIBLE_MEDIA_TYPES:
+        return True
+    return media_type not in INCOMPRESSIBLE_MEDIA_TYPES and not media_type.startswith(
+        INCOMPRESSIBLE_MEDIA_TYPE_PREFIXES
+    )
+
+
+class CompressionMiddleware:  # pylint: disable=too-few-public-methods
+    """ASGI middleware that compresses response bodies, chunk by chunk, with a negotiated content coding."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size_bytes: int = DEFAULT_COMPRESSION_MIN_SIZE_BYTES,
+        levels: Optional[Dict[ContentCoding, int]] = None,
+        flush_size_bytes: int = DEFAULT_COMPRESSION_FLUSH_SIZE_BYTES,
+    ):
+        self.app = app
+        self.minimum_size_bytes = minimum_size_bytes
+        self.flush_size_bytes = flush_size_bytes
+        self.levels = {
+            ContentCoding.GZIP: DEFAULT_GZIP_LEVEL,
+            ContentCoding.ZSTD: DEFAULT_ZSTD_LEVEL,
+            ContentCoding.BROTLI: DEFAULT_BROTLI_LEVEL,
+            **(levels or {}),
+        }
+        self.available_codings = get_available_content_codings()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        # a HEAD response keeps its Content-Length, which is what clients send HEAD requests for
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate_content_coding(Headers(scope=scope).get("Accept-Encoding", ""), self.available_codings)
+        responder = _CompressingResponder(
+            send, coding, self.levels.get(coding), self.minimum_size_bytes, self.flush_size_bytes
+        )
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressingResponder:  # pylint: disable=too-many-instance-attributes
+    """Compress the body of one response on its way to `send`, if the response is worth compressing."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        send: Send,
+        coding: Optional[ContentCoding],
+        level: Optional[int],
+        minimum_size_bytes: int,
+        flush_size_bytes: int,
+    ):
+        self._send = send
+        self._coding = coding
+        self._level = level
+        self._minimum_size_bytes = minimum_size_bytes
+        self._flush_size_bytes = flush_size_bytes
+        self._unflushed_size_bytes = 0
+        self._compressor: Optional[Compressor] = None
+        self._start_message: Optional[Message] = None
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # held back until the body starts, which tells whether this middleware sees the body at all
+            self._start_message = message
+            return
+        if self._start_message is not None:
+            start_message, self._start_message = self._start_message, None
+            if message["type"] != "http.response.pathsend":
+                self._start(start_message)
+            # otherwise the server sends the file itself, so its response goes out as it is
+            await self._send(start_message)
+        if message["type"] == "http.response.body" and self._compressor is not None:
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if len(body) >= OFFLOAD_CHUNK_SIZE_BYTES:
+                compressed = await asyncio.to_thread(self._compress, self._compressor, body, more_body)
+            else:
+                compressed = self._compress(self._compressor, body, more_body)
+            message = {**message, "body": compressed}
+        await self._send(message)
+
+    def _compress(self, compressor: Compressor, body: bytes, more_body: bool) -> bytes:
+        compressed = compressor.compress(body) if body else b""
+        if not more_body:
+            return compressed + compressor.finish()
+        self._unflushed_size_bytes += len(body)
+        if self._unflushed_size_bytes >= self._flush_size_bytes:
+            self._unflushed_size_bytes = 0
+            compressed += compressor.flush()
+        return compressed
+
+    def _start(self, message: Message) -> None:
+        headers = MutableHeaders(scope=message)
+        if (
+            message["status"] in (204, 206, 304)
+            or "Content-Encoding" in headers
+            or "Content-Range" in headers
+            or not is_compressible_media_type(headers.get("Content-Type"))
+        ):
+            return
+        # the body depends on Accept-Encoding, also when this request did not accept any coding
+        headers.add_vary_header("Accept-Encoding")
+        content_length = headers.get("Content-Length")
+        if self._coding is None or (content_length is not None and int(content_length) < self._minimum_size_bytes):
+            return
+
+        self._compressor = create_compressor(self._coding, self._level)  # type: ignore[arg-type]
+        headers["Content-Encoding"] = self._coding.value
+        del headers["Content-Length"]
+        etag = headers.get("ETag")
+        if etag and not etag.startswith("W/"):
+            # the compressed body is a different sequence of bytes, equivalent to the original
+            headers["ETag"] = f"W/{etag}"
@@ -0,0 +1,53 @@
+"""Parse conditional request headers (RFC 9110, section 13) and pick caching headers for responses."""
+
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import (
+    Dict,
+    Optional,
+)
+
+
+def parse_if_none_match(if_none_match: str) -> list[str]:
+    """
+    Parse an `If-None-Match` header into the entity tags it lists.
+
+    Weak tags (`W/"..."`) are returned as their strong counterpart, because GET and HEAD
+    compare entity tags weakly.
+
+    :param if_none_match: Value of the `If-None-Match` header, e.g. `"abc", W/"def"` or `*`.
+
+    :return: The quoted entity tags, or `["*"]`.
+    """
+    etags = (etag.strip() for etag in if_none_match.split(","))
+    return [etag.removeprefix("W/") for etag in etags if etag]
+
+
+def parse_http_date(http_date: Optional[str]) -> Optional[datetime]:
+    """Parse an HTTP date such as `Thu, 01 Jan 2022 00:00:00 GMT`; None if it is missing or invalid."""
+    if not http_date:
+        return None
+    try:
+        return parsedate_to_datetime(http_date)
+    except (TypeError, ValueError):
+        return None
+
+
+def format_http_date(value: datetime) -> str:
+    """Format a UTC datetime as an HTTP date, e.g. for the `Last-Modified` header."""
+    return value.strftime("%a, %d %b %Y %H:%M:%S GMT")
+
+
+def get_cache_control(file_path: str, cache_control_by_prefix: Dict[str, str]) -> Optional[str]:
+    """
+    Pick the `Cache-Control` header of a file by the longest matching path prefix.
+
+    :param file_path: Path of the file.
+    :param cache_control_by_prefix: `Cache-Control` values keyed by path prefix; the empty prefix matches every file.
+
+    :return: The `Cache-Control` value, or None if no prefix matches.
+    """
+    matching_prefixes = [prefix for prefix in cache_control_by_prefix if file_path.startswith(prefix)]
+    if not matching_prefixes:
+        return None
+    return cache_control_by_prefix[max(matching_prefixes, key=len)]
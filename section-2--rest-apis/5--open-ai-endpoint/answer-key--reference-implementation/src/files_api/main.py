@@ -1,18 +1,51 @@
+import asyncio
+import logging
+from contextlib import (
+    AsyncExitStack,
+    asynccontextmanager,
+)
 from textwrap import dedent
+from typing import AsyncIterator
 
 import pydantic
 from fastapi import FastAPI
 from fastapi.routing import APIRoute
 
+from files_api.compression import (
+    CompressionMiddleware,
+    ContentCoding,
+)
 from files_api.errors import (
     handle_broad_exceptions,
     handle_pydantic_validation_errors,
 )
-from files_api.routes import (
-    FILES_ROUTER,
-    GENERATED_FILES_ROUTER,
+from files_api.routes.batch import BATCH_ROUTER
+from files_api.routes.client_uploads import CLIENT_UPLOADS_ROUTER
+from files_api.routes.downloads import DOWNLOADS_ROUTER
+from files_api.routes.files import FILES_ROUTER
+from files_api.routes.generated_files import GENERATED_FILES_ROUTER
+from files_api.routes.listing import LISTING_ROUTER
+from files_api.routes.metrics import METRICS_ROUTER
+from files_api.s3.backends import (
+    AiobotocoreS3Backend,
+    Boto3S3Backend,
+)
+from files_api.s3.clients import (
+    S3ClientOptions,
+    create_s3_client,
+    register_s3_client,
+)
+from files_api.s3.disk_cache import S3ObjectDiskCache
+from files_api.s3.executor import S3Executor
+from files_api.s3.listing_prefetch import S3ListingPrefetcher
+from files_api.s3.metadata_cache import S3MetadataCache
+from files_api.s3.metadata_index import S3MetadataIndex
+from files_api.settings import (
+    S3BackendType,
+    Settings,
 )
-from files_api.settings import Settings
+
+LOGGER = logging.getLogger(__name__)
 
 
 def create_app(settings: Settings | None = None) -> FastAPI:
@@ -39,21 +72,176 @@ def create_app(settings: Settings | None = None) -> FastAPI:
         ),
         docs_url="/",  # its easier to find the docs when they live on the base url
         generate_unique_id_function=custom_generate_unique_id,
+        lifespan=lifespan,
     )
     app.state.settings = settings
 
     app.include_router(FILES_ROUTER)
+    app.include_router(BATCH_ROUTER)
+    app.include_router(CLIENT_UPLOADS_ROUTER)
+    app.include_router(LISTING_ROUTER)
+    app.include_router(DOWNLOADS_ROUTER)
     app.include_router(GENERATED_FILES_ROUTER)
+    app.include_router(METRICS_ROUTER)
 
     app.add_exception_handler(
         exc_class_or_status_code=pydantic.ValidationError,
         handler=handle_pydantic_validation_errors,
     )
     app.middleware("http")(handle_broad_exceptions)
+    if settings.response_compression_enabled:
+        # added last, so it is the outermost middleware and also compresses error responses
+        # mypy 1.2 cannot match a middleware's arguments to Starlette's ParamSpec-based middleware factory
+        app.add_middleware(  # type: ignore[call-arg]
+            CompressionMiddleware,  # type: ignore[arg-type]
+            minimum_size_bytes=settings.response_compression_min_size_bytes,
+            levels={
+                ContentCoding.GZIP: settings.response_compression_gzip_level,
+                ContentCoding.ZSTD: settings.response_compression_zstd_level,
+                ContentCoding.BROTLI: settings.response_compression_brotli_level,
+            },
+        )
 
     return app
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """
+    Create the app's long-lived resources on startup and release them on shutdown.
+
+    FastAPI docs on lifespan events: https://fastapi.tiangolo.com/advanced/events/
+    """
+    settings: Settings = app.state.settings
+    s3_client_options: S3ClientOptions = {
+        "max_pool_connections": settings.s3_max_pool_connections,
+        "tcp_keepalive": settings.s3_tcp_keepalive,
+        "connect_timeout_seconds": settings.s3_connect_timeout_seconds,
+        "read_timeout_seconds": settings.s3_read_timeout_seconds,
+        "max_retry_attempts": settings.s3_max_retry_attempts,
+    }
+
+    async with AsyncExitStack() as stack:
+        # one pooled S3 client is shared by every request, rather than creating a client per S3 call
+        s3_client = create_s3_client(**s3_client_options)
+        stack.callback(s3_client.close)
+        stack.callback(register_s3_client, None)
+        app.state.s3_client = s3_client
+        register_s3_client(s3_client)
+
+        # blocking boto3 calls run on threads; one thread per pooled connection is all that can make progress
+        s3_executor = S3Executor(max_workers=settings.s3_max_pool_connections)
+        stack.callback(s3_executor.shutdown)
+        app.state.s3_executor = s3_executor
+
+        # per instance, so a write is only visible to other instances once their cached entries expire
+        metadata_cache = None
+        if settings.metadata_cache_max_entries or settings.object_content_cache_max_bytes:
+            metadata_cache = S3MetadataCache(
+                max_entries=settings.metadata_cache_max_entries,
+                ttl_seconds=settings.metadata_cache_ttl_seconds,
+                negative_ttl_seconds=settings.metadata_cache_negative_ttl_seconds,
+                content_max_bytes=settings.object_content_cache_max_bytes,
+                content_max_object_size_bytes=settings.object_content_cache_max_object_size_bytes,
+            )
+
+        listing_prefetcher = None
+        if settings.listing_prefetch_max_entries:
+            listing_prefetcher = S3ListingPrefetcher(
+                max_entries=settings.listing_prefetch_max_entries, ttl_seconds=settings.listing_prefetch_ttl_seconds
+            )
+            # before the executor is shut down, which waits for the fetches still running on it
+            stack.callback(listing_prefetcher.close)
+
+        metadata_index = None
+        if settings.metadata_index_path:
+            metadata_index = S3MetadataIndex(settings.metadata_index_path)
+            stack.callback(metadata_index.close)
+
+        app.state.disk_cache = None
+        if settings.disk_cache_dir:
+            app.state.disk_cache = S3ObjectDiskCache(
+                settings.disk_cache_dir,
+                max_bytes=settings.disk_cache_max_bytes,
+                max_object_size_bytes=settings.disk_cache_max_object_size_bytes,
+                eviction=settings.disk_cache_eviction,
+            )
+            stack.callback(app.state.disk_cache.close)
+
+        if settings.s3_backend == S3BackendType.AIOBOTOCORE:
+            # imported here so that aiobotocore is only required when this backend is selected
+            from files_api.s3.aio.clients import create_async_s3_client  # pylint: disable=import-outside-toplevel
+
+            async_s3_client = await stack.enter_async_context(create_async_s3_client(**s3_client_options))
+            app.state.s3_backend = AiobotocoreS3Backend(
+                s3_client=s3_client,
+                executor=s3_executor,
+                async_s3_client=async_s3_client,
+                metadata_cache=metadata_cache,
+                metadata_index=metadata_index,
+                listing_prefetcher=listing_prefetcher,
+                deduplicate_uploads=settings.deduplicate_uploads,
+            )
+        else:
+            app.state.s3_backend = Boto3S3Backend(
+                s3_client=s3_client,
+                executor=s3_executor,
+                metadata_cache=metadata_cache,
+                metadata_index=metadata_index,
+                listing_prefetcher=listing_prefetcher,
+                deduplicate_uploads=settings.deduplicate_uploads,
+            )
+
+        if metadata_index is not None:
+            # listing the bucket can take minutes, so the API serves requests from S3 in the meantime
+            reconcile = asyncio.create_task(_reconcile_metadata_index_periodically(app))
+            stack.callback(reconcile.cancel)
+
+        if settings.upload_session_gc_interval_seconds is not None:
+            collect_upload_sessions = asyncio.create_task(_abort_stale_upload_sessions_periodically(app))
+            stack.callback(collect_upload_sessions.cancel)
+
+        yield
+
+
+async def _reconcile_metadata_index_periodically(app: FastAPI) -> None:
+    """Build the metadata index if it was not built yet, then reconcile it with S3 at the configured interval."""
+    settings: Settings = app.state.settings
+    s3_backend = app.state.s3_backend
+    interval_seconds = settings.metadata_index_reconcile_interval_seconds
+    if s3_backend.metadata_index.is_built(settings.s3_bucket_name):
+        if interval_seconds is None:
+            return
+        await asyncio.sleep(interval_seconds)
+    while True:
+        try:
+            await s3_backend.reconcile_metadata_index(
+                settings.s3_bucket_name, max_concurrency=settings.metadata_index_reconcile_max_concurrency
+            )
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception("Failed to reconcile the metadata index with S3")
+        if interval_seconds is None:
+            return
+        await asyncio.sleep(interval_seconds)
+
+
+async def _abort_stale_upload_sessions_periodically(app: FastAPI) -> None:
+    """Abort the upload sessions that were abandoned, so their chunks stop being billed, at the configured interval."""
+    settings: Settings = app.state.settings
+    s3_backend = app.state.s3_backend
+    while True:
+        # sleeping first, so instances that restart often do not all scan the bucket as they start
+        await asyncio.sleep(settings.upload_session_gc_interval_seconds)
+        try:
+            aborted = await s3_backend.abort_stale_upload_sessions(
+                settings.s3_bucket_name, max_age_seconds=settings.upload_session_ttl_seconds
+            )
+            if aborted:
+                LOGGER.info("Aborted %d abandoned upload sessions", aborted)
+        except Exception:  # pylint: disable=broad-except
+            LOGGER.exception("Failed to abort abandoned upload sessions")
+
+
 def custom_generate_unique_id(route: APIRoute):
     """
     Generate prettier `operationId`s in the OpenAPI schema.
@@ -0,0 +1,43 @@
+"""In-process metrics primitives reported by `GET /v1/metrics`."""
+
+import bisect
+import threading
+from typing import (
+    Dict,
+    Sequence,
+)
+
+DEFAULT_LATENCY_BUCKETS_SECONDS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Thread-safe histogram with fixed buckets, in the style of a Prometheus histogram.
+
+    Bucket counts are cumulative: the count for bucket `le` is the number of observations <= `le`.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS_SECONDS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # the last slot is the +Inf bucket
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative_counts: Dict[str, int] = {}
+        running_count = 0
+        for upper_bound, count in zip([*map(str, self.buckets), "+Inf"], counts):
+            running_count += count
+            cumulative_counts[upper_bound] = running_count
+
+        return {"buckets": cumulative_counts, "count": running_count, "sum": total}
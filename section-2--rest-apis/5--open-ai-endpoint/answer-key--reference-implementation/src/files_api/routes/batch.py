@@ -0,0 +1,149 @@
+"""Routes that upload or delete many files in one request."""
+
+import asyncio
+import threading
+from typing import Dict
+
+from botocore.exceptions import ClientError
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Request,
+    status,
+)
+from starlette.datastructures import UploadFile as StarletteUploadFile
+
+from files_api.routes.common import (
+    get_directory_prefix,
+    reject_content_addressed_paths,
+    upload_file_content,
+    wait_unless_disconnected,
+)
+from files_api.s3.backends import S3Backend
+from files_api.schemas import (
+    DeleteFilesRequest,
+    DeleteFilesResponse,
+    FileFailure,
+    UploadFileResult,
+    UploadFilesResponse,
+)
+from files_api.settings import Settings
+
+BATCH_ROUTER = APIRouter(tags=["Files"])
+
+
+@BATCH_ROUTER.post(
+    "/v1/files/batch-upload",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "description": "One file per form field, named by the path to upload the file to.",
+                        "additionalProperties": {"type": "string", "format": "binary"},
+                    }
+                }
+            },
+        }
+    },
+)
+async def upload_files(request: Request) -> UploadFilesResponse:
+    """
+    Upload many files in one request.
+
+    Each field of the `multipart/form-data` body is a file, and its field name is the path to upload
+    it to. The files are uploaded to S3 concurrently, and each one is created or updated exactly as
+    `PUT /v1/files/:file_path` would, so the response reports per file the status code that route
+    would have returned. A file that fails to upload does not fail the others.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+
+    # Starlette spools each part to a temporary file as the body arrives, so the batch never has to fit in memory
+    async with request.form(max_files=settings.batch_upload_max_files) as form:
+        # `request.form()` returns Starlette's `UploadFile`, which FastAPI's `UploadFile` subclasses
+        files: Dict[str, StarletteUploadFile] = {}
+        for file_path, file_content in form.multi_items():
+            if not isinstance(file_content, StarletteUploadFile):
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"Field {file_path} is not a file"
+                )
+            if file_path in files:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=f"File {file_path} is sent twice"
+                )
+            reject_content_addressed_paths(settings, file_path)
+            files[file_path] = file_content
+
+        cancel_event = threading.Event()
+        semaphore = asyncio.Semaphore(settings.batch_upload_max_concurrency)
+
+        async def upload(file_path: str, file_content: StarletteUploadFile) -> UploadFileResult:
+            async with semaphore:
+                try:
+                    created = await upload_file_content(
+                        s3_backend, settings, file_path, file_content.file, file_content.content_type, cancel_event
+                    )
+                except ClientError as err:
+                    return UploadFileResult(
+                        file_path=file_path,
+                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                        message=f"Failed to upload file: {err.response['Error']['Code']}",
+                    )
+            if created:
+                return UploadFileResult(
+                    file_path=file_path,
+                    status_code=status.HTTP_201_CREATED,
+                    message=f"New file uploaded at path: /{file_path}",
+                )
+            return UploadFileResult(
+                file_path=file_path,
+                status_code=status.HTTP_200_OK,
+                message=f"Existing file updated at path: /{file_path}",
+            )
+
+        uploads = asyncio.ensure_future(
+            asyncio.gather(*(upload(file_path, file_content) for file_path, file_content in files.items()))
+        )
+        try:
+            await wait_unless_disconnected(request, uploads, cancel_event)
+        except BaseException:
+            # stops the uploads still running when one of them failed unexpectedly or the request was cancelled
+            cancel_event.set()
+            raise
+
+    return UploadFilesResponse(files=uploads.result())
+
+
+@BATCH_ROUTER.post("/v1/files/batch-delete")
+async def delete_files(request: Request, body: DeleteFilesRequest) -> DeleteFilesResponse:
+    """
+    Delete many files at once: either the listed files or every file in a directory.
+
+    Files are deleted in batches of up to 1000 with S3's `DeleteObjects`, so deleting a directory
+    costs one S3 request per 1000 files, and is not atomic: files that could not be deleted are
+    reported in `failures`, and the rest are deleted regardless.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    reject_content_addressed_paths(settings, *(body.file_paths or []), body.directory)
+    if body.file_paths is not None:
+        deleted_count, failures = await s3_backend.delete_s3_objects(
+            settings.s3_bucket_name, body.file_paths, max_concurrency=settings.bulk_delete_max_concurrency
+        )
+    else:
+        deleted_count, failures = await s3_backend.delete_s3_objects_with_prefix(
+            settings.s3_bucket_name,
+            get_directory_prefix(body.directory),  # type: ignore[arg-type]
+            max_concurrency=settings.bulk_delete_max_concurrency,
+        )
+
+    return DeleteFilesResponse(
+        deleted_count=deleted_count,
+        failures=[
+            FileFailure(file_path=failure["Key"], code=failure["Code"], message=failure["Message"])
+            for failure in failures
+        ],
+    )
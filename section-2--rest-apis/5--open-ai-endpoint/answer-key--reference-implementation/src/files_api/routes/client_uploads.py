@@ -0,0 +1,312 @@
+"""Routes of uploads that clients send to S3 themselves, with presigned URLs, or in resumable chunks."""
+
+import base64
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from typing import (
+    Annotated,
+    List,
+)
+
+from botocore.exceptions import ClientError
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Path,
+    Request,
+    Response,
+    status,
+)
+from pydantic import BaseModel
+
+from files_api.routes.common import reject_content_addressed_paths
+from files_api.s3.backends import S3Backend
+from files_api.s3.presigned_urls import MAX_MULTIPART_UPLOAD_PARTS
+from files_api.s3.upload_sessions import MissingChunksError
+from files_api.s3.write_objects import MIN_MULTIPART_PART_SIZE_BYTES
+from files_api.schemas import (
+    CompletePresignedUploadRequest,
+    CompleteUploadSessionRequest,
+    CreatePresignedUploadRequest,
+    CreatePresignedUploadResponse,
+    CreateUploadSessionRequest,
+    PresignedUploadPart,
+    PutFileResponse,
+    UploadedChunk,
+    UploadSession,
+)
+from files_api.settings import Settings
+
+try:
+    from mypy_boto3_s3.type_defs import CompletedPartTypeDef
+except ImportError:
+    ...
+
+CLIENT_UPLOADS_ROUTER = APIRouter(tags=["Files"])
+
+
+@CLIENT_UPLOADS_ROUTER.post(
+    "/v1/files/presigned-uploads",
+    status_code=status.HTTP_201_CREATED,
+    responses={
+        status.HTTP_409_CONFLICT: {"description": "Uploads are deduplicated, which needs the API to hash each file."}
+    },
+)
+async def create_presigned_upload(
+    request: Request, body: CreatePresignedUploadRequest
+) -> CreatePresignedUploadResponse:
+    """
+    Get presigned URLs to upload a file straight to S3, without sending its bytes through the API.
+
+    A file of up to the multipart part size is uploaded with one `PUT` of the whole file to `url`.
+    A larger file is uploaded in parts, each `PUT` to its own URL, concurrently if the client likes.
+    Then complete the upload with `POST /v1/files/presigned-uploads/complete`. A multipart upload that
+    is never completed keeps its parts in S3 until a bucket lifecycle rule aborts it.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    if settings.deduplicate_uploads:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Presigned uploads are not available when deduplicating"
+        )
+
+    expires_at = datetime.now(timezone.utc) + timedelta(seconds=settings.presigned_url_ttl_seconds)
+    presigned_upload = await s3_backend.create_presigned_upload(
+        settings.s3_bucket_name,
+        body.file_path,
+        body.size_bytes,
+        content_type=body.content_type,
+        part_size_bytes=settings.multipart_upload_part_size_bytes,
+        expires_in_seconds=settings.presigned_url_ttl_seconds,
+    )
+    return CreatePresignedUploadResponse(
+        file_path=body.file_path,
+        url=presigned_upload.url,
+        headers={"Content-Type": body.content_type or "application/octet-stream"} if presigned_upload.url else {},
+        upload_id=presigned_upload.upload_id,
+        part_size_bytes=presigned_upload.part_size_bytes,
+        parts=[
+            PresignedUploadPart(part_number=part_number, url=url)
+            for part_number, url in enumerate(presigned_upload.part_urls, start=1)
+        ],
+        expires_at=expires_at,
+    )
+
+
+@CLIENT_UPLOADS_ROUTER.post(
+    "/v1/files/presigned-uploads/complete",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "The file was not uploaded, or the multipart upload is unknown."},
+        status.HTTP_400_BAD_REQUEST: {"description": "A part is missing, or its ETag does not match."},
+    },
+)
+async def complete_presigned_upload(request: Request, body: CompletePresignedUploadRequest) -> PutFileResponse:
+    """
+    Complete the upload of a file to presigned URLs.
+
+    A file uploaded in parts is assembled from them. Either way, the API then serves the file's new
+    content: it did not see the file being written, so it updates what it cached about the file.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    reject_content_addressed_paths(settings, body.file_path)
+    parts: List["CompletedPartTypeDef"] = [
+        {"PartNumber": part.part_number, "ETag": part.etag}
+        for part in sorted(body.parts, key=lambda part: part.part_number)
+    ]
+    try:
+        await s3_backend.complete_presigned_upload(settings.s3_bucket_name, body.file_path, body.upload_id, parts)
+    except ClientError as err:
+        code = err.response["Error"]["Code"]
+        if code == "NoSuchUpload":
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload not found") from err
+        if code in ("InvalidPart", "InvalidPartOrder", "EntityTooSmall"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=err.response["Error"]["Message"]
+            ) from err
+        raise
+
+    if not await s3_backend.object_exists_in_s3(settings.s3_bucket_name, body.file_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    return PutFileResponse(file_path=body.file_path, message=f"File uploaded at path: /{body.file_path}")
+
+
+@CLIENT_UPLOADS_ROUTER.post("/v1/upload-sessions", status_code=status.HTTP_201_CREATED)
+async def create_upload_session(request: Request, body: CreateUploadSessionRequest) -> UploadSession:
+    """
+    Start a resumable upload of a file, sent in chunks that can be retried one at a time.
+
+    Unlike `PUT /v1/files/:file_path`, a dropped connection only loses the chunks in flight: the chunks
+    that landed are kept until the session is completed or aborted. If the API collects abandoned
+    sessions (`UPLOAD_SESSION_GC_INTERVAL_SECONDS`), they are also aborted once older than
+    `UPLOAD_SESSION_TTL_SECONDS`.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    if settings.deduplicate_uploads:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="Upload sessions are not available when deduplicating"
+        )
+
+    created_at = datetime.now(timezone.utc)
+    upload_id = await s3_backend.create_upload_session(
+        settings.s3_bucket_name, body.file_path, content_type=body.content_type
+    )
+    session = _UploadSessionToken(file_path=body.file_path, upload_id=upload_id, created_at=created_at)
+    return _to_upload_session(session, chunks=[], settings=settings)
+
+
+@CLIENT_UPLOADS_ROUTER.get(
+    "/v1/upload-sessions/{session_id}",
+    responses={status.HTTP_404_NOT_FOUND: {"description": "The session was completed, aborted or never existed."}},
+)
+async def get_upload_session(request: Request, session_id: str) -> UploadSession:
+    """Get an upload session, with the chunks that landed so far."""
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    session = _decode_session_id(session_id)
+    try:
+        parts = await s3_backend.list_upload_session_chunks(
+            settings.s3_bucket_name, session.file_path, session.upload_id
+        )
+    except ClientError as err:
+        _raise_upload_session_http_error(err)
+        raise
+    chunks = [
+        UploadedChunk(chunk_number=part["PartNumber"], size_bytes=part.get("Size"), etag=part["ETag"])
+        for part in parts
+    ]
+    return _to_upload_session(session, chunks=chunks, settings=settings)
+
+
+@CLIENT_UPLOADS_ROUTER.put(
+    "/v1/upload-sessions/{session_id}/chunks/{chunk_number}",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "The session was completed, aborted or never existed."},
+        status.HTTP_413_REQUEST_ENTITY_TOO_LARGE: {"description": "The chunk is larger than the API accepts."},
+    },
+)
+async def upload_chunk(
+    request: Request,
+    session_id: str,
+    chunk_number: Annotated[int, Path(ge=1, le=MAX_MULTIPART_UPLOAD_PARTS)],
+) -> UploadedChunk:
+    """
+    Upload one chunk of a file, sent as the raw request body.
+
+    Uploading a chunk number again replaces the chunk, so a chunk whose response was lost can simply be resent.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    session = _decode_session_id(session_id)
+
+    # a chunk is buffered so that S3 gets its length up front; the limit bounds the memory each request holds
+    chunk_content = bytearray()
+    async for data in request.stream():
+        chunk_content.extend(data)
+        if len(chunk_content) > settings.upload_session_max_chunk_size_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Chunks may be at most {settings.upload_session_max_chunk_size_bytes} bytes",
+            )
+    try:
+        part = await s3_backend.upload_session_chunk(
+            settings.s3_bucket_name, session.file_path, session.upload_id, chunk_number, bytes(chunk_content)
+        )
+    except ClientError as err:
+        _raise_upload_session_http_error(err)
+        raise
+    return UploadedChunk(chunk_number=chunk_number, size_bytes=len(chunk_content), etag=part["ETag"])
+
+
+@CLIENT_UPLOADS_ROUTER.post(
+    "/v1/upload-sessions/{session_id}/complete",
+    responses={
+        status.HTTP_404_NOT_FOUND: {"description": "The session was completed, aborted or never existed."},
+        status.HTTP_409_CONFLICT: {"description": "Some of the chunks have not landed; upload them and retry."},
+        status.HTTP_400_BAD_REQUEST: {"description": "A chunk other than the last is smaller than S3 accepts."},
+    },
+)
+async def complete_upload_session(
+    request: Request, session_id: str, body: CompleteUploadSessionRequest
+) -> PutFileResponse:
+    """Assemble chunks 1 to `chunk_count` into the file, ending the session."""
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    session = _decode_session_id(session_id)
+    try:
+        await s3_backend.complete_upload_session(
+            settings.s3_bucket_name, session.file_path, session.upload_id, body.chunk_count
+        )
+    except MissingChunksError as err:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail={"message": str(err), "missing_chunk_numbers": err.missing_chunk_numbers},
+        ) from err
+    except ClientError as err:
+        _raise_upload_session_http_error(err)
+        raise
+    return PutFileResponse(file_path=session.file_path, message=f"File uploaded at path: /{session.file_path}")
+
+
+@CLIENT_UPLOADS_ROUTER.delete(
+    "/v1/upload-sessions/{session_id}",
+    status_code=status.HTTP_204_NO_CONTENT,
+    responses={status.HTTP_404_NOT_FOUND: {"description": "The session was completed, aborted or never existed."}},
+)
+async def abort_upload_session(request: Request, session_id: str) -> Response:
+    """Abort an upload session and delete the chunks that landed."""
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    session = _decode_session_id(session_id)
+    try:
+        await s3_backend.abort_upload_session(settings.s3_bucket_name, session.file_path, session.upload_id)
+    except ClientError as err:
+        _raise_upload_session_http_error(err)
+        raise
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+
+class _UploadSessionToken(BaseModel):
+    """What session IDs carry: the multipart upload a session is, which S3 only finds with the file's path."""
+
+    file_path: str
+    upload_id: str
+    created_at: datetime
+
+
+def _encode_session_id(session: _UploadSessionToken) -> str:
+    return base64.urlsafe_b64encode(session.model_dump_json().encode()).decode()
+
+
+def _decode_session_id(session_id: str) -> _UploadSessionToken:
+    try:
+        return _UploadSessionToken.model_validate_json(base64.urlsafe_b64decode(session_id))
+    # also catches malformed base64 and pydantic's ValidationError
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found") from err
+
+
+def _to_upload_session(session: _UploadSessionToken, chunks: List[UploadedChunk], settings: Settings) -> UploadSession:
+    return UploadSession(
+        session_id=_encode_session_id(session),
+        file_path=session.file_path,
+        chunk_size_bytes=min(settings.multipart_upload_part_size_bytes, settings.upload_session_max_chunk_size_bytes),
+        min_chunk_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES,
+        max_chunk_size_bytes=settings.upload_session_max_chunk_size_bytes,
+        created_at=session.created_at,
+        expires_at=session.created_at + timedelta(seconds=settings.upload_session_ttl_seconds),
+        chunks=chunks,
+    )
+
+
+def _raise_upload_session_http_error(err: ClientError) -> None:
+    """Raise the `HTTPException` an error of S3 about an upload session maps to, if any."""
+    code = err.response["Error"]["Code"]
+    if code == "NoSuchUpload":
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found") from err
+    if code in ("EntityTooSmall", "InvalidPart"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=err.response["Error"]["Message"]) from err
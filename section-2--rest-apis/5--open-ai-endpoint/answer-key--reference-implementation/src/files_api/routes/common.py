@@ -0,0 +1,71 @@
+"""Helpers shared by the route modules."""
+
+import asyncio
+import threading
+from typing import (
+    BinaryIO,
+    Optional,
+)
+
+from botocore.exceptions import ClientError
+from fastapi import (
+    HTTPException,
+    Request,
+    status,
+)
+
+from files_api.s3.backends import S3Backend
+from files_api.s3.content_addressed import is_content_addressed_key
+from files_api.settings import Settings
+
+
+async def wait_unless_disconnected(
+    request: Request,
+    task: asyncio.Future,
+    cancel_event: threading.Event,
+    poll_interval_seconds: float = 0.5,
+) -> None:
+    """Wait for `task`, setting `cancel_event` if the client disconnects in the meantime."""
+    while not (await asyncio.wait({task}, timeout=poll_interval_seconds))[0]:
+        if await request.is_disconnected():
+            cancel_event.set()
+    await task
+
+
+async def upload_file_content(  # pylint: disable=too-many-arguments
+    s3_backend: S3Backend,
+    settings: Settings,
+    file_path: str,
+    file_obj: BinaryIO,
+    content_type: Optional[str],
+    cancel_event: threading.Event,
+) -> bool:
+    """Upload a file sent to the API with the configured part size and concurrency; return whether it was created."""
+    return await s3_backend.upload_s3_object_from_file(
+        bucket_name=settings.s3_bucket_name,
+        object_key=file_path,
+        file_obj=file_obj,
+        content_type=content_type,
+        part_size_bytes=settings.multipart_upload_part_size_bytes,
+        max_concurrency=settings.multipart_upload_max_concurrency,
+        cancel_event=cancel_event,
+    )
+
+
+def reject_content_addressed_paths(settings: Settings, *paths: Optional[str]) -> None:
+    """Report a file or directory inside the content-addressed storage of deduplicated uploads as not found."""
+    if settings.deduplicate_uploads and any(
+        path is not None and is_content_addressed_key(f"{path.strip('/')}/") for path in paths
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+
+def get_directory_prefix(directory: str) -> str:
+    """Return the key prefix of the files in `directory`; "a/b" must not also match "a/bc.txt"."""
+    directory = directory.strip("/")
+    return f"{directory}/" if directory else ""
+
+
+def is_not_found_error(err: ClientError) -> bool:
+    # GetObject reports a missing key as "NoSuchKey"; HeadObject has no body, so only its status code is left
+    return err.response["Error"]["Code"] in ("NoSuchKey", "404")
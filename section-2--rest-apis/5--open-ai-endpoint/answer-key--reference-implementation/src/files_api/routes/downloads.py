@@ -0,0 +1,563 @@
+"""Routes that read files: whole, by byte ranges, from the disk cache, or redirected to S3."""
+
+import secrets
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Mapping,
+    Optional,
+)
+
+from botocore.exceptions import ClientError
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import (
+    FileResponse,
+    RedirectResponse,
+    StreamingResponse,
+)
+from starlette.types import (
+    Receive,
+    Scope,
+    Send,
+)
+
+from files_api.byte_ranges import (
+    ByteRangeSpec,
+    format_byte_range_spec,
+    format_content_range,
+    format_unsatisfied_content_range,
+    parse_range_header,
+    resolve_byte_ranges,
+)
+from files_api.conditional_requests import (
+    format_http_date,
+    get_cache_control,
+    parse_http_date,
+    parse_if_none_match,
+)
+from files_api.routes.common import (
+    is_not_found_error,
+    reject_content_addressed_paths,
+)
+from files_api.s3.backends import S3Backend
+from files_api.s3.disk_cache import (
+    DiskCacheEntry,
+    DiskCacheFill,
+    S3ObjectDiskCache,
+)
+from files_api.settings import Settings
+
+DOWNLOADS_ROUTER = APIRouter(tags=["Files"])
+
+
+@DOWNLOADS_ROUTER.head(
+    "/v1/files/{file_path:path}",
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "File not found for the given `file_path`.",
+        },
+        status.HTTP_200_OK: {
+            "headers": {
+                "Content-Type": {
+                    "description": "The [MIME type](https://developer.mozilla.org/en-US/docs/Web/HTTP/Basics_of_HTTP/MIME_types/Common_types) of the file.",
+                    "example": "text/plain",
+                    "schema": {"type": "string"},
+                },
+                "Content-Length": {
+                    "description": "The size of the file in bytes.",
+                    "example": 512,
+                    "schema": {"type": "integer"},
+                },
+                "Last-Modified": {
+                    "description": "The last modified date of the file.",
+                    "example": "Thu, 01 Jan 2022 00:00:00 GMT",
+                    "schema": {"type": "string", "format": "date-time"},
+                },
+                "ETag": {
+                    "description": "The entity tag of the file's current content.",
+                    "example": '"5d41402abc4b2a76b9719d911017c592"',
+                    "schema": {"type": "string"},
+                },
+            }
+        },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The file matches the `If-None-Match` or `If-Modified-Since` header.",
+        },
+    },
+)
+async def get_file_metadata(request: Request, file_path: str, response: Response) -> Response:
+    """
+    Retrieve file metadata.
+
+    Note: by convention, HEAD requests MUST NOT return a body in the response.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    reject_content_addressed_paths(settings, file_path)
+
+    cache_control = get_cache_control(file_path, settings.cache_control_by_prefix)
+    try:
+        head_object_response = await s3_backend.head_s3_object(
+            settings.s3_bucket_name, object_key=file_path, **_get_s3_preconditions(request)
+        )
+    except ClientError as err:
+        if is_not_found_error(err):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found") from err
+        if not _is_not_modified_error(err):
+            raise
+        return _not_modified_response_from_error(err, cache_control)
+
+    etag, last_modified = head_object_response["ETag"], format_http_date(head_object_response["LastModified"])
+    if _etag_matches_if_none_match(request, etag):
+        return _not_modified_response(etag, last_modified, cache_control)
+
+    response.headers["Content-Type"] = head_object_response["ContentType"]
+    response.headers["Content-Length"] = str(head_object_response["ContentLength"])
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers.update(_get_caching_headers(etag, last_modified, cache_control))
+    response.status_code = status.HTTP_200_OK
+    return response
+
+
+@DOWNLOADS_ROUTER.get(
+    "/v1/files/{file_path:path}",
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "File not found for the given `file_path`.",
+        },
+        status.HTTP_200_OK: {
+            "description": "The file content.",
+            "content": {
+                "application/octet-stream": {
+                    "schema": {"type": "string", "format": "binary"},
+                },
+            },
+        },
+        status.HTTP_304_NOT_MODIFIED: {
+            "description": "The file matches the `If-None-Match` or `If-Modified-Since` header.",
+        },
+        status.HTTP_206_PARTIAL_CONTENT: {
+            "description": (
+                "The byte ranges of the file requested with the `Range` header. "
+                "Multiple ranges are returned as a `multipart/byteranges` body."
+            ),
+            "headers": {
+                "Content-Range": {
+                    "description": "The byte range returned, for a single range.",
+                    "example": "bytes 0-99/512",
+                    "schema": {"type": "string"},
+                },
+            },
+        },
+        status.HTTP_307_TEMPORARY_REDIRECT: {
+            "description": "The file is downloaded from the presigned S3 URL in `Location`.",
+        },
+        status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE: {
+            "description": "None of the byte ranges in the `Range` header overlap the file.",
+            "headers": {
+                "Content-Range": {
+                    "description": "The size of the file.",
+                    "example": "bytes */512",
+                    "schema": {"type": "string"},
+                },
+            },
+        },
+    },
+)
+async def get_file(
+    request: Request,
+    file_path: str,
+) -> Response:
+    """
+    Retrieve a file.
+
+    Supports single and multiple byte ranges with the `Range` header, e.g. `Range: bytes=0-99`,
+    and conditional requests with the `If-None-Match` and `If-Modified-Since` headers.
+
+    If `PRESIGNED_DOWNLOAD_THRESHOLD_BYTES` is set, files at least that large are not sent by the
+    API: the response is a `307` redirect to a short-lived presigned S3 URL, which honors the same
+    headers.
+
+    If `DISK_CACHE_DIR` is set, whole files are cached on the API's local disk as they are downloaded,
+    and sent from there while their ETag in S3 is unchanged. Byte ranges are always read from S3.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    reject_content_addressed_paths(settings, file_path)
+
+    cache_control = get_cache_control(file_path, settings.cache_control_by_prefix)
+    if settings.presigned_download_threshold_bytes is not None:
+        redirect = await _get_presigned_download_redirect(request, s3_backend, settings, file_path, cache_control)
+        if redirect is not None:
+            return redirect
+
+    preconditions = _get_s3_preconditions(request)
+    byte_range_specs = parse_range_header(request.headers["Range"]) if "Range" in request.headers else None
+    try:
+        if byte_range_specs and len(byte_range_specs) == 1:
+            return await _get_file_byte_range(
+                s3_backend, settings.s3_bucket_name, file_path, byte_range_specs[0], cache_control, **preconditions
+            )
+        if byte_range_specs:
+            return await _get_file_byte_ranges(
+                s3_backend, settings.s3_bucket_name, file_path, byte_range_specs, cache_control, **preconditions
+            )
+        return await _get_whole_file(request, s3_backend, settings, file_path, cache_control, preconditions)
+    except ClientError as err:
+        if is_not_found_error(err):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found") from err
+        if not _is_not_modified_error(err):
+            raise
+        return _not_modified_response_from_error(err, cache_control)
+
+
+async def _get_whole_file(  # pylint: disable=too-many-arguments
+    request: Request,
+    s3_backend: S3Backend,
+    settings: Settings,
+    file_path: str,
+    cache_control: Optional[str],
+    preconditions: Dict[str, Any],
+) -> Response:
+    """Send a whole file from the disk cache if it holds the current version, or else from S3, caching it on disk."""
+    disk_cache: Optional[S3ObjectDiskCache] = request.app.state.disk_cache
+    if disk_cache is not None:
+        cached_response = await _get_file_from_disk_cache(
+            request, s3_backend, disk_cache, settings.s3_bucket_name, file_path, cache_control, preconditions
+        )
+        if cached_response is not None:
+            return cached_response
+
+    get_object_response = await s3_backend.fetch_s3_object_in_parallel(
+        settings.s3_bucket_name,
+        object_key=file_path,
+        threshold_bytes=settings.parallel_download_threshold_bytes,
+        part_size_bytes=settings.parallel_download_part_size_bytes,
+        max_concurrency=settings.parallel_download_max_concurrency,
+        **preconditions,
+    )
+    etag, last_modified = get_object_response["ETag"], format_http_date(get_object_response["LastModified"])
+    if _etag_matches_if_none_match(request, etag):
+        await _close_body(get_object_response["Body"])
+        return _not_modified_response(etag, last_modified, cache_control)
+
+    body = get_object_response["Body"]
+    if disk_cache is not None:
+        fill = disk_cache.start_fill(
+            settings.s3_bucket_name,
+            file_path,
+            etag=etag,
+            content_type=get_object_response["ContentType"],
+            size_bytes=get_object_response["ContentLength"],
+            last_modified=last_modified,
+        )
+        if fill is not None:
+            body = _tee_to_disk_cache(body, fill)
+    return StreamingResponse(
+        content=body,
+        media_type=get_object_response["ContentType"],
+        headers={
+            "Accept-Ranges": "bytes",
+            # also lets the compression middleware skip files too small to be worth compressing
+            "Content-Length": str(get_object_response["ContentLength"]),
+            **_get_caching_headers(etag, last_modified, cache_control),
+        },
+    )
+
+
+async def _get_file_from_disk_cache(  # pylint: disable=too-many-arguments
+    request: Request,
+    s3_backend: S3Backend,
+    disk_cache: S3ObjectDiskCache,
+    bucket_name: str,
+    object_key: str,
+    cache_control: Optional[str],
+    preconditions: Dict[str, Any],
+) -> Optional[Response]:
+    """
+    Send a file from the disk cache if its cached version is current, or return None to download it from S3.
+
+    A file that is not cached costs no request; the HEAD that revalidates a cached file's ETag is
+    usually answered by the metadata cache, so a file replaced by another API instance may be sent
+    from disk until its cached metadata expires (`METADATA_CACHE_TTL_SECONDS`).
+    """
+    if disk_cache.get_cached_etag(bucket_name, object_key) is None:
+        return None
+    head_object_response = await s3_backend.head_s3_object(bucket_name, object_key, **preconditions)
+    etag, last_modified = head_object_response["ETag"], format_http_date(head_object_response["LastModified"])
+    if _etag_matches_if_none_match(request, etag):
+        return _not_modified_response(etag, last_modified, cache_control)
+
+    entry = disk_cache.acquire(bucket_name, object_key, etag)
+    if entry is None:
+        return None
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(entry.size_bytes),
+        **_get_caching_headers(etag, last_modified, cache_control),
+    }
+    return _CachedFileResponse(disk_cache, entry, headers=headers)
+
+
+async def _tee_to_disk_cache(body: AsyncIterator[bytes], fill: DiskCacheFill) -> AsyncIterator[bytes]:
+    """Yield the chunks of a file's body, writing them to the disk cache; only a complete file is cached."""
+    completed = False
+    try:
+        async for chunk in body:
+            # a write to the page cache costs less than handing each chunk to a thread
+            fill.write(chunk)
+            yield chunk
+        completed = fill.commit()
+    finally:
+        if not completed:
+            fill.abort()
+
+
+class _CachedFileResponse(FileResponse):
+    """Sends a file from the disk cache, which must not delete the file until it was sent."""
+
+    def __init__(self, disk_cache: S3ObjectDiskCache, entry: DiskCacheEntry, headers: Dict[str, str]):
+        super().__init__(entry.path, media_type=entry.content_type, headers=headers)
+        self.disk_cache = disk_cache
+        self.entry = entry
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.disk_cache.release(self.entry)
+
+
+async def _get_presigned_download_redirect(
+    request: Request, s3_backend: S3Backend, settings: Settings, file_path: str, cache_control: Optional[str]
+) -> Optional[Response]:
+    """Redirect the download of a large file to a presigned S3 URL, or return None to send the file from the API."""
+    try:
+        # unconditional, so the metadata cache usually answers it
+        head_object_response = await s3_backend.head_s3_object(settings.s3_bucket_name, file_path)
+    except ClientError as err:
+        if is_not_found_error(err):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found") from err
+        raise
+    if head_object_response["ContentLength"] < settings.presigned_download_threshold_bytes:  # type: ignore[operator]
+        return None
+
+    etag, last_modified = head_object_response["ETag"], format_http_date(head_object_response["LastModified"])
+    if _etag_matches_if_none_match(request, etag):
+        return _not_modified_response(etag, last_modified, cache_control)
+    url = await s3_backend.generate_presigned_download_url(
+        settings.s3_bucket_name, file_path, expires_in_seconds=settings.presigned_url_ttl_seconds
+    )
+    # the URL expires, so the redirect must not outlive it in a cache
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Cache-Control": "no-store"})
+
+
+async def _get_file_byte_range(  # pylint: disable=too-many-arguments
+    s3_backend: S3Backend,
+    bucket_name: str,
+    object_key: str,
+    byte_range_spec: ByteRangeSpec,
+    cache_control: Optional[str],
+    if_match: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[datetime] = None,
+) -> StreamingResponse:
+    """Respond with one byte range of a file, which S3 resolves against the file size."""
+    try:
+        get_object_response = await s3_backend.fetch_s3_object(
+            bucket_name,
+            object_key,
+            byte_range=format_byte_range_spec(byte_range_spec),
+            if_match=if_match,
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+        )
+    except ClientError as err:
+        if err.response["Error"]["Code"] != "InvalidRange":
+            raise
+        size_bytes = await _get_unsatisfied_object_size(s3_backend, bucket_name, object_key, err)
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": format_unsatisfied_content_range(size_bytes)},
+        ) from err
+
+    return StreamingResponse(
+        content=get_object_response["Body"],
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=get_object_response["ContentType"],
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Range": get_object_response["ContentRange"],
+            "Content-Length": str(get_object_response["ContentLength"]),
+            **_get_caching_headers(
+                get_object_response["ETag"], format_http_date(get_object_response["LastModified"]), cache_control
+            ),
+        },
+    )
+
+
+async def _get_unsatisfied_object_size(
+    s3_backend: S3Backend, bucket_name: str, object_key: str, err: ClientError
+) -> int:
+    """Return the size of a file whose byte range S3 could not satisfy, asking S3 if the error does not say."""
+    # S3 reports the size with an `InvalidRange` error, but that key is not part of botocore's error shape
+    error: Mapping[str, Any] = err.response["Error"]
+    if "ActualObjectSize" in error:
+        return int(error["ActualObjectSize"])
+    head_object_response = await s3_backend.head_s3_object(bucket_name, object_key)
+    return head_object_response["ContentLength"]
+
+
+async def _get_file_byte_ranges(  # pylint: disable=too-many-arguments
+    s3_backend: S3Backend,
+    bucket_name: str,
+    object_key: str,
+    byte_range_specs: list[ByteRangeSpec],
+    cache_control: Optional[str],
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[datetime] = None,
+) -> StreamingResponse:
+    """Respond with several byte ranges of a file as a `multipart/byteranges` body."""
+    # the size and ETag come from a GET of the first byte rather than a HEAD, which the metadata cache
+    # could answer with the ETag of a version since replaced, failing every range after the headers were sent
+    try:
+        first_byte_response = await s3_backend.fetch_s3_object(
+            bucket_name,
+            object_key,
+            byte_range="bytes=0-0",
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+        )
+    except ClientError as err:
+        if err.response["Error"]["Code"] != "InvalidRange":
+            raise
+        # only an empty file has no first byte
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": format_unsatisfied_content_range(0)},
+        ) from err
+    await _close_body(first_byte_response["Body"])
+    size_bytes = int(first_byte_response["ContentRange"].rsplit("/", 1)[1])
+
+    byte_ranges = resolve_byte_ranges(byte_range_specs, size_bytes)
+    if not byte_ranges:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Requested range not satisfiable",
+            headers={"Content-Range": format_unsatisfied_content_range(size_bytes)},
+        )
+    if len(byte_ranges) == 1:
+        return await _get_file_byte_range(
+            s3_backend, bucket_name, object_key, byte_ranges[0], cache_control, if_match=first_byte_response["ETag"]
+        )
+    return _multipart_byteranges_response(
+        s3_backend, bucket_name, object_key, byte_ranges, size_bytes, first_byte_response, cache_control
+    )
+
+
+def _multipart_byteranges_response(  # pylint: disable=too-many-arguments
+    s3_backend: S3Backend,
+    bucket_name: str,
+    object_key: str,
+    byte_ranges: list[tuple[int, int]],
+    size_bytes: int,
+    metadata: Mapping[str, Any],
+    cache_control: Optional[str],
+) -> StreamingResponse:
+    """Stream the resolved `byte_ranges` of the version of a file that `metadata` describes."""
+    etag = metadata["ETag"]
+    boundary = secrets.token_hex(16)
+    part_headers = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {metadata['ContentType']}\r\n"
+            f"Content-Range: {format_content_range(first_byte, last_byte, size_bytes)}\r\n\r\n"
+        ).encode()
+        for first_byte, last_byte in byte_ranges
+    ]
+    closing_delimiter = f"--{boundary}--\r\n".encode()
+    content_length = sum(
+        len(part_header) + last_byte - first_byte + 1 + 2
+        for part_header, (first_byte, last_byte) in zip(part_headers, byte_ranges)
+    ) + len(closing_delimiter)
+
+    async def iter_parts() -> AsyncIterator[bytes]:
+        for part_header, byte_range in zip(part_headers, byte_ranges):
+            yield part_header
+            # every range must come from the same version of the file
+            get_object_response = await s3_backend.fetch_s3_object(
+                bucket_name, object_key, byte_range=format_byte_range_spec(byte_range), if_match=etag
+            )
+            async for chunk in get_object_response["Body"]:
+                yield chunk
+            yield b"\r\n"
+        yield closing_delimiter
+
+    return StreamingResponse(
+        content=iter_parts(),
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers={
+            "Accept-Ranges": "bytes",
+            "Content-Length": str(content_length),
+            **_get_caching_headers(etag, format_http_date(metadata["LastModified"]), cache_control),
+        },
+    )
+
+
+async def _close_body(body: AsyncIterator[bytes]) -> None:
+    """Close the body of a response that will not be sent, releasing its connection to S3."""
+    aclose = getattr(body, "aclose", None)
+    if aclose is not None:
+        await aclose()
+
+
+def _get_s3_preconditions(request: Request) -> Dict[str, Any]:
+    """Translate the request's `If-None-Match` or `If-Modified-Since` header into an S3 precondition."""
+    if "If-None-Match" in request.headers:
+        etags = parse_if_none_match(request.headers["If-None-Match"])
+        # S3 takes a single entity tag; lists are compared by `_etag_matches_if_none_match` instead
+        return {"if_none_match": etags[0]} if len(etags) == 1 else {}
+    # per the RFC, If-Modified-Since is only evaluated without If-None-Match
+    return {"if_modified_since": parse_http_date(request.headers.get("If-Modified-Since"))}
+
+
+def _etag_matches_if_none_match(request: Request, etag: str) -> bool:
+    etags = parse_if_none_match(request.headers.get("If-None-Match", ""))
+    return "*" in etags or etag in etags
+
+
+def _is_not_modified_error(err: ClientError) -> bool:
+    return err.response["Error"]["Code"] == "304"
+
+
+def _get_caching_headers(
+    etag: Optional[str], last_modified: Optional[str], cache_control: Optional[str]
+) -> Dict[str, str]:
+    """Return the validator and `Cache-Control` headers of a file response, leaving out missing values."""
+    headers = {"ETag": etag, "Last-Modified": last_modified, "Cache-Control": cache_control}
+    return {name: value for name, value in headers.items() if value}
+
+
+def _not_modified_response(
+    etag: Optional[str], last_modified: Optional[str], cache_control: Optional[str]
+) -> Response:
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED, headers=_get_caching_headers(etag, last_modified, cache_control)
+    )
+
+
+def _not_modified_response_from_error(err: ClientError, cache_control: Optional[str]) -> Response:
+    """Respond with 304 to a request whose precondition S3 evaluated, using the validators S3 returned."""
+    s3_headers = err.response["ResponseMetadata"]["HTTPHeaders"]
+    return _not_modified_response(s3_headers.get("etag"), s3_headers.get("last-modified"), cache_control)
@@ -0,0 +1,173 @@
+"""Routes that upload, delete, copy and move files."""
+
+import asyncio
+import threading
+
+from botocore.exceptions import ClientError
+from fastapi import (
+    APIRouter,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+    status,
+)
+
+from files_api.routes.common import (
+    get_directory_prefix,
+    is_not_found_error,
+    reject_content_addressed_paths,
+    upload_file_content,
+    wait_unless_disconnected,
+)
+from files_api.s3.backends import S3Backend
+from files_api.schemas import (
+    CopyFilesRequest,
+    CopyFilesResponse,
+    FileFailure,
+    PutFileResponse,
+)
+from files_api.settings import Settings
+
+FILES_ROUTER = APIRouter(tags=["Files"])
+
+
+@FILES_ROUTER.put(
+    "/v1/files/{file_path:path}",
+    responses={
+        status.HTTP_200_OK: {"model": PutFileResponse},
+        status.HTTP_201_CREATED: {"model": PutFileResponse},
+    },
+)
+async def upload_file(
+    request: Request,
+    file_path: str,
+    file_content: UploadFile,
+    response: Response,
+) -> PutFileResponse:
+    """Upload a file."""
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    reject_content_addressed_paths(settings, file_path)
+
+    # the upload is read from Starlette's spooled temp file one part at a time, so large files
+    # never have to fit in memory; it is aborted if the client goes away mid-upload
+    cancel_event = threading.Event()
+    upload = asyncio.ensure_future(
+        upload_file_content(
+            s3_backend, settings, file_path, file_content.file, file_content.content_type, cancel_event
+        )
+    )
+    try:
+        await wait_unless_disconnected(request, upload, cancel_event)
+    except asyncio.CancelledError:
+        cancel_event.set()
+        raise
+
+    # the upload itself reports whether it created the file, so there is no check-then-act race
+    if upload.result():
+        message = f"New file uploaded at path: /{file_path}"
+        response.status_code = status.HTTP_201_CREATED
+    else:
+        message = f"Existing file updated at path: /{file_path}"
+        response.status_code = status.HTTP_200_OK
+
+    return PutFileResponse(file_path=f"{file_path}", message=message)
+
+
+@FILES_ROUTER.delete(
+    "/v1/files/{file_path:path}",
+    responses={
+        status.HTTP_404_NOT_FOUND: {
+            "description": "File not found for the given `file_path`.",
+        },
+        status.HTTP_204_NO_CONTENT: {
+            "description": "File deleted successfully.",
+        },
+    },
+)
+async def delete_file(
+    request: Request,
+    file_path: str,
+    response: Response,
+) -> Response:
+    """
+    Delete a file.
+
+    NOTE: DELETE requests MUST NOT return a body in the response.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    reject_content_addressed_paths(settings, file_path)
+    if not await s3_backend.object_exists_in_s3(settings.s3_bucket_name, object_key=file_path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    await s3_backend.delete_s3_object(settings.s3_bucket_name, object_key=file_path)
+
+    response.status_code = status.HTTP_204_NO_CONTENT
+    return response
+
+
+@FILES_ROUTER.post(
+    "/v1/files/copy",
+    responses={status.HTTP_404_NOT_FOUND: {"description": "File not found for the given `source_path`."}},
+)
+async def copy_files(request: Request, body: CopyFilesRequest) -> CopyFilesResponse:
+    """
+    Copy a file, or every file in a directory, overwriting files that already exist at the destination.
+
+    The files are copied by S3 itself, so their content never passes through the API, whatever their size.
+    Copying a directory is not atomic: files that could not be copied are reported in `failures`.
+    """
+    return await _copy_files(request, body, delete_sources=False)
+
+
+@FILES_ROUTER.post(
+    "/v1/files/move",
+    responses={status.HTTP_404_NOT_FOUND: {"description": "File not found for the given `source_path`."}},
+)
+async def move_files(request: Request, body: CopyFilesRequest) -> CopyFilesResponse:
+    """
+    Move a file, or every file in a directory, overwriting files that already exist at the destination.
+
+    S3 cannot rename files, so each file is copied by S3 and then deleted. Moving a directory is not
+    atomic: files that could not be copied, or deleted after copying, are reported in `failures`.
+    """
+    return await _copy_files(request, body, delete_sources=True)
+
+
+async def _copy_files(request: Request, body: CopyFilesRequest, delete_sources: bool) -> CopyFilesResponse:
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    reject_content_addressed_paths(
+        settings, body.source_path, body.destination_path, body.source_directory, body.destination_directory
+    )
+    copy_kwargs = {
+        "part_size_bytes": settings.multipart_copy_part_size_bytes,
+        "max_concurrency": settings.copy_max_concurrency,
+    }
+
+    if body.source_path is not None:
+        copy = s3_backend.move_s3_object if delete_sources else s3_backend.copy_s3_object
+        try:
+            await copy(settings.s3_bucket_name, body.source_path, body.destination_path, **copy_kwargs)  # type: ignore
+        except ClientError as err:
+            if is_not_found_error(err):
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found") from err
+            raise
+        return CopyFilesResponse(file_count=1, failures=[])
+
+    file_count, failures = await s3_backend.copy_s3_objects_with_prefix(
+        settings.s3_bucket_name,
+        get_directory_prefix(body.source_directory),  # type: ignore[arg-type]
+        get_directory_prefix(body.destination_directory),  # type: ignore[arg-type]
+        delete_sources=delete_sources,
+        **copy_kwargs,
+    )
+    return CopyFilesResponse(
+        file_count=file_count,
+        failures=[
+            FileFailure(file_path=failure["Key"], code=failure["Code"], message=failure["Message"])
+            for failure in failures
+        ],
+    )
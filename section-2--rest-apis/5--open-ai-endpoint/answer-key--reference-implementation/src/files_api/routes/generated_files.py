@@ -0,0 +1,109 @@
+"""Routes that generate files with OpenAI and store them in S3."""
+
+import mimetypes
+from typing import Annotated
+
+import httpx
+from fastapi import (
+    APIRouter,
+    Depends,
+    Request,
+    Response,
+    status,
+)
+
+from files_api.generate_files import (
+    generate_image,
+    generate_text_to_speech,
+    get_text_chat_completion,
+)
+from files_api.routes.common import reject_content_addressed_paths
+from files_api.s3.backends import S3Backend
+from files_api.schemas import (
+    GeneratedFileType,
+    GenerateFilesQueryParams,
+    PutGeneratedFileResponse,
+)
+from files_api.settings import Settings
+
+GENERATED_FILES_ROUTER = APIRouter(tags=["Generated Files"])
+
+
+@GENERATED_FILES_ROUTER.post(
+    "/v1/files/generated/{file_path:path}",
+    status_code=status.HTTP_201_CREATED,
+    summary="AI Generated Files",
+    responses={
+        status.HTTP_201_CREATED: {
+            "model": PutGeneratedFileResponse,
+            "description": "Successful Response",
+            "content": {
+                "application/json": {
+                    "examples": {
+                        "text": PutGeneratedFileResponse.model_json_schema()["examples"][0],
+                        "image": PutGeneratedFileResponse.model_json_schema()["examples"][1],
+                        "text-to-speech": PutGeneratedFileResponse.model_json_schema()["examples"][2],
+                    },
+                },
+            },
+        },
+    },
+)
+async def generate_file_using_openai(
+    request: Request, response: Response, query_params: Annotated[GenerateFilesQueryParams, Depends()]
+) -> PutGeneratedFileResponse:
+    """
+    Generate a File using AI.
+
+    Supported file types:
+    - **text**: `.txt`
+    - **image**: `.png`, `.jpg`, `.jpeg`
+    - **text-to-speech**: `.mp3`, `.opus`, `.aac`, `.flac`, `.wav`, `.pcm`
+
+    Note: the generated file type is derived from the file_path extension. So the file_path must have
+    an extension matching one of the supported file types in the list above.
+    """
+    settings: Settings = request.app.state.settings
+    s3_bucket_name = settings.s3_bucket_name
+    reject_content_addressed_paths(settings, query_params.file_path)
+
+    content_type = None
+
+    # generate text
+    if query_params.file_type == GeneratedFileType.TEXT:
+        file_content = await get_text_chat_completion(prompt=query_params.prompt)
+        file_content_bytes: bytes = file_content.encode("utf-8")  # convert string to bytes
+        content_type = "text/plain"
+
+    # generate/download an image
+    elif query_params.file_type == GeneratedFileType.IMAGE:
+        image_url = await generate_image(prompt=query_params.prompt)
+        async with httpx.AsyncClient() as client:
+            image_response = await client.get(image_url)  # pylint: disable=missing-timeout
+        file_content_bytes = image_response.content
+
+    # generate audio
+    else:
+        response_audio_file_format = query_params.file_path.split(".")[-1]  # the file extension
+        file_content_bytes, content_type = await generate_text_to_speech(
+            prompt=query_params.prompt, response_format=response_audio_file_format  # type: ignore
+        )
+
+    # try to guess the mimetype from the file path's extension if we don't already know it
+    content_type: str | None = content_type or mimetypes.guess_type(query_params.file_path)[0]  # type: ignore
+
+    # Upload the generated file to S3
+    s3_backend: S3Backend = request.app.state.s3_backend
+    await s3_backend.upload_s3_object(
+        bucket_name=s3_bucket_name,
+        object_key=query_params.file_path,
+        file_content=file_content_bytes,
+        content_type=content_type,
+    )
+
+    # return response
+    response.status_code = status.HTTP_201_CREATED
+    return PutGeneratedFileResponse(
+        file_path=query_params.file_path,
+        message=f"New {query_params.file_type.value} file generated and uploaded at path: {query_params.file_path}",
+    )
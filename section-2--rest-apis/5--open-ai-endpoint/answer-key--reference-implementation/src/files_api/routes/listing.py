@@ -0,0 +1,425 @@
+"""Routes that list files, a page at a time or streamed as NDJSON, and download directories as archives."""
+
+import asyncio
+import base64
+from collections import deque
+from datetime import datetime
+from typing import (
+    Annotated,
+    Any,
+    AsyncIterator,
+    Deque,
+    Dict,
+    List,
+    Optional,
+)
+
+from botocore.exceptions import ClientError
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Request,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from pydantic import (
+    BaseModel,
+    Field,
+)
+
+from files_api.archives import (
+    ArchiveEntry,
+    get_archive_file_extension,
+    get_archive_media_type,
+    stream_archive,
+)
+from files_api.routes.common import (
+    get_directory_prefix,
+    is_not_found_error,
+    reject_content_addressed_paths,
+)
+from files_api.s3.backends import S3Backend
+from files_api.s3.metadata_index import (
+    Cursor,
+    S3MetadataIndex,
+)
+from files_api.s3.read_objects import DEFAULT_MAX_KEYS
+from files_api.schemas import (
+    DEFAULT_GET_FILES_DIRECTORY,
+    DEFAULT_GET_FILES_MAX_PAGE_SIZE,
+    DEFAULT_GET_FILES_MIN_PAGE_SIZE,
+    DEFAULT_GET_FILES_PAGE_SIZE,
+    FileMetadata,
+    FileSortField,
+    GetArchiveQueryParams,
+    GetFilesQueryParams,
+    GetFilesResponse,
+    SortOrder,
+)
+from files_api.settings import Settings
+
+try:
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+except ImportError:
+    ...
+
+
+LISTING_ROUTER = APIRouter(tags=["Files"])
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+@LISTING_ROUTER.get(
+    "/v1/files",
+    responses={
+        status.HTTP_200_OK: {
+            "content": {
+                NDJSON_MEDIA_TYPE: {
+                    "schema": FileMetadata.model_json_schema(),
+                    "description": "With `Accept: application/x-ndjson`, every file, one JSON object per line.",
+                }
+            }
+        }
+    },
+)
+async def list_files(  # pylint: disable=too-many-locals
+    request: Request,
+    query_params: GetFilesQueryParams = Depends(),
+) -> GetFilesResponse:
+    """
+    List files with pagination.
+
+    With a `delimiter`, only the files directly in `directory` are listed, along with its sub-directories
+    under `directories`, so a deep tree can be browsed one level at a time. A directory counts towards
+    `page_size` like a file does.
+
+    With `LISTING_PREFETCH_MAX_ENTRIES` set, when a page has a `next_page_token`, the next page is
+    requested from S3 in the background right away, so a client that follows the token promptly gets
+    it from memory.
+
+    When the API keeps a metadata index of the bucket (`METADATA_INDEX_PATH`), listings are answered
+    from the index rather than S3, and files can also be sorted, filtered by extension and modification
+    time, and skipped with `offset`; the first page then reports the number and size of the matching files.
+
+    With `Accept: application/x-ndjson`, every file in `directory` (or from `page_token` on) is streamed
+    instead, one JSON object per line, and `page_size` is ignored. The server walks the pages of the
+    listing itself, requesting the next page from S3 while the current one is sent.
+
+    A `page_token` from an earlier release, which listed the whole bucket 10 files per page, is
+    also accepted and continues that listing.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    stream = NDJSON_MEDIA_TYPE in request.headers.get("Accept", "")
+    if query_params.page_token:
+        listing = _decode_page_token(query_params.page_token)
+    else:
+        listing = _Listing.from_query_params(query_params)
+    reject_content_addressed_paths(settings, listing.directory)
+    needs_index = listing.cursor is not None or query_params.needs_metadata_index()
+    if stream and (listing.delimiter or needs_index):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Streaming files as NDJSON does not support delimiter, sorting, filtering or offset",
+        )
+
+    index = s3_backend.metadata_index
+    use_index = (
+        index is not None
+        and index.is_built(settings.s3_bucket_name)
+        and not (stream or listing.delimiter or listing.continuation_token)
+    )
+    if needs_index and not use_index:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Sorting, filtering and offsets need the metadata index, which is not available",
+        )
+    if use_index:
+        return _list_files_from_index(index, settings.s3_bucket_name, listing)  # type: ignore[arg-type]
+
+    directories: Optional[List[str]] = None
+    max_keys = DEFAULT_MAX_KEYS if stream else listing.page_size
+    if listing.delimiter:
+        files, directories, next_page_token = await s3_backend.fetch_s3_objects_and_directories(
+            bucket_name=settings.s3_bucket_name,
+            prefix=listing.directory,
+            delimiter=listing.delimiter,
+            max_keys=max_keys,
+            continuation_token=listing.continuation_token,
+        )
+    elif listing.continuation_token:
+        try:
+            files, next_page_token = await s3_backend.fetch_s3_objects_using_page_token(
+                bucket_name=settings.s3_bucket_name,
+                continuation_token=listing.continuation_token,
+                max_keys=max_keys,
+                prefix=listing.directory,
+            )
+        except ClientError as err:
+            # S3 rejects continuation tokens it did not issue, e.g. a page_token that is neither ours nor legacy
+            if err.response["Error"]["Code"] != "InvalidArgument":
+                raise
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid page_token") from err
+    else:
+        files, next_page_token = await s3_backend.fetch_s3_objects_metadata(
+            bucket_name=settings.s3_bucket_name,
+            prefix=listing.directory,
+            max_keys=max_keys,
+        )
+
+    if stream:
+        pages = _iter_s3_object_pages(s3_backend, settings.s3_bucket_name, listing.directory, (files, next_page_token))
+        return StreamingResponse(  # type: ignore[return-value]
+            content=(
+                "".join(_to_file_metadata(item).model_dump_json() + "\n" for item in page) async for page in pages
+            ),
+            media_type=NDJSON_MEDIA_TYPE,
+        )
+
+    file_metadata_objs = [_to_file_metadata(item) for item in files]
+    return GetFilesResponse(
+        files=file_metadata_objs,
+        directories=directories,
+        next_page_token=(
+            _encode_page_token(listing.model_copy(update={"continuation_token": next_page_token}))
+            if next_page_token
+            else None
+        ),
+    )
+
+
+def _list_files_from_index(index: S3MetadataIndex, bucket_name: str, listing: "_Listing") -> GetFilesResponse:
+    filters: Dict[str, Any] = {
+        "prefix": listing.directory,
+        "extension": listing.extension,
+        "modified_after": listing.modified_after,
+        "modified_before": listing.modified_before,
+    }
+    files, next_cursor = index.query(
+        bucket_name,
+        sort_by=_INDEX_SORT_COLUMNS[listing.sort_by],
+        descending=listing.order == SortOrder.DESC,
+        limit=listing.page_size,
+        offset=listing.offset,
+        after=listing.cursor,
+        **filters,
+    )
+    total_count = total_size_bytes = None
+    if listing.cursor is None:
+        total_count, total_size_bytes = index.count(bucket_name, **filters)
+    return GetFilesResponse(
+        files=[_to_file_metadata(item) for item in files],
+        next_page_token=(
+            _encode_page_token(listing.model_copy(update={"cursor": next_cursor, "offset": 0}))
+            if next_cursor
+            else None
+        ),
+        total_count=total_count,
+        total_size_bytes=total_size_bytes,
+    )
+
+
+_INDEX_SORT_COLUMNS = {
+    FileSortField.FILE_PATH: "object_key",
+    FileSortField.SIZE_BYTES: "size_bytes",
+    FileSortField.LAST_MODIFIED: "last_modified",
+}
+
+
+class _Listing(BaseModel):
+    """Where a listing is up to, and what it lists; this is what page tokens carry."""
+
+    # the S3 continuation token of a listing from S3, or the cursor of a listing from the metadata index
+    continuation_token: Optional[str] = None
+    cursor: Optional[Cursor] = None
+    directory: str
+    delimiter: Optional[str] = None
+    page_size: int = Field(ge=DEFAULT_GET_FILES_MIN_PAGE_SIZE, le=DEFAULT_GET_FILES_MAX_PAGE_SIZE)
+    sort_by: FileSortField = FileSortField.FILE_PATH
+    order: SortOrder = SortOrder.ASC
+    extension: Optional[str] = None
+    modified_after: Optional[datetime] = None
+    modified_before: Optional[datetime] = None
+    offset: int = Field(0, ge=0)
+
+    @classmethod
+    def from_query_params(cls, query_params: GetFilesQueryParams) -> "_Listing":
+        return cls(
+            directory=query_params.directory or DEFAULT_GET_FILES_DIRECTORY,
+            delimiter=query_params.delimiter,
+            page_size=query_params.page_size or DEFAULT_GET_FILES_PAGE_SIZE,
+            sort_by=query_params.sort_by or FileSortField.FILE_PATH,
+            order=query_params.order or SortOrder.ASC,
+            extension=query_params.extension,
+            modified_after=query_params.modified_after,
+            modified_before=query_params.modified_before,
+            offset=query_params.offset or 0,
+        )
+
+
+def _encode_page_token(listing: _Listing) -> str:
+    # S3 needs the prefix and delimiter of the listing with every continuation token, so the
+    # token handed to clients carries them, along with the page size and filters, to the next request
+    return base64.urlsafe_b64encode(listing.model_dump_json(exclude_defaults=True).encode()).decode()
+
+
+def _decode_page_token(page_token: str) -> _Listing:
+    try:
+        decoded = base64.urlsafe_b64decode(page_token)
+    except ValueError:
+        decoded = b""
+    if not decoded.startswith(b"{"):
+        # earlier releases handed out the raw S3 continuation token of a listing of the whole bucket;
+        # those are still accepted so clients paging across the upgrade keep working
+        return _Listing(
+            continuation_token=page_token,
+            directory=DEFAULT_GET_FILES_DIRECTORY,
+            page_size=DEFAULT_GET_FILES_PAGE_SIZE,
+            offset=0,
+        )
+    try:
+        return _Listing.model_validate_json(decoded)
+    # pydantic's ValidationError is a ValueError
+    except ValueError as err:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail="Invalid page_token") from err
+
+
+def _to_file_metadata(item: "ObjectTypeDef") -> FileMetadata:
+    return FileMetadata(
+        file_path=f"{item['Key']}",
+        last_modified=item["LastModified"],
+        size_bytes=item["Size"],
+    )
+
+
+@LISTING_ROUTER.get(
+    "/v1/archive",
+    response_class=StreamingResponse,
+    responses={
+        status.HTTP_200_OK: {
+            "description": "The archive, streamed as it is built.",
+            "content": {"application/zip": {}, "application/x-tar": {}, "application/gzip": {}},
+        },
+        status.HTTP_404_NOT_FOUND: {"description": "No files found in the given `directory`."},
+    },
+)
+async def download_archive(
+    request: Request,
+    query_params: Annotated[GetArchiveQueryParams, Depends()],
+) -> StreamingResponse:
+    """
+    Download every file in a directory as one ZIP or TAR archive.
+
+    The archive is built while it is sent: the files are listed page by page, and the next files are
+    requested from S3 while the current one is written, so memory use does not grow with the size
+    of the directory. File paths in the archive are relative to `directory`.
+    """
+    settings: Settings = request.app.state.settings
+    s3_backend: S3Backend = request.app.state.s3_backend
+    reject_content_addressed_paths(settings, query_params.directory)
+    prefix = get_directory_prefix(query_params.directory)
+
+    # the first page is listed up front, so that an empty directory is reported as a 404 rather than an empty archive
+    first_page = await s3_backend.fetch_s3_objects_metadata(
+        bucket_name=settings.s3_bucket_name, prefix=prefix, max_keys=DEFAULT_MAX_KEYS
+    )
+    if not first_page[0]:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No files found")
+
+    entries = _iter_archive_entries(
+        s3_backend,
+        settings.s3_bucket_name,
+        prefix,
+        _iter_s3_objects(s3_backend, settings.s3_bucket_name, prefix, first_page),
+        prefetch_count=settings.archive_prefetch_count,
+    )
+    archive_name = (query_params.directory.strip("/").rsplit("/", 1)[-1] or "files") + get_archive_file_extension(
+        query_params.format, query_params.compression
+    )
+    return StreamingResponse(
+        content=stream_archive(entries, query_params.format, query_params.compression),
+        media_type=get_archive_media_type(query_params.format, query_params.compression),
+        headers={"Content-Disposition": f'attachment; filename="{archive_name}"'},
+    )
+
+
+async def _iter_s3_object_pages(
+    s3_backend: S3Backend, bucket_name: str, prefix: str, first_page: tuple[list["ObjectTypeDef"], Optional[str]]
+) -> AsyncIterator[list["ObjectTypeDef"]]:
+    """
+    Yield the pages of a listing, starting at `first_page`.
+
+    The next page is requested as soon as the previous one arrives, so it is being listed while the
+    caller works through the current page, and at most two pages are held at a time.
+    """
+    s3_objects, next_page_token = first_page
+    next_page: Optional[asyncio.Future] = None
+    try:
+        while True:
+            if next_page_token:
+                next_page = asyncio.ensure_future(
+                    s3_backend.fetch_s3_objects_using_page_token(
+                        bucket_name, next_page_token, max_keys=DEFAULT_MAX_KEYS, prefix=prefix
+                    )
+                )
+            yield s3_objects
+            if next_page is None:
+                return
+            s3_objects, next_page_token = await next_page
+            next_page = None
+    finally:
+        if next_page is not None:
+            next_page.cancel()
+
+
+async def _iter_s3_objects(
+    s3_backend: S3Backend, bucket_name: str, prefix: str, first_page: tuple[list["ObjectTypeDef"], Optional[str]]
+) -> AsyncIterator["ObjectTypeDef"]:
+    """Yield the objects of a listing, starting at `first_page`; see `_iter_s3_object_pages`."""
+    async for s3_objects in _iter_s3_object_pages(s3_backend, bucket_name, prefix, first_page):
+        for s3_object in s3_objects:
+            yield s3_object
+
+
+async def _iter_archive_entries(
+    s3_backend: S3Backend,
+    bucket_name: str,
+    prefix: str,
+    s3_objects: AsyncIterator["ObjectTypeDef"],
+    prefetch_count: int,
+) -> AsyncIterator[ArchiveEntry]:
+    """Yield an archive entry per object, with up to `prefetch_count` objects already requested from S3."""
+    pending_fetches: Deque[tuple[str, asyncio.Future]] = deque()
+
+    async def fetch_next_objects() -> None:
+        while len(pending_fetches) < prefetch_count:
+            s3_object = await anext(s3_objects, None)
+            if s3_object is None:
+                return
+            object_key = s3_object["Key"]
+            if object_key != prefix:  # a placeholder object for the directory itself
+                pending_fetches.append(
+                    (object_key, asyncio.ensure_future(s3_backend.fetch_s3_object(bucket_name, object_key)))
+                )
+
+    try:
+        await fetch_next_objects()
+        while pending_fetches:
+            object_key, fetch = pending_fetches.popleft()
+            await fetch_next_objects()
+            try:
+                get_object_response = await fetch
+            except ClientError as err:
+                if is_not_found_error(err):  # deleted since it was listed
+                    continue
+                raise
+            yield ArchiveEntry(
+                name=object_key.removeprefix(prefix),
+                size_bytes=get_object_response["ContentLength"],
+                last_modified=get_object_response["LastModified"],
+                content=get_object_response["Body"],
+            )
+    finally:
+        for _, fetch in pending_fetches:
+            fetch.cancel()
@@ -0,0 +1,57 @@
+"""Route that reports in-process performance metrics."""
+
+from fastapi import (
+    APIRouter,
+    Request,
+)
+
+from files_api.s3.backends import S3Backend
+from files_api.schemas import (
+    GetMetricsResponse,
+    ListingPrefetchMetrics,
+    MetadataIndexMetrics,
+    ReconcileMetrics,
+    S3MetadataCacheMetrics,
+)
+
+METRICS_ROUTER = APIRouter(tags=["Metrics"])
+
+
+@METRICS_ROUTER.get("/v1/metrics")
+async def get_metrics(request: Request) -> GetMetricsResponse:
+    """Report in-process performance metrics of this API instance."""
+    s3_backend: S3Backend = request.app.state.s3_backend
+    metadata_index = None
+    if s3_backend.metadata_index is not None:
+        report = s3_backend.last_reconcile_report
+        metadata_index = MetadataIndexMetrics(
+            **s3_backend.metadata_index.stats(),
+            last_reconcile=(
+                ReconcileMetrics(
+                    shard_count=len(report.shards),
+                    listed_keys=report.listed_keys,
+                    written_keys=report.written_keys,
+                    deleted_keys=report.deleted_keys,
+                    duration_seconds=report.duration_seconds,
+                    keys_per_second=report.keys_per_second,
+                    shard_skew=report.shard_skew,
+                )
+                if report is not None
+                else None
+            ),
+        )
+    return GetMetricsResponse(
+        s3_executor=request.app.state.s3_executor.stats(),
+        s3_metadata_cache=(
+            S3MetadataCacheMetrics.model_validate(s3_backend.metadata_cache.stats())
+            if s3_backend.metadata_cache is not None
+            else None
+        ),
+        listing_prefetch=(
+            ListingPrefetchMetrics(**s3_backend.listing_prefetcher.stats())
+            if s3_backend.listing_prefetcher is not None
+            else None
+        ),
+        metadata_index=metadata_index,
+        disk_cache=request.app.state.disk_cache.stats() if request.app.state.disk_cache is not None else None,
+    )
@@ -0,0 +1,54 @@
+"""
+Create aiobotocore S3 clients for the asyncio S3 backend.
+
+Unlike boto3 clients, aiobotocore clients are bound to the event loop they were created on,
+so they are owned by the app's lifespan instead of a process-wide registry.
+"""
+
+from aiobotocore.config import AioConfig
+from aiobotocore.session import (
+    ClientCreatorContext,
+    get_session,
+)
+
+from files_api.s3.clients import (
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    DEFAULT_MAX_RETRY_ATTEMPTS,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_TCP_KEEPALIVE,
+    create_client_config,
+)
+
+
+def create_async_s3_client(
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+    tcp_keepalive: bool = DEFAULT_TCP_KEEPALIVE,
+    connect_timeout_seconds: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    read_timeout_seconds: float = DEFAULT_READ_TIMEOUT_SECONDS,
+    max_retry_attempts: int = DEFAULT_MAX_RETRY_ATTEMPTS,
+) -> ClientCreatorContext:
+    """
+    Create an async context manager that opens (and later closes) an aiobotocore S3 client.
+
+    Usage:
+        async with create_async_s3_client() as s3_client:
+            await s3_client.head_object(Bucket="some-bucket", Key="some/key.txt")
+
+    :param max_pool_connections: Maximum number of HTTP connections kept open in the client's pool.
+    :param tcp_keepalive: Whether to enable TCP keep-alive on pooled connections.
+    :param connect_timeout_seconds: Seconds to wait when establishing a connection.
+    :param read_timeout_seconds: Seconds to wait for data from an established connection.
+    :param max_retry_attempts: Maximum number of retries for throttled or failed requests.
+
+    :return: Async context manager yielding the S3 client.
+    """
+    config = create_client_config(
+        AioConfig,
+        max_pool_connections,
+        tcp_keepalive,
+        connect_timeout_seconds,
+        read_timeout_seconds,
+        max_retry_attempts,
+    )
+    return get_session().create_client("s3", config=config)
@@ -0,0 +1,17 @@
+"""Async functions for deleting objects from an S3 bucket--the "D" in CRUD."""
+
+try:
+    from types_aiobotocore_s3 import S3Client
+except ImportError:
+    ...
+
+
+async def delete_s3_object(bucket_name: str, object_key: str, *, s3_client: "S3Client") -> None:
+    """
+    Delete an object from the S3 bucket.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Key of the object to delete.
+    :param s3_client: aiobotocore S3 client to use.
+    """
+    await s3_client.delete_object(Bucket=bucket_name, Key=object_key)
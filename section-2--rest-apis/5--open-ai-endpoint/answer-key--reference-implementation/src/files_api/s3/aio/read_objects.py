@@ -0,0 +1,224 @@
+"""Async functions for reading objects from an S3 bucket--the "R" in CRUD."""
+
+from datetime import datetime
+from typing import (
+    AsyncIterator,
+    Optional,
+    TypedDict,
+    cast,
+)
+
+from botocore.exceptions import ClientError
+
+from files_api.s3.read_objects import (
+    DEFAULT_MAX_KEYS,
+    get_conditional_request_kwargs,
+    get_list_objects_request_kwargs,
+    get_object_request_kwargs,
+    parse_list_objects_response,
+)
+
+try:
+    from types_aiobotocore_s3 import S3Client
+    from types_aiobotocore_s3.type_defs import (
+        HeadObjectOutputTypeDef,
+        ObjectTypeDef,
+    )
+except ImportError:
+    ...
+
+DEFAULT_CHUNK_SIZE_BYTES = 64 * 1024
+
+
+class GetObjectResponse(TypedDict, total=False):
+    """The part of a `get_object` response the API uses, with the `Body` as an async iterator of byte chunks."""
+
+    Body: AsyncIterator[bytes]
+    ContentLength: int
+    ContentRange: str
+    ContentType: str
+    ETag: str
+    LastModified: datetime
+
+
+async def object_exists_in_s3(bucket_name: str, object_key: str, *, s3_client: "S3Client") -> bool:
+    """
+    Check if an object exists in the S3 bucket using head_object.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Key of the object to check.
+    :param s3_client: aiobotocore S3 client to use.
+
+    :return: True if the object exists, False otherwise.
+    """
+    try:
+        await s3_client.head_object(Bucket=bucket_name, Key=object_key)
+        return True
+    # aiobotocore raises botocore's own `ClientError`
+    except ClientError as err:
+        error_code = err.response["Error"]["Code"]
+        if error_code == "404":
+            return False
+        raise
+
+
+async def head_s3_object(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[datetime] = None,
+    *,
+    s3_client: "S3Client",
+) -> "HeadObjectOutputTypeDef":
+    """
+    Fetch metadata of an object in the S3 bucket, without its content.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Key of the object to fetch.
+    :param if_none_match: Optional ETag or "*"; the request fails with a "304" error if the object has it.
+    :param if_modified_since: Optional time; the request fails with a "304" error if the object is not newer.
+    :param s3_client: aiobotocore S3 client to use.
+
+    :return: Metadata of the object.
+    """
+    kwargs = get_conditional_request_kwargs(if_none_match=if_none_match, if_modified_since=if_modified_since)
+    return await s3_client.head_object(Bucket=bucket_name, Key=object_key, **kwargs)
+
+
+async def fetch_s3_object(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    byte_range: Optional[str] = None,
+    if_match: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[datetime] = None,
+    *,
+    s3_client: "S3Client",
+) -> GetObjectResponse:
+    """
+    Fetch an object in the S3 bucket.
+
+    The `Body` of the response is replaced with an async iterator of byte chunks
+    which closes the underlying connection once it is exhausted.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Key of the object to fetch.
+    :param byte_range: Optional HTTP range, e.g. "bytes=0-99", to fetch only part of the object.
+    :param if_match: Optional ETag; the request fails with `PreconditionFailed` if the object no longer has it.
+    :param if_none_match: Optional ETag or "*"; the request fails with a "304" error if the object has it.
+    :param if_modified_since: Optional time; the request fails with a "304" error if the object is not newer.
+    :param s3_client: aiobotocore S3 client to use.
+
+    :return: Metadata of the object, and its content as an async iterator.
+    """
+    request_kwargs = get_object_request_kwargs(byte_range, if_match, if_none_match, if_modified_since)
+    response = await s3_client.get_object(Bucket=bucket_name, Key=object_key, **request_kwargs)
+    return cast(GetObjectResponse, {**response, "Body": iter_body_chunks(response["Body"])})
+
+
+async def fetch_s3_object_range(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    first_byte: int,
+    last_byte: int,
+    if_match: Optional[str] = None,
+    *,
+    s3_client: "S3Client",
+) -> bytes:
+    """
+    Fetch and read a byte range of an object in the S3 bucket.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Key of the object to fetch.
+    :param first_byte: Offset of the first byte to fetch.
+    :param last_byte: Offset of the last byte to fetch, inclusive.
+    :param if_match: Optional ETag; the request fails with `PreconditionFailed` if the object no longer has it.
+    :param s3_client: aiobotocore S3 client to use.
+
+    :return: Content of the byte range.
+    """
+    request_kwargs = get_object_request_kwargs(byte_range=f"bytes={first_byte}-{last_byte}", if_match=if_match)
+    response = await s3_client.get_object(Bucket=bucket_name, Key=object_key, **request_kwargs)
+    async with response["Body"] as body:
+        return await body.read()
+
+
+async def iter_body_chunks(body, chunk_size: int = DEFAULT_CHUNK_SIZE_BYTES) -> AsyncIterator[bytes]:
+    """Yield the chunks of an aiobotocore `StreamingBody`, closing it when done."""
+    async with body:
+        async for chunk in body.iter_chunks(chunk_size):
+            yield chunk
+
+
+async def fetch_s3_objects_using_page_token(
+    bucket_name: str,
+    continuation_token: str,
+    max_keys: int | None = None,
+    prefix: Optional[str] = None,
+    *,
+    s3_client: "S3Client",
+) -> tuple[list["ObjectTypeDef"], Optional[str]]:
+    """
+    Fetch list of object keys and their metadata using a continuation token.
+
+    :param bucket_name: Name of the S3 bucket to list objects from.
+    :param continuation_token: Token for fetching the next page of results where the last page left off.
+    :param max_keys: Maximum number of keys to return within this page.
+    :param prefix: Prefix the listing was started with; S3 expects it again with every continuation token.
+    :param s3_client: aiobotocore S3 client to use.
+
+    :return: Tuple of a list of objects and the next continuation token.
+    """
+    request_kwargs = get_list_objects_request_kwargs(prefix, max_keys, continuation_token=continuation_token)
+    response = await s3_client.list_objects_v2(Bucket=bucket_name, **request_kwargs)
+    files, _, next_continuation_token = parse_list_objects_response(response)
+    return files, next_continuation_token
+
+
+async def fetch_s3_objects_metadata(
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+    *,
+    s3_client: "S3Client",
+) -> tuple[list["ObjectTypeDef"], Optional[str]]:
+    """
+    Fetch list of object keys and their metadata.
+
+    :param bucket_name: Name of the S3 bucket to list objects from.
+    :param prefix: Prefix to filter objects by.
+    :param max_keys: Maximum number of keys to return within this page.
+    :param s3_client: aiobotocore S3 client to use.
+
+    :return: Tuple of a list of objects and the next continuation token.
+    """
+    request_kwargs = get_list_objects_request_kwargs(prefix, max_keys)
+    response = await s3_client.list_objects_v2(Bucket=bucket_name, **request_kwargs)
+    files, _, next_page_token = parse_list_objects_response(response)
+    return files, next_page_token
+
+
+async def fetch_s3_objects_and_directories(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    delimiter: str = "/",
+    max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+    continuation_token: Optional[str] = None,
+    *,
+    s3_client: "S3Client",
+) -> tuple[list["ObjectTypeDef"], list[str], Optional[str]]:
+    """
+    Fetch one level of the key hierarchy under `prefix`: its objects and its "directories".
+
+    :param bucket_name: Name of the S3 bucket to list objects from.
+    :param prefix: Prefix to filter objects by, e.g. "path/to/".
+    :param delimiter: Separator of the levels of the hierarchy.
+    :param max_keys: Maximum number of objects and directories, together, to return within this page.
+    :param continuation_token: Token of the page to fetch, as returned for the previous page.
+    :param s3_client: aiobotocore S3 client to use.
+
+    :return: Same as `files_api.s3.read_objects.fetch_s3_objects_and_directories`.
+    """
+    request_kwargs = get_list_objects_request_kwargs(prefix, max_keys, delimiter, continuation_token)
+    response = await s3_client.list_objects_v2(Bucket=bucket_name, **request_kwargs)
+    return parse_list_objects_response(response)
@@ -0,0 +1,34 @@
+"""Async functions for writing objects to an S3 bucket--the "C" and "U" in CRUD."""
+
+from typing import Optional
+
+try:
+    from types_aiobotocore_s3 import S3Client
+except ImportError:
+    ...
+
+
+async def upload_s3_object(
+    bucket_name: str,
+    object_key: str,
+    file_content: bytes,
+    content_type: Optional[str] = None,
+    *,
+    s3_client: "S3Client",
+) -> None:
+    """
+    Upload a file to an S3 bucket.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param file_content: The content of the file to upload.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param s3_client: aiobotocore S3 client to use.
+    """
+    content_type = content_type or "application/octet-stream"
+    await s3_client.put_object(
+        Bucket=bucket_name,
+        Key=object_key,
+        Body=file_content,
+        ContentType=content_type,
+    )
@@ -0,0 +1,466 @@
+"""
+Decorators that add the optional features of the S3 backends in `files_api.s3.backends` to their operations.
+
+Each decorator wraps an operation of a backend with the lookups and invalidations of one feature:
+the `S3MetadataCache` and its content cache, the `S3ListingPrefetcher`, the `S3MetadataIndex`, and the
+pointers of content-addressed storage. A decorator passes calls straight through when the backend
+does not have its feature, so every backend operation can be decorated with all the features it needs.
+"""
+
+import contextlib
+import functools
+import inspect
+from contextvars import ContextVar
+from datetime import datetime
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterator,
+    Optional,
+    cast,
+)
+
+from botocore.exceptions import ClientError
+
+from files_api.byte_ranges import (
+    format_content_range,
+    parse_range_header,
+    resolve_byte_ranges,
+)
+from files_api.conditional_requests import format_http_date
+from files_api.s3.content_addressed import (
+    get_content_key,
+    get_pointer_digest,
+    is_content_addressed_key,
+    resolve_listed_pointers,
+)
+from files_api.s3.metadata_cache import (
+    NOT_FOUND,
+    ObjectContent,
+)
+from files_api.s3.read_objects import DEFAULT_CHUNK_SIZE_BYTES
+
+if TYPE_CHECKING:
+    from files_api.s3.backends import Boto3S3Backend
+
+# set in the tasks that prefetch a page, so that the page they fetch does not itself prefetch the next one
+_prefetching: ContextVar[bool] = ContextVar("_prefetching", default=False)
+# set while a backend looks up an object as it is stored, so that a pointer is not resolved to its content
+_resolving_pointer: ContextVar[bool] = ContextVar("_resolving_pointer", default=False)
+
+
+@contextlib.contextmanager
+def reading_stored_objects() -> Iterator[None]:
+    """Within this context, read objects as they are stored: a pointer is not resolved to its content."""
+    token = _resolving_pointer.set(True)
+    try:
+        yield
+    finally:
+        _resolving_pointer.reset(token)
+
+
+def _not_found_error(operation_name: str) -> ClientError:
+    """Build the error S3 raises for a missing object, to raise it for an object cached as missing."""
+    code = "404" if operation_name == "HeadObject" else "NoSuchKey"
+    return ClientError({"Error": {"Code": code, "Message": "Not Found"}}, operation_name)
+
+
+def _not_modified_error(operation_name: str, etag: str, last_modified: datetime) -> ClientError:
+    """Build the error S3 raises for a precondition that spared sending an object, with the validators S3 returns."""
+    return ClientError(
+        {
+            "Error": {"Code": "304", "Message": "Not Modified"},
+            "ResponseMetadata": {
+                "RequestId": "",
+                "HostId": "",
+                "HTTPStatusCode": 304,
+                "HTTPHeaders": {"etag": etag, "last-modified": format_http_date(last_modified)},
+                "RetryAttempts": 0,
+            },
+        },
+        operation_name,
+    )
+
+
+def cache_object_exists(method: Callable) -> Callable:
+    """Answer `object_exists_in_s3` from the metadata cache, caching objects found missing."""
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str) -> bool:
+        cache = self.metadata_cache
+        if cache is None:
+            return await method(self, bucket_name, object_key)
+        metadata = cache.get_object_metadata(bucket_name, object_key)
+        if metadata is not None:
+            return metadata is not NOT_FOUND
+        generation = cache.generation
+        exists = await method(self, bucket_name, object_key)
+        if not exists:
+            cache.set_object_not_found(bucket_name, object_key, generation)
+        return exists
+
+    return wrapper
+
+
+def cache_head_object(method: Callable) -> Callable:
+    """Answer unconditional `head_s3_object` calls from the metadata cache."""
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str, *args: Any, **kwargs: Any) -> Any:
+        cache = self.metadata_cache
+        if cache is None or any(args) or any(kwargs.values()):
+            # the preconditions of a conditional HEAD are evaluated by S3
+            return await method(self, bucket_name, object_key, *args, **kwargs)
+        metadata = cache.get_object_metadata(bucket_name, object_key)
+        if metadata is NOT_FOUND:
+            raise _not_found_error("HeadObject")
+        if isinstance(metadata, dict):
+            return dict(metadata)
+        generation = cache.generation
+        try:
+            response = await method(self, bucket_name, object_key)
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "404":
+                cache.set_object_not_found(bucket_name, object_key, generation)
+            raise
+        cache.set_object_metadata(bucket_name, object_key, response, generation)
+        return response
+
+    return wrapper
+
+
+def cache_fetch_object(method: Callable) -> Callable:
+    """
+    Fail `fetch_s3_object` calls for objects cached as missing without calling S3.
+
+    Whole, unconditional GETs also cache the object's metadata. The content is cached by `cache_object_content`.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str, *args: Any, **kwargs: Any) -> Any:
+        cache = self.metadata_cache
+        if cache is None:
+            return await method(self, bucket_name, object_key, *args, **kwargs)
+        if cache.is_object_not_found(bucket_name, object_key):
+            raise _not_found_error("GetObject")
+        generation = cache.generation
+        try:
+            response = await method(self, bucket_name, object_key, *args, **kwargs)
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "NoSuchKey":
+                cache.set_object_not_found(bucket_name, object_key, generation)
+            raise
+        if not any(args) and not any(kwargs.values()):
+            cache.set_object_metadata(bucket_name, object_key, response, generation)
+        return response
+
+    return wrapper
+
+
+# the `fetch_s3_object` arguments that a response from the content cache honours
+_GET_CONDITIONS = ("byte_range", "if_match", "if_none_match", "if_modified_since")
+
+
+def cache_object_content(method: Callable) -> Callable:
+    """
+    Answer `fetch_s3_object` calls from the content cache, and cache the content of whole small objects fetched.
+
+    The preconditions and byte range of a call answered from the cache are evaluated here, as S3 would:
+    a single satisfiable range is served from the cached content, an unsatisfiable one fails with
+    `InvalidRange`, and a malformed or multiple range gets the whole object. A fetched object is only
+    cached once its whole body was read, so a download cut short caches nothing.
+    """
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str, *args: Any, **kwargs: Any) -> Any:
+        cache = self.metadata_cache
+        if cache is None or cache.contents is None:
+            return await method(self, bucket_name, object_key, *args, **kwargs)
+        arguments = signature.bind(self, bucket_name, object_key, *args, **kwargs).arguments
+        content = cache.get_object_content(bucket_name, object_key)
+        if content is not None:
+            return _respond_from_cached_content(content, **{name: arguments.get(name) for name in _GET_CONDITIONS})
+
+        generation = cache.generation
+        response = await method(self, bucket_name, object_key, *args, **kwargs)
+        size_bytes = response["ContentLength"]
+        content_range = response.get("ContentRange")
+        if size_bytes <= cache.content_max_object_size_bytes and (
+            content_range is None or content_range == format_content_range(0, size_bytes - 1, size_bytes)
+        ):
+
+            def cache_content(body: bytes) -> None:
+                cache.set_object_content(bucket_name, object_key, response, body, generation)
+
+            response["Body"] = _collect_body(response["Body"], cache_content)
+        return response
+
+    return wrapper
+
+
+def _respond_from_cached_content(  # pylint: disable=too-many-arguments
+    content: ObjectContent,
+    byte_range: Optional[str],
+    if_match: Optional[str],
+    if_none_match: Optional[str],
+    if_modified_since: Optional[datetime],
+) -> Dict[str, Any]:
+    """Build the `fetch_s3_object` response S3 would return for an object with the cached content."""
+    metadata = content.metadata
+    if if_match is not None and if_match not in ("*", metadata["ETag"]):
+        raise ClientError({"Error": {"Code": "PreconditionFailed", "Message": "Precondition Failed"}}, "GetObject")
+    if if_none_match is not None:
+        if if_none_match in ("*", metadata["ETag"]):
+            raise _not_modified_error("GetObject", metadata["ETag"], metadata["LastModified"])
+    elif if_modified_since is not None and metadata["LastModified"] <= if_modified_since:
+        raise _not_modified_error("GetObject", metadata["ETag"], metadata["LastModified"])
+
+    response = dict(metadata)
+    body = content.body
+    specs = parse_range_header(byte_range) if byte_range else None
+    if specs is not None and len(specs) == 1:
+        byte_ranges = resolve_byte_ranges(specs, len(body))
+        if not byte_ranges:
+            # S3 adds the object size to `InvalidRange` errors, which botocore's error shape does not declare
+            raise ClientError(
+                cast(
+                    Any,
+                    {
+                        "Error": {
+                            "Code": "InvalidRange",
+                            "Message": "The requested range is not satisfiable",
+                            "ActualObjectSize": str(len(body)),
+                        }
+                    },
+                ),
+                "GetObject",
+            )
+        first_byte, last_byte = byte_ranges[0]
+        response["ContentRange"] = format_content_range(first_byte, last_byte, len(body))
+        end = last_byte + 1
+        body = body[first_byte:end]
+        response["ContentLength"] = len(body)
+    response["Body"] = _iter_memoryview_chunks(body)
+    return response
+
+
+async def _iter_memoryview_chunks(
+    body: memoryview, chunk_size: int = DEFAULT_CHUNK_SIZE_BYTES
+) -> AsyncIterator[memoryview]:
+    """Yield a cached content in slices, which share its memory rather than copying it."""
+    for start in range(0, len(body), chunk_size):
+        end = start + chunk_size
+        yield body[start:end]
+
+
+async def _collect_body(body: AsyncIterator[bytes], on_complete: Callable[[bytes], None]) -> AsyncIterator[bytes]:
+    """Yield the chunks of a body, and pass all of its bytes to `on_complete` once the last one was read."""
+    chunks = []
+    try:
+        async for chunk in body:
+            chunks.append(chunk)
+            yield chunk
+        on_complete(b"".join(chunks))
+    finally:
+        aclose = getattr(body, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+def cache_listing(method: Callable) -> Callable:
+    """Answer a listing call from the metadata cache, keyed by the method and its arguments."""
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, *args: Any, **kwargs: Any) -> Any:
+        cache = self.metadata_cache
+        if cache is None:
+            return await method(self, bucket_name, *args, **kwargs)
+        query = (method.__name__, args, tuple(sorted(kwargs.items())))
+        page = cache.get_listing(bucket_name, query)
+        if page is None:
+            generation = cache.generation
+            page = await method(self, bucket_name, *args, **kwargs)
+            cache.set_listing(bucket_name, query, page, generation)
+        # a copy of each list, so that callers cannot change the cached page
+        return tuple(list(item) if isinstance(item, list) else item for item in page)
+
+    return wrapper
+
+
+def prefetch_next_page(next_page_method_name: str) -> Callable[[Callable], Callable]:
+    """
+    Answer a listing call with the page prefetched for its continuation token, and prefetch the page after it.
+
+    The next page is fetched with the backend's `next_page_method_name` method, with the same arguments
+    as the decorated call apart from the continuation token.
+    """
+
+    def decorator(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        async def wrapper(self: "Boto3S3Backend", *args: Any, **kwargs: Any) -> Any:
+            prefetcher = self.listing_prefetcher
+            if prefetcher is None or _prefetching.get():
+                return await method(self, *args, **kwargs)
+            arguments = signature.bind(self, *args, **kwargs)
+            arguments.apply_defaults()
+            query = dict(arguments.arguments)
+            del query["self"]
+            bucket_name = query.pop("bucket_name")
+            continuation_token = query.pop("continuation_token", None)
+            query_key = (next_page_method_name, tuple(sorted(query.items())))
+
+            page = None
+            prefetched = prefetcher.take(bucket_name, continuation_token, query_key) if continuation_token else None
+            if prefetched is not None:
+                try:
+                    page = await prefetched
+                except ClientError:
+                    # fetched again below, in case the error was transient
+                    page = None
+            if page is None:
+                page = await method(self, *args, **kwargs)
+
+            next_continuation_token = page[-1]
+            if next_continuation_token:
+
+                async def fetch_next_page() -> Any:
+                    _prefetching.set(True)
+                    next_page_method = getattr(self, next_page_method_name)
+                    return await next_page_method(bucket_name, continuation_token=next_continuation_token, **query)
+
+                prefetcher.prefetch(bucket_name, next_continuation_token, query_key, fetch_next_page)
+            return page
+
+        return wrapper
+
+    return decorator
+
+
+def resolve_content_pointer(method: Callable) -> Callable:
+    """
+    Read the content a pointer points to in place of the pointer, on a backend that deduplicates uploads.
+
+    The pointer is looked up with an unconditional, and thus cacheable, HEAD. The content is then read
+    with the same arguments, and reported with the pointer's modification time and content type. A
+    content can be older than the files pointing to it, so `if_modified_since` is evaluated here,
+    against the pointer, rather than by S3.
+    """
+    signature = inspect.signature(method)
+    operation_name = "HeadObject" if method.__name__ == "head_s3_object" else "GetObject"
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str, *args: Any, **kwargs: Any) -> Any:
+        if not self.deduplicate_uploads or _resolving_pointer.get() or is_content_addressed_key(object_key):
+            return await method(self, bucket_name, object_key, *args, **kwargs)
+        pointer = await self.head_stored_object(bucket_name, object_key)
+        digest = get_pointer_digest(pointer)
+        if digest is None:
+            return await method(self, bucket_name, object_key, *args, **kwargs)
+
+        content_key = get_content_key(digest)
+        arguments = signature.bind(self, bucket_name, content_key, *args, **kwargs)
+        if_modified_since = arguments.arguments.pop("if_modified_since", None)
+        if if_modified_since is not None and pointer["LastModified"] <= if_modified_since:
+            content = await self.head_s3_object(bucket_name, content_key)
+            raise _not_modified_error(operation_name, content["ETag"], pointer["LastModified"])
+        response = await method(*arguments.args, **arguments.kwargs)
+        if isinstance(response, dict):
+            response.update(LastModified=pointer["LastModified"], ContentType=pointer["ContentType"])
+        return response
+
+    return wrapper
+
+
+def resolve_pointers_in_listing(method: Callable) -> Callable:
+    """
+    Leave the content-addressed storage out of a listing page, and report pointers with their content's size.
+
+    A page can thus hold fewer entries than requested, and even none, while a next page follows.
+    """
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, *args: Any, **kwargs: Any) -> Any:
+        page = await method(self, bucket_name, *args, **kwargs)
+        if not self.deduplicate_uploads:
+            return page
+        s3_objects, *rest = page
+        s3_objects = await self.executor.run(
+            resolve_listed_pointers, bucket_name, s3_objects, s3_client=self.s3_client
+        )
+        if len(rest) == 2:
+            directories, next_continuation_token = rest
+            directories = [directory for directory in directories if not is_content_addressed_key(directory)]
+            return s3_objects, directories, next_continuation_token
+        return s3_objects, *rest
+
+    return wrapper
+
+
+def release_content_reference(method: Callable) -> Callable:
+    """Release the reference a deleted pointer held to its content, which is deleted along with its last reference."""
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str, *args: Any, **kwargs: Any) -> Any:
+        if not self.deduplicate_uploads or is_content_addressed_key(object_key):
+            return await method(self, bucket_name, object_key, *args, **kwargs)
+        try:
+            digest = get_pointer_digest(await self.head_stored_object(bucket_name, object_key))
+        except ClientError as err:
+            if err.response["Error"]["Code"] != "404":
+                raise
+            digest = None
+        result = await method(self, bucket_name, object_key, *args, **kwargs)
+        if digest is not None:
+            await self.release_content_references(bucket_name, {object_key: digest})
+        return result
+
+    return wrapper
+
+
+def invalidate_cached_object(method: Callable) -> Callable:
+    """Invalidate what the metadata cache holds about an object once it has been written or deleted."""
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str, *args: Any, **kwargs: Any) -> Any:
+        try:
+            return await method(self, bucket_name, object_key, *args, **kwargs)
+        finally:
+            # also after a failure, which may have happened after S3 applied the change
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate(bucket_name, object_key)
+            if self.listing_prefetcher is not None:
+                self.listing_prefetcher.invalidate(bucket_name)
+
+    return wrapper
+
+
+def index_written_object(method: Callable) -> Callable:
+    """Record an object's new size and modification time in the metadata index once it has been written."""
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str, *args: Any, **kwargs: Any) -> Any:
+        result = await method(self, bucket_name, object_key, *args, **kwargs)
+        if self.metadata_index is not None:
+            await self.index_s3_object(bucket_name, object_key)
+        return result
+
+    return wrapper
+
+
+def index_deleted_object(method: Callable) -> Callable:
+    """Record in the metadata index that an object was deleted."""
+
+    @functools.wraps(method)
+    async def wrapper(self: "Boto3S3Backend", bucket_name: str, object_key: str, *args: Any, **kwargs: Any) -> Any:
+        result = await method(self, bucket_name, object_key, *args, **kwargs)
+        if self.metadata_index is not None:
+            self.metadata_index.delete(bucket_name, object_key)
+        return result
+
+    return wrapper
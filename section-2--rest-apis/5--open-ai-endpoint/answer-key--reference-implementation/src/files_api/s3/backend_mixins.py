@@ -0,0 +1,269 @@
+"""
+Groups of operations of the S3 backends in `files_api.s3.backends`, which `Boto3S3Backend` mixes in.
+
+- `ClientUploadsMixin`: uploads that clients send straight to S3 with presigned URLs, and resumable upload sessions.
+- `ContentReferencesMixin`: the references that pointers hold to content-addressed contents.
+- `MetadataIndexMixin`: keeping the `S3MetadataIndex` in line with the bucket.
+
+The operations only need the backend's clients and optional features, declared by `S3BackendAttributes`;
+reads, listings and writes of objects are defined by the backends themselves.
+"""
+
+import asyncio
+import functools
+import time
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    Optional,
+)
+
+from botocore.exceptions import ClientError
+
+from files_api.s3.backend_decorators import (
+    index_written_object,
+    invalidate_cached_object,
+    reading_stored_objects,
+)
+from files_api.s3.content_addressed import (
+    add_copy_references,
+    get_content_key,
+    release_references,
+    resolve_listed_pointers,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.metadata_cache import S3MetadataCache
+from files_api.s3.metadata_index import S3MetadataIndex
+from files_api.s3.presigned_urls import (
+    DEFAULT_PRESIGNED_URL_TTL_SECONDS,
+    PresignedUpload,
+    create_presigned_upload,
+)
+from files_api.s3.read_objects import iter_s3_objects
+from files_api.s3.reconciler import (
+    DEFAULT_RECONCILE_MAX_CONCURRENCY,
+    ReconcileReport,
+    reconcile_metadata_index,
+)
+from files_api.s3.upload_sessions import (
+    DEFAULT_UPLOAD_SESSION_TTL_SECONDS,
+    abort_stale_multipart_uploads,
+    complete_upload_session,
+    list_uploaded_parts,
+)
+from files_api.s3.write_objects import (
+    DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+    upload_part,
+)
+
+try:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import (
+        CompletedPartTypeDef,
+        HeadObjectOutputTypeDef,
+        PartTypeDef,
+    )
+except ImportError:
+    ...
+
+
+class S3BackendAttributes:
+    """The attributes of an S3 backend that its mixins use."""
+
+    s3_client: "S3Client"
+    executor: S3Executor
+    metadata_cache: Optional[S3MetadataCache]
+    metadata_index: Optional[S3MetadataIndex]
+    deduplicate_uploads: bool
+    last_reconcile_report: Optional[ReconcileReport]
+    head_s3_object: Callable[..., Awaitable["HeadObjectOutputTypeDef"]]
+
+
+class ClientUploadsMixin(S3BackendAttributes):
+    """Uploads that clients send straight to S3 with presigned URLs, and resumable upload sessions."""
+
+    async def create_presigned_upload(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        size_bytes: int,
+        content_type: Optional[str] = None,
+        part_size_bytes: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+        expires_in_seconds: int = DEFAULT_PRESIGNED_URL_TTL_SECONDS,
+    ) -> PresignedUpload:
+        return await self.executor.run(
+            create_presigned_upload,
+            bucket_name,
+            object_key,
+            size_bytes,
+            content_type=content_type,
+            part_size_bytes=part_size_bytes,
+            expires_in_seconds=expires_in_seconds,
+            s3_client=self.s3_client,
+        )
+
+    @index_written_object
+    @invalidate_cached_object
+    async def complete_presigned_upload(
+        self,
+        bucket_name: str,
+        object_key: str,
+        upload_id: Optional[str] = None,
+        parts: Optional[List["CompletedPartTypeDef"]] = None,
+    ) -> None:
+        """
+        Complete the upload of a file a client made with presigned URLs.
+
+        A multipart upload is assembled from its `parts`. Either way, the file's cached metadata is
+        dropped and its index entry updated, as the API did not see the file being written.
+        """
+        if upload_id is not None:
+            await self.executor.run(
+                complete_multipart_upload, bucket_name, object_key, upload_id, parts or [], s3_client=self.s3_client
+            )
+
+    async def create_upload_session(
+        self, bucket_name: str, object_key: str, content_type: Optional[str] = None
+    ) -> str:
+        """Start the multipart upload an upload session's chunks are uploaded to, returning its ID."""
+        return await self.executor.run(
+            create_multipart_upload, bucket_name, object_key, content_type=content_type, s3_client=self.s3_client
+        )
+
+    async def upload_session_chunk(  # pylint: disable=too-many-arguments
+        self, bucket_name: str, object_key: str, upload_id: str, chunk_number: int, chunk_content: bytes
+    ) -> "CompletedPartTypeDef":
+        return await self.executor.run(
+            upload_part, bucket_name, object_key, upload_id, chunk_number, chunk_content, s3_client=self.s3_client
+        )
+
+    async def list_upload_session_chunks(
+        self, bucket_name: str, object_key: str, upload_id: str
+    ) -> List["PartTypeDef"]:
+        return await self.executor.run(
+            list_uploaded_parts, bucket_name, object_key, upload_id, s3_client=self.s3_client
+        )
+
+    @index_written_object
+    @invalidate_cached_object
+    async def complete_upload_session(
+        self, bucket_name: str, object_key: str, upload_id: str, chunk_count: int
+    ) -> None:
+        await self.executor.run(
+            complete_upload_session, bucket_name, object_key, upload_id, chunk_count, s3_client=self.s3_client
+        )
+
+    async def abort_upload_session(self, bucket_name: str, object_key: str, upload_id: str) -> None:
+        await self.executor.run(abort_multipart_upload, bucket_name, object_key, upload_id, s3_client=self.s3_client)
+
+    async def abort_stale_upload_sessions(
+        self, bucket_name: str, max_age_seconds: float = DEFAULT_UPLOAD_SESSION_TTL_SECONDS
+    ) -> int:
+        """Abort the multipart uploads started more than `max_age_seconds` ago, returning how many were aborted."""
+        return await self.executor.run(
+            abort_stale_multipart_uploads, bucket_name, max_age_seconds=max_age_seconds, s3_client=self.s3_client
+        )
+
+
+class ContentReferencesMixin(S3BackendAttributes):
+    """The references that pointers hold to content-addressed contents, on a backend that deduplicates uploads."""
+
+    async def head_stored_object(self, bucket_name: str, object_key: str) -> "HeadObjectOutputTypeDef":
+        """HEAD an object as it is stored in S3, i.e. a pointer rather than the content it points to."""
+        with reading_stored_objects():
+            return await self.head_s3_object(bucket_name, object_key)
+
+    async def add_copy_references(
+        self, bucket_name: str, destination_by_source: Dict[str, str]
+    ) -> tuple[Dict[str, str], Dict[str, str]]:
+        """
+        Before objects are copied, reference the contents of the pointers among them from their copies.
+
+        :return: See `files_api.s3.content_addressed.add_copy_references`.
+        """
+        if not self.deduplicate_uploads:
+            return {}, {}
+        return await self.executor.run(
+            add_copy_references, bucket_name, destination_by_source, s3_client=self.s3_client
+        )
+
+    async def release_content_references(self, bucket_name: str, digest_by_key: Dict[str, str]) -> None:
+        """Release the references of pointers that were deleted or replaced, and the contents left unreferenced."""
+        if not digest_by_key:
+            return
+        deleted_digests = await self.executor.run(
+            release_references, bucket_name, digest_by_key, s3_client=self.s3_client
+        )
+        if self.metadata_cache is not None:
+            self.metadata_cache.invalidate_many(bucket_name, [get_content_key(digest) for digest in deleted_digests])
+
+
+class MetadataIndexMixin(S3BackendAttributes):
+    """Keeping the metadata index in line with the objects in the bucket."""
+
+    async def index_s3_object(self, bucket_name: str, object_key: str) -> None:
+        """Record an object's current size and modification time in the metadata index, or that it is missing."""
+        if self.metadata_index is None:
+            return
+        try:
+            response = await self.head_s3_object(bucket_name, object_key)
+        except ClientError as err:
+            if err.response["Error"]["Code"] != "404":
+                raise
+            self.metadata_index.delete(bucket_name, object_key)
+            return
+        self.metadata_index.upsert(bucket_name, object_key, response["ContentLength"], response["LastModified"])
+
+    async def reindex_s3_objects_with_prefix(self, bucket_name: str, prefix: str = "") -> None:
+        """
+        Rebuild the metadata index of every object whose key starts with `prefix` from a listing of S3.
+
+        With the default empty prefix, this builds the index of the whole bucket, after which the
+        index can answer queries about the bucket. Writes made through the backend while the listing
+        runs are kept; see `S3MetadataIndex.replace_prefix`.
+        """
+        if self.metadata_index is None:
+            return
+        started_at = time.time()
+        s3_objects = await self.executor.run(
+            lambda: list(iter_s3_objects(bucket_name, prefix, s3_client=self.s3_client))
+        )
+        if self.deduplicate_uploads:
+            s3_objects = await self.executor.run(
+                resolve_listed_pointers, bucket_name, s3_objects, s3_client=self.s3_client
+            )
+        # a large listing takes long enough to write to hold up other requests, so it runs off the event loop
+        await asyncio.to_thread(self.metadata_index.replace_prefix, bucket_name, prefix, s3_objects, started_at)
+
+    async def reconcile_metadata_index(
+        self,
+        bucket_name: str,
+        prefix: str = "",
+        max_concurrency: int = DEFAULT_RECONCILE_MAX_CONCURRENCY,
+    ) -> Optional[ReconcileReport]:
+        """
+        Bring the metadata index in line with S3 by listing the bucket in concurrent prefix shards.
+
+        Unlike `reindex_s3_objects_with_prefix`, only the differences are written to the index, which
+        suits large and mostly unchanged buckets. See `files_api.s3.reconciler`.
+        """
+        if self.metadata_index is None:
+            return None
+        resolve_listed_objects = None
+        if self.deduplicate_uploads:
+            resolve_listed_objects = functools.partial(resolve_listed_pointers, bucket_name, s3_client=self.s3_client)
+        self.last_reconcile_report = await self.executor.run(
+            reconcile_metadata_index,
+            bucket_name,
+            self.metadata_index,
+            prefix=prefix,
+            max_concurrency=max_concurrency,
+            resolve_listed_objects=resolve_listed_objects,
+            s3_client=self.s3_client,
+        )
+        return self.last_reconcile_report
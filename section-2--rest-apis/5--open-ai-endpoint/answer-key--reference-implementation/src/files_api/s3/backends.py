@@ -0,0 +1,799 @@
+"""
+Async interface through which the routes call S3.
+
+The routes are `async def`, so every S3 round trip they make must be awaitable or it stalls the
+event loop--and with it every other in-flight request on the worker. Two backends are available:
+
+- `Boto3S3Backend` runs the synchronous `files_api.s3` functions on a bounded thread pool (`S3Executor`).
+- `AiobotocoreS3Backend` calls the asyncio `files_api.s3.aio` functions with an aiobotocore client.
+
+Select one with the `S3_BACKEND` setting. Either backend can answer metadata reads from an
+`S3MetadataCache`; the decorators in `files_api.s3.backend_decorators` wrap each S3 operation with
+the cache's lookups and invalidations, and pass calls straight through when the backend has no cache.
+A cache created with a content byte budget also holds the content of small objects, which
+`fetch_s3_object` then serves, ranges and preconditions included, without calling S3. Likewise, a
+backend with an `S3MetadataIndex` records every object it writes or deletes in the index, and a
+backend with an `S3ListingPrefetcher` requests the next page of every listing before the client asks
+for it.
+
+A backend created with `deduplicate_uploads` stores uploaded files as pointers to content-addressed
+contents (see `files_api.s3.content_addressed`). Reads of a pointer return its content, listings
+report pointers with their content's size, and deletes, copies and moves keep the contents'
+references counted.
+"""
+
+import asyncio
+import io
+import threading
+from collections import deque
+from datetime import datetime
+from typing import (
+    Any,
+    AsyncIterator,
+    BinaryIO,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    cast,
+)
+
+from botocore.response import StreamingBody
+
+from files_api.s3.aio import delete_objects as aio_delete_objects
+from files_api.s3.aio import read_objects as aio_read_objects
+from files_api.s3.aio import write_objects as aio_write_objects
+from files_api.s3.aio.read_objects import GetObjectResponse
+from files_api.s3.backend_decorators import (
+    cache_fetch_object,
+    cache_head_object,
+    cache_listing,
+    cache_object_content,
+    cache_object_exists,
+    index_deleted_object,
+    index_written_object,
+    invalidate_cached_object,
+    prefetch_next_page,
+    release_content_reference,
+    resolve_content_pointer,
+    resolve_pointers_in_listing,
+)
+from files_api.s3.backend_mixins import (
+    ClientUploadsMixin,
+    ContentReferencesMixin,
+    MetadataIndexMixin,
+)
+from files_api.s3.content_addressed import (
+    add_prefix_copy_references,
+    get_content_key,
+    get_pointer_digest,
+    get_pointer_digests,
+    get_pointer_digests_with_prefix,
+    is_content_addressed_key,
+    upload_s3_object_deduplicated,
+)
+from files_api.s3.copy_objects import (
+    DEFAULT_COPY_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+    copy_s3_object,
+    copy_s3_objects_with_prefix,
+    move_s3_object,
+)
+from files_api.s3.delete_objects import (
+    DEFAULT_BULK_DELETE_MAX_CONCURRENCY,
+    delete_s3_object,
+    delete_s3_objects,
+    delete_s3_objects_with_prefix,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.listing_prefetch import S3ListingPrefetcher
+from files_api.s3.metadata_cache import S3MetadataCache
+from files_api.s3.metadata_index import S3MetadataIndex
+from files_api.s3.presigned_urls import (
+    DEFAULT_PRESIGNED_URL_TTL_SECONDS,
+    generate_presigned_download_url,
+)
+from files_api.s3.read_objects import (
+    DEFAULT_CHUNK_SIZE_BYTES,
+    DEFAULT_MAX_KEYS,
+    DEFAULT_PARALLEL_DOWNLOAD_MAX_CONCURRENCY,
+    DEFAULT_PARALLEL_DOWNLOAD_PART_SIZE_BYTES,
+    DEFAULT_PARALLEL_DOWNLOAD_THRESHOLD_BYTES,
+    fetch_s3_object,
+    fetch_s3_object_range,
+    fetch_s3_objects_and_directories,
+    fetch_s3_objects_metadata,
+    fetch_s3_objects_using_page_token,
+    head_s3_object,
+    object_exists_in_s3,
+)
+from files_api.s3.reconciler import ReconcileReport
+from files_api.s3.write_objects import (
+    DEFAULT_MULTIPART_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    upload_s3_object,
+    upload_s3_object_from_file,
+)
+
+try:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import (
+        ErrorTypeDef,
+        HeadObjectOutputTypeDef,
+        ObjectTypeDef,
+    )
+    from types_aiobotocore_s3 import S3Client as AioS3Client
+except ImportError:
+    ...
+
+
+class Boto3S3Backend(ClientUploadsMixin, ContentReferencesMixin, MetadataIndexMixin):
+    """
+    Call S3 using the synchronous boto3 functions in `files_api.s3`.
+
+    Every blocking call, including reads of a downloaded object's body, runs on the `S3Executor`
+    so that a slow S3 round trip never holds up the event loop.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        s3_client: "S3Client",
+        executor: S3Executor,
+        metadata_cache: Optional[S3MetadataCache] = None,
+        metadata_index: Optional[S3MetadataIndex] = None,
+        listing_prefetcher: Optional[S3ListingPrefetcher] = None,
+        deduplicate_uploads: bool = False,
+    ):
+        self.s3_client = s3_client
+        self.executor = executor
+        self.metadata_cache = metadata_cache
+        self.metadata_index = metadata_index
+        self.listing_prefetcher = listing_prefetcher
+        self.deduplicate_uploads = deduplicate_uploads
+        self.last_reconcile_report: Optional[ReconcileReport] = None
+
+    @cache_object_exists
+    async def object_exists_in_s3(self, bucket_name: str, object_key: str) -> bool:
+        return await self.executor.run(object_exists_in_s3, bucket_name, object_key, s3_client=self.s3_client)
+
+    @resolve_content_pointer
+    @cache_head_object
+    async def head_s3_object(
+        self,
+        bucket_name: str,
+        object_key: str,
+        if_none_match: Optional[str] = None,
+        if_modified_since: Optional[datetime] = None,
+    ) -> "HeadObjectOutputTypeDef":
+        return await self.executor.run(
+            head_s3_object,
+            bucket_name,
+            object_key,
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+            s3_client=self.s3_client,
+        )
+
+    @resolve_content_pointer
+    @cache_object_content
+    @cache_fetch_object
+    async def fetch_s3_object(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        byte_range: Optional[str] = None,
+        if_match: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+        if_modified_since: Optional[datetime] = None,
+    ) -> GetObjectResponse:
+        response = await self.executor.run(
+            fetch_s3_object,
+            bucket_name,
+            object_key,
+            byte_range=byte_range,
+            if_match=if_match,
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+            s3_client=self.s3_client,
+        )
+        return cast(GetObjectResponse, {**response, "Body": self.iter_body_chunks(response["Body"])})
+
+    @resolve_content_pointer
+    async def fetch_s3_object_range(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        first_byte: int,
+        last_byte: int,
+        if_match: Optional[str] = None,
+    ) -> bytes:
+        return await self.executor.run(
+            fetch_s3_object_range,
+            bucket_name,
+            object_key,
+            first_byte,
+            last_byte,
+            if_match=if_match,
+            s3_client=self.s3_client,
+        )
+
+    async def fetch_s3_object_in_parallel(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        threshold_bytes: int = DEFAULT_PARALLEL_DOWNLOAD_THRESHOLD_BYTES,
+        part_size_bytes: int = DEFAULT_PARALLEL_DOWNLOAD_PART_SIZE_BYTES,
+        max_concurrency: int = DEFAULT_PARALLEL_DOWNLOAD_MAX_CONCURRENCY,
+        if_none_match: Optional[str] = None,
+        if_modified_since: Optional[datetime] = None,
+    ) -> GetObjectResponse:
+        """
+        Fetch an object, downloading objects larger than `threshold_bytes` with concurrent ranged GETs.
+
+        The first `threshold_bytes` are fetched with one ranged GET, which also reveals the object's size.
+        Smaller objects are thereby fetched whole, exactly like `fetch_s3_object`. For larger objects, the
+        rest is fetched in parts of `part_size_bytes`, `max_concurrency` at a time, while the first range
+        streams. The parts are yielded in order, so at most `max_concurrency` parts are buffered, and every
+        part is fetched with `If-Match` on the first response's ETag so a concurrent overwrite fails the
+        download instead of mixing two versions of the object.
+
+        `if_none_match` and `if_modified_since` apply to the first GET, as in `fetch_s3_object`.
+
+        :return: Metadata of the whole object, and its content as an async iterator.
+        """
+        conditions: Dict[str, Any] = {"if_none_match": if_none_match, "if_modified_since": if_modified_since}
+        try:
+            response = await self.fetch_s3_object(
+                bucket_name, object_key, byte_range=f"bytes=0-{threshold_bytes - 1}", **conditions
+            )
+        except self.s3_client.exceptions.ClientError as err:
+            if err.response["Error"]["Code"] != "InvalidRange":
+                raise
+            # S3 cannot satisfy any range of an empty object
+            return await self.fetch_s3_object(bucket_name, object_key, **conditions)
+
+        object_size = int(response.pop("ContentRange").rsplit("/", 1)[1])
+        if object_size > threshold_bytes:
+            response["Body"] = self._iter_ranges_in_parallel(
+                bucket_name,
+                object_key,
+                first_range=response["Body"],
+                offsets=range(threshold_bytes, object_size, part_size_bytes),
+                part_size_bytes=part_size_bytes,
+                max_concurrency=max_concurrency,
+                object_size=object_size,
+                etag=response["ETag"],
+            )
+        response["ContentLength"] = object_size
+        return response
+
+    async def _iter_ranges_in_parallel(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        first_range: AsyncIterator[bytes],
+        offsets: range,
+        part_size_bytes: int,
+        max_concurrency: int,
+        object_size: int,
+        etag: str,
+    ) -> AsyncIterator[bytes]:
+        """Yield `first_range`, then the parts at `offsets`, fetching up to `max_concurrency` parts ahead."""
+        next_offsets = iter(offsets)
+        pending_parts: Deque[asyncio.Task] = deque()
+
+        def fetch_next_part() -> None:
+            offset = next(next_offsets, None)
+            if offset is not None:
+                last_byte = min(offset + part_size_bytes, object_size) - 1
+                pending_parts.append(
+                    asyncio.ensure_future(
+                        self.fetch_s3_object_range(bucket_name, object_key, offset, last_byte, if_match=etag)
+                    )
+                )
+
+        try:
+            for _ in range(max_concurrency):
+                fetch_next_part()
+            async for chunk in first_range:
+                yield chunk
+            while pending_parts:
+                part = await pending_parts.popleft()
+                fetch_next_part()
+                yield part
+        finally:
+            for pending_part in pending_parts:
+                pending_part.cancel()
+
+    async def iter_body_chunks(
+        self, body: "StreamingBody", chunk_size: int = DEFAULT_CHUNK_SIZE_BYTES
+    ) -> AsyncIterator[bytes]:
+        """Yield the chunks of a boto3 `StreamingBody`, reading each one on the executor."""
+        try:
+            while chunk := await self.executor.run(body.read, chunk_size):
+                yield chunk
+        finally:
+            body.close()
+
+    @prefetch_next_page("fetch_s3_objects_using_page_token")
+    @cache_listing
+    @resolve_pointers_in_listing
+    async def fetch_s3_objects_using_page_token(
+        self,
+        bucket_name: str,
+        continuation_token: str,
+        max_keys: Optional[int] = None,
+        prefix: Optional[str] = None,
+    ) -> tuple[list["ObjectTypeDef"], Optional[str]]:
+        return await self.executor.run(
+            fetch_s3_objects_using_page_token,
+            bucket_name,
+            continuation_token,
+            max_keys=max_keys,
+            prefix=prefix,
+            s3_client=self.s3_client,
+        )
+
+    @prefetch_next_page("fetch_s3_objects_using_page_token")
+    @cache_listing
+    @resolve_pointers_in_listing
+    async def fetch_s3_objects_metadata(
+        self,
+        bucket_name: str,
+        prefix: Optional[str] = None,
+        max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+    ) -> tuple[list["ObjectTypeDef"], Optional[str]]:
+        return await self.executor.run(
+            fetch_s3_objects_metadata, bucket_name, prefix=prefix, max_keys=max_keys, s3_client=self.s3_client
+        )
+
+    @prefetch_next_page("fetch_s3_objects_and_directories")
+    @cache_listing
+    @resolve_pointers_in_listing
+    async def fetch_s3_objects_and_directories(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        prefix: Optional[str] = None,
+        delimiter: str = "/",
+        max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+        continuation_token: Optional[str] = None,
+    ) -> tuple[list["ObjectTypeDef"], list[str], Optional[str]]:
+        return await self.executor.run(
+            fetch_s3_objects_and_directories,
+            bucket_name,
+            prefix=prefix,
+            delimiter=delimiter,
+            max_keys=max_keys,
+            continuation_token=continuation_token,
+            s3_client=self.s3_client,
+        )
+
+    @index_written_object
+    @invalidate_cached_object
+    async def upload_s3_object(
+        self,
+        bucket_name: str,
+        object_key: str,
+        file_content: bytes,
+        content_type: Optional[str] = None,
+    ) -> None:
+        if self.deduplicate_uploads:
+            await self._upload_s3_object_deduplicated(bucket_name, object_key, io.BytesIO(file_content), content_type)
+            return
+        await self.executor.run(
+            upload_s3_object,
+            bucket_name,
+            object_key,
+            file_content,
+            content_type=content_type,
+            s3_client=self.s3_client,
+        )
+
+    @index_written_object
+    @invalidate_cached_object
+    async def upload_s3_object_from_file(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        file_obj: BinaryIO,
+        content_type: Optional[str] = None,
+        part_size_bytes: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+        max_concurrency: int = DEFAULT_MULTIPART_MAX_CONCURRENCY,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> bool:
+        if self.deduplicate_uploads:
+            return await self._upload_s3_object_deduplicated(
+                bucket_name, object_key, file_obj, content_type, part_size_bytes, max_concurrency, cancel_event
+            )
+        return await self.executor.run(
+            upload_s3_object_from_file,
+            bucket_name,
+            object_key,
+            file_obj,
+            content_type=content_type,
+            part_size_bytes=part_size_bytes,
+            max_concurrency=max_concurrency,
+            cancel_event=cancel_event,
+            s3_client=self.s3_client,
+        )
+
+    async def _upload_s3_object_deduplicated(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        file_obj: BinaryIO,
+        content_type: Optional[str] = None,
+        part_size_bytes: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+        max_concurrency: int = DEFAULT_MULTIPART_MAX_CONCURRENCY,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> bool:
+        # not decorated: the upload methods calling it index the file and invalidate its cache entries once
+        created, digest = await self.executor.run(
+            upload_s3_object_deduplicated,
+            bucket_name,
+            object_key,
+            file_obj,
+            content_type=content_type,
+            part_size_bytes=part_size_bytes,
+            max_concurrency=max_concurrency,
+            cancel_event=cancel_event,
+            s3_client=self.s3_client,
+        )
+        if self.metadata_cache is not None:
+            # the content may have been cached as missing, before this upload created it
+            self.metadata_cache.invalidate(bucket_name, get_content_key(digest))
+        return created
+
+    @index_deleted_object
+    @invalidate_cached_object
+    @release_content_reference
+    async def delete_s3_object(self, bucket_name: str, object_key: str) -> None:
+        await self.executor.run(delete_s3_object, bucket_name, object_key, s3_client=self.s3_client)
+
+    async def delete_s3_objects(
+        self,
+        bucket_name: str,
+        object_keys: List[str],
+        max_concurrency: int = DEFAULT_BULK_DELETE_MAX_CONCURRENCY,
+    ) -> tuple[int, List["ErrorTypeDef"]]:
+        digest_by_key: Dict[str, str] = {}
+        if self.deduplicate_uploads:
+            digest_by_key = await self.executor.run(
+                get_pointer_digests, bucket_name, object_keys, s3_client=self.s3_client
+            )
+        try:
+            deleted_count, failures = await self.executor.run(
+                delete_s3_objects,
+                bucket_name,
+                object_keys,
+                max_concurrency=max_concurrency,
+                s3_client=self.s3_client,
+            )
+        finally:
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate_many(bucket_name, object_keys)
+            if self.listing_prefetcher is not None:
+                self.listing_prefetcher.invalidate(bucket_name)
+        failed_keys = {failure["Key"] for failure in failures}
+        if self.metadata_index is not None:
+            self.metadata_index.delete_many(bucket_name, (key for key in object_keys if key not in failed_keys))
+        await self.release_content_references(
+            bucket_name, {key: digest for key, digest in digest_by_key.items() if key not in failed_keys}
+        )
+        return deleted_count, failures
+
+    async def delete_s3_objects_with_prefix(
+        self,
+        bucket_name: str,
+        prefix: str,
+        max_concurrency: int = DEFAULT_BULK_DELETE_MAX_CONCURRENCY,
+    ) -> tuple[int, List["ErrorTypeDef"]]:
+        digest_by_key: Dict[str, str] = {}
+        if self.deduplicate_uploads:
+            digest_by_key = await self.executor.run(
+                get_pointer_digests_with_prefix, bucket_name, prefix, s3_client=self.s3_client
+            )
+        try:
+            result = await self.executor.run(
+                delete_s3_objects_with_prefix,
+                bucket_name,
+                prefix,
+                max_concurrency=max_concurrency,
+                s3_client=self.s3_client,
+            )
+        finally:
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate_prefix(bucket_name, prefix)
+            if self.listing_prefetcher is not None:
+                self.listing_prefetcher.invalidate(bucket_name)
+        if self.metadata_index is not None:
+            await self.reindex_s3_objects_with_prefix(bucket_name, prefix)
+        failed_keys = {failure["Key"] for failure in result[1]}
+        await self.release_content_references(
+            bucket_name, {key: digest for key, digest in digest_by_key.items() if key not in failed_keys}
+        )
+        return result
+
+    async def copy_s3_object(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        source_key: str,
+        destination_key: str,
+        part_size_bytes: int = DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+        max_concurrency: int = DEFAULT_COPY_MAX_CONCURRENCY,
+    ) -> None:
+        _, replaced_digests = await self.add_copy_references(bucket_name, {source_key: destination_key})
+        try:
+            await self.executor.run(
+                copy_s3_object,
+                bucket_name,
+                source_key,
+                destination_key,
+                part_size_bytes=part_size_bytes,
+                max_concurrency=max_concurrency,
+                s3_client=self.s3_client,
+            )
+        finally:
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate(bucket_name, destination_key)
+            if self.listing_prefetcher is not None:
+                self.listing_prefetcher.invalidate(bucket_name)
+        if self.metadata_index is not None:
+            await self.index_s3_object(bucket_name, destination_key)
+        await self.release_content_references(bucket_name, replaced_digests)
+
+    async def move_s3_object(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        source_key: str,
+        destination_key: str,
+        part_size_bytes: int = DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+        max_concurrency: int = DEFAULT_COPY_MAX_CONCURRENCY,
+    ) -> None:
+        source_digests, replaced_digests = await self.add_copy_references(bucket_name, {source_key: destination_key})
+        try:
+            await self.executor.run(
+                move_s3_object,
+                bucket_name,
+                source_key,
+                destination_key,
+                part_size_bytes=part_size_bytes,
+                max_concurrency=max_concurrency,
+                s3_client=self.s3_client,
+            )
+        finally:
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate_many(bucket_name, [source_key, destination_key])
+            if self.listing_prefetcher is not None:
+                self.listing_prefetcher.invalidate(bucket_name)
+        if self.metadata_index is not None:
+            await self.index_s3_object(bucket_name, destination_key)
+            self.metadata_index.delete(bucket_name, source_key)
+        await self.release_content_references(bucket_name, {**replaced_digests, **source_digests})
+
+    async def copy_s3_objects_with_prefix(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        source_prefix: str,
+        destination_prefix: str,
+        delete_sources: bool = False,
+        part_size_bytes: int = DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+        max_concurrency: int = DEFAULT_COPY_MAX_CONCURRENCY,
+    ) -> tuple[int, List["ErrorTypeDef"]]:
+        source_digests: Dict[str, str] = {}
+        replaced_digests: Dict[str, str] = {}
+        if self.deduplicate_uploads:
+            source_digests, replaced_digests = await self.executor.run(
+                add_prefix_copy_references, bucket_name, source_prefix, destination_prefix, s3_client=self.s3_client
+            )
+        try:
+            result = await self.executor.run(
+                copy_s3_objects_with_prefix,
+                bucket_name,
+                source_prefix,
+                destination_prefix,
+                delete_sources=delete_sources,
+                part_size_bytes=part_size_bytes,
+                max_concurrency=max_concurrency,
+                s3_client=self.s3_client,
+            )
+        finally:
+            if self.metadata_cache is not None:
+                self.metadata_cache.invalidate_prefix(bucket_name, destination_prefix)
+                if delete_sources:
+                    self.metadata_cache.invalidate_prefix(bucket_name, source_prefix)
+            if self.listing_prefetcher is not None:
+                self.listing_prefetcher.invalidate(bucket_name)
+        if self.metadata_index is not None:
+            await self.reindex_s3_objects_with_prefix(bucket_name, destination_prefix)
+            if delete_sources:
+                await self.reindex_s3_objects_with_prefix(bucket_name, source_prefix)
+        # a failed source may not have been copied, so the pointer at its destination may still be in use
+        failed_sources = {failure["Key"] for failure in result[1]}
+        failed_destinations = {destination_prefix + key.removeprefix(source_prefix) for key in failed_sources}
+        released_digests = {key: digest for key, digest in replaced_digests.items() if key not in failed_destinations}
+        if delete_sources:
+            released_digests.update(
+                (key, digest) for key, digest in source_digests.items() if key not in failed_sources
+            )
+        await self.release_content_references(bucket_name, released_digests)
+        return result
+
+    async def generate_presigned_download_url(
+        self,
+        bucket_name: str,
+        object_key: str,
+        expires_in_seconds: int = DEFAULT_PRESIGNED_URL_TTL_SECONDS,
+    ) -> str:
+        """Presign a `GET` of a file; the URL of a pointer downloads its content, with the pointer's content type."""
+        response_content_type = None
+        if self.deduplicate_uploads and not is_content_addressed_key(object_key):
+            pointer = await self.head_stored_object(bucket_name, object_key)
+            digest = get_pointer_digest(pointer)
+            if digest is not None:
+                object_key, response_content_type = get_content_key(digest), pointer["ContentType"]
+        # signed locally, so there is no S3 round trip to run on the executor
+        return generate_presigned_download_url(
+            bucket_name,
+            object_key,
+            expires_in_seconds=expires_in_seconds,
+            response_content_type=response_content_type,
+            s3_client=self.s3_client,
+        )
+
+
+class AiobotocoreS3Backend(Boto3S3Backend):
+    """
+    Call S3 using the asyncio functions in `files_api.s3.aio`.
+
+    Operations without an asyncio implementation fall back to the boto3 backend.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        s3_client: "S3Client",
+        executor: S3Executor,
+        async_s3_client: "AioS3Client",
+        metadata_cache: Optional[S3MetadataCache] = None,
+        metadata_index: Optional[S3MetadataIndex] = None,
+        listing_prefetcher: Optional[S3ListingPrefetcher] = None,
+        deduplicate_uploads: bool = False,
+    ):
+        super().__init__(
+            s3_client=s3_client,
+            executor=executor,
+            metadata_cache=metadata_cache,
+            metadata_index=metadata_index,
+            listing_prefetcher=listing_prefetcher,
+            deduplicate_uploads=deduplicate_uploads,
+        )
+        self.async_s3_client = async_s3_client
+
+    @cache_object_exists
+    async def object_exists_in_s3(self, bucket_name: str, object_key: str) -> bool:
+        return await aio_read_objects.object_exists_in_s3(bucket_name, object_key, s3_client=self.async_s3_client)
+
+    @resolve_content_pointer
+    @cache_head_object
+    async def head_s3_object(
+        self,
+        bucket_name: str,
+        object_key: str,
+        if_none_match: Optional[str] = None,
+        if_modified_since: Optional[datetime] = None,
+    ) -> "HeadObjectOutputTypeDef":
+        return await aio_read_objects.head_s3_object(
+            bucket_name,
+            object_key,
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+            s3_client=self.async_s3_client,
+        )
+
+    @resolve_content_pointer
+    @cache_object_content
+    @cache_fetch_object
+    async def fetch_s3_object(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        byte_range: Optional[str] = None,
+        if_match: Optional[str] = None,
+        if_none_match: Optional[str] = None,
+        if_modified_since: Optional[datetime] = None,
+    ) -> GetObjectResponse:
+        return await aio_read_objects.fetch_s3_object(
+            bucket_name,
+            object_key,
+            byte_range=byte_range,
+            if_match=if_match,
+            if_none_match=if_none_match,
+            if_modified_since=if_modified_since,
+            s3_client=self.async_s3_client,
+        )
+
+    @resolve_content_pointer
+    async def fetch_s3_object_range(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        first_byte: int,
+        last_byte: int,
+        if_match: Optional[str] = None,
+    ) -> bytes:
+        return await aio_read_objects.fetch_s3_object_range(
+            bucket_name, object_key, first_byte, last_byte, if_match=if_match, s3_client=self.async_s3_client
+        )
+
+    @prefetch_next_page("fetch_s3_objects_using_page_token")
+    @cache_listing
+    @resolve_pointers_in_listing
+    async def fetch_s3_objects_using_page_token(
+        self,
+        bucket_name: str,
+        continuation_token: str,
+        max_keys: Optional[int] = None,
+        prefix: Optional[str] = None,
+    ) -> tuple[list["ObjectTypeDef"], Optional[str]]:
+        return await aio_read_objects.fetch_s3_objects_using_page_token(
+            bucket_name, continuation_token, max_keys=max_keys, prefix=prefix, s3_client=self.async_s3_client
+        )
+
+    @prefetch_next_page("fetch_s3_objects_using_page_token")
+    @cache_listing
+    @resolve_pointers_in_listing
+    async def fetch_s3_objects_metadata(
+        self,
+        bucket_name: str,
+        prefix: Optional[str] = None,
+        max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+    ) -> tuple[list["ObjectTypeDef"], Optional[str]]:
+        return await aio_read_objects.fetch_s3_objects_metadata(
+            bucket_name, prefix=prefix, max_keys=max_keys, s3_client=self.async_s3_client
+        )
+
+    @prefetch_next_page("fetch_s3_objects_and_directories")
+    @cache_listing
+    @resolve_pointers_in_listing
+    async def fetch_s3_objects_and_directories(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        prefix: Optional[str] = None,
+        delimiter: str = "/",
+        max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+        continuation_token: Optional[str] = None,
+    ) -> tuple[list["ObjectTypeDef"], list[str], Optional[str]]:
+        return await aio_read_objects.fetch_s3_objects_and_directories(
+            bucket_name,
+            prefix=prefix,
+            delimiter=delimiter,
+            max_keys=max_keys,
+            continuation_token=continuation_token,
+            s3_client=self.async_s3_client,
+        )
+
+    @index_written_object
+    @invalidate_cached_object
+    async def upload_s3_object(
+        self,
+        bucket_name: str,
+        object_key: str,
+        file_content: bytes,
+        content_type: Optional[str] = None,
+    ) -> None:
+        if self.deduplicate_uploads:
+            # content-addressed storage is only implemented with boto3
+            await self._upload_s3_object_deduplicated(bucket_name, object_key, io.BytesIO(file_content), content_type)
+            return
+        await aio_write_objects.upload_s3_object(
+            bucket_name, object_key, file_content, content_type=content_type, s3_client=self.async_s3_client
+        )
+
+    @index_deleted_object
+    @invalidate_cached_object
+    @release_content_reference
+    async def delete_s3_object(self, bucket_name: str, object_key: str) -> None:
+        await aio_delete_objects.delete_s3_object(bucket_name, object_key, s3_client=self.async_s3_client)
+
+
+S3Backend = Boto3S3Backend | AiobotocoreS3Backend
@@ -0,0 +1,118 @@
+"""
+Process-wide registry of pooled S3 clients.
+
+Creating a boto3 client is expensive: it loads the service model, resolves the endpoint and
+credentials, and creates a brand-new HTTP connection pool. boto3 clients are thread-safe, so
+the Files API creates one client when the app starts up and shares it for every request.
+"""
+
+import threading
+from typing import (
+    Optional,
+    Type,
+    TypedDict,
+)
+
+import boto3
+from botocore.config import Config
+
+try:
+    from mypy_boto3_s3 import S3Client
+except ImportError:
+    ...
+
+DEFAULT_MAX_POOL_CONNECTIONS = 50
+DEFAULT_TCP_KEEPALIVE = True
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 5.0
+DEFAULT_READ_TIMEOUT_SECONDS = 60.0
+DEFAULT_MAX_RETRY_ATTEMPTS = 3
+
+_REGISTRY_LOCK = threading.Lock()
+_S3_CLIENT: Optional["S3Client"] = None
+
+
+class S3ClientOptions(TypedDict):
+    """The options of `create_s3_client`, and of `files_api.s3.aio.clients.create_async_s3_client`."""
+
+    max_pool_connections: int
+    tcp_keepalive: bool
+    connect_timeout_seconds: float
+    read_timeout_seconds: float
+    max_retry_attempts: int
+
+
+def create_client_config(  # pylint: disable=too-many-arguments
+    config_class: Type[Config] = Config,
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+    tcp_keepalive: bool = DEFAULT_TCP_KEEPALIVE,
+    connect_timeout_seconds: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    read_timeout_seconds: float = DEFAULT_READ_TIMEOUT_SECONDS,
+    max_retry_attempts: int = DEFAULT_MAX_RETRY_ATTEMPTS,
+) -> Config:
+    """
+    Create the configuration of an S3 client from the options of `create_s3_client`.
+
+    :param config_class: `Config`, or a subclass taking the same options, such as aiobotocore's `AioConfig`.
+
+    :return: A new configuration.
+    """
+    return config_class(
+        max_pool_connections=max_pool_connections,
+        tcp_keepalive=tcp_keepalive,
+        connect_timeout=connect_timeout_seconds,
+        read_timeout=read_timeout_seconds,
+        retries={"max_attempts": max_retry_attempts, "mode": "standard"},
+    )
+
+
+def create_s3_client(
+    max_pool_connections: int = DEFAULT_MAX_POOL_CONNECTIONS,
+    tcp_keepalive: bool = DEFAULT_TCP_KEEPALIVE,
+    connect_timeout_seconds: float = DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    read_timeout_seconds: float = DEFAULT_READ_TIMEOUT_SECONDS,
+    max_retry_attempts: int = DEFAULT_MAX_RETRY_ATTEMPTS,
+) -> "S3Client":
+    """
+    Create a new S3 client with a tuned connection pool.
+
+    :param max_pool_connections: Maximum number of HTTP connections kept open in the client's pool.
+    :param tcp_keepalive: Whether to enable TCP keep-alive on pooled connections.
+    :param connect_timeout_seconds: Seconds to wait when establishing a connection.
+    :param read_timeout_seconds: Seconds to wait for data from an established connection.
+    :param max_retry_attempts: Maximum number of retries for throttled or failed requests.
+
+    :return: A new S3 client.
+    """
+    config = create_client_config(
+        Config, max_pool_connections, tcp_keepalive, connect_timeout_seconds, read_timeout_seconds, max_retry_attempts
+    )
+    # boto3.client() uses a shared default session, which is not thread-safe to create clients from
+    session = boto3.session.Session()
+    return session.client("s3", config=config)
+
+
+def register_s3_client(s3_client: Optional["S3Client"]) -> None:
+    """
+    Set the process-wide S3 client returned by `get_s3_client`.
+
+    :param s3_client: The client to share, or None to clear the registry.
+    """
+    global _S3_CLIENT  # pylint: disable=global-statement
+    with _REGISTRY_LOCK:
+        _S3_CLIENT = s3_client
+
+
+def get_s3_client() -> "S3Client":
+    """
+    Get the process-wide S3 client, creating one with default settings if none is registered.
+
+    :return: The shared S3 client.
+    """
+    global _S3_CLIENT  # pylint: disable=global-statement
+    s3_client = _S3_CLIENT
+    if s3_client is not None:
+        return s3_client
+    with _REGISTRY_LOCK:
+        if _S3_CLIENT is None:
+            _S3_CLIENT = create_s3_client()
+        return _S3_CLIENT
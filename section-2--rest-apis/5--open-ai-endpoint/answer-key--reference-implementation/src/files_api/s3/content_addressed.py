@@ -0,0 +1,409 @@
+"""
+Content-addressed storage of uploaded files, which stores each distinct content once.
+
+When uploads are deduplicated, the content of a file is stored under its SHA-256 digest, at
+`.cas/sha256/<digest>`, and the file's own key holds an empty *pointer* object whose metadata names
+the digest and the content's size. Uploading content the bucket already holds writes only the
+pointer: however large the file, its body is not sent to S3 again.
+
+Every pointer has a *reference* object, `.cas/refs/<digest>/<sha256 of the file's key>`, so the
+files that share a content are counted by listing its references. A reference is written before its
+pointer and deleted after it, and the content is deleted together with its last reference. A failure
+between those steps can leave a reference, and with it a content, behind--never a pointer to a
+content that was deleted.
+
+Releasing a content's last reference races uploads of the same content: an upload may reference it
+and find it present just before the release deletes it. The release therefore writes a *release
+marker*, `.cas/releasing/<digest>/<id>`, and lists the references again before deleting the content,
+and uploads wait for fresh release markers to go away before looking the content up. A release that
+dies between writing and deleting its marker leaves it behind; uploads of that content ignore the
+marker once it is `DEFAULT_RELEASE_MARKER_TTL_SECONDS` old, so the window for a dangling pointer is
+a release that stalls for longer than that between listing the references and deleting the content.
+"""
+
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import (
+    datetime,
+    timezone,
+)
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+)
+
+from botocore.exceptions import ClientError
+
+from files_api.s3.clients import get_s3_client
+from files_api.s3.delete_objects import delete_s3_object
+from files_api.s3.read_objects import (
+    fetch_s3_objects_metadata,
+    iter_s3_objects,
+    object_exists_in_s3,
+)
+from files_api.s3.write_objects import (
+    DEFAULT_MULTIPART_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    UploadCancelledError,
+    upload_s3_object_from_file,
+    upsert_s3_object,
+)
+
+try:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+except ImportError:
+    ...
+
+CONTENT_ADDRESSED_PREFIX = ".cas/"
+CONTENT_PREFIX = f"{CONTENT_ADDRESSED_PREFIX}sha256/"
+REFERENCES_PREFIX = f"{CONTENT_ADDRESSED_PREFIX}refs/"
+RELEASES_PREFIX = f"{CONTENT_ADDRESSED_PREFIX}releasing/"
+
+# user-defined metadata of a pointer object; S3 stores its keys lower-cased
+POINTER_DIGEST_METADATA_KEY = "cas-sha256"
+POINTER_SIZE_METADATA_KEY = "cas-size"
+
+DEFAULT_HASH_CHUNK_SIZE_BYTES = 1024 * 1024
+DEFAULT_POINTER_HEAD_MAX_CONCURRENCY = 16
+DEFAULT_RELEASE_MARKER_TTL_SECONDS = 60.0
+RELEASE_POLL_INTERVAL_SECONDS = 0.1
+
+
+def get_content_key(digest: str) -> str:
+    """Return the key of the content with the given SHA-256 digest."""
+    return f"{CONTENT_PREFIX}{digest}"
+
+
+def get_reference_key(digest: str, object_key: str) -> str:
+    """Return the key of the reference a pointer at `object_key` holds to the content with the given digest."""
+    return f"{REFERENCES_PREFIX}{digest}/{hashlib.sha256(object_key.encode()).hexdigest()}"
+
+
+def is_content_addressed_key(object_key: str) -> bool:
+    """Whether a key belongs to the content-addressed storage itself, rather than to a file."""
+    return object_key.startswith(CONTENT_ADDRESSED_PREFIX)
+
+
+def get_pointer_digest(head_object_response: Mapping[str, Any]) -> Optional[str]:
+    """Return the digest of the content a HEAD response's object points to, or None if it is not a pointer."""
+    return head_object_response.get("Metadata", {}).get(POINTER_DIGEST_METADATA_KEY)
+
+
+def hash_file(file_obj: BinaryIO, chunk_size: int = DEFAULT_HASH_CHUNK_SIZE_BYTES) -> tuple[str, int]:
+    """
+    Hash a file-like object one chunk at a time, then seek it back to its start.
+
+    :return: The hex SHA-256 digest of the file's content, and its size in bytes.
+    """
+    digest = hashlib.sha256()
+    size = 0
+    while chunk := file_obj.read(chunk_size):
+        digest.update(chunk)
+        size += len(chunk)
+    file_obj.seek(0)
+    return digest.hexdigest(), size
+
+
+def upload_s3_object_deduplicated(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    file_obj: BinaryIO,
+    content_type: Optional[str] = None,
+    part_size_bytes: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    max_concurrency: int = DEFAULT_MULTIPART_MAX_CONCURRENCY,
+    cancel_event: Optional[threading.Event] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[bool, str]:
+    """
+    Upload a file-like object as a pointer to its content, uploading the content only if the bucket lacks it.
+
+    The file is hashed in one pass before anything is sent to S3, since the digest decides whether the
+    content is sent at all. That pass reads the file where the request body was spooled to, in memory or
+    on local disk, before the route ran, so it costs no S3 request. If the bucket already holds a content
+    with the same digest, the upload costs five small requests whatever the size of the file: a HEAD of
+    the pointer it replaces, a PUT of its reference, a LIST of release markers, a HEAD of the content and
+    a PUT of the pointer. Otherwise the content is uploaded like `upload_s3_object_from_file` uploads a file.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path of the file in the S3 bucket, where its pointer is written.
+    :param file_obj: A readable, seekable binary file-like object positioned at its start.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param part_size_bytes: Size of each part when the content is uploaded with a multipart upload.
+    :param max_concurrency: Maximum number of parts uploaded at the same time.
+    :param cancel_event: Optional event that aborts the upload when set; see `upload_s3_object_from_file`.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: Whether the file was created rather than replaced, and the digest of its content.
+    """
+    s3_client = s3_client or get_s3_client()
+    digest, size = hash_file(file_obj)
+    previous_digest = get_pointer_digests(bucket_name, [object_key], s3_client=s3_client).get(object_key)
+
+    # referenced before the content is looked up, so that releasing its other references cannot delete it
+    add_reference(bucket_name, digest, object_key, s3_client=s3_client)
+    try:
+        wait_for_content_releases(bucket_name, digest, cancel_event=cancel_event, s3_client=s3_client)
+        content_key = get_content_key(digest)
+        if not object_exists_in_s3(bucket_name, content_key, s3_client=s3_client):
+            file_obj.seek(0)
+            upload_s3_object_from_file(
+                bucket_name,
+                content_key,
+                file_obj,
+                content_type,
+                part_size_bytes,
+                max_concurrency,
+                cancel_event,
+                s3_client,
+            )
+        created = upsert_s3_object(
+            bucket_name,
+            object_key,
+            b"",
+            content_type,
+            metadata={POINTER_DIGEST_METADATA_KEY: digest, POINTER_SIZE_METADATA_KEY: str(size)},
+            s3_client=s3_client,
+        )
+    except BaseException:
+        # the pointer was not written, so the reference added above refers to nothing
+        if previous_digest != digest:
+            release_reference(bucket_name, digest, object_key, s3_client=s3_client)
+        raise
+
+    if previous_digest is not None and previous_digest != digest:
+        release_reference(bucket_name, previous_digest, object_key, s3_client=s3_client)
+    return created, digest
+
+
+def wait_for_content_releases(
+    bucket_name: str,
+    digest: str,
+    marker_ttl_seconds: float = DEFAULT_RELEASE_MARKER_TTL_SECONDS,
+    cancel_event: Optional[threading.Event] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> None:
+    """
+    Wait until no `release_reference` that may delete the content with the given digest is in progress.
+
+    A release marker older than `marker_ttl_seconds` was left behind by a release that failed, and is ignored.
+
+    :raises UploadCancelledError: If `cancel_event` was set while waiting.
+    """
+    s3_client = s3_client or get_s3_client()
+    while True:
+        markers, _ = fetch_s3_objects_metadata(bucket_name, prefix=f"{RELEASES_PREFIX}{digest}/", s3_client=s3_client)
+        now = datetime.now(timezone.utc)
+        if all((now - marker["LastModified"]).total_seconds() >= marker_ttl_seconds for marker in markers):
+            return
+        if cancel_event is not None and cancel_event.is_set():
+            raise UploadCancelledError(f"Upload of the content {digest} was cancelled")
+        time.sleep(RELEASE_POLL_INTERVAL_SECONDS)
+
+
+def add_reference(bucket_name: str, digest: str, object_key: str, s3_client: Optional["S3Client"] = None) -> None:
+    """Record that the file at `object_key` points to the content with the given digest."""
+    s3_client = s3_client or get_s3_client()
+    # the file's key as the body, so that a reference left behind can be traced back to its file
+    s3_client.put_object(Bucket=bucket_name, Key=get_reference_key(digest, object_key), Body=object_key.encode())
+
+
+def release_reference(bucket_name: str, digest: str, object_key: str, s3_client: Optional["S3Client"] = None) -> bool:
+    """
+    Delete the reference of the file at `object_key` to a content, and the content if no other file refers to it.
+
+    Before deleting the content, a release marker is written and the references are listed again: an
+    upload that referenced the content in between keeps it, and an upload that references it afterwards
+    waits for the marker to be deleted (see `wait_for_content_releases`) before it looks the content up.
+
+    :return: True if the content was deleted.
+    """
+    s3_client = s3_client or get_s3_client()
+    s3_client.delete_object(Bucket=bucket_name, Key=get_reference_key(digest, object_key))
+    if _has_references(bucket_name, digest, s3_client):
+        return False
+    marker_key = f"{RELEASES_PREFIX}{digest}/{uuid.uuid4().hex}"
+    s3_client.put_object(Bucket=bucket_name, Key=marker_key, Body=b"")
+    try:
+        if _has_references(bucket_name, digest, s3_client):
+            return False
+        delete_s3_object(bucket_name, get_content_key(digest), s3_client=s3_client)
+        return True
+    finally:
+        s3_client.delete_object(Bucket=bucket_name, Key=marker_key)
+
+
+def _has_references(bucket_name: str, digest: str, s3_client: "S3Client") -> bool:
+    references, _ = fetch_s3_objects_metadata(
+        bucket_name, prefix=f"{REFERENCES_PREFIX}{digest}/", max_keys=1, s3_client=s3_client
+    )
+    return bool(references)
+
+
+def release_references(
+    bucket_name: str,
+    digest_by_key: Dict[str, str],
+    max_concurrency: int = DEFAULT_POINTER_HEAD_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> List[str]:
+    """
+    Release the references of several deleted pointers at once; see `release_reference`.
+
+    :param digest_by_key: Digest of the content each deleted file pointed to, keyed by the file's key.
+
+    :return: Digests of the contents that were deleted.
+    """
+    s3_client = s3_client or get_s3_client()
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-cas") as executor:
+        deleted = executor.map(
+            lambda item: release_reference(bucket_name, item[1], item[0], s3_client=s3_client), digest_by_key.items()
+        )
+        return [digest for digest, was_deleted in zip(digest_by_key.values(), deleted) if was_deleted]
+
+
+def add_copy_references(
+    bucket_name: str,
+    destination_by_source: Dict[str, str],
+    digests: Optional[Dict[str, str]] = None,
+    max_concurrency: int = DEFAULT_POINTER_HEAD_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[Dict[str, str], Dict[str, str]]:
+    """
+    Make the copies of pointers, which are pointers too, reference their contents before the copies are made.
+
+    :param destination_by_source: Key of each copy, keyed by the key of the object to copy.
+    :param digests: Digest of every pointer among the keys, if already known; otherwise every key is looked up.
+
+    :return: Tuple of
+        1. The digest each pointer to copy points to, keyed by its key.
+        2. The digest each pointer the copies will replace points to, keyed by its key, for the pointers
+           whose content differs from their replacement's. Their references are released once the copies are made.
+    """
+    s3_client = s3_client or get_s3_client()
+    if digests is None:
+        keys = list({*destination_by_source, *destination_by_source.values()})
+        digests = get_pointer_digests(bucket_name, keys, max_concurrency=max_concurrency, s3_client=s3_client)
+    source_digests = {source: digests[source] for source in destination_by_source if source in digests}
+    replaced_digests = {
+        destination: digests[destination]
+        for source, destination in destination_by_source.items()
+        if destination in digests and digests[destination] != source_digests.get(source)
+    }
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-cas") as executor:
+        for future in [
+            executor.submit(add_reference, bucket_name, digest, destination_by_source[source], s3_client=s3_client)
+            for source, digest in source_digests.items()
+        ]:
+            future.result()
+    return source_digests, replaced_digests
+
+
+def add_prefix_copy_references(
+    bucket_name: str,
+    source_prefix: str,
+    destination_prefix: str,
+    max_concurrency: int = DEFAULT_POINTER_HEAD_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[Dict[str, str], Dict[str, str]]:
+    """Like `add_copy_references`, for the copy of every object under `source_prefix` to `destination_prefix`."""
+    s3_client = s3_client or get_s3_client()
+    source_objects = [
+        s3_object
+        for s3_object in iter_s3_objects(bucket_name, source_prefix, s3_client=s3_client)
+        if not is_content_addressed_key(s3_object["Key"])
+    ]
+    destination_by_source = {
+        s3_object["Key"]: destination_prefix + s3_object["Key"].removeprefix(source_prefix)
+        for s3_object in source_objects
+    }
+    empty_source_keys = [s3_object["Key"] for s3_object in source_objects if s3_object["Size"] == 0]
+    digests = {
+        **get_pointer_digests_with_prefix(
+            bucket_name, destination_prefix, max_concurrency=max_concurrency, s3_client=s3_client
+        ),
+        **get_pointer_digests(bucket_name, empty_source_keys, max_concurrency=max_concurrency, s3_client=s3_client),
+    }
+    return add_copy_references(
+        bucket_name, destination_by_source, digests=digests, max_concurrency=max_concurrency, s3_client=s3_client
+    )
+
+
+def _head_pointer_metadata(bucket_name: str, object_key: str, s3_client: "S3Client") -> Optional[Dict[str, str]]:
+    """Return the user-defined metadata of the pointer at `object_key`, or None if it is missing or not a pointer."""
+    try:
+        response = s3_client.head_object(Bucket=bucket_name, Key=object_key)
+    except ClientError as err:
+        if err.response["Error"]["Code"] == "404":
+            return None
+        raise
+    return response["Metadata"] if get_pointer_digest(response) is not None else None
+
+
+def get_pointer_digests(
+    bucket_name: str,
+    object_keys: List[str],
+    max_concurrency: int = DEFAULT_POINTER_HEAD_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> Dict[str, str]:
+    """Return the digest each of `object_keys` points to, leaving out keys that are missing or not pointers."""
+    s3_client = s3_client or get_s3_client()
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-cas") as executor:
+        metadata = executor.map(lambda key: _head_pointer_metadata(bucket_name, key, s3_client), object_keys)
+        return {
+            key: pointer_metadata[POINTER_DIGEST_METADATA_KEY]
+            for key, pointer_metadata in zip(object_keys, metadata)
+            if pointer_metadata is not None
+        }
+
+
+def get_pointer_digests_with_prefix(
+    bucket_name: str,
+    prefix: str,
+    max_concurrency: int = DEFAULT_POINTER_HEAD_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> Dict[str, str]:
+    """Return the digest every pointer whose key starts with `prefix` points to, keyed by the pointer's key."""
+    s3_client = s3_client or get_s3_client()
+    # pointers are empty, so only empty objects need a HEAD
+    candidate_keys = [
+        s3_object["Key"]
+        for s3_object in iter_s3_objects(bucket_name, prefix, s3_client=s3_client)
+        if s3_object["Size"] == 0 and not is_content_addressed_key(s3_object["Key"])
+    ]
+    return get_pointer_digests(bucket_name, candidate_keys, max_concurrency=max_concurrency, s3_client=s3_client)
+
+
+def resolve_listed_pointers(
+    bucket_name: str,
+    s3_objects: List["ObjectTypeDef"],
+    max_concurrency: int = DEFAULT_POINTER_HEAD_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> List["ObjectTypeDef"]:
+    """
+    Turn a listing of S3 into a listing of files, reporting pointers with the size of their content.
+
+    The objects of the content-addressed storage itself are left out.
+    """
+    s3_client = s3_client or get_s3_client()
+    s3_objects = [s3_object for s3_object in s3_objects if not is_content_addressed_key(s3_object["Key"])]
+    empty_keys = [s3_object["Key"] for s3_object in s3_objects if s3_object["Size"] == 0]
+    if not empty_keys:
+        return s3_objects
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-cas") as executor:
+        metadata_by_key = dict(
+            zip(empty_keys, executor.map(lambda key: _head_pointer_metadata(bucket_name, key, s3_client), empty_keys))
+        )
+    resolved = []
+    for s3_object in s3_objects:
+        pointer_metadata = metadata_by_key.get(s3_object["Key"])
+        if pointer_metadata is not None:
+            s3_object = {**s3_object, "Size": int(pointer_metadata[POINTER_SIZE_METADATA_KEY])}  # type: ignore[misc]
+        resolved.append(s3_object)
+    return resolved
@@ -0,0 +1,282 @@
+"""
+Functions for copying and moving objects within an S3 bucket.
+
+The copies are made by S3 itself, so no content passes through the API. `CopyObject` copies objects
+up to 5 GiB in one request; larger objects are copied as a multipart upload whose parts are copied
+from ranges of the source with `UploadPartCopy`. S3 has no rename, so a move is a copy followed by
+deleting the source.
+"""
+
+import math
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import (
+    Iterator,
+    List,
+    Optional,
+    Set,
+)
+
+from botocore.exceptions import ClientError
+
+from files_api.s3.clients import get_s3_client
+from files_api.s3.delete_objects import (
+    delete_s3_object,
+    delete_s3_objects,
+)
+from files_api.s3.read_objects import iter_s3_objects
+from files_api.s3.write_objects import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+    create_multipart_upload,
+)
+
+try:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import (
+        CompletedPartTypeDef,
+        ErrorTypeDef,
+    )
+except ImportError:
+    ...
+
+# the largest object S3 copies with one CopyObject request
+MAX_COPY_OBJECT_SIZE_BYTES = 5 * 1024**3
+MAX_MULTIPART_UPLOAD_PARTS = 10_000
+DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES = 512 * 1024**2
+DEFAULT_COPY_MAX_CONCURRENCY = 8
+
+
+def copy_s3_object(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    source_key: str,
+    destination_key: str,
+    source_size_bytes: Optional[int] = None,
+    part_size_bytes: int = DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+    max_concurrency: int = DEFAULT_COPY_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> None:
+    """
+    Copy an object, overwriting the destination if it exists.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param source_key: Key of the object to copy.
+    :param destination_key: Key to copy the object to.
+    :param source_size_bytes: Size of the source if already known, e.g. from a listing. Otherwise
+        the source is HEADed first to find out whether it fits in one `CopyObject` request.
+    :param part_size_bytes: Size of the parts of a multipart copy, raised if needed to stay within
+        S3's limit of 10,000 parts.
+    :param max_concurrency: Maximum number of parts of a multipart copy copied at the same time.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+    """
+    s3_client = s3_client or get_s3_client()
+    if source_size_bytes is not None and source_size_bytes <= MAX_COPY_OBJECT_SIZE_BYTES:
+        s3_client.copy_object(
+            Bucket=bucket_name, Key=destination_key, CopySource={"Bucket": bucket_name, "Key": source_key}
+        )
+        return
+
+    head_object_response = s3_client.head_object(Bucket=bucket_name, Key=source_key)
+    source_size_bytes = head_object_response["ContentLength"]
+    if source_size_bytes <= MAX_COPY_OBJECT_SIZE_BYTES:
+        s3_client.copy_object(
+            Bucket=bucket_name,
+            Key=destination_key,
+            CopySource={"Bucket": bucket_name, "Key": source_key},
+            CopySourceIfMatch=head_object_response["ETag"],
+        )
+        return
+
+    upload_id = create_multipart_upload(
+        bucket_name, destination_key, content_type=head_object_response.get("ContentType"), s3_client=s3_client
+    )
+    try:
+        parts = _copy_parts_concurrently(
+            bucket_name,
+            source_key,
+            destination_key,
+            upload_id,
+            source_size_bytes=source_size_bytes,
+            part_size_bytes=max(part_size_bytes, math.ceil(source_size_bytes / MAX_MULTIPART_UPLOAD_PARTS)),
+            max_concurrency=max_concurrency,
+            # every part must come from the same version of the source
+            source_etag=head_object_response["ETag"],
+            s3_client=s3_client,
+        )
+        complete_multipart_upload(bucket_name, destination_key, upload_id, parts, s3_client=s3_client)
+    except BaseException:
+        abort_multipart_upload(bucket_name, destination_key, upload_id, s3_client=s3_client)
+        raise
+
+
+def _copy_parts_concurrently(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    source_key: str,
+    destination_key: str,
+    upload_id: str,
+    source_size_bytes: int,
+    part_size_bytes: int,
+    max_concurrency: int,
+    source_etag: str,
+    s3_client: "S3Client",
+) -> List["CompletedPartTypeDef"]:
+    def copy_part(part_number: int, first_byte: int) -> "CompletedPartTypeDef":
+        last_byte = min(first_byte + part_size_bytes, source_size_bytes) - 1
+        response = s3_client.upload_part_copy(
+            Bucket=bucket_name,
+            Key=destination_key,
+            UploadId=upload_id,
+            PartNumber=part_number,
+            CopySource={"Bucket": bucket_name, "Key": source_key},
+            CopySourceRange=f"bytes={first_byte}-{last_byte}",
+            CopySourceIfMatch=source_etag,
+        )
+        return {"PartNumber": part_number, "ETag": response["CopyPartResult"]["ETag"]}
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-copy-part") as executor:
+        futures = [
+            executor.submit(copy_part, part_number, first_byte)
+            for part_number, first_byte in enumerate(range(0, source_size_bytes, part_size_bytes), start=1)
+        ]
+        try:
+            parts = [future.result() for future in as_completed(futures)]
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    return sorted(parts, key=lambda part: part["PartNumber"])
+
+
+def move_s3_object(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    source_key: str,
+    destination_key: str,
+    part_size_bytes: int = DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+    max_concurrency: int = DEFAULT_COPY_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+    source_size_bytes: Optional[int] = None,
+) -> None:
+    """
+    Move an object by copying it and then deleting the source.
+
+    The two steps are not atomic: until the source is deleted, the object exists under both keys.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param source_key: Key of the object to move.
+    :param destination_key: Key to move the object to; must differ from `source_key`.
+    :param source_size_bytes: See `copy_s3_object`.
+    :param part_size_bytes: See `copy_s3_object`.
+    :param max_concurrency: See `copy_s3_object`.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+    """
+    if source_key == destination_key:
+        raise ValueError("Cannot move an object onto itself")
+    s3_client = s3_client or get_s3_client()
+    copy_s3_object(
+        bucket_name,
+        source_key,
+        destination_key,
+        source_size_bytes=source_size_bytes,
+        part_size_bytes=part_size_bytes,
+        max_concurrency=max_concurrency,
+        s3_client=s3_client,
+    )
+    delete_s3_object(bucket_name, source_key, s3_client=s3_client)
+
+
+def copy_s3_objects_with_prefix(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    source_prefix: str,
+    destination_prefix: str,
+    delete_sources: bool = False,
+    part_size_bytes: int = DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+    max_concurrency: int = DEFAULT_COPY_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[int, List["ErrorTypeDef"]]:
+    """
+    Copy or move every object whose key starts with `source_prefix` to the same key under `destination_prefix`.
+
+    Up to `max_concurrency` objects are copied at once, starting while the rest are still listed.
+    With `delete_sources`, the sources that were copied are deleted in batches afterwards.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param source_prefix: Prefix of the keys to copy.
+    :param destination_prefix: Prefix to replace `source_prefix` with; the two must not overlap.
+    :param delete_sources: Whether to move the objects instead of copying them.
+    :param part_size_bytes: See `copy_s3_object`.
+    :param max_concurrency: Maximum number of objects, and of parts of each large object, copied at the same time.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: Tuple of
+        1. Number of objects copied, or moved.
+        2. The source keys that failed to copy, or to be deleted, each with an error `Code` and `Message`.
+    """
+    if source_prefix.startswith(destination_prefix) or destination_prefix.startswith(source_prefix):
+        raise ValueError("The source and destination prefixes must not overlap")
+    s3_client = s3_client or get_s3_client()
+    copied_keys, failures = _copy_objects_concurrently(
+        bucket_name, source_prefix, destination_prefix, part_size_bytes, max_concurrency, s3_client
+    )
+
+    if not delete_sources:
+        return len(copied_keys), failures
+
+    _, delete_failures = delete_s3_objects(bucket_name, copied_keys, s3_client=s3_client)
+    return len(copied_keys) - len(delete_failures), failures + delete_failures
+
+
+def _copy_objects_concurrently(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    source_prefix: str,
+    destination_prefix: str,
+    part_size_bytes: int,
+    max_concurrency: int,
+    s3_client: "S3Client",
+) -> tuple[List[str], List["ErrorTypeDef"]]:
+    """Copy the objects under `source_prefix` as they are listed; return the keys copied and the failures."""
+    copied_keys: List[str] = []
+    failures: List["ErrorTypeDef"] = []
+    in_flight: Set[Future] = set()
+
+    def copy(source_key: str, source_size_bytes: int) -> Optional["ErrorTypeDef"]:
+        try:
+            copy_s3_object(
+                bucket_name,
+                source_key,
+                destination_prefix + source_key.removeprefix(source_prefix),
+                source_size_bytes=source_size_bytes,
+                part_size_bytes=part_size_bytes,
+                max_concurrency=max_concurrency,
+                s3_client=s3_client,
+            )
+        except ClientError as err:
+            return {
+                "Key": source_key,
+                "Code": err.response["Error"]["Code"],
+                "Message": err.response["Error"]["Message"],
+            }
+        copied_keys.append(source_key)
+        return None
+
+    def collect_failures(futures: Iterator[Future]) -> None:
+        failures.extend(failure for future in futures if (failure := future.result()) is not None)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-copy-objects") as executor:
+        try:
+            for s3_object in iter_s3_objects(bucket_name, source_prefix, s3_client=s3_client):
+                if len(in_flight) >= max_concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect_failures(iter(done))
+                in_flight.add(executor.submit(copy, s3_object["Key"], s3_object["Size"]))
+            collect_failures(as_completed(in_flight))
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            raise
+    return copied_keys, failures
@@ -1,14 +1,34 @@
 """Functions for deleting objects from an S3 bucket--the "D" in CRUD."""
 
-from typing import Optional
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from itertools import islice
+from typing import (
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+)
 
-import boto3
+from files_api.s3.clients import get_s3_client
+from files_api.s3.read_objects import iter_s3_objects
 
 try:
     from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import ErrorTypeDef
 except ImportError:
     ...
 
+# the most keys S3 accepts in one DeleteObjects request
+MAX_KEYS_PER_DELETE_OBJECTS = 1000
+DEFAULT_BULK_DELETE_MAX_CONCURRENCY = 4
+
 
 def delete_s3_object(bucket_name: str, object_key: str, s3_client: Optional["S3Client"] = None) -> None:
     """
@@ -16,7 +36,111 @@ def delete_s3_object(bucket_name: str, object_key: str, s3_client: Optional["S3C
 
     :param bucket_name: Name of the S3 bucket.
     :param object_key: Key of the object to delete.
-    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
     """
-    s3_client = s3_client or boto3.client("s3")
+    s3_client = s3_client or get_s3_client()
     s3_client.delete_object(Bucket=bucket_name, Key=object_key)
+
+
+def delete_s3_object_batch(
+    bucket_name: str, object_keys: List[str], s3_client: Optional["S3Client"] = None
+) -> List["ErrorTypeDef"]:
+    """
+    Delete up to `MAX_KEYS_PER_DELETE_OBJECTS` objects with one `DeleteObjects` request.
+
+    S3 reports keys that do not exist as deleted, like `delete_object` does.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_keys: Keys of the objects to delete.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: The keys S3 failed to delete, each with an error `Code` and `Message`.
+    """
+    s3_client = s3_client or get_s3_client()
+    response = s3_client.delete_objects(
+        Bucket=bucket_name,
+        # quiet mode leaves the deleted keys out of the response, which then only lists failures
+        Delete={"Objects": [{"Key": object_key} for object_key in object_keys], "Quiet": True},
+    )
+    return response.get("Errors", [])
+
+
+def delete_s3_objects(
+    bucket_name: str,
+    object_keys: Iterable[str],
+    max_concurrency: int = DEFAULT_BULK_DELETE_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[int, List["ErrorTypeDef"]]:
+    """
+    Delete objects in batches of `MAX_KEYS_PER_DELETE_OBJECTS`, sending up to `max_concurrency` batches at once.
+
+    `object_keys` is consumed lazily, so keys that are still being listed are deleted as each batch fills up.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_keys: Keys of the objects to delete.
+    :param max_concurrency: Maximum number of `DeleteObjects` requests in flight.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: Tuple of
+        1. Number of keys deleted.
+        2. The keys S3 failed to delete, each with an error `Code` and `Message`.
+    """
+    s3_client = s3_client or get_s3_client()
+    num_keys = 0
+    failures: List["ErrorTypeDef"] = []
+    in_flight: Set[Future] = set()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-delete-objects") as executor:
+        try:
+            for batch in _iter_batches(object_keys, MAX_KEYS_PER_DELETE_OBJECTS):
+                # wait for a free slot before reading the next batch of keys
+                if len(in_flight) >= max_concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    failures.extend(failure for future in done for failure in future.result())
+
+                num_keys += len(batch)
+                in_flight.add(executor.submit(delete_s3_object_batch, bucket_name, batch, s3_client=s3_client))
+
+            failures.extend(failure for future in as_completed(in_flight) for failure in future.result())
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            raise
+
+    return num_keys - len(failures), failures
+
+
+def delete_s3_objects_with_prefix(
+    bucket_name: str,
+    prefix: str,
+    max_concurrency: int = DEFAULT_BULK_DELETE_MAX_CONCURRENCY,
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[int, List["ErrorTypeDef"]]:
+    """
+    Delete every object whose key starts with `prefix`, deleting each listed page while the next is listed.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param prefix: Prefix of the keys to delete.
+    :param max_concurrency: Maximum number of `DeleteObjects` requests in flight.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: Same as `delete_s3_objects`.
+    """
+    s3_client = s3_client or get_s3_client()
+    return delete_s3_objects(
+        bucket_name,
+        (
+            s3_object["Key"]
+            for s3_object in iter_s3_objects(
+                bucket_name, prefix, page_size=MAX_KEYS_PER_DELETE_OBJECTS, s3_client=s3_client
+            )
+        ),
+        max_concurrency=max_concurrency,
+        s3_client=s3_client,
+    )
+
+
+def _iter_batches(items: Iterable[str], batch_size: int) -> Iterator[List[str]]:
+    iterator = iter(items)
+    while batch := list(islice(iterator, batch_size)):
+        yield batch
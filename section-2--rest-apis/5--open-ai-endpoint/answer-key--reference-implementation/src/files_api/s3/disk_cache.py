@@ -0,0 +1,252 @@
+"""
+Read-through cache of whole S3 objects on local disk.
+
+A few hot files usually make up most downloads. With this cache, the first download of a file
+writes its bytes to disk while they are streamed to the client, and later downloads of the same
+version of the file are sent from disk, which the OS serves from its page cache, instead of being
+downloaded from S3 again.
+
+Entries are keyed by bucket and key and remember the object's ETag. Before sending a cached file,
+readers compare it with the object's current ETag (from a HEAD, which the metadata cache usually
+answers) so a file that changed in S3 is never served from disk. Files that are not cached cost no
+extra round trip: they are cached from the same GET that sends them to the client. The cache holds at most `max_bytes`; to make room it evicts the least
+recently used entry (`LRU`) or the least frequently used one (`LFU`, which keeps hot files cached
+through a scan of many cold ones).
+
+A file being sent from disk when its entry is evicted is only deleted once the last reader releases
+it, so evictions never cut a download short. The index of entries lives in memory, so each cache
+keeps its files in a directory of its own, which is deleted when the cache is closed. That way API
+processes can share a cache directory, e.g. the workers of one server.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import (
+    dataclass,
+    field,
+)
+from enum import Enum
+from typing import (
+    Dict,
+    Optional,
+    Set,
+)
+
+from files_api.cache import CacheCounters
+
+DEFAULT_DISK_CACHE_MAX_BYTES = 1024**3
+DEFAULT_DISK_CACHE_MAX_OBJECT_SIZE_BYTES = 64 * 1024 * 1024
+
+
+class DiskCacheEviction(str, Enum):
+    """Which entry the disk cache evicts to make room."""
+
+    LRU = "lru"
+    LFU = "lfu"
+
+
+@dataclass
+class DiskCacheEntry:  # pylint: disable=too-many-instance-attributes
+    """A cached object: the file holding its bytes, and the metadata it is served with."""
+
+    path: str
+    etag: str
+    content_type: str
+    size_bytes: int
+    last_modified: str
+    hits: int = 0
+    last_used_at: float = field(default_factory=time.monotonic)
+    readers: int = 0
+    evicted: bool = False
+
+
+class DiskCacheFill:
+    """
+    Writes the bytes of an object to a temporary file while they are downloaded.
+
+    Call `commit` once every byte was written, to add the file to the cache, or `abort` to discard it.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        cache: "S3ObjectDiskCache",
+        key: tuple[str, str],
+        etag: str,
+        content_type: str,
+        size_bytes: int,
+        last_modified: str,
+    ):
+        self.cache = cache
+        self.key = key
+        self.entry = DiskCacheEntry(
+            path="", etag=etag, content_type=content_type, size_bytes=size_bytes, last_modified=last_modified
+        )
+        file_descriptor, self.entry.path = tempfile.mkstemp(dir=cache.directory)
+        self._file = os.fdopen(file_descriptor, "wb")
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def commit(self) -> bool:
+        """Add the written file to the cache, returning False if it was incomplete and discarded instead."""
+        self._file.close()
+        if self.bytes_written != self.entry.size_bytes:
+            self.abort()
+            return False
+        self.cache._add(self.key, self.entry)  # pylint: disable=protected-access
+        return True
+
+    def abort(self) -> None:
+        self._file.close()
+        _remove_file(self.entry.path)
+        self.cache._end_fill(self.key)  # pylint: disable=protected-access
+
+
+class S3ObjectDiskCache:  # pylint: disable=too-many-instance-attributes
+    """Cache of S3 objects, of at most `max_bytes`, in a new directory under `directory`; safe to use from threads."""
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = DEFAULT_DISK_CACHE_MAX_BYTES,
+        max_object_size_bytes: int = DEFAULT_DISK_CACHE_MAX_OBJECT_SIZE_BYTES,
+        eviction: DiskCacheEviction = DiskCacheEviction.LRU,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="files-api-cache-", dir=directory)
+        self.max_bytes = max_bytes
+        self.max_object_size_bytes = min(max_object_size_bytes, max_bytes)
+        self.eviction = eviction
+        self._entries: OrderedDict[tuple[str, str], DiskCacheEntry] = OrderedDict()
+        self._filling: Set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self.size_bytes = 0
+        self.counters = CacheCounters()
+
+    def get_cached_etag(self, bucket_name: str, object_key: str) -> Optional[str]:
+        """Return the ETag of the object's cached version, or None (counting a miss) if it is not cached."""
+        with self._lock:
+            entry = self._entries.get((bucket_name, object_key))
+            if entry is None:
+                self.counters.misses += 1
+                return None
+            return entry.etag
+
+    def acquire(self, bucket_name: str, object_key: str, etag: str) -> Optional[DiskCacheEntry]:
+        """
+        Return the cached entry of the object's version with `etag`, or None if it is not cached.
+
+        The entry's file stays on disk until it is passed to `release`, even if the entry is evicted.
+        An entry of another version of the object is stale, and is dropped.
+        """
+        key = (bucket_name, object_key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.etag != etag:
+                self._evict(key)
+                entry = None
+            if entry is None:
+                self.counters.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            entry.hits += 1
+            entry.last_used_at = time.monotonic()
+            entry.readers += 1
+            self.counters.hits += 1
+            return entry
+
+    def release(self, entry: DiskCacheEntry) -> None:
+        """Let an entry returned by `acquire` be deleted, once it was evicted and has no other readers."""
+        with self._lock:
+            entry.readers -= 1
+            remove = entry.evicted and entry.readers == 0
+        if remove:
+            _remove_file(entry.path)
+
+    def start_fill(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        object_key: str,
+        etag: str,
+        content_type: str,
+        size_bytes: int,
+        last_modified: str,
+    ) -> Optional[DiskCacheFill]:
+        """Start caching an object as it is downloaded, or return None if it is too large or already being cached."""
+        key = (bucket_name, object_key)
+        if size_bytes > self.max_object_size_bytes:
+            return None
+        with self._lock:
+            if key in self._filling:
+                return None
+            self._filling.add(key)
+        try:
+            return DiskCacheFill(self, key, etag, content_type, size_bytes, last_modified)
+        except OSError:
+            self._end_fill(key)
+            raise
+
+    def _add(self, key: tuple[str, str], entry: DiskCacheEntry) -> None:
+        with self._lock:
+            self._filling.discard(key)
+            if key in self._entries:
+                self._evict(key)
+            while self._entries and self.size_bytes + entry.size_bytes > self.max_bytes:
+                self._evict(self._choose_victim())
+                self.counters.evictions += 1
+            self._entries[key] = entry
+            self.size_bytes += entry.size_bytes
+
+    def _end_fill(self, key: tuple[str, str]) -> None:
+        with self._lock:
+            self._filling.discard(key)
+
+    def _choose_victim(self) -> tuple[str, str]:
+        if self.eviction == DiskCacheEviction.LFU:
+            # a scan of every entry; a byte budget of whole files keeps the number of entries small
+            return min(self._entries, key=lambda key: (self._entries[key].hits, self._entries[key].last_used_at))
+        return next(iter(self._entries))
+
+    def _evict(self, key: tuple[str, str]) -> None:
+        """Drop an entry, deleting its file now or, if it is being read, when its last reader releases it."""
+        entry = self._entries.pop(key)
+        self.size_bytes -= entry.size_bytes
+        entry.evicted = True
+        if entry.readers == 0:
+            _remove_file(entry.path)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+
+    def close(self) -> None:
+        """Drop every entry and delete the cache's directory."""
+        self.clear()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Return a snapshot of the cache's size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+                **self.counters.as_dict(),
+            }
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,92 @@
+"""
+Bounded, instrumented thread pool for running blocking boto3 calls off the event loop.
+
+The pool is sized to the S3 client's connection pool: each worker holds at most one connection,
+so extra threads would only block waiting for a free connection.
+
+The metrics tell two different problems apart:
+
+- **Saturation**: `queued` stays above zero and `wait_seconds` grows; requests wait for a free worker.
+- **Slow S3**: `queued` stays near zero but `run_seconds` grows; workers are free but S3 is slow.
+"""
+
+import asyncio
+import threading
+import time
+from collections import Counter
+from concurrent.futures import (
+    Future,
+    ThreadPoolExecutor,
+)
+from typing import (
+    Callable,
+    Dict,
+    TypeVar,
+)
+
+from files_api.metrics import Histogram
+
+T = TypeVar("T")
+
+
+class S3Executor:
+    """Run blocking functions on a dedicated thread pool and await their results from async code."""
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "s3-executor"):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._lock = threading.Lock()
+        # the number of jobs "queued", "active" and "completed", updated under the lock
+        self._job_counts: Counter[str] = Counter()
+        self.wait_seconds = Histogram()
+        self.run_seconds = Histogram()
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """
+        Run `func(*args, **kwargs)` on the pool and wait for its result without blocking the event loop.
+
+        :param func: The blocking function to run.
+
+        :return: The return value of `func`.
+        """
+        submitted_at = time.perf_counter()
+
+        def call() -> T:
+            started_at = time.perf_counter()
+            with self._lock:
+                self._job_counts["queued"] -= 1
+                self._job_counts["active"] += 1
+            self.wait_seconds.observe(started_at - submitted_at)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self._job_counts["active"] -= 1
+                    self._job_counts["completed"] += 1
+                self.run_seconds.observe(time.perf_counter() - started_at)
+
+        with self._lock:
+            self._job_counts["queued"] += 1
+        future = self._executor.submit(call)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future: Future) -> None:
+        # a job cancelled while still queued never runs `call`, so it never leaves the queue on its own
+        if future.cancelled():
+            with self._lock:
+                self._job_counts["queued"] -= 1
+
+    def stats(self) -> Dict:
+        """Return a snapshot of the pool's load and latency metrics."""
+        with self._lock:
+            job_counts = {name: self._job_counts[name] for name in ("queued", "active", "completed")}
+        return {
+            "max_workers": self.max_workers,
+            **job_counts,
+            "wait_seconds": self.wait_seconds.snapshot(),
+            "run_seconds": self.run_seconds.snapshot(),
+        }
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,89 @@
+"""
+Speculative prefetch of the next page of a listing.
+
+Clients of `GET /v1/files` almost always request the page at `next_page_token` right after the
+previous page arrives. So as soon as a listing call returns a continuation token, the S3 backends
+request the page it points to in the background, and keep the pending request here, keyed by the
+token, for the client's next request to take. A request that arrives while its page is still being
+fetched waits for that fetch rather than starting another.
+
+Pages nobody takes within `ttl_seconds`, or that `max_entries` newer ones push out, are dropped;
+the cache's hits and misses tell how many follow-up requests were answered from memory. Writes and
+deletes made through the backend drop the prefetched pages of their bucket, as they drop the
+metadata cache's listing pages.
+"""
+
+import asyncio
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Hashable,
+    Optional,
+    Set,
+)
+
+from files_api.cache import TTLCache
+
+DEFAULT_LISTING_PREFETCH_MAX_ENTRIES = 1000
+DEFAULT_LISTING_PREFETCH_TTL_SECONDS = 30.0
+
+
+class S3ListingPrefetcher:
+    """Pending fetches of listing pages, keyed by bucket, continuation token and the rest of the query."""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_LISTING_PREFETCH_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_LISTING_PREFETCH_TTL_SECONDS,
+    ):
+        self.pages: TTLCache[tuple[str, str, Hashable], "asyncio.Task[Any]"] = TTLCache(max_entries, ttl_seconds)
+        self.prefetched = 0
+        self._tasks: Set["asyncio.Task[Any]"] = set()
+
+    def prefetch(
+        self, bucket_name: str, continuation_token: str, query: Hashable, fetch: Callable[[], Awaitable[Any]]
+    ) -> None:
+        """Start `fetch`ing the page at `continuation_token` in the background, unless it already was."""
+        key = (bucket_name, continuation_token, query)
+        if self.pages.max_entries <= 0 or self.pages.peek(key) is not None:
+            return
+        task = asyncio.ensure_future(fetch())
+        self._tasks.add(task)
+        task.add_done_callback(self._forget_task)
+        self.pages.set(key, task)
+        self.prefetched += 1
+
+    def take(self, bucket_name: str, continuation_token: str, query: Hashable) -> Optional["asyncio.Task[Any]"]:
+        """Return the prefetch of the page at `continuation_token` and forget it, or None if there is none."""
+        key = (bucket_name, continuation_token, query)
+        task = self.pages.get(key)
+        if task is not None:
+            self.pages.delete(key)
+        return task
+
+    def invalidate(self, bucket_name: str) -> None:
+        """Drop the prefetched pages of a bucket whose contents changed."""
+        self.pages.delete_where(lambda key: key[0] == bucket_name)
+
+    def close(self) -> None:
+        """Cancel the fetches still running."""
+        for task in list(self._tasks):
+            task.cancel()
+        self.pages.clear()
+
+    def _forget_task(self, task: "asyncio.Task[Any]") -> None:
+        self._tasks.discard(task)
+        if not task.cancelled():
+            # retrieved, so that the failure of a page nobody took is not logged as never retrieved
+            task.exception()
+
+    def stats(self) -> Dict:
+        stats = self.pages.stats()
+        lookups = stats["hits"] + stats["misses"]
+        return {
+            **stats,
+            "prefetched": self.prefetched,
+            "hit_rate": stats["hits"] / lookups if lookups else None,
+        }
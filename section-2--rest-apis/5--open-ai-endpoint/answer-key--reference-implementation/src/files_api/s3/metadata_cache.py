@@ -0,0 +1,171 @@
+"""
+In-process cache of S3 object metadata and listing pages.
+
+Hot objects are HEADed, checked for existence and listed far more often than they change, so the
+S3 backends answer those calls from this cache for up to `ttl_seconds`. Objects found missing are
+cached too, for `negative_ttl_seconds`, so repeated requests for a missing file stay cheap.
+
+Writes and deletes made through the backend invalidate the object's metadata and every cached
+listing page of its bucket. Changes made by anything else, such as another API instance, become
+visible once the entries expire, so the TTLs bound how stale a response can be.
+
+A read that started before an invalidation may return what S3 had before the write; to keep it from
+caching that stale result, readers take the cache's `generation` before calling S3 and pass it back
+when storing the result, which is dropped if anything was invalidated in between.
+
+With `content_max_bytes` set, the content of small objects (`content_max_object_size_bytes` at most)
+is cached as well, so repeated downloads of a hot small file skip S3 entirely. Objects compete for
+that byte budget through a `WTinyLFUCache`, which only admits an object if it is downloaded more
+often than the objects it would evict, so a scan of many files does not flush the hot ones. Content
+is invalidated, and expires, along with the object's metadata.
+"""
+
+import threading
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Hashable,
+    NamedTuple,
+    Optional,
+    Union,
+)
+
+from files_api.cache import (
+    TTLCache,
+    WTinyLFUCache,
+)
+
+DEFAULT_METADATA_CACHE_MAX_ENTRIES = 10_000
+DEFAULT_METADATA_CACHE_TTL_SECONDS = 5.0
+DEFAULT_METADATA_CACHE_NEGATIVE_TTL_SECONDS = 1.0
+DEFAULT_CONTENT_CACHE_MAX_OBJECT_SIZE_BYTES = 256 * 1024
+
+
+class _NotFound:  # pylint: disable=too-few-public-methods
+    def __repr__(self) -> str:
+        return "NOT_FOUND"
+
+
+# cached in place of the metadata of an object that does not exist
+NOT_FOUND = _NotFound()
+
+ObjectMetadata = Dict[str, Any]
+
+
+class ObjectContent(NamedTuple):
+    """The cached content of a whole object, and the metadata of a GET of it."""
+
+    metadata: ObjectMetadata
+    body: memoryview
+
+
+class S3MetadataCache:
+    """Cache of `head_object` metadata keyed by bucket and key, and of listing pages keyed by bucket and query."""
+
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        max_entries: int = DEFAULT_METADATA_CACHE_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_METADATA_CACHE_TTL_SECONDS,
+        negative_ttl_seconds: float = DEFAULT_METADATA_CACHE_NEGATIVE_TTL_SECONDS,
+        content_max_bytes: int = 0,
+        content_max_object_size_bytes: int = DEFAULT_CONTENT_CACHE_MAX_OBJECT_SIZE_BYTES,
+    ):
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.content_max_object_size_bytes = content_max_object_size_bytes
+        self.generation = 0
+        self._lock = threading.Lock()
+        self.objects: TTLCache[tuple[str, str], Union[ObjectMetadata, _NotFound]] = TTLCache(max_entries, ttl_seconds)
+        self.listings: TTLCache[tuple[str, Hashable], Any] = TTLCache(max_entries, ttl_seconds)
+        self.contents: Optional[WTinyLFUCache[tuple[str, str], ObjectContent]] = (
+            WTinyLFUCache(
+                content_max_bytes, ttl_seconds, expected_entries=max_entries or DEFAULT_METADATA_CACHE_MAX_ENTRIES
+            )
+            if content_max_bytes
+            else None
+        )
+
+    def get_object_metadata(self, bucket_name: str, object_key: str) -> Union[ObjectMetadata, _NotFound, None]:
+        """Return the object's cached metadata, `NOT_FOUND` if it is cached as missing, or None if not cached."""
+        return self.objects.get((bucket_name, object_key))
+
+    def is_object_not_found(self, bucket_name: str, object_key: str) -> bool:
+        """Whether the object is cached as missing, without counting a cache hit or miss."""
+        return self.objects.peek((bucket_name, object_key)) is NOT_FOUND
+
+    def set_object_metadata(
+        self, bucket_name: str, object_key: str, metadata: ObjectMetadata, generation: int
+    ) -> None:
+        metadata = {name: value for name, value in metadata.items() if name not in ("Body", "ResponseMetadata")}
+        with self._lock:
+            if generation == self.generation:
+                self.objects.set((bucket_name, object_key), metadata)
+
+    def set_object_not_found(self, bucket_name: str, object_key: str, generation: int) -> None:
+        with self._lock:
+            if generation == self.generation:
+                self.objects.set((bucket_name, object_key), NOT_FOUND, ttl_seconds=self.negative_ttl_seconds)
+
+    def get_object_content(self, bucket_name: str, object_key: str) -> Optional[ObjectContent]:
+        """Return the object's cached content, or None if it is not cached or content caching is disabled."""
+        if self.contents is None:
+            return None
+        return self.contents.get((bucket_name, object_key))
+
+    def set_object_content(  # pylint: disable=too-many-arguments
+        self, bucket_name: str, object_key: str, metadata: ObjectMetadata, content: bytes, generation: int
+    ) -> None:
+        """Cache the whole content of an object, along with the metadata of the GET that downloaded it."""
+        if self.contents is None or len(content) > self.content_max_object_size_bytes:
+            return
+        metadata = {
+            name: value for name, value in metadata.items() if name not in ("Body", "ResponseMetadata", "ContentRange")
+        }
+        metadata["ContentLength"] = len(content)
+        with self._lock:
+            if generation == self.generation:
+                self.contents.set(
+                    (bucket_name, object_key), ObjectContent(metadata, memoryview(content)), len(content)
+                )
+
+    def get_listing(self, bucket_name: str, query: Hashable) -> Optional[Any]:
+        return self.listings.get((bucket_name, query))
+
+    def set_listing(self, bucket_name: str, query: Hashable, page: Any, generation: int) -> None:
+        with self._lock:
+            if generation == self.generation:
+                self.listings.set((bucket_name, query), page)
+
+    def invalidate(self, bucket_name: str, object_key: str) -> None:
+        """Forget what is cached about an object that was written or deleted."""
+        with self._lock:
+            self.generation += 1
+            self.objects.delete((bucket_name, object_key))
+            if self.contents is not None:
+                self.contents.delete((bucket_name, object_key))
+            self.listings.delete_where(lambda key: key[0] == bucket_name)
+
+    def invalidate_many(self, bucket_name: str, object_keys: Collection[str]) -> None:
+        """Forget what is cached about several objects that were written or deleted."""
+        object_keys = set(object_keys)
+        with self._lock:
+            self.generation += 1
+            self.objects.delete_where(lambda key: key[0] == bucket_name and key[1] in object_keys)
+            if self.contents is not None:
+                self.contents.delete_where(lambda key: key[0] == bucket_name and key[1] in object_keys)
+            self.listings.delete_where(lambda key: key[0] == bucket_name)
+
+    def invalidate_prefix(self, bucket_name: str, prefix: str) -> None:
+        """Forget what is cached about every object whose key starts with `prefix`."""
+        with self._lock:
+            self.generation += 1
+            self.objects.delete_where(lambda key: key[0] == bucket_name and key[1].startswith(prefix))
+            if self.contents is not None:
+                self.contents.delete_where(lambda key: key[0] == bucket_name and key[1].startswith(prefix))
+            self.listings.delete_where(lambda key: key[0] == bucket_name)
+
+    def stats(self) -> Dict:
+        stats = {"objects": self.objects.stats(), "listings": self.listings.stats()}
+        if self.contents is not None:
+            stats["contents"] = self.contents.stats()
+        return stats
@@ -0,0 +1,402 @@
+"""
+Local SQLite index of the keys, sizes and modification times of the objects in a bucket.
+
+S3 lists keys in one order only, 1000 at a time, so sorting a bucket by size, filtering it by
+extension or date, or counting the files under a prefix all take a full scan of the bucket. The
+index answers those queries from a local SQLite database instead, in the time of a local query.
+
+The backend keeps the index up to date with every write and delete it makes. A bucket's index is
+only used once it has been built by a full scan, since until then it may be missing objects; see
+`S3MetadataIndex.replace_prefix`. Writes made by anything other than the API are not seen until the
+index is rebuilt.
+
+Deleted objects stay in the index as tombstones until the next rebuild, so that a rebuild whose
+listing ran before a delete does not bring the deleted object back.
+
+The database is opened in WAL mode, so several API processes can share one index file: readers do
+not block the writer, and each process records its own writes.
+"""
+
+import sqlite3
+import threading
+import time
+from datetime import (
+    datetime,
+    timezone,
+)
+from pathlib import PurePosixPath
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Union,
+)
+
+try:
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+except ImportError:
+    ...
+
+# the columns the index can sort by
+SORT_COLUMNS = ("object_key", "size_bytes", "last_modified")
+
+# the position of the last object of a page in the sort order, from which the next page continues
+Cursor = List[Union[str, int, float]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    bucket_name TEXT NOT NULL,
+    object_key TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    last_modified REAL NOT NULL,
+    extension TEXT NOT NULL,
+    -- deleted rows are kept as tombstones until the next rebuild, so that it does not bring them back
+    deleted INTEGER NOT NULL DEFAULT 0,
+    indexed_at REAL NOT NULL,
+    PRIMARY KEY (bucket_name, object_key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS objects_by_size ON objects (bucket_name, size_bytes, object_key);
+CREATE INDEX IF NOT EXISTS objects_by_last_modified ON objects (bucket_name, last_modified, object_key);
+CREATE INDEX IF NOT EXISTS objects_by_extension ON objects (bucket_name, extension, object_key);
+CREATE TABLE IF NOT EXISTS indexed_buckets (
+    bucket_name TEXT PRIMARY KEY,
+    indexed_at REAL NOT NULL
+);
+"""
+
+_UPSERT = """
+INSERT INTO objects (bucket_name, object_key, size_bytes, last_modified, extension, deleted, indexed_at)
+VALUES (:bucket_name, :object_key, :size_bytes, :last_modified, :extension, 0, :indexed_at)
+ON CONFLICT (bucket_name, object_key) DO UPDATE SET
+    size_bytes = excluded.size_bytes,
+    last_modified = excluded.last_modified,
+    extension = excluded.extension,
+    deleted = 0,
+    indexed_at = excluded.indexed_at
+WHERE objects.indexed_at <= excluded.indexed_at
+"""
+
+_DELETE = """
+INSERT INTO objects (bucket_name, object_key, size_bytes, last_modified, extension, deleted, indexed_at)
+VALUES (:bucket_name, :object_key, 0, 0, '', 1, :indexed_at)
+ON CONFLICT (bucket_name, object_key) DO UPDATE SET deleted = 1, indexed_at = excluded.indexed_at
+"""
+
+
+class S3MetadataIndex:
+    """SQLite index of object metadata, keyed by bucket and key."""
+
+    def __init__(self, path: str):
+        """
+        Open the index at `path`, creating it if it does not exist.
+
+        :param path: Path of the SQLite database file, or ":memory:" for an index that is not persisted.
+        """
+        # one connection shared by every thread; the lock serializes its use
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            # in WAL mode, commits are durable against crashes of the process, though not of the OS, without an fsync
+            self._connection.execute("PRAGMA synchronous=NORMAL")
+            self._connection.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def is_built(self, bucket_name: str) -> bool:
+        """Whether the bucket's index has been built by a full scan, and can therefore answer queries."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM indexed_buckets WHERE bucket_name = ?", (bucket_name,)
+            ).fetchone()
+        return row is not None
+
+    def upsert(self, bucket_name: str, object_key: str, size_bytes: int, last_modified: datetime) -> None:
+        """Record that an object was written."""
+        with self._lock:
+            self._connection.execute(
+                _UPSERT, _to_row(bucket_name, object_key, size_bytes, last_modified, indexed_at=time.time())
+            )
+
+    def delete(self, bucket_name: str, object_key: str) -> None:
+        """Record that an object was deleted."""
+        self.delete_many(bucket_name, [object_key])
+
+    def delete_many(self, bucket_name: str, object_keys: Iterable[str]) -> None:
+        """Record that several objects were deleted."""
+        indexed_at = time.time()
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            # a tombstone is written even for keys the index has not seen, which a rebuild may yet list
+            self._connection.executemany(
+                _DELETE,
+                ({"bucket_name": bucket_name, "object_key": key, "indexed_at": indexed_at} for key in object_keys),
+            )
+
+    def replace_prefix(
+        self, bucket_name: str, prefix: str, s3_objects: Iterable["ObjectTypeDef"], started_at: float
+    ) -> None:
+        """
+        Replace the index of every key that starts with `prefix` with the objects a listing found.
+
+        Writes and deletes recorded after `started_at`, when the listing began, are newer than what
+        the listing may have seen of the same keys, so they are kept. With an empty prefix, this
+        marks the bucket's index as built.
+
+        :param bucket_name: Name of the S3 bucket.
+        :param prefix: Prefix of the keys that were listed.
+        :param s3_objects: Every object whose key starts with `prefix`, as listed by S3.
+        :param started_at: `time.time()` when the listing started.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            prefix_condition, prefix_params = _get_prefix_condition(prefix)
+            self._connection.execute(
+                f"DELETE FROM objects WHERE bucket_name = ? AND indexed_at < ? AND {prefix_condition}",
+                (bucket_name, started_at, *prefix_params),
+            )
+            self._connection.executemany(
+                _UPSERT,
+                (
+                    _to_row(bucket_name, s3_object["Key"], s3_object["Size"], s3_object["LastModified"], started_at)
+                    for s3_object in s3_objects
+                ),
+            )
+            if not prefix:
+                self._mark_built(bucket_name, started_at)
+
+    def get_range(
+        self, bucket_name: str, lower_bound: str, upper_bound: Optional[str]
+    ) -> Dict[str, tuple[int, float]]:
+        """
+        Fetch the size and modification timestamp of every indexed object with a key in a range.
+
+        :param bucket_name: Name of the S3 bucket.
+        :param lower_bound: Smallest key of the range.
+        :param upper_bound: Key just past the range, or None for a range to the end of the keyspace.
+
+        :return: `(size_bytes, last_modified timestamp)` by key.
+        """
+        where = "bucket_name = ? AND deleted = 0 AND object_key >= ?"
+        params = [bucket_name, lower_bound]
+        if upper_bound is not None:
+            where += " AND object_key < ?"
+            params.append(upper_bound)
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT object_key, size_bytes, last_modified FROM objects WHERE {where}", params
+            ).fetchall()
+        return {object_key: (size_bytes, last_modified) for object_key, size_bytes, last_modified in rows}
+
+    def apply_changes(
+        self,
+        bucket_name: str,
+        written: Iterable["ObjectTypeDef"],
+        deleted_keys: Iterable[str],
+        started_at: float,
+    ) -> None:
+        """
+        Apply the differences between the index and a listing of S3 that began at `started_at`.
+
+        As in `replace_prefix`, writes and deletes recorded after `started_at` are kept.
+
+        :param bucket_name: Name of the S3 bucket.
+        :param written: Listed objects that are missing from the index or differ from it.
+        :param deleted_keys: Indexed keys the listing did not find.
+        :param started_at: `time.time()` when the listing started.
+        """
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                _UPSERT,
+                (
+                    _to_row(bucket_name, s3_object["Key"], s3_object["Size"], s3_object["LastModified"], started_at)
+                    for s3_object in written
+                ),
+            )
+            self._connection.executemany(
+                "DELETE FROM objects WHERE bucket_name = ? AND object_key = ? AND indexed_at < ?",
+                ((bucket_name, object_key, started_at) for object_key in deleted_keys),
+            )
+
+    def finish_rebuild(self, bucket_name: str, prefix: str, started_at: float) -> None:
+        """
+        Drop the tombstones a rebuild of `prefix` that began at `started_at` no longer needs.
+
+        With an empty prefix, this marks the bucket's index as built.
+        """
+        prefix_condition, prefix_params = _get_prefix_condition(prefix)
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.execute(
+                f"DELETE FROM objects WHERE bucket_name = ? AND deleted = 1 AND indexed_at < ? AND {prefix_condition}",
+                (bucket_name, started_at, *prefix_params),
+            )
+            if not prefix:
+                self._mark_built(bucket_name, started_at)
+
+    def _mark_built(self, bucket_name: str, started_at: float) -> None:
+        self._connection.execute(
+            "INSERT OR REPLACE INTO indexed_buckets (bucket_name, indexed_at) VALUES (?, ?)", (bucket_name, started_at)
+        )
+
+    def query(  # pylint: disable=too-many-arguments,too-many-locals
+        self,
+        bucket_name: str,
+        prefix: str = "",
+        sort_by: str = "object_key",
+        descending: bool = False,
+        extension: Optional[str] = None,
+        modified_after: Optional[datetime] = None,
+        modified_before: Optional[datetime] = None,
+        limit: int = 100,
+        offset: int = 0,
+        after: Optional[Cursor] = None,
+    ) -> tuple[List["ObjectTypeDef"], Optional[Cursor]]:
+        """
+        Fetch one page of the objects under `prefix` that match the filters, in the given order.
+
+        :param bucket_name: Name of the S3 bucket.
+        :param prefix: Prefix of the keys to list.
+        :param sort_by: One of `SORT_COLUMNS`. Objects that tie are ordered by key.
+        :param descending: Whether to sort in descending order.
+        :param extension: Only list keys with this extension, e.g. "txt"; compared case-insensitively.
+        :param modified_after: Only list objects last modified at or after this time.
+        :param modified_before: Only list objects last modified before this time.
+        :param limit: Maximum number of objects to return.
+        :param offset: Number of matching objects to skip.
+        :param after: Cursor returned with the previous page, to continue after it.
+
+        :return: Tuple of
+            1. The objects, with the `Key`, `Size` and `LastModified` of a listing.
+            2. Cursor of the next page if there may be more objects, otherwise None.
+        """
+        if sort_by not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort by {sort_by!r}")
+        where, params = _get_filters(bucket_name, prefix, extension, modified_after, modified_before)
+        direction = "DESC" if descending else "ASC"
+        if after is not None:
+            if sort_by == "object_key":
+                where += f" AND object_key {'<' if descending else '>'} ?"
+            else:
+                where += f" AND ({sort_by}, object_key) {'<' if descending else '>'} (?, ?)"
+            params.extend(after)
+        order_by = (
+            f"object_key {direction}" if sort_by == "object_key" else f"{sort_by} {direction}, object_key {direction}"
+        )
+
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT object_key, size_bytes, last_modified FROM objects WHERE {where}"
+                f" ORDER BY {order_by} LIMIT ? OFFSET ?",
+                (*params, limit + 1, offset),
+            ).fetchall()
+
+        next_cursor: Optional[Cursor] = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_key, last_size_bytes, last_modified = rows[-1]
+            sort_value = {"size_bytes": last_size_bytes, "last_modified": last_modified}.get(sort_by)
+            next_cursor = [last_key] if sort_value is None else [sort_value, last_key]
+        s3_objects: List[Any] = [
+            {
+                "Key": object_key,
+                "Size": size_bytes,
+                "LastModified": datetime.fromtimestamp(last_modified, tz=timezone.utc),
+            }
+            for object_key, size_bytes, last_modified in rows
+        ]
+        return s3_objects, next_cursor
+
+    def count(  # pylint: disable=too-many-arguments
+        self,
+        bucket_name: str,
+        prefix: str = "",
+        extension: Optional[str] = None,
+        modified_after: Optional[datetime] = None,
+        modified_before: Optional[datetime] = None,
+    ) -> tuple[int, int]:
+        """
+        Count the objects under `prefix` that match the filters; see `query`.
+
+        :return: Tuple of
+            1. Number of matching objects.
+            2. Their total size in bytes.
+        """
+        where, params = _get_filters(bucket_name, prefix, extension, modified_after, modified_before)
+        with self._lock:
+            count, total_size_bytes = self._connection.execute(
+                f"SELECT count(*), coalesce(sum(size_bytes), 0) FROM objects WHERE {where}", params
+            ).fetchone()
+        return count, total_size_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (num_objects,) = self._connection.execute("SELECT count(*) FROM objects WHERE deleted = 0").fetchone()
+            built_buckets = [row[0] for row in self._connection.execute("SELECT bucket_name FROM indexed_buckets")]
+        return {"objects": num_objects, "built_buckets": built_buckets}
+
+
+def get_prefix_upper_bound(prefix: str) -> Optional[str]:
+    """Return the smallest key greater than every key that starts with `prefix`, or None if there is none."""
+    # UTF-8, which S3 and SQLite compare bytewise, sorts strings in code point order, so
+    # incrementing the last code point works
+    stripped = prefix.rstrip(chr(0x10FFFF))
+    if not stripped:
+        return None
+    return stripped[:-1] + chr(ord(stripped[-1]) + 1)
+
+
+def _get_prefix_condition(prefix: str) -> tuple[str, List[str]]:
+    # a range on the primary key, unlike LIKE or substr(), lets SQLite seek straight to the prefix
+    if not prefix:
+        return "1", []
+    upper_bound = get_prefix_upper_bound(prefix)
+    if upper_bound is None:
+        return "object_key >= ?", [prefix]
+    return "object_key >= ? AND object_key < ?", [prefix, upper_bound]
+
+
+def _get_filters(
+    bucket_name: str,
+    prefix: str,
+    extension: Optional[str],
+    modified_after: Optional[datetime],
+    modified_before: Optional[datetime],
+) -> tuple[str, List[Any]]:
+    prefix_condition, prefix_params = _get_prefix_condition(prefix)
+    where = f"bucket_name = ? AND deleted = 0 AND {prefix_condition}"
+    params: List[Any] = [bucket_name, *prefix_params]
+    if extension is not None:
+        where += " AND extension = ?"
+        params.append(extension.lstrip(".").lower())
+    if modified_after is not None:
+        where += " AND last_modified >= ?"
+        params.append(to_timestamp(modified_after))
+    if modified_before is not None:
+        where += " AND last_modified < ?"
+        params.append(to_timestamp(modified_before))
+    return where, params
+
+
+def _to_row(
+    bucket_name: str, object_key: str, size_bytes: int, last_modified: datetime, indexed_at: float
+) -> Dict[str, Any]:
+    return {
+        "bucket_name": bucket_name,
+        "object_key": object_key,
+        "size_bytes": size_bytes,
+        "last_modified": to_timestamp(last_modified),
+        "extension": PurePosixPath(object_key).suffix.lstrip(".").lower(),
+        "indexed_at": indexed_at,
+    }
+
+
+def to_timestamp(value: datetime) -> float:
+    """Return the POSIX timestamp the index stores for a time."""
+    # times without a time zone are taken to be UTC, like every time S3 reports
+    return (value if value.tzinfo else value.replace(tzinfo=timezone.utc)).timestamp()
@@ -0,0 +1,123 @@
+"""
+Presigned URLs, through which clients download files from S3 and upload them to S3 directly.
+
+A presigned URL carries the signature of one S3 request, made with the API's credentials and valid
+for `expires_in_seconds`. The signature is computed locally, without a round trip to S3. A client
+given such a URL moves the file's bytes to or from S3 itself, so the API's CPU and bandwidth no
+longer grow with the size of the files.
+
+Files too large for one `PUT` are uploaded in parts: the API starts a multipart upload, presigns an
+`UploadPart` request for every part, and completes the upload with the ETags the client collected.
+"""
+
+import math
+from typing import (
+    List,
+    NamedTuple,
+    Optional,
+)
+
+from files_api.s3.clients import get_s3_client
+from files_api.s3.write_objects import (
+    DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    create_multipart_upload,
+)
+
+try:
+    from mypy_boto3_s3 import S3Client
+except ImportError:
+    ...
+
+DEFAULT_PRESIGNED_URL_TTL_SECONDS = 5 * 60
+# the longest validity S3 accepts for a presigned URL
+MAX_PRESIGNED_URL_TTL_SECONDS = 7 * 24 * 60 * 60
+MAX_MULTIPART_UPLOAD_PARTS = 10_000
+MAX_OBJECT_SIZE_BYTES = 5 * 1024**4
+
+
+class PresignedUpload(NamedTuple):
+    """URLs a client uploads one file to: either `url` for the whole file, or one URL per part."""
+
+    url: Optional[str]
+    upload_id: Optional[str]
+    part_size_bytes: Optional[int]
+    part_urls: List[str]
+
+
+def generate_presigned_download_url(
+    bucket_name: str,
+    object_key: str,
+    expires_in_seconds: int = DEFAULT_PRESIGNED_URL_TTL_SECONDS,
+    response_content_type: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> str:
+    """
+    Presign a `GET` of an object.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param expires_in_seconds: Number of seconds the URL is valid for.
+    :param response_content_type: Optional `Content-Type` for S3 to respond with instead of the object's.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: The presigned URL.
+    """
+    s3_client = s3_client or get_s3_client()
+    params = {"Bucket": bucket_name, "Key": object_key}
+    if response_content_type:
+        params["ResponseContentType"] = response_content_type
+    return s3_client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in_seconds)
+
+
+def get_upload_part_size(size_bytes: int, part_size_bytes: int = DEFAULT_MULTIPART_PART_SIZE_BYTES) -> int:
+    """Return `part_size_bytes`, or the smallest larger part size that uploads `size_bytes` in at most 10,000 parts."""
+    return max(part_size_bytes, math.ceil(size_bytes / MAX_MULTIPART_UPLOAD_PARTS))
+
+
+def create_presigned_upload(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    size_bytes: int,
+    content_type: Optional[str] = None,
+    part_size_bytes: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    expires_in_seconds: int = DEFAULT_PRESIGNED_URL_TTL_SECONDS,
+    s3_client: Optional["S3Client"] = None,
+) -> PresignedUpload:
+    """
+    Presign the requests a client uploads a file of `size_bytes` with.
+
+    A file of at most `part_size_bytes` is uploaded with one presigned `PUT`, which must send the
+    `Content-Type` it was signed with. A larger file is uploaded in parts, each `PUT` to its own URL,
+    after which the upload is completed with `complete_multipart_upload`.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param size_bytes: Size of the file to upload.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param part_size_bytes: Files larger than this are uploaded in parts of this size; see `get_upload_part_size`.
+    :param expires_in_seconds: Number of seconds the URLs are valid for.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: The URLs to upload the file to.
+    """
+    s3_client = s3_client or get_s3_client()
+    content_type = content_type or "application/octet-stream"
+    if size_bytes <= part_size_bytes:
+        url = s3_client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": bucket_name, "Key": object_key, "ContentType": content_type},
+            ExpiresIn=expires_in_seconds,
+        )
+        return PresignedUpload(url=url, upload_id=None, part_size_bytes=None, part_urls=[])
+
+    part_size_bytes = get_upload_part_size(size_bytes, part_size_bytes)
+    upload_id = create_multipart_upload(bucket_name, object_key, content_type=content_type, s3_client=s3_client)
+    part_urls = [
+        s3_client.generate_presigned_url(
+            "upload_part",
+            Params={"Bucket": bucket_name, "Key": object_key, "UploadId": upload_id, "PartNumber": part_number},
+            ExpiresIn=expires_in_seconds,
+        )
+        for part_number in range(1, math.ceil(size_bytes / part_size_bytes) + 1)
+    ]
+    return PresignedUpload(url=None, upload_id=upload_id, part_size_bytes=part_size_bytes, part_urls=part_urls)
@@ -1,13 +1,20 @@
 """Functions for reading objects from an S3 bucket--the "R" in CRUD."""
 
-from typing import Optional
+from datetime import datetime
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    Optional,
+)
 
-import boto3
+from files_api.s3.clients import get_s3_client
 
 try:
     from mypy_boto3_s3 import S3Client
     from mypy_boto3_s3.type_defs import (
         GetObjectOutputTypeDef,
+        HeadObjectOutputTypeDef,
         ListObjectsV2OutputTypeDef,
         ObjectTypeDef,
     )
@@ -15,6 +22,11 @@ except ImportError:
     ...
 
 DEFAULT_MAX_KEYS = 1_000
+DEFAULT_PARALLEL_DOWNLOAD_THRESHOLD_BYTES = 16 * 1024 * 1024
+DEFAULT_PARALLEL_DOWNLOAD_PART_SIZE_BYTES = 8 * 1024 * 1024
+DEFAULT_PARALLEL_DOWNLOAD_MAX_CONCURRENCY = 4
+# the size of the chunks a downloaded body is streamed in
+DEFAULT_CHUNK_SIZE_BYTES = 64 * 1024
 
 
 def object_exists_in_s3(bucket_name: str, object_key: str, s3_client: Optional["S3Client"] = None) -> bool:
@@ -23,11 +35,11 @@ def object_exists_in_s3(bucket_name: str, object_key: str, s3_client: Optional["
 
     :param bucket_name: Name of the S3 bucket.
     :param object_key: Key of the object to check.
-    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
 
     :return: True if the object exists, False otherwise.
     """
-    s3_client = s3_client or boto3.client("s3")
+    s3_client = s3_client or get_s3_client()
     try:
         s3_client.head_object(Bucket=bucket_name, Key=object_key)
         return True
@@ -38,9 +50,90 @@ def object_exists_in_s3(bucket_name: str, object_key: str, s3_client: Optional["
         raise
 
 
-def fetch_s3_object(
+def head_s3_object(
     bucket_name: str,
     object_key: str,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[datetime] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> "HeadObjectOutputTypeDef":
+    """
+    Fetch metadata of an object in the S3 bucket, without its content.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Key of the object to fetch.
+    :param if_none_match: Optional ETag or "*"; the request fails with a "304" error if the object has it.
+    :param if_modified_since: Optional time; the request fails with a "304" error if the object is not newer.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: Metadata of the object.
+    """
+    s3_client = s3_client or get_s3_client()
+    kwargs = get_conditional_request_kwargs(if_none_match=if_none_match, if_modified_since=if_modified_since)
+    return s3_client.head_object(Bucket=bucket_name, Key=object_key, **kwargs)
+
+
+def get_conditional_request_kwargs(
+    if_none_match: Optional[str], if_modified_since: Optional[datetime]
+) -> Dict[str, Any]:
+    """Build the keyword arguments of `get_object`/`head_object` for the given preconditions."""
+    kwargs: Dict[str, Any] = {}
+    if if_none_match:
+        kwargs["IfNoneMatch"] = if_none_match
+    if if_modified_since:
+        kwargs["IfModifiedSince"] = if_modified_since
+    return kwargs
+
+
+def get_object_request_kwargs(
+    byte_range: Optional[str] = None,
+    if_match: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """Build the keyword arguments of `get_object` for the given byte range and preconditions."""
+    kwargs = get_conditional_request_kwargs(if_none_match=if_none_match, if_modified_since=if_modified_since)
+    if byte_range:
+        kwargs["Range"] = byte_range
+    if if_match:
+        kwargs["IfMatch"] = if_match
+    return kwargs
+
+
+def get_list_objects_request_kwargs(
+    prefix: Optional[str] = None,
+    max_keys: Optional[int] = None,
+    delimiter: Optional[str] = None,
+    continuation_token: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Build the keyword arguments of `list_objects_v2` for one page of a listing."""
+    kwargs: Dict[str, Any] = {"Prefix": prefix or "", "MaxKeys": max_keys or DEFAULT_MAX_KEYS}
+    if delimiter:
+        kwargs["Delimiter"] = delimiter
+    if continuation_token:
+        kwargs["ContinuationToken"] = continuation_token
+    return kwargs
+
+
+def parse_list_objects_response(
+    response: "ListObjectsV2OutputTypeDef",
+) -> tuple[list["ObjectTypeDef"], list[str], Optional[str]]:
+    """
+    Extract a page of a listing from a `list_objects_v2` response.
+
+    :return: Tuple of the objects, the directories (common prefixes) and the next continuation token, if any.
+    """
+    directories = [common_prefix["Prefix"] for common_prefix in response.get("CommonPrefixes", [])]
+    return response.get("Contents", []), directories, response.get("NextContinuationToken")
+
+
+def fetch_s3_object(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    byte_range: Optional[str] = None,
+    if_match: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_modified_since: Optional[datetime] = None,
     s3_client: Optional["S3Client"] = None,
 ) -> "GetObjectOutputTypeDef":
     """
@@ -48,19 +141,52 @@ def fetch_s3_object(
 
     :param bucket_name: Name of the S3 bucket.
     :param object_key: Key of the object to fetch.
-    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+    :param byte_range: Optional HTTP range, e.g. "bytes=0-99", to fetch only part of the object.
+    :param if_match: Optional ETag; the request fails with `PreconditionFailed` if the object no longer has it.
+    :param if_none_match: Optional ETag or "*"; the request fails with a "304" error if the object has it.
+    :param if_modified_since: Optional time; the request fails with a "304" error if the object is not newer.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
 
     :return: Metadata of the object.
     """
-    s3_client = s3_client or boto3.client("s3")
-    response = s3_client.get_object(Bucket=bucket_name, Key=object_key)
+    s3_client = s3_client or get_s3_client()
+    request_kwargs = get_object_request_kwargs(byte_range, if_match, if_none_match, if_modified_since)
+    response = s3_client.get_object(Bucket=bucket_name, Key=object_key, **request_kwargs)
     return response
 
 
+def fetch_s3_object_range(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    first_byte: int,
+    last_byte: int,
+    if_match: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> bytes:
+    """
+    Fetch and read a byte range of an object in the S3 bucket.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param object_key: Key of the object to fetch.
+    :param first_byte: Offset of the first byte to fetch.
+    :param last_byte: Offset of the last byte to fetch, inclusive.
+    :param if_match: Optional ETag; the request fails with `PreconditionFailed` if the object no longer has it.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: Content of the byte range.
+    """
+    response = fetch_s3_object(
+        bucket_name, object_key, byte_range=f"bytes={first_byte}-{last_byte}", if_match=if_match, s3_client=s3_client
+    )
+    with response["Body"] as body:
+        return body.read()
+
+
 def fetch_s3_objects_using_page_token(
     bucket_name: str,
     continuation_token: str,
     max_keys: int | None = None,
+    prefix: Optional[str] = None,
     s3_client: Optional["S3Client"] = None,
 ) -> tuple[list["ObjectTypeDef"], Optional[str]]:
     """
@@ -69,21 +195,17 @@ def fetch_s3_objects_using_page_token(
     :param bucket_name: Name of the S3 bucket to list objects from.
     :param continuation_token: Token for fetching the next page of results where the last page left off.
     :param max_keys: Maximum number of keys to return within this page.
-    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+    :param prefix: Prefix the listing was started with; S3 expects it again with every continuation token.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
 
     :return: Tuple of a list of objects and the next continuation token.
         1. Possibly empty list of objects in the current page.
         2. Next continuation token if there are more pages, otherwise None.
     """
-    s3_client = s3_client or boto3.client("s3")
-    response: "ListObjectsV2OutputTypeDef" = s3_client.list_objects_v2(
-        Bucket=bucket_name,
-        ContinuationToken=continuation_token,
-        MaxKeys=max_keys or DEFAULT_MAX_KEYS,
-    )
-    files: list["ObjectTypeDef"] = response.get("Contents", [])
-    next_continuation_token: str | None = response.get("NextContinuationToken")
-
+    s3_client = s3_client or get_s3_client()
+    request_kwargs = get_list_objects_request_kwargs(prefix, max_keys, continuation_token=continuation_token)
+    response = s3_client.list_objects_v2(Bucket=bucket_name, **request_kwargs)
+    files, _, next_continuation_token = parse_list_objects_response(response)
     return files, next_continuation_token
 
 
@@ -99,15 +221,65 @@ def fetch_s3_objects_metadata(
     :param bucket_name: Name of the S3 bucket to list objects from.
     :param prefix: Prefix to filter objects by.
     :param max_keys: Maximum number of keys to return within this page.
-    :param s3_client: Optional S3 client to use. If not provided, a new client will be created.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
 
     :return: Tuple of a list of objects and the next continuation token.
         1. Possibly empty list of objects in the current page.
         2. Next continuation token if there are more pages, otherwise None.
     """
-    s3_client = s3_client or boto3.client("s3")
-    response = s3_client.list_objects_v2(Bucket=bucket_name, Prefix=prefix or "", MaxKeys=max_keys)
-    files: list["ObjectTypeDef"] = response.get("Contents", [])
-    next_page_token: str | None = response.get("NextContinuationToken")
-
+    s3_client = s3_client or get_s3_client()
+    response = s3_client.list_objects_v2(Bucket=bucket_name, **get_list_objects_request_kwargs(prefix, max_keys))
+    files, _, next_page_token = parse_list_objects_response(response)
     return files, next_page_token
+
+
+def fetch_s3_objects_and_directories(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    prefix: Optional[str] = None,
+    delimiter: str = "/",
+    max_keys: Optional[int] = DEFAULT_MAX_KEYS,
+    continuation_token: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[list["ObjectTypeDef"], list[str], Optional[str]]:
+    """
+    Fetch one level of the key hierarchy under `prefix`: its objects and its "directories".
+
+    Keys that contain `delimiter` after `prefix` are not listed; S3 rolls them up into one common
+    prefix per directory instead, so the cost of the listing does not grow with the depth of the tree.
+
+    :param bucket_name: Name of the S3 bucket to list objects from.
+    :param prefix: Prefix to filter objects by, e.g. "path/to/".
+    :param delimiter: Separator of the levels of the hierarchy.
+    :param max_keys: Maximum number of objects and directories, together, to return within this page.
+    :param continuation_token: Token of the page to fetch, as returned for the previous page.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: Tuple of
+        1. Possibly empty list of objects directly under `prefix`.
+        2. Possibly empty list of directories directly under `prefix`, each ending with `delimiter`.
+        3. Next continuation token if there are more pages, otherwise None.
+    """
+    s3_client = s3_client or get_s3_client()
+    request_kwargs = get_list_objects_request_kwargs(prefix, max_keys, delimiter, continuation_token)
+    response = s3_client.list_objects_v2(Bucket=bucket_name, **request_kwargs)
+    return parse_list_objects_response(response)
+
+
+def iter_s3_objects(
+    bucket_name: str,
+    prefix: str = "",
+    page_size: int = DEFAULT_MAX_KEYS,
+    s3_client: Optional["S3Client"] = None,
+) -> Iterator["ObjectTypeDef"]:
+    """
+    Yield every object whose key starts with `prefix`, listing the next page once the previous one is used up.
+
+    :param bucket_name: Name of the S3 bucket to list objects from.
+    :param prefix: Prefix to filter objects by.
+    :param page_size: Number of objects listed per request.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+    """
+    s3_client = s3_client or get_s3_client()
+    paginator = s3_client.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix, PaginationConfig={"PageSize": page_size}):
+        yield from page.get("Contents", [])
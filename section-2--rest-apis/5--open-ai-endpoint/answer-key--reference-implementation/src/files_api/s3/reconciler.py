@@ -0,0 +1,328 @@
+"""
+Reconcile the metadata index with a full listing of a bucket.
+
+The index only records the writes and deletes made through the API, so it drifts from S3 whenever
+anything else writes to the bucket. The reconciler re-lists the bucket and applies the differences.
+
+One listing of a large bucket takes a long time, since S3 lists 1000 keys per request, one request
+after another. So the keyspace is first split into prefix shards along the "/" hierarchy of the keys:
+directories are expanded level by level, concurrently, until there are about `target_shards` of them. The shards
+are then listed concurrently, and each is diffed against its range of the index, and the changes
+written in batches, as soon as its listing completes. The files found directly in the expanded
+directories, outside every shard, are diffed the same way.
+
+Keys without a "/" cannot be split into shards this way, so a flat bucket is listed sequentially.
+
+Run from the command line with:
+    python -m files_api.s3.reconciler --bucket-name my-bucket --index-path index.db
+"""
+
+import argparse
+import bisect
+import statistics
+import time
+from collections import deque
+from concurrent.futures import (
+    ThreadPoolExecutor,
+    as_completed,
+)
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+from files_api.s3.clients import get_s3_client
+from files_api.s3.metadata_index import (
+    S3MetadataIndex,
+    get_prefix_upper_bound,
+    to_timestamp,
+)
+from files_api.s3.read_objects import (
+    DEFAULT_MAX_KEYS,
+    fetch_s3_objects_and_directories,
+    fetch_s3_objects_metadata,
+    fetch_s3_objects_using_page_token,
+)
+
+try:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import ObjectTypeDef
+except ImportError:
+    ...
+
+DEFAULT_RECONCILE_MAX_CONCURRENCY = 8
+DEFAULT_RECONCILE_TARGET_SHARDS = 64
+DEFAULT_RECONCILE_BATCH_SIZE = 1000
+
+
+class ShardReport(NamedTuple):
+    """How much of the bucket one shard covered, and how long it took to list."""
+
+    prefix: str
+    key_count: int
+    duration_seconds: float
+
+
+class ReconcileReport(NamedTuple):
+    """What a reconciliation found and how fast it ran."""
+
+    shards: List[ShardReport]
+    listed_keys: int
+    written_keys: int
+    deleted_keys: int
+    duration_seconds: float
+
+    @property
+    def keys_per_second(self) -> float:
+        return self.listed_keys / self.duration_seconds if self.duration_seconds else 0.0
+
+    @property
+    def shard_skew(self) -> float:
+        """Keys in the largest shard over the mean keys per shard; 1.0 when the shards are even."""
+        key_counts = [shard.key_count for shard in self.shards]
+        if not key_counts or not any(key_counts):
+            return 1.0
+        return max(key_counts) / statistics.mean(key_counts)
+
+
+def plan_prefix_shards(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    prefix: str = "",
+    target_shards: int = DEFAULT_RECONCILE_TARGET_SHARDS,
+    max_concurrency: int = DEFAULT_RECONCILE_MAX_CONCURRENCY,
+    page_size: int = DEFAULT_MAX_KEYS,
+    delimiter: str = "/",
+    s3_client: Optional["S3Client"] = None,
+) -> tuple[List[str], List["ObjectTypeDef"]]:
+    """
+    Split the keys under `prefix` into prefix shards, expanding the widest level of directories first.
+
+    Directories are expanded `max_concurrency` at a time. A directory whose entries fit in one
+    page is thereby listed completely, so the planning itself lists small buckets concurrently.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param prefix: Prefix of the keys to split.
+    :param target_shards: Number of shards to stop expanding directories at.
+    :param max_concurrency: Maximum number of directories expanded at the same time.
+    :param page_size: Number of entries S3 returns per listing request.
+    :param delimiter: Separator of the levels of the key hierarchy.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: Tuple of
+        1. Sorted, non-overlapping shard prefixes.
+        2. The objects directly in the expanded directories, which no shard covers, sorted by key.
+    """
+    s3_client = s3_client or get_s3_client()
+
+    def expand(directory: str) -> tuple[List["ObjectTypeDef"], List[str], Optional[str]]:
+        return fetch_s3_objects_and_directories(
+            bucket_name, prefix=directory, delimiter=delimiter, max_keys=page_size, s3_client=s3_client
+        )
+
+    shards, direct_objects = _expand_breadth_first(expand, prefix, target_shards, max_concurrency)
+    return sorted(shards), sorted(direct_objects, key=lambda s3_object: s3_object["Key"])
+
+
+def _expand_breadth_first(
+    expand: Callable[[str], tuple[List["ObjectTypeDef"], List[str], Optional[str]]],
+    prefix: str,
+    target_shards: int,
+    max_concurrency: int,
+) -> tuple[List[str], List["ObjectTypeDef"]]:
+    """Expand directories, level by level, until there are about `target_shards`; return them and the objects found."""
+    shards: List[str] = []
+    direct_objects: List["ObjectTypeDef"] = []
+    # breadth-first, so that the shards end up at about the same depth
+    to_expand = deque([prefix])
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-plan-shards") as executor:
+        while to_expand and len(shards) + len(to_expand) < target_shards:
+            expanded = [to_expand.popleft() for _ in range(min(len(to_expand), max_concurrency))]
+            for directory, (s3_objects, directories, continuation_token) in zip(
+                expanded, executor.map(expand, expanded)
+            ):
+                if continuation_token:
+                    # a directory with more entries than one page holds is listed faster as a shard of its own
+                    shards.append(directory)
+                    continue
+                direct_objects.extend(s3_objects)
+                to_expand.extend(directories)
+    return [*shards, *to_expand], direct_objects
+
+
+def list_shard(
+    bucket_name: str, prefix: str, page_size: int = DEFAULT_MAX_KEYS, s3_client: Optional["S3Client"] = None
+) -> List["ObjectTypeDef"]:
+    """List every object whose key starts with `prefix`, page by page."""
+    s3_client = s3_client or get_s3_client()
+    s3_objects, continuation_token = fetch_s3_objects_metadata(
+        bucket_name, prefix=prefix, max_keys=page_size, s3_client=s3_client
+    )
+    while continuation_token:
+        page, continuation_token = fetch_s3_objects_using_page_token(
+            bucket_name, continuation_token, max_keys=page_size, prefix=prefix, s3_client=s3_client
+        )
+        s3_objects.extend(page)
+    return s3_objects
+
+
+def reconcile_metadata_index(  # pylint: disable=too-many-arguments,too-many-locals
+    bucket_name: str,
+    index: S3MetadataIndex,
+    prefix: str = "",
+    max_concurrency: int = DEFAULT_RECONCILE_MAX_CONCURRENCY,
+    target_shards: int = DEFAULT_RECONCILE_TARGET_SHARDS,
+    batch_size: int = DEFAULT_RECONCILE_BATCH_SIZE,
+    page_size: int = DEFAULT_MAX_KEYS,
+    resolve_listed_objects: Optional[Callable[[List["ObjectTypeDef"]], List["ObjectTypeDef"]]] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> ReconcileReport:
+    """
+    Bring the index of every key under `prefix` in line with a listing of S3.
+
+    Writes and deletes the API records while the listing runs are newer than what the listing saw,
+    so they are kept. With the default empty prefix, this builds the bucket's index if it was not
+    built yet.
+
+    :param bucket_name: Name of the S3 bucket.
+    :param index: The index to reconcile.
+    :param prefix: Prefix of the keys to reconcile.
+    :param max_concurrency: Maximum number of shards listed at the same time.
+    :param target_shards: Number of prefix shards to split the keys into; see `plan_prefix_shards`.
+    :param batch_size: Maximum number of changes written to the index in one transaction.
+    :param page_size: Number of entries S3 returns per listing request.
+    :param resolve_listed_objects: Optional function that turns each listed page of S3 objects into the
+        entries to index, e.g. `files_api.s3.content_addressed.resolve_listed_pointers`.
+    :param s3_client: Optional S3 client to use. If not provided, the shared client is used.
+
+    :return: What the reconciliation found and how fast it ran.
+    """
+    s3_client = s3_client or get_s3_client()
+    started_at = time.time()
+    shard_prefixes, direct_objects = plan_prefix_shards(
+        bucket_name,
+        prefix,
+        target_shards=target_shards,
+        max_concurrency=max_concurrency,
+        page_size=page_size,
+        s3_client=s3_client,
+    )
+    if resolve_listed_objects is not None:
+        direct_objects = resolve_listed_objects(direct_objects)
+
+    def reconcile_shard(shard_prefix: str) -> tuple[ShardReport, int, int]:
+        shard_started_at = time.perf_counter()
+        s3_objects = list_shard(bucket_name, shard_prefix, page_size=page_size, s3_client=s3_client)
+        if resolve_listed_objects is not None:
+            s3_objects = resolve_listed_objects(s3_objects)
+        duration_seconds = time.perf_counter() - shard_started_at
+        written, deleted = _apply_diff(
+            index, bucket_name, shard_prefix, get_prefix_upper_bound(shard_prefix), s3_objects, batch_size, started_at
+        )
+        return ShardReport(shard_prefix, len(s3_objects), duration_seconds), written, deleted
+
+    shards: List[ShardReport] = []
+    written_keys = deleted_keys = 0
+    # everything in the scope outside the shards should be one of the objects found while planning them
+    direct_keys = [s3_object["Key"] for s3_object in direct_objects]
+    for lower_bound, upper_bound in _iter_gaps(prefix, shard_prefixes):
+        first = bisect.bisect_left(direct_keys, lower_bound)
+        end = bisect.bisect_left(direct_keys, upper_bound) if upper_bound is not None else len(direct_keys)
+        in_gap = direct_objects[first:end]
+        written, deleted = _apply_diff(index, bucket_name, lower_bound, upper_bound, in_gap, batch_size, started_at)
+        written_keys, deleted_keys = written_keys + written, deleted_keys + deleted
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-reconcile") as executor:
+        futures = [executor.submit(reconcile_shard, shard_prefix) for shard_prefix in shard_prefixes]
+        try:
+            for future in as_completed(futures):
+                shard, written, deleted = future.result()
+                shards.append(shard)
+                written_keys, deleted_keys = written_keys + written, deleted_keys + deleted
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    index.finish_rebuild(bucket_name, prefix, started_at)
+    return ReconcileReport(
+        shards=sorted(shards, key=lambda shard: shard.prefix),
+        listed_keys=len(direct_objects) + sum(shard.key_count for shard in shards),
+        written_keys=written_keys,
+        deleted_keys=deleted_keys,
+        duration_seconds=time.time() - started_at,
+    )
+
+
+def _apply_diff(  # pylint: disable=too-many-arguments
+    index: S3MetadataIndex,
+    bucket_name: str,
+    lower_bound: str,
+    upper_bound: Optional[str],
+    s3_objects: List["ObjectTypeDef"],
+    batch_size: int,
+    started_at: float,
+) -> tuple[int, int]:
+    indexed: Dict[str, tuple[int, float]] = index.get_range(bucket_name, lower_bound, upper_bound)
+    written = [
+        s3_object
+        for s3_object in s3_objects
+        if indexed.pop(s3_object["Key"], None) != (s3_object["Size"], to_timestamp(s3_object["LastModified"]))
+    ]
+    # what is left was not listed
+    deleted_keys = list(indexed)
+    for start in range(0, max(len(written), len(deleted_keys)), batch_size):
+        end = start + batch_size
+        index.apply_changes(bucket_name, written[start:end], deleted_keys[start:end], started_at)
+    return len(written), len(deleted_keys)
+
+
+def _iter_gaps(prefix: str, shard_prefixes: List[str]) -> Iterator[tuple[str, Optional[str]]]:
+    """Yield the key ranges under `prefix` that no shard covers, as `(lower_bound, upper_bound)`."""
+    lower_bound = prefix
+    for shard_prefix in shard_prefixes:
+        if lower_bound < shard_prefix:
+            yield lower_bound, shard_prefix
+        lower_bound = get_prefix_upper_bound(shard_prefix)  # type: ignore[assignment]
+        if lower_bound is None:
+            return
+    upper_bound = get_prefix_upper_bound(prefix) if prefix else None
+    if upper_bound is None or lower_bound < upper_bound:
+        yield lower_bound, upper_bound
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bucket-name", required=True)
+    parser.add_argument("--index-path", required=True, help="Path of the SQLite metadata index.")
+    parser.add_argument("--prefix", default="", help="Only reconcile the keys under this prefix.")
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_RECONCILE_MAX_CONCURRENCY)
+    parser.add_argument("--target-shards", type=int, default=DEFAULT_RECONCILE_TARGET_SHARDS)
+    args = parser.parse_args()
+
+    index = S3MetadataIndex(args.index_path)
+    try:
+        report = reconcile_metadata_index(
+            args.bucket_name,
+            index,
+            prefix=args.prefix,
+            max_concurrency=args.max_concurrency,
+            target_shards=args.target_shards,
+        )
+    finally:
+        index.close()
+
+    print(f"{'shard':<40}{'keys':>10}{'seconds':>10}")
+    for shard in report.shards:
+        print(f"{shard.prefix:<40}{shard.key_count:>10}{shard.duration_seconds:>10.2f}")
+    print(
+        f"\nlisted {report.listed_keys} keys in {report.duration_seconds:.2f}s ({report.keys_per_second:.0f} keys/s), "
+        f"shard skew {report.shard_skew:.2f}; wrote {report.written_keys}, deleted {report.deleted_keys}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Resumable uploads, made of chunks that are sent one request at a time, in any order.
+
+An upload session is an S3 multipart upload: each chunk is uploaded as the part with the chunk's
+number, and S3 keeps the parts that landed until the session is completed or aborted. A client whose
+connection drops asks which chunks S3 has (`list_uploaded_parts`) and sends only the others, rather
+than restarting the whole upload.
+
+A session that is never completed keeps its parts in S3, where they are billed, so
+`abort_stale_multipart_uploads` aborts the multipart uploads of a bucket that were started too long ago.
+S3 does not tell a session's multipart upload from any other, so it aborts those of other clients too.
+"""
+
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+from typing import (
+    Dict,
+    Iterator,
+    List,
+    Optional,
+)
+
+from botocore.exceptions import ClientError
+
+from files_api.s3.clients import get_s3_client
+from files_api.s3.write_objects import (
+    abort_multipart_upload,
+    complete_multipart_upload,
+)
+
+try:
+    from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import (
+        MultipartUploadTypeDef,
+        PartTypeDef,
+    )
+except ImportError:
+    ...
+
+DEFAULT_UPLOAD_SESSION_TTL_SECONDS = 24 * 60 * 60
+DEFAULT_UPLOAD_SESSION_MAX_CHUNK_SIZE_BYTES = 64 * 1024 * 1024
+# the largest part S3 accepts
+MAX_UPLOAD_SESSION_CHUNK_SIZE_BYTES = 5 * 1024**3
+# the most parts S3 lists per request
+MAX_LISTED_PARTS = 1000
+
+
+class MissingChunksError(Exception):
+    """Raised when an upload session is completed before all of its chunks were uploaded."""
+
+    def __init__(self, missing_chunk_numbers: List[int]):
+        super().__init__(f"Chunks {missing_chunk_numbers} were not uploaded")
+        self.missing_chunk_numbers = missing_chunk_numbers
+
+
+def list_uploaded_parts(
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    max_parts: int = MAX_LISTED_PARTS,
+    s3_client: Optional["S3Client"] = None,
+) -> List["PartTypeDef"]:
+    """
+    List every part uploaded to a multipart upload so far.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID of the multipart upload.
+    :param max_parts: Number of parts to list per request to S3.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: The number, size and ETag of every uploaded part, in ascending part number order.
+    """
+    s3_client = s3_client or get_s3_client()
+    parts: List["PartTypeDef"] = []
+    part_number_marker = 0
+    while True:
+        response = s3_client.list_parts(
+            Bucket=bucket_name,
+            Key=object_key,
+            UploadId=upload_id,
+            MaxParts=max_parts,
+            PartNumberMarker=part_number_marker,
+        )
+        parts.extend(response.get("Parts", []))
+        if not response.get("IsTruncated"):
+            return parts
+        part_number_marker = response["NextPartNumberMarker"]
+
+
+def complete_upload_session(
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    chunk_count: int,
+    s3_client: Optional["S3Client"] = None,
+) -> None:
+    """
+    Assemble chunks 1 to `chunk_count` of an upload session into the final object.
+
+    The ETags of the chunks are listed from S3, so the client does not need to keep track of them.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID of the session's multipart upload.
+    :param chunk_count: The number of chunks the file was split into.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :raises MissingChunksError: If any of the chunks was not uploaded; the session can still be completed later.
+    """
+    s3_client = s3_client or get_s3_client()
+    etag_by_part_number = {
+        part["PartNumber"]: part["ETag"]
+        for part in list_uploaded_parts(bucket_name, object_key, upload_id, s3_client=s3_client)
+    }
+    missing_chunk_numbers = [
+        chunk_number for chunk_number in range(1, chunk_count + 1) if chunk_number not in etag_by_part_number
+    ]
+    if missing_chunk_numbers:
+        raise MissingChunksError(missing_chunk_numbers)
+    parts = [{"PartNumber": number, "ETag": etag_by_part_number[number]} for number in range(1, chunk_count + 1)]
+    complete_multipart_upload(bucket_name, object_key, upload_id, parts=parts, s3_client=s3_client)  # type: ignore
+
+
+def iter_multipart_uploads(
+    bucket_name: str,
+    s3_client: Optional["S3Client"] = None,
+) -> Iterator["MultipartUploadTypeDef"]:
+    """
+    Yield every multipart upload of a bucket that was started and neither completed nor aborted.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+    """
+    s3_client = s3_client or get_s3_client()
+    markers: Dict[str, str] = {}
+    while True:
+        response = s3_client.list_multipart_uploads(Bucket=bucket_name, **markers)
+        yield from response.get("Uploads", [])
+        if not response.get("IsTruncated"):
+            return
+        markers = {"KeyMarker": response["NextKeyMarker"], "UploadIdMarker": response["NextUploadIdMarker"]}
+
+
+def abort_stale_multipart_uploads(
+    bucket_name: str,
+    max_age_seconds: float = DEFAULT_UPLOAD_SESSION_TTL_SECONDS,
+    s3_client: Optional["S3Client"] = None,
+) -> int:
+    """
+    Abort the multipart uploads of a bucket that were started more than `max_age_seconds` ago.
+
+    These are abandoned upload sessions, along with any other multipart upload left behind, e.g. a
+    presigned upload that was never completed.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param max_age_seconds: Age after which an incomplete multipart upload is considered abandoned.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: The number of multipart uploads aborted.
+    """
+    s3_client = s3_client or get_s3_client()
+    started_before = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+    stale_uploads = [
+        upload
+        for upload in iter_multipart_uploads(bucket_name, s3_client=s3_client)
+        if upload["Initiated"] < started_before
+    ]
+    aborted = 0
+    for upload in stale_uploads:
+        try:
+            abort_multipart_upload(bucket_name, upload["Key"], upload["UploadId"], s3_client=s3_client)
+            aborted += 1
+        except ClientError as err:
+            # completed or aborted since it was listed
+            if err.response["Error"]["Code"] != "NoSuchUpload":
+                raise
+    return aborted
@@ -1,20 +1,50 @@
 """Functions for writing objects from an S3 bucket--the "C" and "U" in CRUD."""
 
-from typing import Optional
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Future,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from typing import (
+    BinaryIO,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Set,
+)
 
-import boto3
+from botocore.exceptions import ClientError
+
+from files_api.s3.clients import get_s3_client
 
 try:
     from mypy_boto3_s3 import S3Client
+    from mypy_boto3_s3.type_defs import CompletedPartTypeDef
 except ImportError:
     ...
 
+MIN_MULTIPART_PART_SIZE_BYTES = 5 * 1024 * 1024
+DEFAULT_MULTIPART_PART_SIZE_BYTES = 8 * 1024 * 1024
+DEFAULT_MULTIPART_MAX_CONCURRENCY = 4
+MAX_CONDITIONAL_WRITE_ATTEMPTS = 5
+
+
+class UploadCancelledError(Exception):
+    """Raised when an upload is cancelled before it finished, e.g. because the client disconnected."""
+
 
-def upload_s3_object(
+def upload_s3_object(  # pylint: disable=too-many-arguments
     bucket_name: str,
     object_key: str,
     file_content: bytes,
     content_type: Optional[str] = None,
+    if_none_match: Optional[str] = None,
+    if_match: Optional[str] = None,
+    metadata: Optional[Dict[str, str]] = None,
     s3_client: Optional["S3Client"] = None,
 ) -> None:
     """
@@ -24,13 +54,333 @@ def upload_s3_object(
     :param object_key: path to the object in the S3 bucket.
     :param file_content: The content of the file to upload.
     :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
-    :param s3_client: An optional boto3 S3 client. If not provided, one will be created.
+    :param if_none_match: Optional "*" to only create the object; the upload fails with
+        `PreconditionFailed` if the object already exists.
+    :param if_match: Optional ETag to only replace that version of the object; the upload fails with
+        `PreconditionFailed` if the object changed, or `NoSuchKey` if it no longer exists.
+    :param metadata: Optional user-defined metadata to store with the object.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
     """
     content_type = content_type or "application/octet-stream"
-    s3_client = s3_client or boto3.client("s3")
+    s3_client = s3_client or get_s3_client()
+    kwargs: Dict = _get_precondition_kwargs(if_none_match, if_match)
+    if metadata:
+        kwargs["Metadata"] = metadata
     s3_client.put_object(
         Bucket=bucket_name,
         Key=object_key,
         Body=file_content,
         ContentType=content_type,
+        **kwargs,
+    )
+
+
+def upsert_s3_object(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    file_content: bytes,
+    content_type: Optional[str] = None,
+    metadata: Optional[Dict[str, str]] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> bool:
+    """
+    Upload a file to an S3 bucket, reporting whether it created the object or replaced an existing one.
+
+    The object is created with `If-None-Match: *`, so a new object takes a single request and the
+    status of that request tells whether it was created. Only if it already exists is it looked up
+    and replaced with `If-Match` on the version that was found. Unlike checking for the object and
+    then uploading it unconditionally, two concurrent uploads can never both report that they created it.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param file_content: The content of the file to upload.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param metadata: Optional user-defined metadata to store with the object.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: True if the object was created, False if an existing object was replaced.
+    """
+    s3_client = s3_client or get_s3_client()
+    return _write_conditionally(
+        bucket_name,
+        object_key,
+        lambda precondition: upload_s3_object(
+            bucket_name,
+            object_key,
+            file_content,
+            content_type,
+            metadata=metadata,
+            s3_client=s3_client,
+            **precondition,
+        ),
+        s3_client=s3_client,
+    )
+
+
+def _write_conditionally(
+    bucket_name: str,
+    object_key: str,
+    write: Callable[[Dict[str, str]], None],
+    s3_client: "S3Client",
+) -> bool:
+    """
+    Call `write` with the keyword arguments of a precondition on the object, creating it if absent.
+
+    The first attempt only creates the object. A write that fails its precondition (`PreconditionFailed`,
+    `NoSuchKey`, or S3's 409 `ConditionalRequestConflict`) is retried against the state of the object
+    found by a HEAD, up to `MAX_CONDITIONAL_WRITE_ATTEMPTS` times in all. Return whether the write
+    created the object.
+    """
+    precondition = {"if_none_match": "*"}
+    attempt = 1
+    while True:
+        try:
+            write(precondition)
+            return "if_none_match" in precondition
+        except ClientError as err:
+            if attempt >= MAX_CONDITIONAL_WRITE_ATTEMPTS or not _is_write_conflict_error(err):
+                raise
+        attempt += 1
+        etag = _get_etag(bucket_name, object_key, s3_client)
+        precondition = {"if_none_match": "*"} if etag is None else {"if_match": etag}
+
+
+def _get_etag(bucket_name: str, object_key: str, s3_client: "S3Client") -> Optional[str]:
+    try:
+        return s3_client.head_object(Bucket=bucket_name, Key=object_key)["ETag"]
+    except ClientError as err:
+        if err.response["Error"]["Code"] == "404":
+            return None
+        raise
+
+
+def _get_precondition_kwargs(if_none_match: Optional[str], if_match: Optional[str]) -> Dict[str, str]:
+    kwargs = {"IfNoneMatch": if_none_match} if if_none_match else {}
+    if if_match:
+        kwargs["IfMatch"] = if_match
+    return kwargs
+
+
+def _is_write_conflict_error(err: ClientError) -> bool:
+    return err.response["Error"]["Code"] in ("PreconditionFailed", "ConditionalRequestConflict", "NoSuchKey")
+
+
+def upload_s3_object_from_file(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    file_obj: BinaryIO,
+    content_type: Optional[str] = None,
+    part_size_bytes: int = DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    max_concurrency: int = DEFAULT_MULTIPART_MAX_CONCURRENCY,
+    cancel_event: Optional[threading.Event] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> bool:
+    """
+    Upload a file-like object to an S3 bucket, reading and uploading it one part at a time.
+
+    Files smaller than one part are uploaded with a single `put_object`. Larger files are uploaded
+    with a multipart upload whose parts are sent concurrently. Only `max_concurrency + 1` parts are
+    held in memory at once, however large the file is. If anything goes wrong the multipart upload
+    is aborted, so no orphaned parts are left behind.
+
+    Like `upsert_s3_object`, the object is created with `If-None-Match: *`, or replaced with `If-Match`
+    on the version of it that was found, which reports whether the upload created the object without
+    racing other uploads. A multipart upload stays open when completing it fails a precondition, so it
+    is completed again with the same upload ID against the new state of the object; the parts are not
+    sent again.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param file_obj: Readable binary file-like object with the content to upload.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param part_size_bytes: Size of each part; S3 requires at least 5 MiB for all but the last part.
+    :param max_concurrency: Maximum number of parts being uploaded at the same time.
+    :param cancel_event: If set while uploading, e.g. because the client disconnected, the upload is aborted.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: True if the object was created, False if an existing object was replaced.
+
+    :raises UploadCancelledError: If `cancel_event` was set before the upload finished.
+    """
+    if part_size_bytes < MIN_MULTIPART_PART_SIZE_BYTES:
+        raise ValueError(f"part_size_bytes must be at least {MIN_MULTIPART_PART_SIZE_BYTES} bytes")
+
+    content_type = content_type or "application/octet-stream"
+    s3_client = s3_client or get_s3_client()
+
+    first_part = file_obj.read(part_size_bytes)
+    if len(first_part) < part_size_bytes:
+        return upsert_s3_object(bucket_name, object_key, first_part, content_type=content_type, s3_client=s3_client)
+
+    upload_id = create_multipart_upload(bucket_name, object_key, content_type=content_type, s3_client=s3_client)
+    try:
+        parts = _upload_parts_concurrently(
+            bucket_name,
+            object_key,
+            upload_id,
+            first_part=first_part,
+            read_next_part=lambda: file_obj.read(part_size_bytes),
+            max_concurrency=max_concurrency,
+            cancel_event=cancel_event,
+            s3_client=s3_client,
+        )
+        return _write_conditionally(
+            bucket_name,
+            object_key,
+            lambda precondition: complete_multipart_upload(
+                bucket_name, object_key, upload_id, parts=parts, s3_client=s3_client, **precondition
+            ),
+            s3_client=s3_client,
+        )
+    except BaseException:
+        abort_multipart_upload(bucket_name, object_key, upload_id, s3_client=s3_client)
+        raise
+
+
+def _upload_parts_concurrently(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    first_part: bytes,
+    read_next_part: Callable[[], bytes],
+    max_concurrency: int,
+    cancel_event: Optional[threading.Event],
+    s3_client: "S3Client",
+) -> List["CompletedPartTypeDef"]:
+    """Upload parts as they are read, keeping at most `max_concurrency` of them in flight."""
+    completed_parts: List["CompletedPartTypeDef"] = []
+    in_flight: Set[Future] = set()
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="s3-upload-part") as executor:
+        try:
+            part_number, part = 1, first_part
+            while part:
+                if cancel_event is not None and cancel_event.is_set():
+                    raise UploadCancelledError(f"Upload of {object_key} was cancelled")
+
+                # wait for a free slot before reading the next part into memory
+                if len(in_flight) >= max_concurrency:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    completed_parts.extend(future.result() for future in done)
+
+                in_flight.add(
+                    executor.submit(
+                        upload_part, bucket_name, object_key, upload_id, part_number, part, s3_client=s3_client
+                    )
+                )
+                part_number, part = part_number + 1, read_next_part()
+
+            completed_parts.extend(future.result() for future in as_completed(in_flight))
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            raise
+
+    return sorted(completed_parts, key=lambda completed_part: completed_part["PartNumber"])
+
+
+def create_multipart_upload(
+    bucket_name: str,
+    object_key: str,
+    content_type: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> str:
+    """
+    Start a multipart upload.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param content_type: The MIME type of the file, e.g. "text/plain" for a text file.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: The ID of the new multipart upload.
+    """
+    s3_client = s3_client or get_s3_client()
+    response = s3_client.create_multipart_upload(
+        Bucket=bucket_name,
+        Key=object_key,
+        ContentType=content_type or "application/octet-stream",
     )
+    return response["UploadId"]
+
+
+def upload_part(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    part_number: int,
+    part_content: bytes,
+    s3_client: Optional["S3Client"] = None,
+) -> "CompletedPartTypeDef":
+    """
+    Upload one part of a multipart upload.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID of the multipart upload.
+    :param part_number: 1-based position of the part within the object.
+    :param part_content: The content of the part.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+
+    :return: The part number and ETag, as needed to complete the upload.
+    """
+    s3_client = s3_client or get_s3_client()
+    response = s3_client.upload_part(
+        Bucket=bucket_name,
+        Key=object_key,
+        UploadId=upload_id,
+        PartNumber=part_number,
+        Body=part_content,
+    )
+    return {"PartNumber": part_number, "ETag": response["ETag"]}
+
+
+def complete_multipart_upload(  # pylint: disable=too-many-arguments
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    parts: List["CompletedPartTypeDef"],
+    if_none_match: Optional[str] = None,
+    if_match: Optional[str] = None,
+    s3_client: Optional["S3Client"] = None,
+) -> None:
+    """
+    Assemble the uploaded parts into the final object.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID of the multipart upload.
+    :param parts: Part numbers and ETags of every uploaded part, in ascending part number order.
+    :param if_none_match: Optional "*" to only create the object; completing fails with
+        `PreconditionFailed` if the object already exists, and may then be retried without it.
+    :param if_match: Optional ETag to only replace that version of the object; completing fails with
+        `PreconditionFailed` if the object changed, and may then be retried with its new ETag.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+    """
+    s3_client = s3_client or get_s3_client()
+    kwargs = _get_precondition_kwargs(if_none_match, if_match)
+    s3_client.complete_multipart_upload(
+        Bucket=bucket_name,
+        Key=object_key,
+        UploadId=upload_id,
+        MultipartUpload={"Parts": parts},
+        **kwargs,
+    )
+
+
+def abort_multipart_upload(
+    bucket_name: str,
+    object_key: str,
+    upload_id: str,
+    s3_client: Optional["S3Client"] = None,
+) -> None:
+    """
+    Abort a multipart upload and delete any parts uploaded so far.
+
+    :param bucket_name: The name of the S3 bucket.
+    :param object_key: path to the object in the S3 bucket.
+    :param upload_id: The ID of the multipart upload.
+    :param s3_client: An optional boto3 S3 client. If not provided, the shared client is used.
+    """
+    s3_client = s3_client or get_s3_client()
+    s3_client.abort_multipart_upload(Bucket=bucket_name, Key=object_key, UploadId=upload_id)
@@ -6,6 +6,7 @@ import re
 from datetime import datetime
 from enum import Enum
 from typing import (
+    Dict,
     List,
     Optional,
 )
@@ -19,10 +20,39 @@ from pydantic import (
 )
 from typing_extensions import Self
 
+from files_api.archives import (
+    ArchiveCompression,
+    ArchiveFormat,
+)
+from files_api.s3.presigned_urls import (
+    MAX_MULTIPART_UPLOAD_PARTS,
+    MAX_OBJECT_SIZE_BYTES,
+)
+
 DEFAULT_GET_FILES_PAGE_SIZE = 10
 DEFAULT_GET_FILES_MIN_PAGE_SIZE = 10
 DEFAULT_GET_FILES_MAX_PAGE_SIZE = 100
 DEFAULT_GET_FILES_DIRECTORY = ""
+MAX_GET_FILES_DELIMITER_LENGTH = 16
+MAX_DELETE_FILES_FILE_PATHS = 10_000
+DEFAULT_BATCH_UPLOAD_MAX_FILES = 1000
+DEFAULT_BATCH_UPLOAD_MAX_CONCURRENCY = 16
+DEFAULT_ARCHIVE_PREFETCH_COUNT = 4
+
+
+class FileSortField(str, Enum):
+    """A field of `FileMetadata` that files can be sorted by."""
+
+    FILE_PATH = "file_path"
+    SIZE_BYTES = "size_bytes"
+    LAST_MODIFIED = "last_modified"
+
+
+class SortOrder(str, Enum):
+    """The direction of a sort."""
+
+    ASC = "asc"
+    DESC = "desc"
 
 
 # read (cRud)
@@ -42,7 +72,19 @@ class GetFilesResponse(BaseModel):
     """Response model for `GET /v1/files`."""
 
     files: List[FileMetadata]
+    directories: Optional[List[str]] = Field(
+        default=None,
+        description="With a `delimiter`, the sub-directories directly in `directory`, each ending with the delimiter.",
+    )
     next_page_token: Optional[str]
+    total_count: Optional[int] = Field(
+        default=None,
+        description="On the first page of a listing answered from the metadata index, the number of matching files.",
+    )
+    total_size_bytes: Optional[int] = Field(
+        default=None,
+        description="On the first page of a listing answered from the metadata index, the size of the matching files.",
+    )
 
     model_config = ConfigDict(
         json_schema_extra={
@@ -69,30 +111,83 @@ class GetFilesResponse(BaseModel):
 class GetFilesQueryParams(BaseModel):
     """Query parameters for `GET /v1/files`."""
 
-    page_size: int = Field(
-        DEFAULT_GET_FILES_PAGE_SIZE,
+    # page_size and directory default to None so that the validator can tell whether they were sent
+    page_size: Optional[int] = Field(
+        None,
         ge=DEFAULT_GET_FILES_MIN_PAGE_SIZE,
         le=DEFAULT_GET_FILES_MAX_PAGE_SIZE,
+        description=f"The number of files per page, {DEFAULT_GET_FILES_PAGE_SIZE} if not set.",
     )
-    directory: str = Field(
-        DEFAULT_GET_FILES_DIRECTORY,
-        description="The directory to list files from.",
+    directory: Optional[str] = Field(
+        None,
+        description="The directory to list files from, the whole bucket if not set.",
+    )
+    delimiter: Optional[str] = Field(
+        None,
+        min_length=1,
+        max_length=MAX_GET_FILES_DELIMITER_LENGTH,
+        description=(
+            "List only the files directly in `directory`, and its sub-directories, i.e. the distinct key prefixes"
+            " up to the next occurrence of the delimiter, usually `/`, under `directories`."
+        ),
+    )
+    sort_by: Optional[FileSortField] = Field(
+        None,
+        description="Sort files by this field instead of by path. Requires the metadata index.",
+    )
+    order: Optional[SortOrder] = Field(
+        None,
+        description="The direction to sort files in, ascending if not set. Requires the metadata index to be descending.",
+    )
+    extension: Optional[str] = Field(
+        None,
+        min_length=1,
+        description="Only list files with this extension, e.g. `txt`, compared case-insensitively. Requires the metadata index.",
+    )
+    modified_after: Optional[datetime] = Field(
+        None,
+        description="Only list files last modified at or after this time, UTC if no time zone is given. Requires the metadata index.",
+    )
+    modified_before: Optional[datetime] = Field(
+        None,
+        description="Only list files last modified before this time, UTC if no time zone is given. Requires the metadata index.",
+    )
+    offset: Optional[int] = Field(
+        None,
+        ge=0,
+        description=(
+            "Skip this many files before the first page. Later pages continue from the end of the previous one, "
+            "so they stay consistent while files change. Requires the metadata index."
+        ),
     )
     page_token: Optional[str] = Field(
         None,
-        description="The token for the next page.",
+        description="The token for the next page. It carries the other parameters of the listing.",
     )
 
     @model_validator(mode="after")
     def check_page_token_is_mutually_exclusive_with_page_size_and_directory(self) -> Self:
         if self.page_token:
-            get_files_query_params: dict = self.model_dump(exclude_unset=True)
-            page_size_set = "page_size" in get_files_query_params.keys()
-            directory_set = "directory" in get_files_query_params.keys()
-            if page_size_set or directory_set:
-                raise ValueError("page_token is mutually exclusive with page_size and directory")
+            other_params_set = [name for name, value in self if name != "page_token" and value is not None]
+            if other_params_set:
+                raise ValueError(f"page_token is mutually exclusive with {', '.join(other_params_set)}")
+        return self
+
+    @model_validator(mode="after")
+    def check_delimiter_is_not_combined_with_index_params(self) -> Self:
+        if self.delimiter and self.needs_metadata_index():
+            raise ValueError("delimiter cannot be combined with sort_by, order, extension, modified_* or offset")
         return self
 
+    def needs_metadata_index(self) -> bool:
+        """Whether the listing can only be answered from the metadata index."""
+        return (
+            self.sort_by not in (None, FileSortField.FILE_PATH)
+            or self.order == SortOrder.DESC
+            or any(value is not None for value in (self.extension, self.modified_after, self.modified_before))
+            or bool(self.offset)
+        )
+
 
 # delete (cruD)
 class DeleteFileResponse(BaseModel):
@@ -101,6 +196,50 @@ class DeleteFileResponse(BaseModel):
     message: str
 
 
+# delete (cruD)
+class DeleteFilesRequest(BaseModel):
+    """Request body of `POST /v1/files/batch-delete`. Exactly one of `file_paths` and `directory` must be set."""
+
+    file_paths: Optional[List[str]] = Field(
+        None,
+        min_length=1,
+        max_length=MAX_DELETE_FILES_FILE_PATHS,
+        description="Paths of the files to delete.",
+        json_schema_extra={"example": ["path/to/pyproject.toml", "path/to/Makefile"]},
+    )
+    directory: Optional[str] = Field(
+        None,
+        min_length=1,
+        description="Delete every file in this directory, including its subdirectories.",
+        json_schema_extra={"example": "path/to"},
+    )
+
+    @model_validator(mode="after")
+    def check_exactly_one_of_file_paths_and_directory(self) -> Self:
+        if (self.file_paths is None) == (self.directory is None):
+            raise ValueError("exactly one of file_paths and directory must be set")
+        return self
+
+
+# batch operations
+class FileFailure(BaseModel):
+    """A file that a batch operation failed on."""
+
+    file_path: str = Field(description="The path of the file.")
+    code: str = Field(description="The S3 error code, e.g. `AccessDenied`.")
+    message: str = Field(description="The S3 error message.")
+
+
+# delete (cruD)
+class DeleteFilesResponse(BaseModel):
+    """Response model for `POST /v1/files/batch-delete`."""
+
+    deleted_count: int = Field(
+        description="Number of files deleted. Paths of files that did not exist count as deleted."
+    )
+    failures: List[FileFailure] = Field(description="Files that could not be deleted.")
+
+
 # create/update (CrUd)
 class PutFileResponse(BaseModel):
     """Response model for `PUT /v1/files/:file_path`."""
@@ -112,6 +251,236 @@ class PutFileResponse(BaseModel):
     message: str = Field(description="A message about the operation.")
 
 
+# create/update (CrUd)
+class UploadFileResult(BaseModel):
+    """Outcome of uploading one file of `POST /v1/files/batch-upload`."""
+
+    file_path: str = Field(
+        description="The path of the file.",
+        json_schema_extra={"example": "path/to/pyproject.toml"},
+    )
+    status_code: int = Field(
+        description="The status code `PUT /v1/files/:file_path` would have returned for this file.",
+        json_schema_extra={"example": 201},
+    )
+    message: str = Field(description="A message about the operation.")
+
+
+# create/update (CrUd)
+class UploadFilesResponse(BaseModel):
+    """Response model for `POST /v1/files/batch-upload`."""
+
+    files: List[UploadFileResult] = Field(description="Outcome of each file, in the order they were sent.")
+
+
+# create/update (CrUd)
+class CreatePresignedUploadRequest(BaseModel):
+    """Request body of `POST /v1/files/presigned-uploads`."""
+
+    file_path: str = Field(
+        min_length=1,
+        description="The path to upload the file to.",
+        json_schema_extra={"example": "path/to/dataset.parquet"},
+    )
+    size_bytes: int = Field(
+        ge=0,
+        le=MAX_OBJECT_SIZE_BYTES,
+        description="The size of the file. Files larger than the multipart part size are uploaded in parts.",
+        json_schema_extra={"example": 104857600},
+    )
+    content_type: Optional[str] = Field(
+        None,
+        description="The MIME type to store the file with. Defaults to `application/octet-stream`.",
+        json_schema_extra={"example": "application/vnd.apache.parquet"},
+    )
+
+
+# create/update (CrUd)
+class PresignedUploadPart(BaseModel):
+    """The URL to `PUT` one part of a file to."""
+
+    part_number: int = Field(description="The 1-based position of the part within the file.")
+    url: str = Field(description="The presigned URL of the part.")
+
+
+# create/update (CrUd)
+class CreatePresignedUploadResponse(BaseModel):
+    """
+    Response model for `POST /v1/files/presigned-uploads`.
+
+    Either `url` is set, to `PUT` the whole file to with the given `headers`, or `upload_id` and
+    `parts`: every part but the last is `part_size_bytes` long, and the `ETag` header of each part's
+    response is needed to complete the upload. Either way, complete the upload with
+    `POST /v1/files/presigned-uploads/complete`.
+    """
+
+    file_path: str = Field(description="The path the file is uploaded to.")
+    url: Optional[str] = Field(None, description="The presigned URL to `PUT` a file uploaded in one request to.")
+    headers: Dict[str, str] = Field(description="Headers the `PUT` to `url` must send, as they are signed.")
+    upload_id: Optional[str] = Field(None, description="The ID of the multipart upload of a file uploaded in parts.")
+    part_size_bytes: Optional[int] = Field(None, description="The size of every part but the last.")
+    parts: List[PresignedUploadPart] = Field(description="The URL of every part, in order.")
+    expires_at: datetime = Field(description="When the URLs expire.")
+
+
+# create/update (CrUd)
+class CompletedUploadPart(BaseModel):
+    """A part of a file the client uploaded to its presigned URL."""
+
+    part_number: int = Field(ge=1, le=MAX_MULTIPART_UPLOAD_PARTS)
+    etag: str = Field(description="The `ETag` header S3 responded to the part's upload with.")
+
+
+# create/update (CrUd)
+class CompletePresignedUploadRequest(BaseModel):
+    """Request body of `POST /v1/files/presigned-uploads/complete`."""
+
+    file_path: str = Field(min_length=1, json_schema_extra={"example": "path/to/dataset.parquet"})
+    upload_id: Optional[str] = Field(None, description="The `upload_id` of a file uploaded in parts.")
+    parts: List[CompletedUploadPart] = Field(
+        default_factory=list,
+        max_length=MAX_MULTIPART_UPLOAD_PARTS,
+        description="Every part of a file uploaded in parts, in any order.",
+    )
+
+    @model_validator(mode="after")
+    def check_parts_belong_to_a_multipart_upload(self) -> Self:
+        if (self.upload_id is None) != (not self.parts):
+            raise ValueError("parts must be set exactly when upload_id is set")
+        return self
+
+
+# create/update (CrUd)
+class CreateUploadSessionRequest(BaseModel):
+    """Request body of `POST /v1/upload-sessions`."""
+
+    file_path: str = Field(
+        min_length=1,
+        description="The path to upload the file to.",
+        json_schema_extra={"example": "path/to/dataset.parquet"},
+    )
+    content_type: Optional[str] = Field(
+        None,
+        description="The MIME type to store the file with. Defaults to `application/octet-stream`.",
+        json_schema_extra={"example": "application/vnd.apache.parquet"},
+    )
+
+
+# read (cRud)
+class UploadedChunk(BaseModel):
+    """A chunk of an upload session that landed in S3."""
+
+    chunk_number: int = Field(description="The 1-based position of the chunk within the file.")
+    size_bytes: Optional[int] = Field(None, description="The size of the chunk.")
+    etag: str = Field(
+        description="The `ETag` of the chunk; the hex MD5 of its bytes, unless the bucket encrypts with KMS."
+    )
+
+
+# read (cRud)
+class UploadSession(BaseModel):
+    """
+    Response model of the `/v1/upload-sessions` endpoints.
+
+    Split the file into chunks of `chunk_size_bytes`, the last one possibly shorter, and `PUT` each to
+    `/v1/upload-sessions/:session_id/chunks/:chunk_number`, in any order and concurrently if the client
+    likes. After a dropped connection, `GET` the session to see which chunks landed and send only the rest.
+    """
+
+    session_id: str = Field(description="The ID to send the session's chunks to.")
+    file_path: str = Field(description="The path the file is uploaded to.")
+    chunk_size_bytes: int = Field(description="The suggested size of every chunk but the last.")
+    min_chunk_size_bytes: int = Field(description="The smallest size S3 accepts for every chunk but the last.")
+    max_chunk_size_bytes: int = Field(description="The largest chunk the API accepts.")
+    created_at: datetime = Field(description="When the session was created.")
+    expires_at: datetime = Field(description="When the session is aborted, with its chunks, if it was not completed.")
+    chunks: List[UploadedChunk] = Field(description="The chunks that landed so far, by chunk number.")
+
+
+# create/update (CrUd)
+class CompleteUploadSessionRequest(BaseModel):
+    """Request body of `POST /v1/upload-sessions/:session_id/complete`."""
+
+    chunk_count: int = Field(
+        ge=1,
+        le=MAX_MULTIPART_UPLOAD_PARTS,
+        description="The number of chunks the file was split into; chunks 1 to `chunk_count` must have landed.",
+        json_schema_extra={"example": 12},
+    )
+
+
+# read (cRud)
+class GetArchiveQueryParams(BaseModel):
+    """Query parameters for `GET /v1/archive`."""
+
+    directory: str = Field(
+        DEFAULT_GET_FILES_DIRECTORY,
+        description="The directory to archive, including its subdirectories. By default, every file is archived.",
+    )
+    format: ArchiveFormat = Field(ArchiveFormat.ZIP, description="The format of the archive.")
+    compression: ArchiveCompression = Field(
+        ArchiveCompression.STORE,
+        description=(
+            "`store` sends the files as they are, which costs no CPU; `deflate` compresses each file of a ZIP "
+            "archive, or gzips a TAR archive, which saves bandwidth on compressible files."
+        ),
+    )
+
+
+# create/update (CrUd)
+class CopyFilesRequest(BaseModel):
+    """
+    Request body of `POST /v1/files/copy` and `POST /v1/files/move`.
+
+    Either `source_path` and `destination_path`, or `source_directory` and `destination_directory` must be set.
+    """
+
+    source_path: Optional[str] = Field(None, min_length=1, json_schema_extra={"example": "path/to/pyproject.toml"})
+    destination_path: Optional[str] = Field(
+        None, min_length=1, json_schema_extra={"example": "path/to/copy/pyproject.toml"}
+    )
+    source_directory: Optional[str] = Field(
+        None,
+        min_length=1,
+        description="Copy every file in this directory, including its subdirectories.",
+        json_schema_extra={"example": "path/to"},
+    )
+    destination_directory: Optional[str] = Field(
+        None,
+        min_length=1,
+        description="Directory to copy the files of `source_directory` to, keeping their relative paths.",
+        json_schema_extra={"example": "path/to/copy"},
+    )
+
+    @model_validator(mode="after")
+    def check_exactly_one_of_files_and_directories(self) -> Self:
+        files = (self.source_path, self.destination_path)
+        directories = (self.source_directory, self.destination_directory)
+        if not (all(files) and not any(directories)) and not (all(directories) and not any(files)):
+            raise ValueError(
+                "either source_path and destination_path, or source_directory and destination_directory must be set"
+            )
+        if self.source_path == self.destination_path and self.source_path:
+            raise ValueError("source_path and destination_path must differ")
+        if self.source_directory and self.destination_directory:
+            source, destination = (_to_directory_prefix(directory) for directory in directories)
+            if source.startswith(destination) or destination.startswith(source):
+                raise ValueError("source_directory and destination_directory must not contain one another")
+        return self
+
+
+def _to_directory_prefix(directory: str) -> str:
+    return f"{directory.strip('/')}/".lstrip("/")
+
+
+# create/update (CrUd)
+class CopyFilesResponse(BaseModel):
+    """Response model for `POST /v1/files/copy` and `POST /v1/files/move`."""
+
+    file_count: int = Field(description="Number of files copied, or moved.")
+    failures: List[FileFailure] = Field(description="Files that could not be copied, or moved.")
+
+
 class GeneratedFileType(str, Enum):
     """The type of file generated by OpenAI."""
 
@@ -195,3 +564,123 @@ class PutGeneratedFileResponse(BaseModel):
             ]
         }
     )
+
+
+# metrics
+class HistogramSnapshot(BaseModel):
+    """Snapshot of a latency histogram."""
+
+    buckets: Dict[str, int] = Field(
+        description="Cumulative count of observations less than or equal to each bucket's upper bound, in seconds.",
+        json_schema_extra={"example": {"0.001": 4, "0.005": 9, "+Inf": 10}},
+    )
+    count: int = Field(description="Total number of observations.")
+    sum: float = Field(description="Sum of all observed values, in seconds.")
+
+
+# metrics
+class S3ExecutorMetrics(BaseModel):
+    """Load and latency of the thread pool that runs blocking S3 calls."""
+
+    max_workers: int = Field(description="Number of threads in the pool.")
+    queued: int = Field(
+        description="Calls waiting for a free thread. Persistently above 0 means the pool is saturated."
+    )
+    active: int = Field(description="Calls currently running on a thread.")
+    completed: int = Field(description="Calls finished since startup.")
+    wait_seconds: HistogramSnapshot = Field(description="Time calls spent queued before a thread picked them up.")
+    run_seconds: HistogramSnapshot = Field(description="Time calls spent running, mostly waiting on S3.")
+
+
+# metrics
+class CacheMetrics(BaseModel):
+    """Size and effectiveness of an in-process cache."""
+
+    size: int = Field(description="Number of entries currently cached, including expired ones not yet dropped.")
+    max_entries: int = Field(description="Entries the cache holds before evicting the least recently used one.")
+    hits: int = Field(description="Lookups answered from the cache since startup.")
+    misses: int = Field(description="Lookups that had to go to S3 since startup.")
+    evictions: int = Field(description="Entries evicted to make room since startup.")
+
+
+# metrics
+class ObjectContentCacheMetrics(BaseModel):
+    """Size and effectiveness of the in-memory cache of small files' content."""
+
+    size: int = Field(description="Number of files cached, including expired ones not yet dropped.")
+    size_bytes: int = Field(description="Total size of the files cached.")
+    max_bytes: int = Field(description="Total size the cache holds before evicting files.")
+    hits: int = Field(description="Downloads answered from memory since startup.")
+    misses: int = Field(description="Downloads that had to go to S3 since startup.")
+    evictions: int = Field(description="Files evicted to make room for more frequently downloaded ones since startup.")
+    rejections: int = Field(
+        description="Files not cached since startup because they were downloaded less often than those cached."
+    )
+
+
+# metrics
+class S3MetadataCacheMetrics(BaseModel):
+    """Effectiveness of the cache of S3 object metadata and listing pages."""
+
+    objects: CacheMetrics = Field(description="Cached object metadata, used by existence checks and HEAD requests.")
+    listings: CacheMetrics = Field(description="Cached pages of file listings.")
+    contents: Optional[ObjectContentCacheMetrics] = Field(
+        None, description="Cached content of small files, if enabled."
+    )
+
+
+# metrics
+class ListingPrefetchMetrics(CacheMetrics):
+    """Effectiveness of fetching the next page of a listing before the client requests it."""
+
+    prefetched: int = Field(description="Pages fetched ahead since startup.")
+    hit_rate: Optional[float] = Field(
+        description="Share of requests for a next page that were answered from a prefetched page; null before any."
+    )
+
+
+# metrics
+class DiskCacheMetrics(BaseModel):
+    """Size and effectiveness of the cache of downloaded files on local disk."""
+
+    size: int = Field(description="Number of files cached.")
+    size_bytes: int = Field(description="Total size of the files cached.")
+    max_bytes: int = Field(description="Total size the cache holds before evicting files.")
+    hits: int = Field(description="Downloads sent from disk since startup.")
+    misses: int = Field(description="Downloads of files small enough to cache that had to go to S3 since startup.")
+    evictions: int = Field(description="Files evicted to make room since startup.")
+
+
+# metrics
+class ReconcileMetrics(BaseModel):
+    """Outcome of the last scan of the bucket that brought the metadata index in line with S3."""
+
+    shard_count: int = Field(description="Number of prefix shards the bucket was listed in.")
+    listed_keys: int = Field(description="Number of keys listed.")
+    written_keys: int = Field(description="Keys that were missing from the index or had changed.")
+    deleted_keys: int = Field(description="Indexed keys that were no longer in the bucket.")
+    duration_seconds: float = Field(description="Time the scan took.")
+    keys_per_second: float = Field(description="Keys listed per second.")
+    shard_skew: float = Field(
+        description="Keys in the largest shard over the mean keys per shard; 1.0 when the shards are even."
+    )
+
+
+# metrics
+class MetadataIndexMetrics(BaseModel):
+    """Size and freshness of the metadata index."""
+
+    objects: int = Field(description="Number of files in the index.")
+    built_buckets: List[str] = Field(description="Buckets whose index is complete and answers listings.")
+    last_reconcile: Optional[ReconcileMetrics] = Field(None, description="The last scan of the bucket, if any.")
+
+
+# metrics
+class GetMetricsResponse(BaseModel):
+    """Response model for `GET /v1/metrics`."""
+
+    s3_executor: S3ExecutorMetrics
+    s3_metadata_cache: Optional[S3MetadataCacheMetrics] = None
+    listing_prefetch: Optional[ListingPrefetchMetrics] = None
+    metadata_index: Optional[MetadataIndexMetrics] = None
+    disk_cache: Optional[DiskCacheMetrics] = None
@@ -1,9 +1,77 @@
+from enum import Enum
+from typing import (
+    Dict,
+    Optional,
+)
+
 from pydantic import Field
 from pydantic_settings import (
     BaseSettings,
     SettingsConfigDict,
 )
 
+from files_api.compression import (
+    DEFAULT_BROTLI_LEVEL,
+    DEFAULT_COMPRESSION_MIN_SIZE_BYTES,
+    DEFAULT_GZIP_LEVEL,
+    DEFAULT_ZSTD_LEVEL,
+)
+from files_api.s3.clients import (
+    DEFAULT_CONNECT_TIMEOUT_SECONDS,
+    DEFAULT_MAX_POOL_CONNECTIONS,
+    DEFAULT_MAX_RETRY_ATTEMPTS,
+    DEFAULT_READ_TIMEOUT_SECONDS,
+    DEFAULT_TCP_KEEPALIVE,
+)
+from files_api.s3.copy_objects import (
+    DEFAULT_COPY_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+)
+from files_api.s3.delete_objects import DEFAULT_BULK_DELETE_MAX_CONCURRENCY
+from files_api.s3.disk_cache import (
+    DEFAULT_DISK_CACHE_MAX_BYTES,
+    DEFAULT_DISK_CACHE_MAX_OBJECT_SIZE_BYTES,
+    DiskCacheEviction,
+)
+from files_api.s3.listing_prefetch import DEFAULT_LISTING_PREFETCH_TTL_SECONDS
+from files_api.s3.metadata_cache import (
+    DEFAULT_CONTENT_CACHE_MAX_OBJECT_SIZE_BYTES,
+    DEFAULT_METADATA_CACHE_NEGATIVE_TTL_SECONDS,
+    DEFAULT_METADATA_CACHE_TTL_SECONDS,
+)
+from files_api.s3.presigned_urls import (
+    DEFAULT_PRESIGNED_URL_TTL_SECONDS,
+    MAX_PRESIGNED_URL_TTL_SECONDS,
+)
+from files_api.s3.read_objects import (
+    DEFAULT_PARALLEL_DOWNLOAD_MAX_CONCURRENCY,
+    DEFAULT_PARALLEL_DOWNLOAD_PART_SIZE_BYTES,
+    DEFAULT_PARALLEL_DOWNLOAD_THRESHOLD_BYTES,
+)
+from files_api.s3.reconciler import DEFAULT_RECONCILE_MAX_CONCURRENCY
+from files_api.s3.upload_sessions import (
+    DEFAULT_UPLOAD_SESSION_MAX_CHUNK_SIZE_BYTES,
+    DEFAULT_UPLOAD_SESSION_TTL_SECONDS,
+    MAX_UPLOAD_SESSION_CHUNK_SIZE_BYTES,
+)
+from files_api.s3.write_objects import (
+    DEFAULT_MULTIPART_MAX_CONCURRENCY,
+    DEFAULT_MULTIPART_PART_SIZE_BYTES,
+    MIN_MULTIPART_PART_SIZE_BYTES,
+)
+from files_api.schemas import (
+    DEFAULT_ARCHIVE_PREFETCH_COUNT,
+    DEFAULT_BATCH_UPLOAD_MAX_CONCURRENCY,
+    DEFAULT_BATCH_UPLOAD_MAX_FILES,
+)
+
+
+class S3BackendType(str, Enum):
+    """The library the routes use to call S3."""
+
+    BOTO3 = "boto3"
+    AIOBOTOCORE = "aiobotocore"
+
 
 class Settings(BaseSettings):
     """
@@ -15,4 +83,279 @@ class Settings(BaseSettings):
 
     s3_bucket_name: str = Field(...)
 
+    s3_backend: S3BackendType = Field(
+        default=S3BackendType.BOTO3,
+        description="Call S3 with blocking boto3 or with asyncio-native aiobotocore (requires the `aiobotocore` extra).",
+    )
+    s3_max_pool_connections: int = Field(
+        default=DEFAULT_MAX_POOL_CONNECTIONS,
+        ge=1,
+        description="Maximum number of HTTP connections the shared S3 client keeps open.",
+    )
+    s3_tcp_keepalive: bool = Field(
+        default=DEFAULT_TCP_KEEPALIVE,
+        description="Whether to enable TCP keep-alive on the S3 client's pooled connections.",
+    )
+    s3_connect_timeout_seconds: float = Field(
+        default=DEFAULT_CONNECT_TIMEOUT_SECONDS,
+        gt=0,
+        description="Seconds to wait when opening a connection to S3.",
+    )
+    s3_read_timeout_seconds: float = Field(
+        default=DEFAULT_READ_TIMEOUT_SECONDS,
+        gt=0,
+        description="Seconds to wait for S3 to send data on an open connection.",
+    )
+    s3_max_retry_attempts: int = Field(
+        default=DEFAULT_MAX_RETRY_ATTEMPTS,
+        ge=0,
+        description="Maximum number of retries for throttled or failed S3 requests.",
+    )
+
+    multipart_upload_part_size_bytes: int = Field(
+        default=DEFAULT_MULTIPART_PART_SIZE_BYTES,
+        ge=MIN_MULTIPART_PART_SIZE_BYTES,
+        description="Uploads larger than this are sent to S3 as a multipart upload with parts of this size.",
+    )
+    multipart_upload_max_concurrency: int = Field(
+        default=DEFAULT_MULTIPART_MAX_CONCURRENCY,
+        ge=1,
+        description="Maximum number of parts of one upload sent to S3 at the same time.",
+    )
+
+    deduplicate_uploads: bool = Field(
+        default=False,
+        description=(
+            "Whether to store each distinct file content once, under its SHA-256 digest, with every uploaded "
+            "file a pointer to its content. An upload whose content the bucket already holds sends no file body "
+            "to S3. Objects written to the bucket by other means are served as they are."
+        ),
+    )
+
+    batch_upload_max_files: int = Field(
+        default=DEFAULT_BATCH_UPLOAD_MAX_FILES,
+        ge=1,
+        description="Maximum number of files in one `POST /v1/files/batch-upload` request.",
+    )
+    batch_upload_max_concurrency: int = Field(
+        default=DEFAULT_BATCH_UPLOAD_MAX_CONCURRENCY,
+        ge=1,
+        description="Maximum number of files of one batch upload sent to S3 at the same time.",
+    )
+
+    parallel_download_threshold_bytes: int = Field(
+        default=DEFAULT_PARALLEL_DOWNLOAD_THRESHOLD_BYTES,
+        ge=1,
+        description="Downloads larger than this are fetched from S3 with concurrent ranged GETs.",
+    )
+    parallel_download_part_size_bytes: int = Field(
+        default=DEFAULT_PARALLEL_DOWNLOAD_PART_SIZE_BYTES,
+        ge=1,
+        description="Size of each ranged GET of a parallel download.",
+    )
+    parallel_download_max_concurrency: int = Field(
+        default=DEFAULT_PARALLEL_DOWNLOAD_MAX_CONCURRENCY,
+        ge=1,
+        description="Maximum number of ranged GETs of one download in flight, and thus of parts buffered, at once.",
+    )
+
+    presigned_download_threshold_bytes: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description=(
+            "Downloads of files at least this large are redirected (307) to a presigned S3 URL, so their bytes "
+            "do not pass through the API. Unset, every download is streamed by the API."
+        ),
+    )
+    presigned_url_ttl_seconds: int = Field(
+        default=DEFAULT_PRESIGNED_URL_TTL_SECONDS,
+        ge=1,
+        le=MAX_PRESIGNED_URL_TTL_SECONDS,
+        description="Number of seconds the presigned download and upload URLs the API hands out are valid for.",
+    )
+    disk_cache_dir: Optional[str] = Field(
+        default=None,
+        description=(
+            "Directory in which to cache downloaded files, so repeated downloads of a file are sent from local "
+            "disk rather than S3. Unset, files are not cached on disk. Each API process uses a subdirectory of "
+            "its own, deleted on shutdown. A cached file is sent only while its ETag in S3 is unchanged; with "
+            "the metadata cache enabled, that ETag may be up to `METADATA_CACHE_TTL_SECONDS` old, so a file "
+            "replaced by another API instance can be sent from disk for that long."
+        ),
+    )
+    disk_cache_max_bytes: int = Field(
+        default=DEFAULT_DISK_CACHE_MAX_BYTES,
+        ge=1,
+        description="Total size of the files cached on disk, beyond which files are evicted.",
+    )
+    disk_cache_max_object_size_bytes: int = Field(
+        default=DEFAULT_DISK_CACHE_MAX_OBJECT_SIZE_BYTES,
+        ge=1,
+        description="Files larger than this are never cached on disk.",
+    )
+    disk_cache_eviction: DiskCacheEviction = Field(
+        default=DiskCacheEviction.LRU,
+        description=(
+            "Evict the least recently used (`lru`) or the least frequently used (`lfu`) file to make room; `lfu` "
+            "keeps hot files cached while many files are downloaded once."
+        ),
+    )
+    upload_session_ttl_seconds: int = Field(
+        default=DEFAULT_UPLOAD_SESSION_TTL_SECONDS,
+        ge=60,
+        description=(
+            "With `UPLOAD_SESSION_GC_INTERVAL_SECONDS` set, upload sessions, and any other multipart upload, "
+            "not completed within this many seconds of being started are aborted and their chunks deleted."
+        ),
+    )
+    upload_session_gc_interval_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Seconds between scans of the bucket for abandoned upload sessions, e.g. 3600. S3 cannot tell an "
+            "upload session from any other multipart upload, so each scan aborts *every* multipart upload of the "
+            "bucket older than `UPLOAD_SESSION_TTL_SECONDS`, including those started by other clients of the "
+            "bucket; only set this if the API is the bucket's sole writer. Unset, the API never aborts them, "
+            "e.g. because a bucket lifecycle rule aborts incomplete multipart uploads."
+        ),
+    )
+    upload_session_max_chunk_size_bytes: int = Field(
+        default=DEFAULT_UPLOAD_SESSION_MAX_CHUNK_SIZE_BYTES,
+        ge=MIN_MULTIPART_PART_SIZE_BYTES,
+        le=MAX_UPLOAD_SESSION_CHUNK_SIZE_BYTES,
+        description="Largest chunk accepted by an upload session; each chunk is held in memory while it is sent to S3.",
+    )
+
+    copy_max_concurrency: int = Field(
+        default=DEFAULT_COPY_MAX_CONCURRENCY,
+        ge=1,
+        description=(
+            "Maximum number of files of one directory copy or move, and of parts of one large file, copied at once."
+        ),
+    )
+    multipart_copy_part_size_bytes: int = Field(
+        default=DEFAULT_MULTIPART_COPY_PART_SIZE_BYTES,
+        ge=MIN_MULTIPART_PART_SIZE_BYTES,
+        description="Files larger than 5 GiB are copied by S3 in parts of this size.",
+    )
+
+    bulk_delete_max_concurrency: int = Field(
+        default=DEFAULT_BULK_DELETE_MAX_CONCURRENCY,
+        ge=1,
+        description="Maximum number of S3 `DeleteObjects` requests of one bulk delete in flight at once.",
+    )
+
+    archive_prefetch_count: int = Field(
+        default=DEFAULT_ARCHIVE_PREFETCH_COUNT,
+        ge=1,
+        description="Number of files an archive download requests from S3 ahead of the file it is writing.",
+    )
+
+    cache_control_by_prefix: Dict[str, str] = Field(
+        default_factory=dict,
+        description=(
+            "`Cache-Control` header of downloaded files, keyed by file path prefix, as a JSON object, e.g. "
+            '`{"public/": "public, max-age=86400", "": "no-cache"}`. The longest matching prefix wins.'
+        ),
+    )
+
+    response_compression_enabled: bool = Field(
+        default=False,
+        description=(
+            "Whether to compress responses with the gzip, zstd or brotli coding the client accepts. zstd and "
+            "brotli require the `compression` extra."
+        ),
+    )
+    response_compression_min_size_bytes: int = Field(
+        default=DEFAULT_COMPRESSION_MIN_SIZE_BYTES,
+        ge=0,
+        description="Responses of a known size below this are not compressed; streamed responses always are.",
+    )
+    response_compression_gzip_level: int = Field(
+        default=DEFAULT_GZIP_LEVEL, ge=1, le=9, description="gzip compression level, from fastest (1) to smallest (9)."
+    )
+    response_compression_zstd_level: int = Field(
+        default=DEFAULT_ZSTD_LEVEL,
+        ge=1,
+        le=22,
+        description="zstd compression level, from fastest (1) to smallest (22).",
+    )
+    response_compression_brotli_level: int = Field(
+        default=DEFAULT_BROTLI_LEVEL,
+        ge=0,
+        le=11,
+        description="brotli compression level, from fastest (0) to smallest (11).",
+    )
+
+    metadata_cache_max_entries: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Maximum number of objects, and of listing pages, whose S3 metadata is cached, e.g. 10000. "
+            "0 disables the cache, so every request sees the bucket as it is."
+        ),
+    )
+    metadata_cache_ttl_seconds: float = Field(
+        default=DEFAULT_METADATA_CACHE_TTL_SECONDS,
+        ge=0,
+        description=(
+            "Seconds cached metadata and listing pages are served for. Bounds how long changes made by "
+            "other API instances take to show."
+        ),
+    )
+    metadata_cache_negative_ttl_seconds: float = Field(
+        default=DEFAULT_METADATA_CACHE_NEGATIVE_TTL_SECONDS,
+        ge=0,
+        description="Seconds an object found missing is remembered as missing.",
+    )
+    object_content_cache_max_bytes: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Bytes of small files whose content is cached in memory, alongside their metadata. "
+            "A file is only cached if it is downloaded more often than the files it would evict. 0 disables the cache."
+        ),
+    )
+    object_content_cache_max_object_size_bytes: int = Field(
+        default=DEFAULT_CONTENT_CACHE_MAX_OBJECT_SIZE_BYTES,
+        ge=0,
+        description="Largest file whose content is cached in memory.",
+    )
+
+    listing_prefetch_max_entries: int = Field(
+        default=0,
+        ge=0,
+        description=(
+            "Maximum number of next pages of file listings fetched ahead of the client's request for them, "
+            "e.g. 1000. Each costs a LIST request whether or not the client asks for it. 0 disables prefetching."
+        ),
+    )
+    listing_prefetch_ttl_seconds: float = Field(
+        default=DEFAULT_LISTING_PREFETCH_TTL_SECONDS,
+        ge=0,
+        description="Seconds a prefetched page is kept for the client to request it.",
+    )
+
+    metadata_index_path: Optional[str] = Field(
+        default=None,
+        description=(
+            "Path of a SQLite database in which to index the size and modification time of every file, "
+            "so that files can be sorted, filtered and counted without scanning the bucket. The index is "
+            "built in the background on startup if the bucket has not been indexed yet. Unset disables the index."
+        ),
+    )
+    metadata_index_reconcile_interval_seconds: Optional[float] = Field(
+        default=None,
+        gt=0,
+        description=(
+            "Seconds between re-scans of the bucket that bring the metadata index in line with changes made "
+            "outside the API. Unset only scans the bucket to build the index."
+        ),
+    )
+    metadata_index_reconcile_max_concurrency: int = Field(
+        default=DEFAULT_RECONCILE_MAX_CONCURRENCY,
+        ge=1,
+        description="Maximum number of prefix shards of the bucket listed at the same time when scanning it.",
+    )
+
     model_config = SettingsConfigDict(case_sensitive=False)
@@ -20,4 +20,5 @@ pytest_plugins = [
     "tests.fixtures.mocked_aws",
     "tests.fixtures.api_client",
     "tests.fixtures.mocked_openai",
+    "tests.fixtures.mocked_aws_server",
 ]
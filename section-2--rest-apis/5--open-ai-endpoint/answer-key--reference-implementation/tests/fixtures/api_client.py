@@ -1,10 +1,15 @@
 """Fixtures for FastAPI test client."""
 
+import time
+
 import pytest
 from fastapi.testclient import TestClient
 
 from files_api.main import create_app
-from files_api.settings import Settings
+from files_api.settings import (
+    S3BackendType,
+    Settings,
+)
 from tests.consts import TEST_BUCKET_NAME
 
 
@@ -16,3 +21,52 @@ def client(mocked_aws, mocked_openai) -> TestClient:
     app = create_app(settings=settings)
     with TestClient(app) as client:
         yield client
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def aiobotocore_client(mocked_aws_server) -> TestClient:
+    """Pytest fixture to provide a FastAPI test client that calls S3 with the aiobotocore backend."""
+    settings: Settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, s3_backend=S3BackendType.AIOBOTOCORE)
+    app = create_app(settings=settings)
+    with TestClient(app) as client:
+        yield client
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def indexed_client(mocked_aws, mocked_openai, tmp_path) -> TestClient:
+    """Pytest fixture to provide a FastAPI test client that keeps a metadata index of the bucket."""
+    settings: Settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, metadata_index_path=str(tmp_path / "index.db"))
+    app = create_app(settings=settings)
+    with TestClient(app) as client:
+        wait_for_metadata_index(client)
+        yield client
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def disk_caching_client(mocked_aws, mocked_openai, tmp_path) -> TestClient:
+    """Pytest fixture to provide a FastAPI test client that sends downloaded files from a disk cache."""
+    settings: Settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, disk_cache_dir=str(tmp_path))
+    app = create_app(settings=settings)
+    with TestClient(app) as client:
+        yield client
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def content_caching_client(mocked_aws, mocked_openai) -> TestClient:
+    """Pytest fixture to provide a FastAPI test client that answers downloads of small files from memory."""
+    settings: Settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, object_content_cache_max_bytes=1024 * 1024)
+    app = create_app(settings=settings)
+    with TestClient(app) as client:
+        yield client
+
+
+def wait_for_metadata_index(client: TestClient, timeout_seconds: float = 10) -> None:
+    """Wait for the app to finish building its metadata index, which it does in the background on startup."""
+    deadline = time.monotonic() + timeout_seconds
+    while client.app.state.s3_backend.last_reconcile_report is None:
+        assert time.monotonic() < deadline, "the metadata index was not built in time"
+        time.sleep(0.01)
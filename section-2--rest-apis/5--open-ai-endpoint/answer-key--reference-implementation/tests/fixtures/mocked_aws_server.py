@@ -0,0 +1,39 @@
+"""Pytest fixture to run a local moto server, for clients that cannot be mocked in-process (e.g. aiobotocore)."""
+
+import logging
+
+import boto3
+import pytest
+from moto.server import ThreadedMotoServer
+
+from tests.consts import TEST_BUCKET_NAME
+from tests.fixtures.mocked_openai import temporary_env_vars
+from tests.utils import delete_s3_bucket
+
+MOTO_SERVER_PORT = 5006
+
+
+@pytest.fixture(scope="session")
+def moto_server_url():
+    """Start a moto server on localhost for the duration of the test session."""
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    server = ThreadedMotoServer(port=MOTO_SERVER_PORT, verbose=False)
+    server.start()
+    yield f"http://localhost:{MOTO_SERVER_PORT}"
+    server.stop()
+
+
+@pytest.fixture
+def mocked_aws_server(moto_server_url: str):
+    """Point AWS SDKs at the moto server and create the test bucket; clean up after the test."""
+    with temporary_env_vars(
+        {
+            "AWS_ENDPOINT_URL": moto_server_url,
+            "AWS_ACCESS_KEY_ID": "testing",
+            "AWS_SECRET_ACCESS_KEY": "testing",
+            "AWS_DEFAULT_REGION": "us-east-1",
+        }
+    ):
+        boto3.client("s3").create_bucket(Bucket=TEST_BUCKET_NAME)
+        yield
+        delete_s3_bucket(TEST_BUCKET_NAME)
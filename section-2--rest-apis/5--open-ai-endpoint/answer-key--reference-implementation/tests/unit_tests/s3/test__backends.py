@@ -0,0 +1,94 @@
+"""Test cases for `s3.backends`."""
+
+import asyncio
+import os
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+from files_api.s3.aio.clients import create_async_s3_client
+from files_api.s3.backends import (
+    AiobotocoreS3Backend,
+    Boto3S3Backend,
+)
+from files_api.s3.executor import S3Executor
+from files_api.s3.metadata_index import S3MetadataIndex
+from tests.consts import TEST_BUCKET_NAME
+
+# small sizes so that a few hundred bytes already take several ranged GETs
+PARALLEL_DOWNLOAD_KWARGS = {"threshold_bytes": 100, "part_size_bytes": 30, "max_concurrency": 2}
+
+
+async def download(backend: Boto3S3Backend, object_key: str) -> tuple[dict, bytes]:
+    response = await backend.fetch_s3_object_in_parallel(TEST_BUCKET_NAME, object_key, **PARALLEL_DOWNLOAD_KWARGS)
+    content = b"".join([chunk async for chunk in response["Body"]])
+    return response, content
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def boto3_backend(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    executor = S3Executor(max_workers=4)
+    yield Boto3S3Backend(s3_client=s3_client, executor=executor)
+    executor.shutdown()
+
+
+@pytest.mark.parametrize("size_bytes", [0, 1, 100, 101, 130, 131, 1000])
+def test_fetch_s3_object_in_parallel__returns_whole_object(boto3_backend: Boto3S3Backend, size_bytes: int):
+    file_content = os.urandom(size_bytes)
+    boto3_backend.s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="file.bin", Body=file_content)
+
+    response, content = asyncio.run(download(boto3_backend, "file.bin"))
+
+    assert content == file_content
+    assert response["ContentLength"] == size_bytes
+    assert "ContentRange" not in response
+
+
+def test_fetch_s3_object_in_parallel__fails_if_object_changes(boto3_backend: Boto3S3Backend):
+    boto3_backend.s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="file.bin", Body=os.urandom(1000))
+
+    async def download_while_overwriting():
+        response = await boto3_backend.fetch_s3_object_in_parallel(
+            TEST_BUCKET_NAME, "file.bin", **PARALLEL_DOWNLOAD_KWARGS
+        )
+        boto3_backend.s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="file.bin", Body=os.urandom(1000))
+        return b"".join([chunk async for chunk in response["Body"]])
+
+    with pytest.raises(ClientError, match="PreconditionFailed"):
+        asyncio.run(download_while_overwriting())
+
+
+# pylint: disable=unused-argument
+def test_fetch_s3_object_in_parallel__aiobotocore_backend(mocked_aws_server: None):
+    file_content = os.urandom(1000)
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="file.bin", Body=file_content)
+
+    async def download_with_aiobotocore():
+        executor = S3Executor(max_workers=1)
+        async with create_async_s3_client() as async_s3_client:
+            backend = AiobotocoreS3Backend(s3_client=s3_client, executor=executor, async_s3_client=async_s3_client)
+            _, content = await download(backend, "file.bin")
+        executor.shutdown()
+        return content
+
+    assert asyncio.run(download_with_aiobotocore()) == file_content
+
+
+def test_upload_s3_object__deduplicated_upload_is_indexed_once(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    executor = S3Executor(max_workers=4)
+    backend = Boto3S3Backend(
+        s3_client=s3_client, executor=executor, metadata_index=S3MetadataIndex(":memory:"), deduplicate_uploads=True
+    )
+    head_object_calls: list = []
+    s3_client.meta.events.register("before-call.s3.HeadObject", lambda **_: head_object_calls.append(1))
+
+    asyncio.run(backend.upload_s3_object(TEST_BUCKET_NAME, "file.txt", b"content"))
+    executor.shutdown()
+
+    # the file's previous pointer and the content are looked up before writing, then both once more to index the file
+    assert len(head_object_calls) == 4
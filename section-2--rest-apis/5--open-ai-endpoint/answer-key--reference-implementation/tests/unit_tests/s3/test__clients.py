@@ -0,0 +1,51 @@
+"""Test cases for `s3.clients`."""
+
+import pytest
+from fastapi.testclient import TestClient
+
+from files_api.s3.clients import (
+    create_s3_client,
+    get_s3_client,
+    register_s3_client,
+)
+
+
+@pytest.fixture
+def empty_s3_client_registry():
+    """Clear the process-wide S3 client before and after a test."""
+    register_s3_client(None)
+    yield
+    register_s3_client(None)
+
+
+def test_create_s3_client_applies_pool_config():
+    s3_client = create_s3_client(
+        max_pool_connections=7,
+        tcp_keepalive=True,
+        connect_timeout_seconds=1.5,
+        read_timeout_seconds=9,
+    )
+    assert s3_client.meta.config.max_pool_connections == 7
+    assert s3_client.meta.config.tcp_keepalive is True
+    assert s3_client.meta.config.connect_timeout == 1.5
+    assert s3_client.meta.config.read_timeout == 9
+
+
+# pylint: disable=unused-argument
+def test_get_s3_client_reuses_one_client(mocked_aws, empty_s3_client_registry):
+    assert get_s3_client() is get_s3_client()
+
+
+# pylint: disable=unused-argument
+def test_registered_s3_client_is_shared(mocked_aws, empty_s3_client_registry):
+    s3_client = create_s3_client()
+    register_s3_client(s3_client)
+    assert get_s3_client() is s3_client
+
+
+def test_app_lifespan_registers_its_s3_client(client: TestClient):
+    assert client.app.state.s3_client is get_s3_client()
+    assert (
+        client.app.state.s3_client.meta.config.max_pool_connections
+        == client.app.state.settings.s3_max_pool_connections
+    )
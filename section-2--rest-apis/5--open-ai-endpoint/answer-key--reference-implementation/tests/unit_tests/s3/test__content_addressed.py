@@ -0,0 +1,123 @@
+"""Test cases for `s3.content_addressed`."""
+
+import hashlib
+import io
+import threading
+import time
+
+import boto3
+
+from files_api.s3.content_addressed import (
+    CONTENT_PREFIX,
+    REFERENCES_PREFIX,
+    RELEASES_PREFIX,
+    get_content_key,
+    release_reference,
+    resolve_listed_pointers,
+    upload_s3_object_deduplicated,
+    wait_for_content_releases,
+)
+from files_api.s3.read_objects import fetch_s3_objects_metadata
+from tests.consts import TEST_BUCKET_NAME
+
+DIGEST = hashlib.sha256(b"content").hexdigest()
+
+
+def list_keys(prefix: str) -> list[str]:
+    s3_objects, _ = fetch_s3_objects_metadata(TEST_BUCKET_NAME, prefix=prefix)
+    return [s3_object["Key"] for s3_object in s3_objects]
+
+
+# pylint: disable=unused-argument
+def test_identical_uploads_store_the_content_once(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    assert upload_s3_object_deduplicated(TEST_BUCKET_NAME, "a.txt", io.BytesIO(b"content"), "text/plain") == (
+        True,
+        DIGEST,
+    )
+
+    put_keys: list[str] = []
+    s3_client.meta.events.register(
+        "before-parameter-build.s3.PutObject", lambda params, **_: put_keys.append(params["Key"])
+    )
+    upload_s3_object_deduplicated(TEST_BUCKET_NAME, "b.txt", io.BytesIO(b"content"), s3_client=s3_client)
+
+    # only the reference and the pointer were written
+    assert put_keys == [f"{REFERENCES_PREFIX}{DIGEST}/{hashlib.sha256(b'b.txt').hexdigest()}", "b.txt"]
+    assert list_keys(CONTENT_PREFIX) == [get_content_key(DIGEST)]
+    assert len(list_keys(REFERENCES_PREFIX)) == 2
+    pointer = s3_client.head_object(Bucket=TEST_BUCKET_NAME, Key="a.txt")
+    assert (pointer["ContentLength"], pointer["ContentType"]) == (0, "text/plain")
+    content = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key=get_content_key(DIGEST))
+    assert content["Body"].read() == b"content"
+
+
+def test_content_is_deleted_with_its_last_reference(mocked_aws: None):
+    for object_key in ["a.txt", "b.txt"]:
+        upload_s3_object_deduplicated(TEST_BUCKET_NAME, object_key, io.BytesIO(b"content"))
+
+    assert not release_reference(TEST_BUCKET_NAME, DIGEST, "a.txt")
+    assert list_keys(CONTENT_PREFIX) == [get_content_key(DIGEST)]
+    assert release_reference(TEST_BUCKET_NAME, DIGEST, "b.txt")
+    assert list_keys(".cas/") == []
+
+
+def test_overwrite_with_new_content_releases_the_previous_content(mocked_aws: None):
+    upload_s3_object_deduplicated(TEST_BUCKET_NAME, "a.txt", io.BytesIO(b"content"))
+    created, digest = upload_s3_object_deduplicated(TEST_BUCKET_NAME, "a.txt", io.BytesIO(b"new content"))
+
+    assert not created
+    assert list_keys(CONTENT_PREFIX) == [get_content_key(digest)]
+    assert len(list_keys(REFERENCES_PREFIX)) == 1
+
+
+def test_upload_waits_for_a_release_of_its_content(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    upload_s3_object_deduplicated(TEST_BUCKET_NAME, "a.txt", io.BytesIO(b"content"))
+    # a release of the content is in progress: its marker is written and it is about to delete the content
+    marker_key = f"{RELEASES_PREFIX}{DIGEST}/release"
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=marker_key, Body=b"")
+
+    upload = threading.Thread(
+        target=upload_s3_object_deduplicated, args=(TEST_BUCKET_NAME, "b.txt", io.BytesIO(b"content"))
+    )
+    upload.start()
+    time.sleep(0.3)
+    assert upload.is_alive()
+    s3_client.delete_object(Bucket=TEST_BUCKET_NAME, Key=get_content_key(DIGEST))
+    s3_client.delete_object(Bucket=TEST_BUCKET_NAME, Key=marker_key)
+    upload.join(timeout=5)
+
+    # the upload looked the content up after the release, and uploaded it again
+    assert not upload.is_alive()
+    assert list_keys(CONTENT_PREFIX) == [get_content_key(DIGEST)]
+
+
+def test_stale_release_markers_are_ignored(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"{RELEASES_PREFIX}{DIGEST}/release", Body=b"")
+
+    started = time.monotonic()
+    wait_for_content_releases(TEST_BUCKET_NAME, DIGEST, marker_ttl_seconds=0)
+    assert time.monotonic() - started < 1
+
+
+def test_release_deletes_its_marker(mocked_aws: None):
+    upload_s3_object_deduplicated(TEST_BUCKET_NAME, "a.txt", io.BytesIO(b"content"))
+    assert release_reference(TEST_BUCKET_NAME, DIGEST, "a.txt")
+    assert list_keys(RELEASES_PREFIX) == []
+
+
+def test_resolve_listed_pointers(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    upload_s3_object_deduplicated(TEST_BUCKET_NAME, "pointer.txt", io.BytesIO(b"content"))
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="empty.txt", Body=b"")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="plain.txt", Body=b"plain")
+
+    s3_objects, _ = fetch_s3_objects_metadata(TEST_BUCKET_NAME)
+    resolved = resolve_listed_pointers(TEST_BUCKET_NAME, s3_objects)
+    assert [(s3_object["Key"], s3_object["Size"]) for s3_object in resolved] == [
+        ("empty.txt", 0),
+        ("plain.txt", 5),
+        ("pointer.txt", 7),
+    ]
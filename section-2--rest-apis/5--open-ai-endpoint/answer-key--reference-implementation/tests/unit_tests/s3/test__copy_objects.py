@@ -0,0 +1,97 @@
+"""Test cases for `s3.copy_objects`."""
+
+import boto3
+import pytest
+from botocore.exceptions import ClientError
+
+from files_api.s3 import copy_objects
+from files_api.s3.copy_objects import (
+    copy_s3_object,
+    copy_s3_objects_with_prefix,
+    move_s3_object,
+)
+from files_api.s3.write_objects import MIN_MULTIPART_PART_SIZE_BYTES
+from tests.consts import TEST_BUCKET_NAME
+
+
+def list_keys(s3_client) -> list[str]:
+    return [s3_object["Key"] for s3_object in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME).get("Contents", [])]
+
+
+# pylint: disable=unused-argument
+def test_copy_s3_object(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="source.txt", Body=b"content", ContentType="text/plain")
+
+    copy_s3_object(TEST_BUCKET_NAME, "source.txt", "destination.txt")
+
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="destination.txt")
+    assert response["Body"].read() == b"content"
+    assert response["ContentType"] == "text/plain"
+    assert list_keys(s3_client) == ["destination.txt", "source.txt"]
+
+
+# pylint: disable=unused-argument
+def test_copy_large_s3_object_in_parts(mocked_aws: None, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(copy_objects, "MAX_COPY_OBJECT_SIZE_BYTES", 1)
+    s3_client = boto3.client("s3")
+    content = b"0123456789abcdef" * (MIN_MULTIPART_PART_SIZE_BYTES * 2 // 16 + 1000)
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="source.bin", Body=content)
+    copied_ranges: list[str] = []
+    s3_client.meta.events.register(
+        "provide-client-params.s3.UploadPartCopy",
+        lambda params, **kwargs: copied_ranges.append(params["CopySourceRange"]),
+    )
+
+    copy_s3_object(
+        TEST_BUCKET_NAME,
+        "source.bin",
+        "destination.bin",
+        part_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES,
+        s3_client=s3_client,
+    )
+
+    assert len(copied_ranges) == 3
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="destination.bin")["Body"].read() == content
+
+
+# pylint: disable=unused-argument
+def test_copy_nonexistent_s3_object(mocked_aws: None):
+    with pytest.raises(ClientError) as err:
+        copy_s3_object(TEST_BUCKET_NAME, "nonexistent.txt", "destination.txt")
+    assert err.value.response["Error"]["Code"] == "404"
+
+
+# pylint: disable=unused-argument
+def test_move_s3_object(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="source.txt", Body=b"content")
+
+    move_s3_object(TEST_BUCKET_NAME, "source.txt", "destination.txt")
+
+    assert list_keys(s3_client) == ["destination.txt"]
+    with pytest.raises(ValueError):
+        move_s3_object(TEST_BUCKET_NAME, "destination.txt", "destination.txt")
+
+
+# pylint: disable=unused-argument
+@pytest.mark.parametrize("delete_sources", [False, True])
+def test_copy_s3_objects_with_prefix(mocked_aws: None, delete_sources: bool):
+    s3_client = boto3.client("s3")
+    for key in ["dir/a.txt", "dir/sub/b.txt", "dir-sibling.txt"]:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=key.encode())
+
+    file_count, failures = copy_s3_objects_with_prefix(
+        TEST_BUCKET_NAME, "dir/", "copy/", delete_sources=delete_sources, max_concurrency=2
+    )
+
+    assert (file_count, failures) == (2, [])
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="copy/sub/b.txt")["Body"].read() == b"dir/sub/b.txt"
+    expected_sources = [] if delete_sources else ["dir/a.txt", "dir/sub/b.txt"]
+    assert list_keys(s3_client) == ["copy/a.txt", "copy/sub/b.txt", "dir-sibling.txt", *expected_sources]
+
+
+# pylint: disable=unused-argument
+def test_copy_s3_objects_with_overlapping_prefixes(mocked_aws: None):
+    with pytest.raises(ValueError):
+        copy_s3_objects_with_prefix(TEST_BUCKET_NAME, "dir/", "dir/sub/")
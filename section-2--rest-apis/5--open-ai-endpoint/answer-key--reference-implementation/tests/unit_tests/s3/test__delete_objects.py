@@ -1,8 +1,14 @@
 """Test cases for `s3.delete_objects`."""
 
 import boto3
+import pytest
 
-from files_api.s3.delete_objects import delete_s3_object
+from files_api.s3 import delete_objects
+from files_api.s3.delete_objects import (
+    delete_s3_object,
+    delete_s3_objects,
+    delete_s3_objects_with_prefix,
+)
 from files_api.s3.read_objects import object_exists_in_s3
 from files_api.s3.write_objects import upload_s3_object
 from tests.consts import TEST_BUCKET_NAME
@@ -26,3 +32,62 @@ def test_delete_nonexistent_s3_object(mocked_aws: None):
     delete_s3_object(TEST_BUCKET_NAME, "testfile.txt")
     # the file should still not be present
     assert object_exists_in_s3(TEST_BUCKET_NAME, "testfile.txt") is False
+
+
+@pytest.fixture
+def delete_objects_calls(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """Shrink `DeleteObjects` batches to 2 keys and record the number of keys of each request."""
+    monkeypatch.setattr(delete_objects, "MAX_KEYS_PER_DELETE_OBJECTS", 2)
+    calls: list[int] = []
+    original_delete_s3_object_batch = delete_objects.delete_s3_object_batch
+
+    def record_batch(bucket_name, object_keys, s3_client=None):
+        calls.append(len(object_keys))
+        return original_delete_s3_object_batch(bucket_name, object_keys, s3_client=s3_client)
+
+    monkeypatch.setattr(delete_objects, "delete_s3_object_batch", record_batch)
+    return calls
+
+
+# pylint: disable=unused-argument
+def test_delete_s3_objects_in_batches(mocked_aws: None, delete_objects_calls: list[int]):
+    s3_client = boto3.client("s3")
+    for index in range(5):
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=f"file-{index}.txt", Body=b"content")
+
+    deleted_count, failures = delete_s3_objects(
+        TEST_BUCKET_NAME, [f"file-{index}.txt" for index in range(4)], max_concurrency=2
+    )
+
+    assert (deleted_count, failures) == (4, [])
+    assert sorted(delete_objects_calls) == [2, 2]
+    remaining_keys = [s3_object["Key"] for s3_object in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)["Contents"]]
+    assert remaining_keys == ["file-4.txt"]
+
+
+# pylint: disable=unused-argument
+def test_delete_s3_objects_with_prefix(mocked_aws: None, delete_objects_calls: list[int]):
+    s3_client = boto3.client("s3")
+    for key in ["dir/a.txt", "dir/b.txt", "dir/sub/c.txt", "dir-sibling.txt", "other.txt"]:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=b"content")
+
+    deleted_count, failures = delete_s3_objects_with_prefix(TEST_BUCKET_NAME, "dir/")
+
+    assert (deleted_count, failures) == (3, [])
+    assert sorted(delete_objects_calls) == [1, 2]
+    remaining_keys = [s3_object["Key"] for s3_object in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)["Contents"]]
+    assert remaining_keys == ["dir-sibling.txt", "other.txt"]
+
+
+# pylint: disable=unused-argument
+def test_delete_s3_objects_reports_failures(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="locked.txt", Body=b"content")
+    failure = {"Key": "locked.txt", "Code": "AccessDenied", "Message": "Access Denied"}
+
+    def fail_to_delete(parsed, **kwargs):
+        parsed["Errors"] = [failure]
+
+    s3_client.meta.events.register("after-call.s3.DeleteObjects", fail_to_delete)
+
+    assert delete_s3_objects(TEST_BUCKET_NAME, ["locked.txt", "missing.txt"], s3_client=s3_client) == (1, [failure])
@@ -0,0 +1,106 @@
+"""Test cases for `s3.disk_cache`."""
+
+import os
+from pathlib import Path
+from typing import Optional
+
+import pytest
+
+from files_api.s3.disk_cache import (
+    DiskCacheEntry,
+    DiskCacheEviction,
+    S3ObjectDiskCache,
+)
+
+BUCKET_NAME = "bucket"
+
+
+@pytest.fixture
+def disk_cache(tmp_path: Path) -> S3ObjectDiskCache:
+    cache = S3ObjectDiskCache(str(tmp_path), max_bytes=10, max_object_size_bytes=5)
+    yield cache
+    cache.close()
+
+
+def cache_object(cache: S3ObjectDiskCache, object_key: str, content: bytes, etag: str = "etag") -> bool:
+    fill = cache.start_fill(BUCKET_NAME, object_key, etag, "text/plain", len(content), "last-modified")
+    if fill is None:
+        return False
+    fill.write(content)
+    return fill.commit()
+
+
+def read(cache: S3ObjectDiskCache, object_key: str, etag: str = "etag") -> Optional[bytes]:
+    entry = cache.acquire(BUCKET_NAME, object_key, etag)
+    if entry is None:
+        return None
+    content = Path(entry.path).read_bytes()
+    cache.release(entry)
+    return content
+
+
+def test_cached_object_is_read_back_while_its_etag_matches(disk_cache: S3ObjectDiskCache):
+    assert cache_object(disk_cache, "a.txt", b"aaaa")
+    assert read(disk_cache, "a.txt") == b"aaaa"
+
+    # a new version in S3 makes the cached one stale
+    assert read(disk_cache, "a.txt", etag="new-etag") is None
+    assert read(disk_cache, "a.txt") is None
+    assert disk_cache.stats()["size_bytes"] == 0
+
+
+def test_least_recently_used_object_is_evicted_first(disk_cache: S3ObjectDiskCache):
+    for object_key in ["a.txt", "b.txt"]:
+        cache_object(disk_cache, object_key, b"xxxx")
+    read(disk_cache, "a.txt")
+    cache_object(disk_cache, "c.txt", b"xxxx")
+
+    assert read(disk_cache, "b.txt") is None
+    assert read(disk_cache, "a.txt") == read(disk_cache, "c.txt") == b"xxxx"
+    assert disk_cache.stats()["evictions"] == 1
+
+
+def test_least_frequently_used_object_is_evicted_first(tmp_path: Path):
+    disk_cache = S3ObjectDiskCache(str(tmp_path), max_bytes=10, eviction=DiskCacheEviction.LFU)
+    cache_object(disk_cache, "hot.txt", b"xxxx")
+    for _ in range(3):
+        read(disk_cache, "hot.txt")
+    cache_object(disk_cache, "cold-1.txt", b"xxxx")
+    cache_object(disk_cache, "cold-2.txt", b"xxxx")
+
+    assert read(disk_cache, "hot.txt") == b"xxxx"
+    assert read(disk_cache, "cold-1.txt") is None
+    disk_cache.close()
+
+
+def test_evicted_file_is_kept_until_its_reader_releases_it(disk_cache: S3ObjectDiskCache):
+    cache_object(disk_cache, "a.txt", b"aaaaa")
+    entry: DiskCacheEntry = disk_cache.acquire(BUCKET_NAME, "a.txt", "etag")
+    cache_object(disk_cache, "b.txt", b"bbbbb")
+    cache_object(disk_cache, "c.txt", b"ccccc")
+
+    assert entry.evicted and os.path.exists(entry.path)
+    disk_cache.release(entry)
+    assert not os.path.exists(entry.path)
+
+
+def test_objects_that_cannot_be_cached(disk_cache: S3ObjectDiskCache):
+    # larger than max_object_size_bytes
+    assert not cache_object(disk_cache, "large.txt", b"x" * 6)
+
+    # only one download of an object fills the cache at a time
+    fill = disk_cache.start_fill(BUCKET_NAME, "a.txt", "etag", "text/plain", 4, "last-modified")
+    assert disk_cache.start_fill(BUCKET_NAME, "a.txt", "etag", "text/plain", 4, "last-modified") is None
+
+    # a download cut short is not cached
+    fill.write(b"aa")
+    assert not fill.commit()
+    assert read(disk_cache, "a.txt") is None
+    assert os.listdir(disk_cache.directory) == []
+
+
+def test_close_deletes_the_cache_directory(tmp_path: Path):
+    disk_cache = S3ObjectDiskCache(str(tmp_path))
+    cache_object(disk_cache, "a.txt", b"aaaa")
+    disk_cache.close()
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,55 @@
+"""Test cases for `s3.executor`."""
+
+import asyncio
+import threading
+
+import pytest
+
+from files_api.s3.executor import S3Executor
+
+
+def test_run_returns_result_of_blocking_call():
+    executor = S3Executor(max_workers=2)
+
+    def add(left, right=0):
+        return left + right
+
+    assert asyncio.run(executor.run(add, 1, right=2)) == 3
+    executor.shutdown()
+
+
+def test_run_raises_exception_of_blocking_call():
+    executor = S3Executor(max_workers=1)
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        asyncio.run(executor.run(fail))
+    assert executor.stats()["completed"] == 1
+    executor.shutdown()
+
+
+def test_stats_report_queue_depth_and_active_workers_when_saturated():
+    executor = S3Executor(max_workers=1)
+    release = threading.Event()
+
+    async def saturate_then_release():
+        tasks = [asyncio.create_task(executor.run(release.wait)) for _ in range(3)]
+        while executor.stats()["active"] < 1:
+            await asyncio.sleep(0.001)
+
+        stats = executor.stats()
+        assert stats["active"] == 1
+        assert stats["queued"] == 2
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    asyncio.run(saturate_then_release())
+
+    stats = executor.stats()
+    assert stats == {**stats, "queued": 0, "active": 0, "completed": 3}
+    assert stats["wait_seconds"]["count"] == 3
+    assert stats["run_seconds"]["count"] == 3
+    executor.shutdown()
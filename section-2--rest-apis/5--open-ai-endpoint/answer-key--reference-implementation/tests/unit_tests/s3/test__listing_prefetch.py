@@ -0,0 +1,59 @@
+"""Test the prefetch of the next pages of listings."""
+
+import asyncio
+
+from files_api.s3.listing_prefetch import S3ListingPrefetcher
+
+
+def test_prefetched_page_is_taken_once():
+    prefetcher = S3ListingPrefetcher()
+    fetches = []
+
+    async def fetch():
+        fetches.append("token")
+        return ([], None)
+
+    async def prefetch_then_take():
+        prefetcher.prefetch("bucket", "token", "query", fetch)
+        # prefetching the same page again does not fetch it again
+        prefetcher.prefetch("bucket", "token", "query", fetch)
+        assert prefetcher.take("bucket", "token", "other query") is None
+        assert await prefetcher.take("bucket", "token", "query") == ([], None)
+        assert prefetcher.take("bucket", "token", "query") is None
+
+    asyncio.run(prefetch_then_take())
+    assert fetches == ["token"]
+    stats = prefetcher.stats()
+    assert (stats["prefetched"], stats["hits"], stats["misses"]) == (1, 1, 2)
+    assert stats["hit_rate"] == 1 / 3
+
+
+def test_invalidate_drops_the_pages_of_a_bucket():
+    prefetcher = S3ListingPrefetcher()
+
+    async def fetch():
+        return ([], None)
+
+    async def prefetch_invalidate_take():
+        prefetcher.prefetch("bucket", "token", "query", fetch)
+        prefetcher.prefetch("other-bucket", "token", "query", fetch)
+        prefetcher.invalidate("bucket")
+        assert prefetcher.take("bucket", "token", "query") is None
+        assert prefetcher.take("other-bucket", "token", "query") is not None
+        prefetcher.close()
+
+    asyncio.run(prefetch_invalidate_take())
+
+
+def test_disabled_prefetcher_fetches_nothing():
+    prefetcher = S3ListingPrefetcher(max_entries=0)
+
+    async def fetch():
+        raise AssertionError("not fetched")
+
+    async def prefetch_then_take():
+        prefetcher.prefetch("bucket", "token", "query", fetch)
+        assert prefetcher.take("bucket", "token", "query") is None
+
+    asyncio.run(prefetch_then_take())
+    assert prefetcher.stats()["prefetched"] == 0
@@ -0,0 +1,65 @@
+"""Test the cache of S3 object metadata and listing pages."""
+
+from files_api.s3.metadata_cache import (
+    NOT_FOUND,
+    S3MetadataCache,
+)
+
+
+def test_body_and_response_metadata_are_not_cached():
+    cache = S3MetadataCache()
+    cache.set_object_metadata(
+        "bucket", "key", {"ContentLength": 3, "Body": b"abc", "ResponseMetadata": {}}, cache.generation
+    )
+    assert cache.get_object_metadata("bucket", "key") == {"ContentLength": 3}
+
+
+def test_invalidate_forgets_object_and_listings_of_its_bucket():
+    cache = S3MetadataCache()
+    cache.set_object_not_found("bucket", "key", cache.generation)
+    cache.set_listing("bucket", "query", ([], None), cache.generation)
+    cache.set_listing("other-bucket", "query", ([], None), cache.generation)
+    cache.invalidate("bucket", "key")
+    assert cache.get_object_metadata("bucket", "key") is None
+    assert cache.get_listing("bucket", "query") is None
+    assert cache.get_listing("other-bucket", "query") == ([], None)
+
+
+def test_result_of_read_that_raced_an_invalidation_is_not_cached():
+    cache = S3MetadataCache()
+    generation = cache.generation
+    cache.invalidate("bucket", "key")
+    cache.set_object_not_found("bucket", "key", generation)
+    assert cache.get_object_metadata("bucket", "key") is None
+    cache.set_object_not_found("bucket", "key", cache.generation)
+    assert cache.get_object_metadata("bucket", "key") is NOT_FOUND
+
+
+def test_object_content_is_cached_with_whole_object_metadata():
+    cache = S3MetadataCache(content_max_bytes=1000, content_max_object_size_bytes=10)
+    metadata = {"ContentLength": 3, "ContentRange": "bytes 0-2/3", "ETag": '"etag"', "Body": None}
+    cache.set_object_content("bucket", "key", metadata, b"abc", cache.generation)
+    content = cache.get_object_content("bucket", "key")
+    assert content is not None
+    assert content.metadata == {"ContentLength": 3, "ETag": '"etag"'}
+    assert bytes(content.body) == b"abc"
+
+    cache.set_object_content("bucket", "large", {}, b"x" * 11, cache.generation)
+    assert cache.get_object_content("bucket", "large") is None
+    assert cache.stats()["contents"]["size"] == 1
+
+
+def test_invalidate_forgets_object_content():
+    cache = S3MetadataCache(content_max_bytes=1000)
+    for key in ["dir/a", "dir/b", "other"]:
+        cache.set_object_content("bucket", key, {}, b"abc", cache.generation)
+    cache.invalidate("bucket", "other")
+    cache.invalidate_prefix("bucket", "dir/")
+    assert cache.contents is not None and len(cache.contents) == 0
+
+
+def test_object_content_is_not_cached_by_default():
+    cache = S3MetadataCache()
+    cache.set_object_content("bucket", "key", {}, b"abc", cache.generation)
+    assert cache.get_object_content("bucket", "key") is None
+    assert "contents" not in cache.stats()
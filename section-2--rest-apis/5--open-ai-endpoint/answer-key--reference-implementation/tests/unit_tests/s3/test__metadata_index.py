@@ -0,0 +1,108 @@
+"""Test cases for `s3.metadata_index`."""
+
+import time
+from datetime import (
+    datetime,
+    timedelta,
+    timezone,
+)
+
+import pytest
+
+from files_api.s3.metadata_index import S3MetadataIndex
+
+BUCKET_NAME = "bucket"
+NOW = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def index() -> S3MetadataIndex:
+    index = S3MetadataIndex(":memory:")
+    yield index
+    index.close()
+
+
+def listed_object(key: str, size_bytes: int = 1, age_days: int = 0) -> dict:
+    return {"Key": key, "Size": size_bytes, "LastModified": NOW - timedelta(days=age_days)}
+
+
+def test_index_is_built_by_a_full_listing(index: S3MetadataIndex):
+    index.replace_prefix(BUCKET_NAME, "docs/", [listed_object("docs/a.txt")], started_at=time.time())
+    assert not index.is_built(BUCKET_NAME)
+
+    index.replace_prefix(BUCKET_NAME, "", [listed_object("docs/a.txt")], started_at=time.time())
+    assert index.is_built(BUCKET_NAME)
+    assert not index.is_built("other-bucket")
+
+
+def test_query_sorts_and_pages_with_a_cursor(index: S3MetadataIndex):
+    index.replace_prefix(
+        BUCKET_NAME,
+        "",
+        [listed_object(f"file{i}.txt", size_bytes=size_bytes) for i, size_bytes in enumerate([30, 10, 20, 10, 40])],
+        started_at=time.time(),
+    )
+
+    keys = []
+    cursor = None
+    while True:
+        files, cursor = index.query(BUCKET_NAME, sort_by="size_bytes", descending=True, limit=2, after=cursor)
+        keys.extend(file["Key"] for file in files)
+        if cursor is None:
+            break
+    # objects of the same size are ordered by key, in the same direction
+    assert keys == ["file4.txt", "file0.txt", "file2.txt", "file3.txt", "file1.txt"]
+
+    files, _ = index.query(BUCKET_NAME, sort_by="size_bytes", limit=2, offset=1)
+    assert [file["Key"] for file in files] == ["file3.txt", "file2.txt"]
+
+
+def test_query_filters_by_prefix_extension_and_modification_time(index: S3MetadataIndex):
+    index.replace_prefix(
+        BUCKET_NAME,
+        "",
+        [
+            listed_object("docs/a.TXT", age_days=1),
+            listed_object("docs/b.md", age_days=2),
+            listed_object("docs/old.txt", age_days=30),
+            listed_object("docs0/c.txt"),
+            listed_object("src/d.txt"),
+        ],
+        started_at=time.time(),
+    )
+
+    def query_keys(**filters) -> list[str]:
+        files, _ = index.query(BUCKET_NAME, **filters)
+        return [file["Key"] for file in files]
+
+    assert query_keys(prefix="docs/") == ["docs/a.TXT", "docs/b.md", "docs/old.txt"]
+    assert query_keys(extension=".txt") == ["docs/a.TXT", "docs/old.txt", "docs0/c.txt", "src/d.txt"]
+    assert query_keys(prefix="docs/", modified_after=NOW - timedelta(days=7)) == ["docs/a.TXT", "docs/b.md"]
+    # a naive time is taken to be UTC
+    assert query_keys(prefix="docs/", modified_before=(NOW - timedelta(days=7)).replace(tzinfo=None)) == [
+        "docs/old.txt"
+    ]
+    assert index.count(BUCKET_NAME, prefix="docs/", extension="txt") == (2, 2)
+
+
+def test_writes_and_deletes_made_during_a_rebuild_are_kept(index: S3MetadataIndex):
+    started_at = time.time()
+    index.upsert(BUCKET_NAME, "new.txt", 5, NOW)
+    index.delete(BUCKET_NAME, "deleted.txt")
+    # the listing started before the write and the delete, so it saw neither
+    index.replace_prefix(
+        BUCKET_NAME, "", [listed_object("deleted.txt"), listed_object("kept.txt")], started_at=started_at - 1
+    )
+
+    files, _ = index.query(BUCKET_NAME)
+    assert [(file["Key"], file["Size"]) for file in files] == [("kept.txt", 1), ("new.txt", 5)]
+
+
+def test_rebuild_of_a_prefix_replaces_only_that_prefix(index: S3MetadataIndex):
+    index.replace_prefix(
+        BUCKET_NAME, "", [listed_object("docs/a.txt"), listed_object("src/b.txt")], started_at=time.time() - 1
+    )
+    index.replace_prefix(BUCKET_NAME, "docs/", [listed_object("docs/c.txt")], started_at=time.time())
+
+    files, _ = index.query(BUCKET_NAME)
+    assert [file["Key"] for file in files] == ["docs/c.txt", "src/b.txt"]
@@ -0,0 +1,59 @@
+"""Test cases for `s3.presigned_urls`."""
+
+import boto3
+import requests
+
+from files_api.s3.presigned_urls import (
+    MAX_MULTIPART_UPLOAD_PARTS,
+    create_presigned_upload,
+    generate_presigned_download_url,
+    get_upload_part_size,
+)
+from files_api.s3.write_objects import (
+    MIN_MULTIPART_PART_SIZE_BYTES,
+    complete_multipart_upload,
+)
+from tests.consts import TEST_BUCKET_NAME
+
+
+# pylint: disable=unused-argument
+def test_small_file_is_uploaded_with_one_put(mocked_aws: None):
+    presigned_upload = create_presigned_upload(TEST_BUCKET_NAME, "small.txt", 5, content_type="text/plain")
+    assert (presigned_upload.upload_id, presigned_upload.part_urls) == (None, [])
+
+    response = requests.put(presigned_upload.url, data=b"hello", headers={"Content-Type": "text/plain"}, timeout=10)
+    assert response.status_code == 200
+    s3_object = boto3.client("s3").get_object(Bucket=TEST_BUCKET_NAME, Key="small.txt")
+    assert (s3_object["Body"].read(), s3_object["ContentType"]) == (b"hello", "text/plain")
+
+
+def test_large_file_is_uploaded_in_parts(mocked_aws: None):
+    file_content = b"x" * (MIN_MULTIPART_PART_SIZE_BYTES + 1)
+    presigned_upload = create_presigned_upload(
+        TEST_BUCKET_NAME, "large.bin", len(file_content), part_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES
+    )
+    assert presigned_upload.url is None
+    assert len(presigned_upload.part_urls) == 2
+
+    parts = []
+    for part_number, url in enumerate(presigned_upload.part_urls, start=1):
+        start = (part_number - 1) * presigned_upload.part_size_bytes
+        end = start + presigned_upload.part_size_bytes
+        response = requests.put(url, data=file_content[start:end], timeout=10)
+        parts.append({"PartNumber": part_number, "ETag": response.headers["ETag"]})
+    complete_multipart_upload(TEST_BUCKET_NAME, "large.bin", presigned_upload.upload_id, parts)
+
+    s3_object = boto3.client("s3").get_object(Bucket=TEST_BUCKET_NAME, Key="large.bin")
+    assert s3_object["Body"].read() == file_content
+
+
+def test_part_size_grows_to_stay_within_the_part_limit():
+    assert get_upload_part_size(100, part_size_bytes=10) == 10
+    assert get_upload_part_size(MAX_MULTIPART_UPLOAD_PARTS * 10 + 1, part_size_bytes=10) == 11
+
+
+def test_presigned_download_url(mocked_aws: None):
+    boto3.client("s3").put_object(Bucket=TEST_BUCKET_NAME, Key="file.txt", Body=b"content")
+    url = generate_presigned_download_url(TEST_BUCKET_NAME, "file.txt", response_content_type="text/csv")
+    response = requests.get(url, timeout=10)
+    assert (response.content, response.headers["Content-Type"]) == (b"content", "text/csv")
@@ -3,6 +3,7 @@
 import boto3
 
 from files_api.s3.read_objects import (
+    fetch_s3_objects_and_directories,
     fetch_s3_objects_metadata,
     fetch_s3_objects_using_page_token,
     object_exists_in_s3,
@@ -102,3 +103,29 @@ def test_directory_queries(mocked_aws):  # noqa: R701 - too complex
     assert files[3]["Key"] == "folder2/file3.txt"
     assert files[4]["Key"] == "folder2/subfolder1/file4.txt"
     assert next_page_token is None
+
+
+# pylint: disable=unused-argument
+def test_fetch_s3_objects_and_directories(mocked_aws):
+    """Assert that only the direct children of the prefix are listed, with its sub-directories rolled up."""
+    s3_client = boto3.client("s3")
+    for key in ["folder/file1.txt", "folder/sub1/file2.txt", "folder/sub1/deeper/file3.txt", "folder/sub2/file4.txt"]:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body="content")
+
+    files, directories, next_page_token = fetch_s3_objects_and_directories(TEST_BUCKET_NAME, prefix="folder/")
+    assert [file["Key"] for file in files] == ["folder/file1.txt"]
+    assert directories == ["folder/sub1/", "folder/sub2/"]
+    assert next_page_token is None
+
+    # files and directories share the page
+    files, directories, next_page_token = fetch_s3_objects_and_directories(
+        TEST_BUCKET_NAME, prefix="folder/", max_keys=2
+    )
+    assert len(files) + len(directories) == 2
+    assert next_page_token is not None
+    more_files, more_directories, next_page_token = fetch_s3_objects_and_directories(
+        TEST_BUCKET_NAME, prefix="folder/", max_keys=2, continuation_token=next_page_token
+    )
+    assert sorted(file["Key"] for file in files + more_files) == ["folder/file1.txt"]
+    assert directories + more_directories == ["folder/sub1/", "folder/sub2/"]
+    assert next_page_token is None
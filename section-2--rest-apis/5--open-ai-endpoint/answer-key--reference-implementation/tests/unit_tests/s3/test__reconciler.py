@@ -0,0 +1,102 @@
+"""Test cases for `s3.reconciler`."""
+
+import time
+from datetime import (
+    datetime,
+    timezone,
+)
+
+import boto3
+import pytest
+
+from files_api.s3.metadata_index import S3MetadataIndex
+from files_api.s3.reconciler import (
+    _iter_gaps,
+    plan_prefix_shards,
+    reconcile_metadata_index,
+)
+from tests.consts import TEST_BUCKET_NAME
+
+KEYS = [
+    "root.txt",
+    "a/1.txt",
+    "a/x/2.txt",
+    "a/y/3.txt",
+    "b/4.txt",
+    "b/z/5.txt",
+    "c/6.txt",
+]
+
+
+@pytest.fixture
+def index() -> S3MetadataIndex:
+    index = S3MetadataIndex(":memory:")
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def bucket_keys(mocked_aws) -> list[str]:  # pylint: disable=unused-argument
+    s3_client = boto3.client("s3")
+    for key in KEYS:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=key.encode())
+    return sorted(KEYS)
+
+
+def indexed_keys(index: S3MetadataIndex) -> list[str]:
+    return sorted(index.get_range(TEST_BUCKET_NAME, "", None))
+
+
+# pylint: disable=unused-argument
+def test_plan_prefix_shards(bucket_keys: list[str]):
+    shards, direct_objects = plan_prefix_shards(TEST_BUCKET_NAME, target_shards=4)
+    # the root is expanded into a/, b/ and c/, then all three at once, then a/x/, a/y/ and b/z/,
+    # so every directory fits in one page and is listed while planning
+    assert shards == []
+    assert [s3_object["Key"] for s3_object in direct_objects] == sorted(KEYS)
+
+    shards, direct_objects = plan_prefix_shards(TEST_BUCKET_NAME, target_shards=4, max_concurrency=1)
+    # one directory at a time stops as soon as there are 4
+    assert shards == ["a/x/", "a/y/", "b/", "c/"]
+    assert [s3_object["Key"] for s3_object in direct_objects] == ["a/1.txt", "root.txt"]
+
+    shards, direct_objects = plan_prefix_shards(TEST_BUCKET_NAME, prefix="b/", target_shards=1)
+    assert (shards, direct_objects) == (["b/"], [])
+
+
+def test_iter_gaps():
+    assert list(_iter_gaps("", [])) == [("", None)]
+    assert list(_iter_gaps("", ["a/", "b/"])) == [("", "a/"), ("a0", "b/"), ("b0", None)]
+    assert list(_iter_gaps("a/", ["a/x/"])) == [("a/", "a/x/"), ("a/x0", "a0")]
+
+
+@pytest.mark.parametrize("target_shards", [1, 3, 64])
+def test_reconcile_builds_the_index(bucket_keys: list[str], index: S3MetadataIndex, target_shards: int):
+    report = reconcile_metadata_index(TEST_BUCKET_NAME, index, target_shards=target_shards)
+
+    assert index.is_built(TEST_BUCKET_NAME)
+    assert indexed_keys(index) == bucket_keys
+    assert (report.listed_keys, report.written_keys, report.deleted_keys) == (len(KEYS), len(KEYS), 0)
+    assert report.keys_per_second > 0
+    assert report.shard_skew >= 1.0
+
+
+# pylint: disable=unused-argument
+def test_reconcile_applies_only_the_differences(bucket_keys: list[str], index: S3MetadataIndex):
+    reconcile_metadata_index(TEST_BUCKET_NAME, index)
+    s3_client = boto3.client("s3")
+    # changes made outside the API
+    s3_client.delete_object(Bucket=TEST_BUCKET_NAME, Key="a/x/2.txt")
+    s3_client.delete_object(Bucket=TEST_BUCKET_NAME, Key="c/6.txt")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="b/4.txt", Body=b"longer content")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="d/7.txt", Body=b"new")
+    # a stale entry of a directory that no longer exists
+    index.upsert(TEST_BUCKET_NAME, "gone/8.txt", 1, datetime.now(timezone.utc))
+    time.sleep(0.01)
+
+    report = reconcile_metadata_index(TEST_BUCKET_NAME, index, target_shards=4)
+
+    assert indexed_keys(index) == ["a/1.txt", "a/y/3.txt", "b/4.txt", "b/z/5.txt", "d/7.txt", "root.txt"]
+    files, _ = index.query(TEST_BUCKET_NAME, prefix="b/4")
+    assert files[0]["Size"] == len(b"longer content")
+    assert (report.written_keys, report.deleted_keys) == (2, 3)
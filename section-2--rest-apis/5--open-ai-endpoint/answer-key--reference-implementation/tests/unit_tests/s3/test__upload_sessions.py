@@ -0,0 +1,55 @@
+"""Test cases for `s3.upload_sessions`."""
+
+import boto3
+import pytest
+
+from files_api.s3.upload_sessions import (
+    MissingChunksError,
+    abort_stale_multipart_uploads,
+    complete_upload_session,
+    list_uploaded_parts,
+)
+from files_api.s3.write_objects import (
+    MIN_MULTIPART_PART_SIZE_BYTES,
+    create_multipart_upload,
+    upload_part,
+)
+from tests.consts import TEST_BUCKET_NAME
+
+CHUNKS = [b"a" * MIN_MULTIPART_PART_SIZE_BYTES, b"b" * MIN_MULTIPART_PART_SIZE_BYTES, b"c"]
+
+
+# pylint: disable=unused-argument
+def test_list_uploaded_parts_across_pages(mocked_aws: None):
+    upload_id = create_multipart_upload(TEST_BUCKET_NAME, "file.bin")
+    for chunk_number in [3, 1]:
+        upload_part(TEST_BUCKET_NAME, "file.bin", upload_id, chunk_number, CHUNKS[chunk_number - 1])
+
+    parts = list_uploaded_parts(TEST_BUCKET_NAME, "file.bin", upload_id, max_parts=1)
+    assert [(part["PartNumber"], part["Size"]) for part in parts] == [(1, len(CHUNKS[0])), (3, 1)]
+
+
+def test_complete_upload_session_needs_every_chunk(mocked_aws: None):
+    upload_id = create_multipart_upload(TEST_BUCKET_NAME, "file.bin")
+    for chunk_number in [3, 1]:
+        upload_part(TEST_BUCKET_NAME, "file.bin", upload_id, chunk_number, CHUNKS[chunk_number - 1])
+
+    with pytest.raises(MissingChunksError) as exc_info:
+        complete_upload_session(TEST_BUCKET_NAME, "file.bin", upload_id, chunk_count=3)
+    assert exc_info.value.missing_chunk_numbers == [2]
+
+    # the session survives, so the missing chunk can still be sent
+    upload_part(TEST_BUCKET_NAME, "file.bin", upload_id, 2, CHUNKS[1])
+    complete_upload_session(TEST_BUCKET_NAME, "file.bin", upload_id, chunk_count=3)
+    s3_object = boto3.client("s3").get_object(Bucket=TEST_BUCKET_NAME, Key="file.bin")
+    assert s3_object["Body"].read() == b"".join(CHUNKS)
+
+
+def test_abort_stale_multipart_uploads(mocked_aws: None):
+    for object_key in ["a.bin", "b.bin"]:
+        create_multipart_upload(TEST_BUCKET_NAME, object_key)
+
+    # moto reports every multipart upload as started in 2010
+    assert abort_stale_multipart_uploads(TEST_BUCKET_NAME, max_age_seconds=100 * 365 * 24 * 60 * 60) == 0
+    assert abort_stale_multipart_uploads(TEST_BUCKET_NAME, max_age_seconds=0) == 2
+    assert boto3.client("s3").list_multipart_uploads(Bucket=TEST_BUCKET_NAME).get("Uploads", []) == []
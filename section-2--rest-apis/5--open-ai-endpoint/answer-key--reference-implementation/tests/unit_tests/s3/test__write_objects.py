@@ -1,8 +1,20 @@
 """Test cases for `s3.write_objects`."""
 
+import io
+import os
+import threading
+from unittest.mock import Mock
+
 import boto3
+import pytest
 
-from files_api.s3.write_objects import upload_s3_object
+from files_api.s3.write_objects import (
+    MIN_MULTIPART_PART_SIZE_BYTES,
+    UploadCancelledError,
+    upload_s3_object,
+    upload_s3_object_from_file,
+    upsert_s3_object,
+)
 from tests.consts import TEST_BUCKET_NAME
 
 
@@ -13,3 +25,101 @@ def test_upload_s3_object(mocked_aws: None):
     upload_s3_object(TEST_BUCKET_NAME, "testfile.txt", file_content)
     response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="testfile.txt")
     assert response["Body"].read() == file_content
+
+
+def test_upload_s3_object_from_file__small_file_uses_single_put(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    upload_s3_object_from_file(TEST_BUCKET_NAME, "small.txt", io.BytesIO(b"small"), content_type="text/plain")
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="small.txt")
+    assert response["Body"].read() == b"small"
+    assert response["ContentType"] == "text/plain"
+
+
+def test_upload_s3_object_from_file__large_file_uses_multipart(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    file_content = os.urandom(2 * MIN_MULTIPART_PART_SIZE_BYTES + 1024)
+    upload_s3_object_from_file(
+        TEST_BUCKET_NAME,
+        "large.bin",
+        io.BytesIO(file_content),
+        part_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES,
+        max_concurrency=2,
+    )
+    response = s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="large.bin")
+    assert response["Body"].read() == file_content
+    assert response["ETag"].endswith('-3"')  # multipart ETags end with the number of parts
+
+
+def test_upload_s3_object_from_file__cancelled_upload_is_aborted(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    cancel_event = threading.Event()
+    cancel_event.set()
+    with pytest.raises(UploadCancelledError):
+        upload_s3_object_from_file(
+            TEST_BUCKET_NAME,
+            "cancelled.bin",
+            io.BytesIO(os.urandom(2 * MIN_MULTIPART_PART_SIZE_BYTES)),
+            part_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES,
+            cancel_event=cancel_event,
+        )
+    assert "Uploads" not in s3_client.list_multipart_uploads(Bucket=TEST_BUCKET_NAME)
+    assert "Contents" not in s3_client.list_objects_v2(Bucket=TEST_BUCKET_NAME)
+
+
+def test_upsert_s3_object_reports_whether_it_created_the_object(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    assert upsert_s3_object(TEST_BUCKET_NAME, "file.txt", b"first") is True
+    assert upsert_s3_object(TEST_BUCKET_NAME, "file.txt", b"second") is False
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="file.txt")["Body"].read() == b"second"
+
+
+def test_upload_s3_object_from_file__multipart_reports_whether_it_created_the_object(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    file_contents = [os.urandom(MIN_MULTIPART_PART_SIZE_BYTES + 1) for _ in range(2)]
+    created = [
+        upload_s3_object_from_file(
+            TEST_BUCKET_NAME, "large.bin", io.BytesIO(file_content), part_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES
+        )
+        for file_content in file_contents
+    ]
+    assert created == [True, False]
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="large.bin")["Body"].read() == file_contents[1]
+    assert "Uploads" not in s3_client.list_multipart_uploads(Bucket=TEST_BUCKET_NAME)
+
+
+def test_upsert_s3_object_retries_a_write_that_lost_a_race(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key="file.txt", Body=b"first")
+
+    def conflict_once(**kwargs):
+        s3_client.meta.events.unregister("before-call.s3.PutObject", conflict_once)
+        error = {"Code": "ConditionalRequestConflict", "Message": "A conflicting operation is in progress"}
+        return Mock(status_code=409), {"Error": error, "ResponseMetadata": {"HTTPStatusCode": 409}}
+
+    s3_client.meta.events.register("before-call.s3.PutObject", conflict_once)
+    assert upsert_s3_object(TEST_BUCKET_NAME, "file.txt", b"second", s3_client=s3_client) is False
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="file.txt")["Body"].read() == b"second"
+
+
+def test_upload_s3_object_from_file__multipart_completes_again_after_losing_a_race(mocked_aws: None):
+    s3_client = boto3.client("s3")
+    completed_upload_ids = []
+
+    def create_object_first(params, **kwargs):
+        if not completed_upload_ids:
+            boto3.client("s3").put_object(Bucket=TEST_BUCKET_NAME, Key="large.bin", Body=b"created concurrently")
+        completed_upload_ids.append(params["query_string"]["uploadId"])
+
+    s3_client.meta.events.register("before-call.s3.CompleteMultipartUpload", create_object_first)
+    file_content = os.urandom(MIN_MULTIPART_PART_SIZE_BYTES + 1)
+    created = upload_s3_object_from_file(
+        TEST_BUCKET_NAME,
+        "large.bin",
+        io.BytesIO(file_content),
+        part_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES,
+        s3_client=s3_client,
+    )
+    assert created is False
+    # the upload that failed the precondition is completed again, without sending its parts again
+    assert len(completed_upload_ids) == 2 and len(set(completed_upload_ids)) == 1
+    assert s3_client.get_object(Bucket=TEST_BUCKET_NAME, Key="large.bin")["Body"].read() == file_content
@@ -0,0 +1,35 @@
+"""Test cases for `byte_ranges`."""
+
+import pytest
+
+from files_api.byte_ranges import (
+    MAX_BYTE_RANGES,
+    parse_range_header,
+    resolve_byte_ranges,
+)
+
+
+@pytest.mark.parametrize(
+    "range_header, expected_specs",
+    [
+        ("bytes=0-99", [(0, 99)]),
+        ("bytes=200-", [(200, None)]),
+        ("bytes=-50", [(None, 50)]),
+        ("bytes=0-0, 5-9 ,-1", [(0, 0), (5, 9), (None, 1)]),
+        ("items=0-99", None),
+        ("bytes=", None),
+        ("bytes=-", None),
+        ("bytes=9-5", None),
+        ("bytes=a-b", None),
+        ("bytes=" + ",".join(["0-0"] * (MAX_BYTE_RANGES + 1)), None),
+    ],
+)
+def test_parse_range_header(range_header, expected_specs):
+    assert parse_range_header(range_header) == expected_specs
+
+
+def test_resolve_byte_ranges():
+    specs = [(0, 99), (95, None), (None, 10), (100, 200), (None, 0)]
+    assert resolve_byte_ranges(specs, size_bytes=100) == [(0, 99), (95, 99), (90, 99)]
+    assert resolve_byte_ranges([(None, 500)], size_bytes=100) == [(0, 99)]
+    assert not resolve_byte_ranges([(None, 5), (0, None)], size_bytes=0)
@@ -0,0 +1,174 @@
+"""Test the in-process caches."""
+
+from files_api.cache import (
+    CountMinSketch,
+    TTLCache,
+    WTinyLFUCache,
+)
+
+
+class FakeClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_get_returns_value_until_it_expires():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set("key", 1)
+    clock.now = 4.9
+    assert cache.get("key") == 1
+    clock.now = 5
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_set_with_own_ttl():
+    clock = FakeClock()
+    cache: TTLCache[str, int] = TTLCache(max_entries=10, ttl_seconds=5, clock=clock)
+    cache.set("key", 1, ttl_seconds=1)
+    clock.now = 1
+    assert cache.get("key") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl_seconds=5)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_peek_does_not_count_or_refresh():
+    cache: TTLCache[str, int] = TTLCache(max_entries=2, ttl_seconds=5)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.peek("a") == 1
+    cache.set("c", 3)
+    assert cache.peek("a") is None
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+
+def test_delete_where():
+    cache: TTLCache[tuple[str, str], int] = TTLCache(max_entries=10, ttl_seconds=5)
+    cache.set(("bucket-a", "x"), 1)
+    cache.set(("bucket-a", "y"), 2)
+    cache.set(("bucket-b", "x"), 3)
+    cache.delete_where(lambda key: key[0] == "bucket-a")
+    assert len(cache) == 1
+    assert cache.get(("bucket-b", "x")) == 3
+
+
+def test_stats_count_hits_and_misses():
+    cache: TTLCache[str, int] = TTLCache(max_entries=10, ttl_seconds=5)
+    cache.get("key")
+    cache.set("key", 1)
+    cache.get("key")
+    cache.get("key")
+    assert cache.stats() == {"size": 1, "max_entries": 10, "hits": 2, "misses": 1, "evictions": 0}
+
+
+def test_cache_without_entries_stores_nothing():
+    cache: TTLCache[str, int] = TTLCache(max_entries=0, ttl_seconds=5)
+    cache.set("key", 1)
+    assert cache.get("key") is None
+
+
+def test_count_min_sketch_estimates_and_ages_counts():
+    # wide enough that the counted integers do not collide with "hot" whatever its hash
+    sketch = CountMinSketch(width=4096, sample_size=100)
+    for _ in range(5):
+        sketch.increment("hot")
+    sketch.increment("cold")
+    assert sketch.estimate("hot") >= 5
+    assert sketch.estimate("cold") >= 1
+    assert sketch.estimate("unseen") <= sketch.estimate("cold")
+
+    for index in range(100):
+        sketch.increment(index)
+    # halved once the sample size was reached
+    assert sketch.estimate("hot") <= 3
+
+
+def test_count_min_sketch_saturates():
+    sketch = CountMinSketch(width=64)
+    for _ in range(100):
+        sketch.increment("key")
+    assert sketch.estimate("key") == CountMinSketch.MAX_COUNT
+
+
+def test_w_tiny_lfu_cache_get_returns_value_until_it_expires():
+    clock = FakeClock()
+    cache: WTinyLFUCache[str, bytes] = WTinyLFUCache(max_bytes=1000, ttl_seconds=5, clock=clock)
+    cache.set("key", b"value", size_bytes=5)
+    clock.now = 4.9
+    assert cache.get("key") == b"value"
+    clock.now = 5
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_w_tiny_lfu_cache_stays_within_its_byte_budget():
+    cache: WTinyLFUCache[int, bytes] = WTinyLFUCache(max_bytes=1000, ttl_seconds=5)
+    for key in range(100):
+        for _ in range(key % 5):
+            cache.get(key)
+        cache.set(key, b"x" * 30, size_bytes=30)
+        assert cache.size_bytes <= 1000
+    # values larger than the cache are not cached at all
+    cache.set("large", b"x" * 1001, size_bytes=1001)
+    assert cache.get("large") is None
+
+
+def test_w_tiny_lfu_cache_keeps_frequently_used_values_through_a_scan():
+    cache: WTinyLFUCache[tuple[str, int], int] = WTinyLFUCache(max_bytes=100 * 100, ttl_seconds=60)
+    for index in range(50):
+        for _ in range(3):
+            cache.get(("hot", index))
+        cache.set(("hot", index), index, size_bytes=100)
+
+    for index in range(1000):
+        if cache.get(("scan", index)) is None:
+            cache.set(("scan", index), index, size_bytes=100)
+
+    assert sum(cache.get(("hot", index)) is not None for index in range(50)) >= 40
+    assert cache.stats()["rejections"] > 900
+
+
+def test_w_tiny_lfu_cache_admits_a_large_value_only_if_used_more_than_all_it_evicts():
+    cache: WTinyLFUCache[str, int] = WTinyLFUCache(max_bytes=1000, ttl_seconds=60, window_ratio=0)
+    for key in ["a", "b", "c"]:
+        cache.get(key)
+        cache.set(key, 0, size_bytes=300)
+
+    cache.get("large")
+    cache.set("large", 0, size_bytes=600)
+    assert cache.get("large") is None
+    assert cache.stats()["rejections"] == 1
+
+    for _ in range(3):
+        cache.get("large")
+    cache.set("large", 0, size_bytes=600)
+    assert cache.get("large") == 0
+    assert cache.size_bytes <= 1000
+    assert cache.stats()["evictions"] == 2
+
+
+def test_w_tiny_lfu_cache_delete_where():
+    cache: WTinyLFUCache[tuple[str, str], int] = WTinyLFUCache(max_bytes=1000, ttl_seconds=5)
+    cache.set(("bucket-a", "x"), 1, size_bytes=10)
+    cache.set(("bucket-a", "y"), 2, size_bytes=10)
+    cache.set(("bucket-b", "x"), 3, size_bytes=10)
+    cache.delete_where(lambda key: key[0] == "bucket-a")
+    assert len(cache) == 1
+    assert cache.size_bytes == 10
+    assert cache.get(("bucket-b", "x")) == 3
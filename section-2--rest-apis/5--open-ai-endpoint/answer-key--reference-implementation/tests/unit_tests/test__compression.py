@@ -0,0 +1,140 @@
+"""Test cases for `compression`."""
+
+import asyncio
+import gzip
+import io
+from pathlib import Path
+from typing import (
+    AsyncIterator,
+    Optional,
+)
+
+import pytest
+from starlette.responses import (
+    FileResponse,
+    StreamingResponse,
+)
+
+from files_api.compression import (
+    CompressionMiddleware,
+    ContentCoding,
+    create_compressor,
+    is_compressible_media_type,
+    negotiate_content_coding,
+)
+
+ALL_CODINGS = list(ContentCoding)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, available, expected_coding",
+    [
+        ("gzip, deflate", ALL_CODINGS, ContentCoding.GZIP),
+        ("gzip, br, zstd", ALL_CODINGS, ContentCoding.ZSTD),
+        ("gzip, br, zstd", [ContentCoding.GZIP], ContentCoding.GZIP),
+        ("gzip;q=0.5, br;q=0.8", ALL_CODINGS, ContentCoding.BROTLI),
+        ("GZIP", ALL_CODINGS, ContentCoding.GZIP),
+        ("*", [ContentCoding.BROTLI, ContentCoding.GZIP], ContentCoding.BROTLI),
+        ("*;q=0.5, zstd;q=0", ALL_CODINGS, ContentCoding.BROTLI),
+        ("gzip;q=0", ALL_CODINGS, None),
+        ("gzip;q=oops", ALL_CODINGS, None),
+        ("identity", ALL_CODINGS, None),
+        ("", ALL_CODINGS, None),
+    ],
+)
+def test_negotiate_content_coding(accept_encoding, available, expected_coding):
+    assert negotiate_content_coding(accept_encoding, available) == expected_coding
+
+
+@pytest.mark.parametrize(
+    "content_type, expected",
+    [
+        ("text/plain; charset=utf-8", True),
+        ("application/json", True),
+        ("text/csv", True),
+        ("image/svg+xml", True),
+        ("image/png", False),
+        ("audio/mpeg", False),
+        ("application/zip", False),
+        (None, False),
+    ],
+)
+def test_is_compressible_media_type(content_type, expected):
+    assert is_compressible_media_type(content_type) == expected
+
+
+def test_gzip_compressor_flush():
+    compressor = create_compressor(ContentCoding.GZIP, level=6)
+    first_chunk = compressor.compress(b"hello " * 100) + compressor.flush()
+    # what was sent so far decodes to the first chunk, before the stream is finished
+    assert gzip.GzipFile(fileobj=io.BytesIO(first_chunk)).read1() == b"hello " * 100
+    body = first_chunk + compressor.compress(b"world " * 100) + compressor.finish()
+    assert gzip.decompress(body) == b"hello " * 100 + b"world " * 100
+
+
+def test_zstd_compressor_round_trip():
+    zstandard = pytest.importorskip("zstandard")
+    compressor = create_compressor(ContentCoding.ZSTD, level=3)
+    body = compressor.compress(b"hello " * 100) + compressor.finish()
+    assert zstandard.ZstdDecompressor().decompressobj().decompress(body) == b"hello " * 100
+
+
+def test_brotli_compressor_round_trip():
+    brotli = pytest.importorskip("brotli")
+    compressor = create_compressor(ContentCoding.BROTLI, level=4)
+    body = compressor.compress(b"hello " * 100) + compressor.finish()
+    assert brotli.decompress(body) == b"hello " * 100
+
+
+def run_middleware(middleware: CompressionMiddleware, extensions: Optional[dict] = None) -> list[dict]:
+    """Send a GET request that accepts gzip through the middleware, and return the messages of its response."""
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "headers": [(b"accept-encoding", b"gzip")],
+        "extensions": extensions or {},
+    }
+    messages: list[dict] = []
+
+    async def receive() -> dict:
+        # the client stays connected
+        await asyncio.Event().wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message: dict) -> None:
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return messages
+
+
+def test_middleware_flushes_once_enough_of_the_body_went_in():
+    async def iter_chunks() -> AsyncIterator[bytes]:
+        for _ in range(100):
+            yield b"hello " * 20
+
+    app = StreamingResponse(iter_chunks(), media_type="text/plain")
+    messages = run_middleware(CompressionMiddleware(app, flush_size_bytes=6000))
+
+    bodies = [message["body"] for message in messages[1:]]
+    # 12000 bytes went in 120 bytes at a time, so the compressor was flushed after the 50th and 100th chunks
+    assert [index for index, body in enumerate(bodies) if body] == [0, 49, 99, 100]
+    assert gzip.decompress(b"".join(bodies)) == b"hello " * 2000
+
+
+@pytest.mark.parametrize("extensions", [{}, {"http.response.pathsend": {}}])
+def test_middleware_leaves_files_the_server_sends_itself_uncompressed(tmp_path: Path, extensions: dict):
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"hello " * 1000)
+    messages = run_middleware(CompressionMiddleware(FileResponse(path, media_type="text/plain")), extensions)
+
+    headers = dict(messages[0]["headers"])
+    if extensions:
+        # the server reads the file from disk, so its bytes never pass through the middleware
+        assert [message["type"] for message in messages] == ["http.response.start", "http.response.pathsend"]
+        assert b"content-encoding" not in headers
+        assert headers[b"content-length"] == str(len(b"hello " * 1000)).encode()
+    else:
+        assert headers[b"content-encoding"] == b"gzip"
+        body = b"".join(message.get("body", b"") for message in messages[1:])
+        assert gzip.decompress(body) == b"hello " * 1000
@@ -0,0 +1,32 @@
+"""Test cases for `conditional_requests`."""
+
+from datetime import (
+    datetime,
+    timezone,
+)
+
+from files_api.conditional_requests import (
+    get_cache_control,
+    parse_http_date,
+    parse_if_none_match,
+)
+
+
+def test_parse_if_none_match():
+    assert parse_if_none_match('"abc"') == ['"abc"']
+    assert parse_if_none_match('"abc", W/"def" ,') == ['"abc"', '"def"']
+    assert parse_if_none_match("*") == ["*"]
+
+
+def test_parse_http_date():
+    assert parse_http_date("Sat, 01 Jan 2022 00:00:00 GMT") == datetime(2022, 1, 1, tzinfo=timezone.utc)
+    assert parse_http_date("yesterday") is None
+    assert parse_http_date(None) is None
+
+
+def test_get_cache_control_uses_longest_matching_prefix():
+    cache_control_by_prefix = {"": "no-cache", "public/": "public, max-age=60", "public/images/": "immutable"}
+    assert get_cache_control("public/images/cat.png", cache_control_by_prefix) == "immutable"
+    assert get_cache_control("public/index.html", cache_control_by_prefix) == "public, max-age=60"
+    assert get_cache_control("private/notes.txt", cache_control_by_prefix) == "no-cache"
+    assert get_cache_control("private/notes.txt", {"public/": "public"}) is None
@@ -0,0 +1,26 @@
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.metrics import Histogram
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=[0.1, 1.0])
+    for value in [0.05, 0.5, 0.5, 5.0]:
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.1": 1, "1.0": 3, "+Inf": 4}
+    assert snapshot["count"] == 4
+    assert snapshot["sum"] == 6.05
+
+
+def test_get_metrics_reports_s3_executor(client: TestClient):
+    client.get("/v1/files")
+
+    response = client.get("/v1/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    s3_executor = response.json()["s3_executor"]
+    assert s3_executor["max_workers"] == client.app.state.settings.s3_max_pool_connections
+    assert s3_executor["completed"] >= 1
+    assert s3_executor["wait_seconds"]["count"] == s3_executor["completed"]
@@ -0,0 +1,74 @@
+import io
+import zipfile
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.s3.backends import AiobotocoreS3Backend
+
+TEST_FILE_PATH = "some/nested/file.txt"
+TEST_FILE_CONTENT = b"Hello, world!"
+TEST_FILE_CONTENT_TYPE = "text/plain"
+
+
+def test_app_uses_aiobotocore_backend(aiobotocore_client: TestClient):
+    assert isinstance(aiobotocore_client.app.state.s3_backend, AiobotocoreS3Backend)
+
+
+def test_crud_round_trip(aiobotocore_client: TestClient):
+    client = aiobotocore_client
+
+    response = client.put(
+        f"/v1/files/{TEST_FILE_PATH}",
+        files={"file_content": (TEST_FILE_PATH, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+    response = client.put(
+        f"/v1/files/{TEST_FILE_PATH}",
+        files={"file_content": (TEST_FILE_PATH, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+    )
+    assert response.status_code == status.HTTP_200_OK
+
+    response = client.get("/v1/files", params={"directory": "some/"})
+    assert response.status_code == status.HTTP_200_OK
+    assert [file["file_path"] for file in response.json()["files"]] == [TEST_FILE_PATH]
+
+    response = client.head(f"/v1/files/{TEST_FILE_PATH}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Length"] == str(len(TEST_FILE_CONTENT))
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == TEST_FILE_CONTENT
+    assert TEST_FILE_CONTENT_TYPE in response.headers["Content-Type"]
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=0-4"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == TEST_FILE_CONTENT[:5]
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=100-"})
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["Content-Range"] == f"bytes */{len(TEST_FILE_CONTENT)}"
+
+    response = client.delete(f"/v1/files/{TEST_FILE_PATH}")
+    assert response.status_code == status.HTTP_204_NO_CONTENT
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_download_archive(aiobotocore_client: TestClient):
+    client = aiobotocore_client
+    for index in range(6):
+        client.put(
+            f"/v1/files/archive/{index}.txt", files={"file_content": (f"{index}.txt", b"x" * index, "text/plain")}
+        )
+
+    response = client.get("/v1/archive", params={"directory": "archive", "compression": "deflate"})
+
+    assert response.status_code == status.HTTP_200_OK
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        assert {name: archive.read(name) for name in archive.namelist()} == {
+            f"{index}.txt": b"x" * index for index in range(6)
+        }
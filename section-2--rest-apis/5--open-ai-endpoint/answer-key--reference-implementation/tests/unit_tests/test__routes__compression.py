@@ -0,0 +1,89 @@
+"""Test the negotiated compression of responses."""
+
+import gzip
+import json
+
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.main import create_app
+from files_api.settings import Settings
+from tests.consts import TEST_BUCKET_NAME
+
+CSV_CONTENT = b"id,name,score\n" + b"".join(f"{i},name{i},{i * 7 % 100}\n".encode() for i in range(2000))
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def compressing_client(mocked_aws, mocked_openai) -> TestClient:
+    settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, response_compression_enabled=True)
+    with TestClient(create_app(settings=settings)) as client:
+        yield client
+
+
+def upload(client: TestClient, file_path: str, content: bytes, content_type: str) -> None:
+    response = client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, content, content_type)})
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def get_raw(client: TestClient, url: str, headers: dict) -> tuple[dict, bytes]:
+    """Return the headers and the body of a response as sent, before the client decodes it."""
+    with client.stream("GET", url, headers=headers) as response:
+        return response.headers, b"".join(response.iter_raw())
+
+
+def test_text_file_is_gzipped(compressing_client: TestClient):
+    upload(compressing_client, "data.csv", CSV_CONTENT, "text/csv")
+    etag = compressing_client.head("/v1/files/data.csv").headers["ETag"]
+
+    headers, body = get_raw(compressing_client, "/v1/files/data.csv", {"Accept-Encoding": "gzip"})
+    assert headers["Content-Encoding"] == "gzip"
+    assert headers["Vary"] == "Accept-Encoding"
+    assert headers["ETag"] == f"W/{etag}"
+    assert "Content-Length" not in headers
+    assert len(body) < len(CSV_CONTENT) / 2
+    assert gzip.decompress(body) == CSV_CONTENT
+
+    # the weak ETag of the compressed file still validates it
+    response = compressing_client.get(
+        "/v1/files/data.csv", headers={"Accept-Encoding": "gzip", "If-None-Match": headers["ETag"]}
+    )
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_responses_that_are_sent_uncompressed(compressing_client: TestClient):
+    upload(compressing_client, "data.csv", CSV_CONTENT, "text/csv")
+    upload(compressing_client, "image.png", CSV_CONTENT, "image/png")
+    upload(compressing_client, "small.txt", b"small", "text/plain")
+
+    for url, headers in [
+        ("/v1/files/data.csv", {"Accept-Encoding": "identity"}),
+        ("/v1/files/data.csv", {"Accept-Encoding": "gzip", "Range": "bytes=0-1999"}),
+        ("/v1/files/image.png", {"Accept-Encoding": "gzip"}),
+        ("/v1/files/small.txt", {"Accept-Encoding": "gzip"}),
+    ]:
+        response_headers, _ = get_raw(compressing_client, url, headers)
+        assert "Content-Encoding" not in response_headers, (url, headers)
+
+
+def test_listings_are_gzipped(compressing_client: TestClient):
+    for i in range(50):
+        upload(compressing_client, f"dir/file{i:02}.txt", b"content", "text/plain")
+
+    headers, body = get_raw(compressing_client, "/v1/files?page_size=50", {"Accept-Encoding": "gzip"})
+    assert headers["Content-Encoding"] == "gzip"
+    assert len(json.loads(gzip.decompress(body))["files"]) == 50
+
+    headers, body = get_raw(
+        compressing_client, "/v1/files", {"Accept-Encoding": "gzip", "Accept": "application/x-ndjson"}
+    )
+    assert headers["Content-Encoding"] == "gzip"
+    assert len(gzip.decompress(body).splitlines()) == 50
+
+
+def test_responses_are_not_compressed_by_default(client: TestClient):
+    upload(client, "data.csv", CSV_CONTENT, "text/csv")
+    headers, body = get_raw(client, "/v1/files/data.csv", {"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in headers
+    assert body == CSV_CONTENT
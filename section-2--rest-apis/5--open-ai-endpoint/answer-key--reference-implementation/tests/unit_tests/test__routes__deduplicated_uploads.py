@@ -0,0 +1,119 @@
+"""Test the routes with `DEDUPLICATE_UPLOADS` on, which stores each distinct file content once."""
+
+import boto3
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.main import create_app
+from files_api.settings import Settings
+from tests.consts import TEST_BUCKET_NAME
+from tests.utils import start_recording_s3_calls
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def deduplicating_client(mocked_aws, mocked_openai) -> TestClient:
+    settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, deduplicate_uploads=True)
+    with TestClient(create_app(settings=settings)) as client:
+        yield client
+
+
+def upload(client: TestClient, file_path: str, content: bytes = b"shared content") -> int:
+    response = client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, content, "text/plain")})
+    assert response.status_code in (status.HTTP_200_OK, status.HTTP_201_CREATED)
+    return response.status_code
+
+
+def stored_contents() -> list[str]:
+    response = boto3.client("s3").list_objects_v2(Bucket=TEST_BUCKET_NAME, Prefix=".cas/sha256/")
+    return [s3_object["Key"] for s3_object in response.get("Contents", [])]
+
+
+def test_upload_of_known_content_sends_no_body_to_s3(deduplicating_client: TestClient):
+    upload(deduplicating_client, "a.txt")
+    uploaded_bodies: list[bytes] = []
+
+    def record_body(params, **kwargs):  # pylint: disable=unused-argument
+        uploaded_bodies.append(params.get("Body", b""))
+
+    s3_client = deduplicating_client.app.state.s3_client
+    s3_client.meta.events.register("before-parameter-build.s3.PutObject", record_body)
+    s3_client.meta.events.register("before-parameter-build.s3.UploadPart", record_body)
+    s3_calls = start_recording_s3_calls(deduplicating_client)
+    assert upload(deduplicating_client, "b.txt") == status.HTTP_201_CREATED
+
+    # HEAD of the replaced pointer, PUT of the reference, LIST of release markers, HEAD of the content,
+    # PUT of the pointer
+    assert s3_calls == ["HeadObject", "PutObject", "ListObjectsV2", "HeadObject", "PutObject"]
+    # the reference holds the file path, the pointer nothing
+    assert uploaded_bodies == [b"b.txt", b""]
+    assert len(stored_contents()) == 1
+
+
+def test_pointers_read_like_the_files_they_point_to(deduplicating_client: TestClient):
+    upload(deduplicating_client, "dir/a.txt")
+    upload(deduplicating_client, "dir/b.txt")
+
+    response = deduplicating_client.get("/v1/files/dir/b.txt")
+    assert response.content == b"shared content"
+    assert response.headers["Content-Type"].startswith("text/plain")
+    head_response = deduplicating_client.head("/v1/files/dir/b.txt")
+    assert head_response.headers["Content-Length"] == str(len(b"shared content"))
+    assert head_response.headers["Last-Modified"] == response.headers["Last-Modified"]
+
+    not_modified = deduplicating_client.get(
+        "/v1/files/dir/b.txt", headers={"If-Modified-Since": response.headers["Last-Modified"]}
+    )
+    assert not_modified.status_code == status.HTTP_304_NOT_MODIFIED
+    assert not_modified.headers["ETag"] == response.headers["ETag"]
+
+    # the content-addressed storage is not listed
+    files = deduplicating_client.get("/v1/files").json()["files"]
+    assert [(file["file_path"], file["size_bytes"]) for file in files] == [("dir/a.txt", 14), ("dir/b.txt", 14)]
+    directories = deduplicating_client.get("/v1/files?delimiter=/").json()
+    assert directories["directories"] == ["dir/"]
+
+
+def test_content_is_kept_until_its_last_file_is_deleted(deduplicating_client: TestClient):
+    upload(deduplicating_client, "a.txt")
+    upload(deduplicating_client, "b.txt")
+    upload(deduplicating_client, "dir/c.txt")
+
+    assert deduplicating_client.delete("/v1/files/a.txt").status_code == status.HTTP_204_NO_CONTENT
+    assert deduplicating_client.get("/v1/files/b.txt").content == b"shared content"
+    response = deduplicating_client.post("/v1/files/move", json={"source_path": "b.txt", "destination_path": "d.txt"})
+    assert response.status_code == status.HTTP_200_OK
+    assert deduplicating_client.get("/v1/files/d.txt").content == b"shared content"
+
+    response = deduplicating_client.post("/v1/files/batch-delete", json={"file_paths": ["d.txt"]})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(stored_contents()) == 1
+    response = deduplicating_client.post("/v1/files/batch-delete", json={"directory": "dir/"})
+    assert response.status_code == status.HTTP_200_OK
+    assert stored_contents() == []
+
+
+def test_content_addressed_storage_is_not_reachable_through_the_api(deduplicating_client: TestClient):
+    upload(deduplicating_client, "a.txt")
+    [content_key] = stored_contents()
+
+    assert deduplicating_client.delete(f"/v1/files/{content_key}").status_code == status.HTTP_404_NOT_FOUND
+    assert deduplicating_client.get(f"/v1/files/{content_key}").status_code == status.HTTP_404_NOT_FOUND
+    assert deduplicating_client.head(f"/v1/files/{content_key}").status_code == status.HTTP_404_NOT_FOUND
+    response = deduplicating_client.put(
+        f"/v1/files/{content_key}", files={"file_content": ("content", b"overwritten", "text/plain")}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = deduplicating_client.post(
+        "/v1/files/copy", json={"source_path": content_key, "destination_path": "b.txt"}
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = deduplicating_client.post("/v1/files/batch-delete", json={"directory": "/.cas"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert (
+        deduplicating_client.get("/v1/files", params={"directory": ".cas/"}).status_code == status.HTTP_404_NOT_FOUND
+    )
+
+    assert stored_contents() == [content_key]
+    assert deduplicating_client.get("/v1/files/a.txt").content == b"shared content"
@@ -0,0 +1,34 @@
+"""Test sending files from the disk cache set with `DISK_CACHE_DIR`."""
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from tests.utils import (
+    check_overwritten_file_is_downloaded,
+    download_twice,
+    start_recording_s3_calls,
+    upload_file,
+)
+
+
+def test_repeated_downloads_are_sent_from_disk(disk_caching_client: TestClient):
+    upload_file(disk_caching_client, "hot.txt", b"hot content")
+    get_object_calls = start_recording_s3_calls(disk_caching_client, "GetObject")
+
+    first = download_twice(disk_caching_client, "hot.txt")
+    assert first.content == b"hot content"
+    assert len(get_object_calls) == 1
+    assert disk_caching_client.get("/v1/metrics").json()["disk_cache"]["hits"] == 1
+
+    response = disk_caching_client.get("/v1/files/hot.txt", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    response = disk_caching_client.get("/v1/files/hot.txt", headers={"Range": "bytes=0-2"})
+    assert (response.status_code, response.content) == (status.HTTP_206_PARTIAL_CONTENT, b"hot")
+
+
+def test_overwritten_file_is_not_sent_from_disk(disk_caching_client: TestClient):
+    check_overwritten_file_is_downloaded(disk_caching_client)
+
+
+def test_missing_file_is_not_found(disk_caching_client: TestClient):
+    assert disk_caching_client.get("/v1/files/missing.txt").status_code == status.HTTP_404_NOT_FOUND
@@ -1,3 +1,6 @@
+import base64
+from unittest.mock import Mock
+
 from fastapi import status
 from fastapi.testclient import TestClient
 
@@ -17,6 +20,34 @@ def test_head_nonexistent_file(client: TestClient):
     assert response.status_code == status.HTTP_404_NOT_FOUND
 
 
+def test_get_file_unsatisfiable_byte_range(client: TestClient):
+    client.put("/v1/files/file.txt", files={"file_content": ("file.txt", b"0123456789", "text/plain")})
+
+    for range_header in ["bytes=10-", "bytes=10-20, 30-"]:
+        response = client.get("/v1/files/file.txt", headers={"Range": range_header})
+        assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+        assert response.headers["Content-Range"] == "bytes */10"
+
+    # malformed ranges are ignored
+    response = client.get("/v1/files/file.txt", headers={"Range": "bytes=5-1"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b"0123456789"
+
+
+def test_get_file_unsatisfiable_byte_range_without_size_in_error(client: TestClient):
+    client.put("/v1/files/file.txt", files={"file_content": ("file.txt", b"0123456789", "text/plain")})
+
+    def fail_without_object_size(**kwargs):  # pylint: disable=unused-argument
+        # not every S3-compatible store reports the object size with the error
+        error = {"Code": "InvalidRange", "Message": "The requested range is not satisfiable"}
+        return Mock(status_code=416), {"Error": error, "ResponseMetadata": {"HTTPStatusCode": 416}}
+
+    client.app.state.s3_client.meta.events.register("before-call.s3.GetObject", fail_without_object_size)
+    response = client.get("/v1/files/file.txt", headers={"Range": "bytes=10-"})
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["Content-Range"] == "bytes */10"
+
+
 def test_delete_nonexistent_file(client: TestClient):
     response = client.delete("/v1/files/nonexistent_file.txt")
     assert response.status_code == status.HTTP_404_NOT_FOUND
@@ -44,6 +75,30 @@ def test_get_files_page_token_is_mutually_exclusive_with_page_size_and_directory
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     assert "mutually exclusive" in str(response.json())
 
+    response = client.get("/v1/files?page_token=token&delimiter=/")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert "mutually exclusive" in str(response.json())
+
+
+def test_get_files_invalid_page_token(client: TestClient):
+    page_token = base64.urlsafe_b64encode(b'{"page_size": 0}').decode()
+    response = client.get(f"/v1/files?page_token={page_token}")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert response.json()["detail"] == "Invalid page_token"
+
+
+def test_get_files_delimiter_is_not_supported_with_ndjson(client: TestClient):
+    response = client.get("/v1/files?delimiter=/", headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_files_sorted_without_metadata_index(client: TestClient):
+    response = client.get("/v1/files?sort_by=size_bytes")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    response = client.get("/v1/files?extension=txt&delimiter=/")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
 
 def test_unforeseen_500_error(client: TestClient):
     # delete the S3 bucket and all objects inside
@@ -53,3 +108,46 @@ def test_unforeseen_500_error(client: TestClient):
     response = client.get("/v1/files")
     assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
     assert response.json() == {"detail": "Internal server error"}
+
+
+def test_delete_files_requires_exactly_one_of_file_paths_and_directory(client: TestClient):
+    for body in [{}, {"file_paths": ["a.txt"], "directory": "dir"}, {"file_paths": []}, {"directory": ""}]:
+        response = client.post("/v1/files/batch-delete", json=body)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_upload_files_rejects_duplicate_paths_and_non_file_fields(client: TestClient):
+    response = client.post(
+        "/v1/files/batch-upload",
+        files=[("a.txt", ("a.txt", b"one", "text/plain")), ("a.txt", ("a.txt", b"two", "text/plain"))],
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    response = client.post(
+        "/v1/files/batch-upload", data={"b.txt": "not a file"}, files=[("a.txt", ("a.txt", b"one", "text/plain"))]
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get("/v1/files").json()["files"] == []
+
+
+def test_download_archive_of_empty_directory(client: TestClient):
+    response = client.get("/v1/archive", params={"directory": "nonexistent"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_copy_nonexistent_file(client: TestClient):
+    for route in ["/v1/files/copy", "/v1/files/move"]:
+        response = client.post(route, json={"source_path": "nonexistent.txt", "destination_path": "copy.txt"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_copy_files_invalid_source_and_destination(client: TestClient):
+    for body in [
+        {"source_path": "a.txt"},
+        {"source_path": "a.txt", "destination_path": "a.txt"},
+        {"source_path": "a.txt", "destination_path": "b.txt", "source_directory": "dir"},
+        {"source_directory": "dir", "destination_directory": "dir/sub"},
+        {"source_directory": "/", "destination_directory": "dir"},
+    ]:
+        response = client.post("/v1/files/move", json=body)
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -1,7 +1,14 @@
+import io
+import tarfile
+import zipfile
+
+import boto3
+import pytest
 from fastapi import status
 from fastapi.testclient import TestClient
 
 from files_api.schemas import GeneratedFileType
+from tests.consts import TEST_BUCKET_NAME
 
 # Constants for testing
 TEST_FILE_PATH = "test.txt"
@@ -55,6 +62,60 @@ def test_list_files_with_pagination(client: TestClient):
     assert "next_page_token" in data
 
 
+def test_list_files_with_delimiter(client: TestClient):
+    for file_path in ["docs/a.txt", "docs/b.txt", "docs/guides/c.txt", "docs/guides/deep/d.txt", "docs/api/e.txt"]:
+        client.put(
+            f"/v1/files/{file_path}",
+            files={"file_content": (file_path, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+        )
+
+    response = client.get("/v1/files?directory=docs/&delimiter=/")
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [file["file_path"] for file in data["files"]] == ["docs/a.txt", "docs/b.txt"]
+    assert data["directories"] == ["docs/api/", "docs/guides/"]
+    assert data["next_page_token"] is None
+
+    # without a delimiter, the whole tree is listed and there are no directories
+    data = client.get("/v1/files?directory=docs/").json()
+    assert len(data["files"]) == 5
+    assert data["directories"] is None
+
+
+def test_list_files_with_delimiter_pagination(client: TestClient):
+    for i in range(12):
+        client.put(
+            f"/v1/files/root/dir{i:02}/file.txt",
+            files={"file_content": ("file.txt", TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+        )
+    client.put(
+        "/v1/files/other/file.txt",
+        files={"file_content": ("file.txt", TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+    )
+
+    first_page = client.get("/v1/files?directory=root/&delimiter=/&page_size=10").json()
+    assert first_page["directories"] == [f"root/dir{i:02}/" for i in range(10)]
+    # the token carries the directory, delimiter and page size to the next page
+    second_page = client.get(f"/v1/files?page_token={first_page['next_page_token']}").json()
+    assert (second_page["files"], second_page["directories"]) == ([], ["root/dir10/", "root/dir11/"])
+    assert second_page["next_page_token"] is None
+
+
+def test_list_files_accepts_raw_s3_page_tokens_from_earlier_releases(client: TestClient):
+    for i in range(12):
+        client.put(
+            f"/v1/files/file{i:02}.txt",
+            files={"file_content": ("file.txt", TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+        )
+    legacy_page_token = boto3.client("s3").list_objects_v2(Bucket=TEST_BUCKET_NAME, MaxKeys=10)[
+        "NextContinuationToken"
+    ]
+
+    response = client.get(f"/v1/files?page_token={legacy_page_token}")
+    assert response.status_code == status.HTTP_200_OK
+    assert [file["file_path"] for file in response.json()["files"]] == ["file10.txt", "file11.txt"]
+
+
 def test_get_file_metadata(client: TestClient):
     # Upload a file
     client.put(
@@ -82,6 +143,81 @@ def test_get_file(client: TestClient):
     assert response.content == TEST_FILE_CONTENT
 
 
+def test_get_file_byte_range(client: TestClient):
+    client.put(
+        f"/v1/files/{TEST_FILE_PATH}",
+        files={"file_content": (TEST_FILE_PATH, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+    )
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=7-"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == TEST_FILE_CONTENT[7:]
+    assert response.headers["Content-Range"] == f"bytes 7-12/{len(TEST_FILE_CONTENT)}"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=-6"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert response.content == TEST_FILE_CONTENT[-6:]
+
+
+def test_get_file_multiple_byte_ranges(client: TestClient):
+    client.put(
+        f"/v1/files/{TEST_FILE_PATH}",
+        files={"file_content": (TEST_FILE_PATH, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+    )
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=0-4, -6"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    content_type, boundary = response.headers["Content-Type"].split("; boundary=")
+    assert content_type == "multipart/byteranges"
+    assert int(response.headers["Content-Length"]) == len(response.content)
+    assert response.content == (
+        f"--{boundary}\r\nContent-Type: {TEST_FILE_CONTENT_TYPE}\r\nContent-Range: bytes 0-4/13\r\n\r\n".encode()
+        + b"Hello\r\n"
+        + f"--{boundary}\r\nContent-Type: {TEST_FILE_CONTENT_TYPE}\r\nContent-Range: bytes 7-12/13\r\n\r\n".encode()
+        + b"world!\r\n"
+        + f"--{boundary}--\r\n".encode()
+    )
+
+
+def test_conditional_get_and_head(client: TestClient):
+    client.put(
+        f"/v1/files/{TEST_FILE_PATH}",
+        files={"file_content": (TEST_FILE_PATH, TEST_FILE_CONTENT, TEST_FILE_CONTENT_TYPE)},
+    )
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}")
+    etag, last_modified = response.headers["ETag"], response.headers["Last-Modified"]
+
+    for method in [client.get, client.head]:
+        for conditional_headers in [
+            {"If-None-Match": etag},
+            {"If-None-Match": f'"other-etag", W/{etag}'},
+            {"If-None-Match": "*"},
+            {"If-Modified-Since": last_modified},
+        ]:
+            response = method(f"/v1/files/{TEST_FILE_PATH}", headers=conditional_headers)
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+            assert response.headers["ETag"] == etag
+            assert response.content == b""
+
+        response = method(f"/v1/files/{TEST_FILE_PATH}", headers={"If-None-Match": '"other-etag"'})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["ETag"] == etag
+
+    response = client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"If-None-Match": etag, "Range": "bytes=0-4"})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_cache_control_by_prefix(client: TestClient):
+    client.app.state.settings.cache_control_by_prefix = {"": "no-cache", "public/": "public, max-age=60"}
+    for file_path in ["public/file.txt", "private/file.txt"]:
+        client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, b"content", "text/plain")})
+
+    assert client.get("/v1/files/public/file.txt").headers["Cache-Control"] == "public, max-age=60"
+    assert client.head("/v1/files/public/file.txt").headers["Cache-Control"] == "public, max-age=60"
+    assert client.get("/v1/files/private/file.txt").headers["Cache-Control"] == "no-cache"
+
+
 def test_delete_file(client: TestClient):
     # Upload a file
     client.put(
@@ -158,3 +294,88 @@ def test_generate_audio(client: TestClient):
     assert response.status_code == status.HTTP_200_OK
     assert response.content is not None
     assert response.headers["Content-Type"] == "audio/mpeg"
+
+
+def test__delete_files__by_path_and_by_directory(client: TestClient):
+    for file_path in ["dir/a.txt", "dir/sub/b.txt", "dir2/c.txt", "d.txt"]:
+        client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, b"content", "text/plain")})
+
+    response = client.post("/v1/files/batch-delete", json={"file_paths": ["d.txt", "missing.txt"]})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"deleted_count": 2, "failures": []}
+
+    response = client.post("/v1/files/batch-delete", json={"directory": "dir"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"deleted_count": 2, "failures": []}
+
+    remaining_files = [file["file_path"] for file in client.get("/v1/files").json()["files"]]
+    assert remaining_files == ["dir2/c.txt"]
+
+
+def test__upload_files__creates_and_updates_each_file(client: TestClient):
+    client.put("/v1/files/existing.txt", files={"file_content": ("existing.txt", b"old content", "text/plain")})
+
+    response = client.post(
+        "/v1/files/batch-upload",
+        files=[
+            ("new/a.txt", ("a.txt", b"content a", "text/plain")),
+            ("existing.txt", ("existing.txt", b"new content", "text/plain")),
+            ("new/b.json", ("b.json", b"{}", "application/json")),
+        ],
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    assert [(file["file_path"], file["status_code"]) for file in response.json()["files"]] == [
+        ("new/a.txt", status.HTTP_201_CREATED),
+        ("existing.txt", status.HTTP_200_OK),
+        ("new/b.json", status.HTTP_201_CREATED),
+    ]
+    assert client.get("/v1/files/existing.txt").content == b"new content"
+    response = client.get("/v1/files/new/b.json")
+    assert response.content == b"{}"
+    assert response.headers["Content-Type"] == "application/json"
+
+
+@pytest.mark.parametrize("archive_format", ["zip", "tar"])
+@pytest.mark.parametrize("compression", ["store", "deflate"])
+def test__download_archive__of_directory(client: TestClient, archive_format: str, compression: str):
+    files = {"dir/a.txt": b"content a", "dir/sub/b.txt": b"content b" * 1000, "dir/empty.txt": b"", "dir2/c.txt": b"c"}
+    for file_path, file_content in files.items():
+        client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, file_content, "text/plain")})
+
+    response = client.get(
+        "/v1/archive", params={"directory": "dir", "format": archive_format, "compression": compression}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    expected_files = {"a.txt": b"content a", "empty.txt": b"", "sub/b.txt": b"content b" * 1000}
+    if archive_format == "zip":
+        assert response.headers["Content-Disposition"] == 'attachment; filename="dir.zip"'
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            assert archive.testzip() is None
+            assert {name: archive.read(name) for name in archive.namelist()} == expected_files
+    else:
+        with tarfile.open(fileobj=io.BytesIO(response.content)) as archive:
+            assert {
+                member.name: archive.extractfile(member).read() for member in archive.getmembers()  # type: ignore
+            } == expected_files
+
+
+def test__copy_and_move_files(client: TestClient):
+    for file_path in ["dir/a.txt", "dir/sub/b.txt"]:
+        client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, file_path.encode(), "text/plain")})
+
+    response = client.post("/v1/files/copy", json={"source_path": "dir/a.txt", "destination_path": "a-copy.txt"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"file_count": 1, "failures": []}
+    assert client.get("/v1/files/a-copy.txt").content == b"dir/a.txt"
+
+    response = client.post("/v1/files/move", json={"source_directory": "dir", "destination_directory": "moved"})
+    assert response.json() == {"file_count": 2, "failures": []}
+
+    response = client.post("/v1/files/move", json={"source_path": "a-copy.txt", "destination_path": "moved/c.txt"})
+    assert response.json() == {"file_count": 1, "failures": []}
+
+    file_paths = [file["file_path"] for file in client.get("/v1/files").json()["files"]]
+    assert file_paths == ["moved/a.txt", "moved/c.txt", "moved/sub/b.txt"]
+    assert client.get("/v1/files/moved/sub/b.txt").content == b"dir/sub/b.txt"
@@ -0,0 +1,97 @@
+"""Test listing files from the metadata index, and keeping the index up to date."""
+
+import boto3
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.main import create_app
+from files_api.settings import Settings
+from tests.consts import TEST_BUCKET_NAME
+from tests.fixtures.api_client import wait_for_metadata_index
+
+
+def upload(client: TestClient, file_path: str, size_bytes: int = 1) -> None:
+    response = client.put(
+        f"/v1/files/{file_path}", files={"file_content": (file_path, b"x" * size_bytes, "text/plain")}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def list_file_paths(client: TestClient, query: str = "") -> list[str]:
+    response = client.get(f"/v1/files?{query}")
+    assert response.status_code == status.HTTP_200_OK
+    return [file["file_path"] for file in response.json()["files"]]
+
+
+# pylint: disable=unused-argument
+def test_index_is_built_from_the_bucket_on_startup(mocked_aws, tmp_path):
+    s3_client = boto3.client("s3")
+    for key in ["b.txt", "a.txt", "dir/c.txt"]:
+        s3_client.put_object(Bucket=TEST_BUCKET_NAME, Key=key, Body=b"content")
+
+    settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, metadata_index_path=str(tmp_path / "index.db"))
+    with TestClient(create_app(settings=settings)) as client:
+        wait_for_metadata_index(client)
+        response = client.get("/v1/files")
+        assert [file["file_path"] for file in response.json()["files"]] == ["a.txt", "b.txt", "dir/c.txt"]
+        assert (response.json()["total_count"], response.json()["total_size_bytes"]) == (3, 21)
+
+
+def test_list_files_sorted_by_size_with_pagination(indexed_client: TestClient):
+    for i in range(25):
+        upload(indexed_client, f"dir/file{i:02}.txt", size_bytes=i)
+    upload(indexed_client, "other/big.txt", size_bytes=100)
+
+    first_page = indexed_client.get("/v1/files?directory=dir/&sort_by=size_bytes&order=desc").json()
+    assert first_page["total_count"] == 25
+    file_paths = [file["file_path"] for file in first_page["files"]]
+
+    page_token = first_page["next_page_token"]
+    while page_token:
+        page = indexed_client.get(f"/v1/files?page_token={page_token}").json()
+        assert page["total_count"] is None
+        file_paths.extend(file["file_path"] for file in page["files"])
+        page_token = page["next_page_token"]
+    assert file_paths == [f"dir/file{i:02}.txt" for i in reversed(range(25))]
+
+    assert list_file_paths(indexed_client, "directory=dir/&sort_by=size_bytes&offset=20") == [
+        f"dir/file{i:02}.txt" for i in range(20, 25)
+    ]
+
+
+def test_list_files_filtered_by_extension(indexed_client: TestClient):
+    for file_path in ["a.txt", "b.md", "c.TXT", "d"]:
+        upload(indexed_client, file_path)
+    assert list_file_paths(indexed_client, "extension=txt") == ["a.txt", "c.TXT"]
+    assert list_file_paths(indexed_client, "extension=md&modified_after=2000-01-01T00:00:00") == ["b.md"]
+    assert list_file_paths(indexed_client, "extension=md&modified_before=2000-01-01T00:00:00") == []
+
+
+def test_list_files_from_the_index_makes_no_s3_calls(indexed_client: TestClient):
+    upload(indexed_client, "a.txt")
+    calls = []
+    indexed_client.app.state.s3_client.meta.events.register("before-call.s3", lambda model, **_: calls.append(model))
+
+    assert list_file_paths(indexed_client, "sort_by=last_modified") == ["a.txt"]
+    assert not calls
+
+
+def test_writes_and_deletes_update_the_index(indexed_client: TestClient):
+    for file_path in ["dir/a.txt", "dir/b.txt", "dir/sub/c.txt", "d.txt"]:
+        upload(indexed_client, file_path)
+
+    indexed_client.delete("/v1/files/d.txt")
+    indexed_client.post("/v1/files/copy", json={"source_path": "dir/a.txt", "destination_path": "e.txt"})
+    indexed_client.post("/v1/files/move", json={"source_directory": "dir/sub", "destination_directory": "moved"})
+    indexed_client.post("/v1/files/batch-delete", json={"file_paths": ["dir/b.txt"]})
+    assert list_file_paths(indexed_client, "sort_by=file_path") == ["dir/a.txt", "e.txt", "moved/c.txt"]
+
+    indexed_client.post("/v1/files/batch-delete", json={"directory": "dir"})
+    assert list_file_paths(indexed_client, "sort_by=file_path") == ["e.txt", "moved/c.txt"]
+
+
+def test_metrics_report_the_last_reconcile(indexed_client: TestClient):
+    metadata_index = indexed_client.get("/v1/metrics").json()["metadata_index"]
+    assert metadata_index["built_buckets"] == [TEST_BUCKET_NAME]
+    assert metadata_index["last_reconcile"]["listed_keys"] == 0
+    assert metadata_index["last_reconcile"]["shard_count"] == 0
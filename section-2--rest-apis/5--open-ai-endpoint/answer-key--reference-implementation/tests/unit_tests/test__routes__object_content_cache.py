@@ -0,0 +1,60 @@
+"""Test serving small files from the in-memory content cache set with `OBJECT_CONTENT_CACHE_MAX_BYTES`."""
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from tests.utils import (
+    check_overwritten_file_is_downloaded,
+    download_twice,
+    start_recording_s3_calls,
+    upload_file,
+)
+
+
+def test_repeated_downloads_are_answered_from_memory(content_caching_client: TestClient):
+    upload_file(content_caching_client, "hot.txt", b"hot content")
+    get_object_calls = start_recording_s3_calls(content_caching_client, "GetObject")
+
+    first = download_twice(content_caching_client, "hot.txt")
+    assert first.content == b"hot content"
+    assert len(get_object_calls) == 1
+
+    response = content_caching_client.get("/v1/files/hot.txt", headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    response = content_caching_client.get("/v1/files/hot.txt", headers={"Range": "bytes=4-"})
+    assert (response.status_code, response.content) == (status.HTTP_206_PARTIAL_CONTENT, b"content")
+    assert response.headers["Content-Range"] == "bytes 4-10/11"
+    response = content_caching_client.get("/v1/files/hot.txt", headers={"Range": "bytes=100-"})
+    assert response.status_code == status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE
+    assert response.headers["Content-Range"] == "bytes */11"
+    assert len(get_object_calls) == 1
+
+    contents = content_caching_client.get("/v1/metrics").json()["s3_metadata_cache"]["contents"]
+    assert contents["hits"] == 4
+    assert contents["size_bytes"] == len(b"hot content")
+
+
+def test_overwritten_or_deleted_file_is_not_answered_from_memory(content_caching_client: TestClient):
+    check_overwritten_file_is_downloaded(content_caching_client)
+
+    assert content_caching_client.delete("/v1/files/file.txt").status_code == status.HTTP_204_NO_CONTENT
+    assert content_caching_client.get("/v1/files/file.txt").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_empty_file_is_answered_from_memory(content_caching_client: TestClient):
+    upload_file(content_caching_client, "empty.txt", b"")
+    get_object_calls = start_recording_s3_calls(content_caching_client, "GetObject")
+    for _ in range(2):
+        response = content_caching_client.get("/v1/files/empty.txt")
+        assert (response.status_code, response.content) == (status.HTTP_200_OK, b"")
+    # the first download's ranged GET of the empty file fails, and is retried without a range
+    assert len(get_object_calls) == 2
+
+
+def test_files_are_not_cached_by_default(client: TestClient):
+    upload_file(client, "file.txt", b"content")
+    get_object_calls = start_recording_s3_calls(client, "GetObject")
+    client.get("/v1/files/file.txt")
+    client.get("/v1/files/file.txt")
+    assert len(get_object_calls) == 2
+    assert client.get("/v1/metrics").json()["s3_metadata_cache"] is None
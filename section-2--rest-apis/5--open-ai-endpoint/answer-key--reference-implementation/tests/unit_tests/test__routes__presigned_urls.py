@@ -0,0 +1,99 @@
+"""Test redirecting large downloads to, and uploading files through, presigned S3 URLs."""
+
+import pytest
+import requests
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.main import create_app
+from files_api.s3.write_objects import MIN_MULTIPART_PART_SIZE_BYTES
+from files_api.settings import Settings
+from tests.consts import TEST_BUCKET_NAME
+
+THRESHOLD_BYTES = 100
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def presigning_client(mocked_aws, mocked_openai) -> TestClient:
+    settings = Settings(
+        s3_bucket_name=TEST_BUCKET_NAME,
+        presigned_download_threshold_bytes=THRESHOLD_BYTES,
+        multipart_upload_part_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES,
+    )
+    with TestClient(create_app(settings=settings)) as client:
+        yield client
+
+
+def upload(client: TestClient, file_path: str, content: bytes) -> None:
+    response = client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, content, "text/plain")})
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def test_large_download_is_redirected_to_s3(presigning_client: TestClient):
+    upload(presigning_client, "small.txt", b"x" * (THRESHOLD_BYTES - 1))
+    upload(presigning_client, "large.txt", b"x" * THRESHOLD_BYTES)
+
+    response = presigning_client.get("/v1/files/small.txt", follow_redirects=False)
+    assert response.status_code == status.HTTP_200_OK
+
+    response = presigning_client.get("/v1/files/large.txt", follow_redirects=False)
+    assert response.status_code == status.HTTP_307_TEMPORARY_REDIRECT
+    assert response.headers["Cache-Control"] == "no-store"
+    redirected = requests.get(response.headers["Location"], headers={"Range": "bytes=0-9"}, timeout=10)
+    assert redirected.content == b"x" * 10
+
+    etag = presigning_client.head("/v1/files/large.txt").headers["ETag"]
+    response = presigning_client.get("/v1/files/large.txt", headers={"If-None-Match": etag}, follow_redirects=False)
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert presigning_client.get("/v1/files/missing.txt").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_upload_in_one_put(presigning_client: TestClient):
+    response = presigning_client.post(
+        "/v1/files/presigned-uploads", json={"file_path": "a.txt", "size_bytes": 5, "content_type": "text/plain"}
+    )
+    assert response.status_code == status.HTTP_201_CREATED
+    presigned_upload = response.json()
+    assert (presigned_upload["upload_id"], presigned_upload["parts"]) == (None, [])
+
+    requests.put(presigned_upload["url"], data=b"hello", headers=presigned_upload["headers"], timeout=10)
+    response = presigning_client.post("/v1/files/presigned-uploads/complete", json={"file_path": "a.txt"})
+    assert response.status_code == status.HTTP_200_OK
+    assert presigning_client.get("/v1/files/a.txt").content == b"hello"
+
+
+def test_upload_in_parts(presigning_client: TestClient):
+    file_content = b"x" * (MIN_MULTIPART_PART_SIZE_BYTES + 1)
+    response = presigning_client.post(
+        "/v1/files/presigned-uploads", json={"file_path": "large.bin", "size_bytes": len(file_content)}
+    )
+    presigned_upload = response.json()
+    assert presigned_upload["url"] is None
+    part_size_bytes = presigned_upload["part_size_bytes"]
+
+    parts = []
+    for part in presigned_upload["parts"]:
+        start = (part["part_number"] - 1) * part_size_bytes
+        end = start + part_size_bytes
+        part_response = requests.put(part["url"], data=file_content[start:end], timeout=10)
+        parts.append({"part_number": part["part_number"], "etag": part_response.headers["ETag"]})
+
+    response = presigning_client.post(
+        "/v1/files/presigned-uploads/complete",
+        json={"file_path": "large.bin", "upload_id": presigned_upload["upload_id"], "parts": parts[::-1]},
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert presigning_client.head("/v1/files/large.bin").headers["Content-Length"] == str(len(file_content))
+
+
+def test_complete_without_upload_is_not_found(presigning_client: TestClient):
+    response = presigning_client.post("/v1/files/presigned-uploads/complete", json={"file_path": "never.txt"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_presigned_uploads_conflict_with_deduplication(mocked_aws, mocked_openai):
+    settings = Settings(s3_bucket_name=TEST_BUCKET_NAME, deduplicate_uploads=True)
+    with TestClient(create_app(settings=settings)) as client:
+        response = client.post("/v1/files/presigned-uploads", json={"file_path": "a.txt", "size_bytes": 5})
+    assert response.status_code == status.HTTP_409_CONFLICT
@@ -0,0 +1,200 @@
+"""Test the number of S3 calls each route makes, counted with botocore event hooks."""
+
+import json
+from typing import Iterator
+
+import boto3
+import pytest
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.main import create_app
+from files_api.routes import listing
+from files_api.settings import Settings
+from tests.consts import TEST_BUCKET_NAME
+
+TEST_FILE_PATH = "some/nested/file.txt"
+
+
+def record_s3_calls(client: TestClient) -> Iterator[list[str]]:
+    """Record the name of every S3 operation the app calls, once it uploaded a file."""
+    calls: list[str] = []
+
+    def record_call(model, **kwargs):  # pylint: disable=unused-argument
+        calls.append(model.name)
+
+    client.put(f"/v1/files/{TEST_FILE_PATH}", files={"file_content": (TEST_FILE_PATH, b"content", "text/plain")})
+    client.app.state.s3_client.meta.events.register("before-call.s3", record_call)
+    yield calls
+    client.app.state.s3_client.meta.events.unregister("before-call.s3", record_call)
+
+
+@pytest.fixture
+def s3_calls(client: TestClient) -> Iterator[list[str]]:
+    yield from record_s3_calls(client)
+
+
+# pylint: disable=unused-argument
+@pytest.fixture
+def caching_client(mocked_aws, mocked_openai) -> Iterator[TestClient]:
+    """Provide a client of an API that caches S3 metadata and prefetches the next pages of listings."""
+    settings = Settings(
+        s3_bucket_name=TEST_BUCKET_NAME, metadata_cache_max_entries=1000, listing_prefetch_max_entries=1000
+    )
+    with TestClient(create_app(settings=settings)) as client:
+        yield client
+
+
+@pytest.fixture
+def caching_s3_calls(caching_client: TestClient) -> Iterator[list[str]]:
+    yield from record_s3_calls(caching_client)
+
+
+@pytest.mark.parametrize(
+    "method, file_path, expected_status_code, expected_calls",
+    [
+        ("GET", TEST_FILE_PATH, status.HTTP_200_OK, ["GetObject"]),
+        ("GET", "nonexistent.txt", status.HTTP_404_NOT_FOUND, ["GetObject"]),
+        ("HEAD", TEST_FILE_PATH, status.HTTP_200_OK, ["HeadObject"]),
+        ("HEAD", "nonexistent.txt", status.HTTP_404_NOT_FOUND, ["HeadObject"]),
+    ],
+)
+def test_get_and_head_make_one_s3_call(  # pylint: disable=too-many-arguments
+    client: TestClient, s3_calls: list[str], method, file_path, expected_status_code, expected_calls
+):
+    response = client.request(method, f"/v1/files/{file_path}")
+    assert response.status_code == expected_status_code
+    assert s3_calls == expected_calls
+
+
+def test_upload_of_new_file_makes_one_s3_call(client: TestClient, s3_calls: list[str]):
+    response = client.put("/v1/files/new.txt", files={"file_content": ("new.txt", b"content", "text/plain")})
+    assert response.status_code == status.HTTP_201_CREATED
+    assert s3_calls == ["PutObject"]
+
+
+def test_upload_over_existing_file_retries_with_if_match(client: TestClient, s3_calls: list[str]):
+    response = client.put(
+        f"/v1/files/{TEST_FILE_PATH}", files={"file_content": (TEST_FILE_PATH, b"new", "text/plain")}
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert s3_calls == ["PutObject", "HeadObject", "PutObject"]
+
+
+def test_repeated_head_is_answered_from_metadata_cache(caching_client: TestClient, caching_s3_calls: list[str]):
+    first_response = caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    second_response = caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    assert second_response.status_code == status.HTTP_200_OK
+    assert second_response.headers == first_response.headers
+    assert caching_s3_calls == ["HeadObject"]
+
+
+def test_missing_file_is_cached_as_missing(caching_client: TestClient, caching_s3_calls: list[str]):
+    assert caching_client.head("/v1/files/nonexistent.txt").status_code == status.HTTP_404_NOT_FOUND
+    assert caching_client.get("/v1/files/nonexistent.txt").status_code == status.HTTP_404_NOT_FOUND
+    assert caching_client.head("/v1/files/nonexistent.txt").status_code == status.HTTP_404_NOT_FOUND
+    assert caching_s3_calls == ["HeadObject"]
+
+
+def test_upload_invalidates_cached_metadata(caching_client: TestClient, caching_s3_calls: list[str]):
+    caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    caching_client.put(
+        f"/v1/files/{TEST_FILE_PATH}", files={"file_content": (TEST_FILE_PATH, b"longer content", "text/plain")}
+    )
+    response = caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    assert response.headers["Content-Length"] == str(len(b"longer content"))
+    assert caching_s3_calls == ["HeadObject", "PutObject", "HeadObject", "PutObject", "HeadObject"]
+
+
+def test_multiple_byte_ranges_are_read_from_the_current_version(
+    caching_client: TestClient, caching_s3_calls: list[str]
+):
+    caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    # replaced behind the API's back, so the cached metadata still has the old ETag
+    boto3.client("s3").put_object(Bucket=TEST_BUCKET_NAME, Key=TEST_FILE_PATH, Body=b"0123456789")
+    response = caching_client.get(f"/v1/files/{TEST_FILE_PATH}", headers={"Range": "bytes=0-1, -2"})
+    assert response.status_code == status.HTTP_206_PARTIAL_CONTENT
+    assert b"Content-Range: bytes 0-1/10\r\n\r\n01\r\n" in response.content
+    assert b"Content-Range: bytes 8-9/10\r\n\r\n89\r\n" in response.content
+    assert caching_s3_calls == ["HeadObject", "GetObject", "GetObject", "GetObject"]
+
+
+def test_delete_invalidates_cached_metadata(caching_client: TestClient, caching_s3_calls: list[str]):
+    caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    caching_client.delete(f"/v1/files/{TEST_FILE_PATH}")
+    assert caching_client.head(f"/v1/files/{TEST_FILE_PATH}").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_repeated_listing_is_answered_from_metadata_cache(caching_client: TestClient, caching_s3_calls: list[str]):
+    first_response = caching_client.get("/v1/files")
+    assert caching_client.get("/v1/files").json() == first_response.json()
+    caching_client.put("/v1/files/new.txt", files={"file_content": ("new.txt", b"content", "text/plain")})
+    assert len(caching_client.get("/v1/files").json()["files"]) == len(first_response.json()["files"]) + 1
+    assert caching_s3_calls == ["ListObjectsV2", "PutObject", "ListObjectsV2"]
+
+
+def test_metrics_report_metadata_cache_hits(caching_client: TestClient, caching_s3_calls: list[str]):
+    caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    objects_metrics = caching_client.get("/v1/metrics").json()["s3_metadata_cache"]["objects"]
+    assert objects_metrics["size"] == 1
+    assert objects_metrics["hits"] == 1
+    assert objects_metrics["misses"] == 1
+
+
+def test_batch_delete_invalidates_cached_metadata(caching_client: TestClient, caching_s3_calls: list[str]):
+    caching_client.head(f"/v1/files/{TEST_FILE_PATH}")
+    caching_client.post("/v1/files/batch-delete", json={"directory": "some"})
+    assert caching_client.head(f"/v1/files/{TEST_FILE_PATH}").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_list_files_as_ndjson_walks_every_page(client: TestClient, s3_calls: list[str], monkeypatch):
+    monkeypatch.setattr(listing, "DEFAULT_MAX_KEYS", 2)
+    file_paths = [f"dir/{index}.txt" for index in range(5)]
+    for file_path in file_paths:
+        client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, b"content", "text/plain")})
+    s3_calls.clear()
+
+    response = client.get("/v1/files", params={"directory": "dir/"}, headers={"Accept": "application/x-ndjson"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["Content-Type"] == "application/x-ndjson"
+    assert [json.loads(line)["file_path"] for line in response.text.splitlines()] == file_paths
+    assert s3_calls == ["ListObjectsV2"] * 3
+
+
+def upload_files(client: TestClient, file_paths: list[str]) -> None:
+    for file_path in file_paths:
+        client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, b"content", "text/plain")})
+
+
+def test_next_page_is_prefetched(caching_client: TestClient, caching_s3_calls: list[str]):
+    upload_files(caching_client, [f"page/{i:02}.txt" for i in range(12)])
+    caching_s3_calls.clear()
+
+    first_page = caching_client.get("/v1/files?directory=page/&page_size=10").json()
+    second_page = caching_client.get(f"/v1/files?page_token={first_page['next_page_token']}").json()
+    assert [file["file_path"] for file in second_page["files"]] == ["page/10.txt", "page/11.txt"]
+    prefetch_metrics = caching_client.get("/v1/metrics").json()["listing_prefetch"]
+    assert (prefetch_metrics["hits"], prefetch_metrics["misses"]) == (1, 0)
+    # the second page was fetched ahead, while the client read the first
+    assert caching_s3_calls == ["ListObjectsV2", "ListObjectsV2"]
+
+
+def test_upload_drops_prefetched_pages(caching_client: TestClient, caching_s3_calls: list[str]):
+    upload_files(caching_client, [f"page/{i:02}.txt" for i in range(11)])
+
+    first_page = caching_client.get("/v1/files?directory=page/&page_size=10").json()
+    upload_files(caching_client, ["page/99.txt"])
+    second_page = caching_client.get(f"/v1/files?page_token={first_page['next_page_token']}").json()
+    assert [file["file_path"] for file in second_page["files"]] == ["page/10.txt", "page/99.txt"]
+    assert caching_client.get("/v1/metrics").json()["listing_prefetch"]["misses"] == 1
+
+
+def test_next_page_is_not_prefetched_by_default(client: TestClient, s3_calls: list[str]):
+    upload_files(client, [f"page/{i:02}.txt" for i in range(12)])
+    s3_calls.clear()
+
+    client.get("/v1/files?directory=page/&page_size=10")
+    assert s3_calls == ["ListObjectsV2"]
+    assert client.get("/v1/metrics").json()["listing_prefetch"] is None
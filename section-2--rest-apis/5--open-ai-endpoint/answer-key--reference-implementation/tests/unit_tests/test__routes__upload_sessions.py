@@ -0,0 +1,83 @@
+"""Test uploading files in chunks through `/v1/upload-sessions`."""
+
+from fastapi import status
+from fastapi.testclient import TestClient
+
+from files_api.main import create_app
+from files_api.s3.write_objects import MIN_MULTIPART_PART_SIZE_BYTES
+from files_api.settings import Settings
+from tests.consts import TEST_BUCKET_NAME
+
+CHUNKS = [b"a" * MIN_MULTIPART_PART_SIZE_BYTES, b"b" * MIN_MULTIPART_PART_SIZE_BYTES, b"c"]
+
+
+def create_session(client: TestClient, file_path: str = "dataset.bin") -> str:
+    response = client.post("/v1/upload-sessions", json={"file_path": file_path, "content_type": "text/plain"})
+    assert response.status_code == status.HTTP_201_CREATED
+    return response.json()["session_id"]
+
+
+def put_chunk(client: TestClient, session_id: str, chunk_number: int) -> int:
+    response = client.put(f"/v1/upload-sessions/{session_id}/chunks/{chunk_number}", content=CHUNKS[chunk_number - 1])
+    return response.status_code
+
+
+def test_resumed_upload_sends_only_the_missing_chunks(client: TestClient):
+    session_id = create_session(client)
+    assert put_chunk(client, session_id, 3) == status.HTTP_200_OK
+    assert put_chunk(client, session_id, 1) == status.HTTP_200_OK
+
+    # after a dropped connection, the client asks which chunks landed
+    session = client.get(f"/v1/upload-sessions/{session_id}").json()
+    assert [(chunk["chunk_number"], chunk["size_bytes"]) for chunk in session["chunks"]] == [
+        (1, MIN_MULTIPART_PART_SIZE_BYTES),
+        (3, 1),
+    ]
+    response = client.post(f"/v1/upload-sessions/{session_id}/complete", json={"chunk_count": 3})
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert response.json()["detail"]["missing_chunk_numbers"] == [2]
+
+    assert put_chunk(client, session_id, 2) == status.HTTP_200_OK
+    response = client.post(f"/v1/upload-sessions/{session_id}/complete", json={"chunk_count": 3})
+    assert response.status_code == status.HTTP_200_OK
+    response = client.get("/v1/files/dataset.bin")
+    assert response.content == b"".join(CHUNKS)
+    assert response.headers["Content-Type"].startswith("text/plain")
+
+    # the session ended with the upload
+    assert client.get(f"/v1/upload-sessions/{session_id}").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_aborted_session_is_gone(client: TestClient):
+    session_id = create_session(client)
+    assert put_chunk(client, session_id, 1) == status.HTTP_200_OK
+
+    assert client.delete(f"/v1/upload-sessions/{session_id}").status_code == status.HTTP_204_NO_CONTENT
+    assert client.get(f"/v1/upload-sessions/{session_id}").status_code == status.HTTP_404_NOT_FOUND
+    assert client.head("/v1/files/dataset.bin").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_invalid_session_id_is_not_found(client: TestClient):
+    assert client.get("/v1/upload-sessions/not-a-session").status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_small_chunk_before_the_last_is_rejected(client: TestClient):
+    session_id = create_session(client)
+    for chunk_number, chunk_content in enumerate([b"short", b"last"], start=1):
+        client.put(f"/v1/upload-sessions/{session_id}/chunks/{chunk_number}", content=chunk_content)
+
+    response = client.post(f"/v1/upload-sessions/{session_id}/complete", json={"chunk_count": 2})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+# pylint: disable=unused-argument
+def test_chunk_larger_than_the_limit_is_rejected(mocked_aws, mocked_openai):
+    settings = Settings(
+        s3_bucket_name=TEST_BUCKET_NAME, upload_session_max_chunk_size_bytes=MIN_MULTIPART_PART_SIZE_BYTES
+    )
+    with TestClient(create_app(settings=settings)) as client:
+        session_id = create_session(client)
+        response = client.put(
+            f"/v1/upload-sessions/{session_id}/chunks/1", content=b"x" * (MIN_MULTIPART_PART_SIZE_BYTES + 1)
+        )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
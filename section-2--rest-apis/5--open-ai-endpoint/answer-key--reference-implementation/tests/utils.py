@@ -1,4 +1,7 @@
 import boto3
+from fastapi import status
+from fastapi.testclient import TestClient
+from httpx import Response
 
 
 def delete_s3_bucket(bucket_name: str) -> None:
@@ -7,3 +10,40 @@ def delete_s3_bucket(bucket_name: str) -> None:
     bucket = s3_client.Bucket(bucket_name)
     bucket.objects.all().delete()
     bucket.delete()
+
+
+def start_recording_s3_calls(client: TestClient, operation_name: str = "") -> list[str]:
+    """Record the name of every S3 operation the app calls from now on, or only of `operation_name`."""
+    calls: list[str] = []
+
+    def record_call(model, **kwargs):  # pylint: disable=unused-argument
+        calls.append(model.name)
+
+    event_name = f"before-call.s3.{operation_name}" if operation_name else "before-call.s3"
+    client.app.state.s3_client.meta.events.register(event_name, record_call)
+    return calls
+
+
+def upload_file(client: TestClient, file_path: str, content: bytes) -> None:
+    """Upload a file through the API, creating or replacing it."""
+    response = client.put(f"/v1/files/{file_path}", files={"file_content": (file_path, content, "text/plain")})
+    assert response.status_code in (status.HTTP_200_OK, status.HTTP_201_CREATED)
+
+
+def download_twice(client: TestClient, file_path: str) -> Response:
+    """Download a file twice, check that both downloads match, and return the first."""
+    first, second = client.get(f"/v1/files/{file_path}"), client.get(f"/v1/files/{file_path}")
+    assert first.content == second.content
+    for header in ["Content-Type", "Content-Length", "ETag", "Last-Modified"]:
+        assert first.headers[header] == second.headers[header]
+    return first
+
+
+def check_overwritten_file_is_downloaded(client: TestClient, file_path: str = "file.txt") -> None:
+    """Check that a file downloaded before it was overwritten is downloaded with its new content afterwards."""
+    upload_file(client, file_path, b"old content")
+    assert client.get(f"/v1/files/{file_path}").content == b"old content"
+
+    upload_file(client, file_path, b"new content")
+    assert client.get(f"/v1/files/{file_path}").content == b"new content"
+    assert client.get(f"/v1/files/{file_path}").content == b"new content"